@@ -0,0 +1,66 @@
+"""
+Compare two loadgen.py reports, e.g. before and after a change.
+
+    python benchmarks/compare.py results/base.json results/head.json --fail-on 10
+
+Prints p50/p99 latency and throughput per scenario (and endpoint) with the
+relative change. With --fail-on PCT it exits with status 1 when any p99
+latency grew, or any throughput dropped, by more than PCT percent.
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+
+def _change(base: float, head: float) -> float:
+    return (head - base) / base * 100 if base else 0.0
+
+
+def _rows(base: dict, head: dict, prefix: str = ""):
+    for name, head_result in head.items():
+        base_result = base.get(name)
+        if base_result is None:
+            continue
+        yield prefix + name, base_result, head_result
+        yield from _rows(base_result.get("endpoints", {}), head_result.get("endpoints", {}), prefix + "  ")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base", type=Path)
+    parser.add_argument("head", type=Path)
+    parser.add_argument("--fail-on", type=float, default=None, metavar="PCT")
+    args = parser.parse_args(argv)
+
+    base = json.loads(args.base.read_text())
+    head = json.loads(args.head.read_text())
+    print(f"base {base['commit']} ({base['started_at']})  vs  head {head['commit']} ({head['started_at']})")
+    if base.get("params") != head.get("params"):
+        print("warning: runs used different parameters, numbers are not directly comparable")
+
+    header = f"{'scenario':<28}{'p50 ms':>18}{'p99 ms':>28}{'req/s':>28}"
+    print(header)
+    print("-" * len(header))
+    regressions = []
+    for name, b, h in _rows(base["scenarios"], head["scenarios"]):
+        p50 = _change(b["latency_ms"]["p50"], h["latency_ms"]["p50"])
+        p99 = _change(b["latency_ms"]["p99"], h["latency_ms"]["p99"])
+        rps = _change(b["throughput_rps"], h["throughput_rps"])
+        print(
+            f"{name:<28}"
+            f"{b['latency_ms']['p50']:>8.1f} → {h['latency_ms']['p50']:<7.1f}({p50:+.0f}%)"
+            f"{b['latency_ms']['p99']:>10.1f} → {h['latency_ms']['p99']:<7.1f}({p99:+.0f}%)"
+            f"{b['throughput_rps']:>8.1f} → {h['throughput_rps']:<7.1f}({rps:+.0f}%)"
+        )
+        if args.fail_on is not None and not name.startswith(" ") and (p99 > args.fail_on or -rps > args.fail_on):
+            regressions.append(name)
+
+    if regressions:
+        print(f"regression over {args.fail_on}% in: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,188 @@
+"""
+Seed a benchmark fleet through the public APIs.
+
+Registers N admins, creates M vehicles per admin and backfills trip and fuel
+history, then writes the credentials and vehicle ids to a state file that
+loadgen.py reads. Everything is derived from --seed, so two runs against an
+empty stack produce the same fleet.
+
+    python benchmarks/fleet.py --admins 5 --vehicles 20 --history-days 365
+"""
+import argparse
+import asyncio
+import json
+import random
+import string
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import httpx
+
+from targets import Targets, add_target_arguments
+
+DEFAULT_STATE = Path(__file__).resolve().parent / ".state" / "fleet.json"
+PASSWORD = "Bench!Passw0rd"
+
+MAKES = {
+    "Toyota": ["Corolla", "Yaris", "RAV4"],
+    "Skoda": ["Octavia", "Superb", "Fabia"],
+    "Volkswagen": ["Golf", "Passat", "Transporter"],
+    "Ford": ["Focus", "Transit", "Kuga"],
+    "Renault": ["Clio", "Master", "Megane"],
+}
+CITIES = ["Warszawa", "Kraków", "Gdańsk", "Wrocław", "Poznań", "Łódź"]
+STATIONS = ["Orlen", "BP", "Shell", "Circle K", "Moya"]
+
+
+def _vin(rng: random.Random) -> str:
+    return "".join(rng.choices("ABCDEFGHJKLMNPRSTUVWXYZ0123456789", k=17))
+
+
+def _plate(rng: random.Random) -> str:
+    return "W" + "".join(rng.choices(string.ascii_uppercase, k=2)) + " " + "".join(rng.choices(string.digits, k=5))
+
+
+def vehicle_payload(rng: random.Random) -> dict:
+    make = rng.choice(sorted(MAKES))
+    return {
+        "vin": _vin(rng),
+        "make": make,
+        "model": rng.choice(MAKES[make]),
+        "year": rng.randint(2012, 2025),
+        "license_plate": _plate(rng),
+        "fuel_type": rng.choice(["gasoline", "diesel", "diesel", "hybrid"]),
+        "fuel_level": rng.randint(10, 100),
+        "odometer": rng.randint(5_000, 250_000),
+        "fuel_capacity": rng.choice([45.0, 50.0, 55.0, 70.0, 80.0]),
+    }
+
+
+def trip_payload(rng: random.Random, vehicle: dict, started_at: datetime) -> dict:
+    distance = round(rng.lognormvariate(3.6, 0.7), 2)
+    consumption = vehicle["consumption_l_100km"] * rng.uniform(0.85, 1.2)
+    fuel_used = round(distance * consumption / 100, 2)
+    return {
+        "vehicle_id": str(vehicle["id"]),
+        "vehicle_label": vehicle["label"],
+        "route_label": f"{rng.choice(CITIES)} - {rng.choice(CITIES)}",
+        "distance_km": distance,
+        "fuel_used_l": fuel_used,
+        "fuel_cost": round(fuel_used * rng.uniform(5.8, 7.2), 2),
+        "tolls_cost": round(rng.choice([0, 0, 0, 9.9, 18.0, 36.5]), 2),
+        "started_at": started_at.isoformat(),
+    }
+
+
+def fuel_payload(rng: random.Random, vehicle: dict) -> dict:
+    liters = round(rng.uniform(20, 65), 2)
+    price = round(rng.uniform(5.8, 7.2), 2)
+    return {
+        "vehicle_id": str(vehicle["id"]),
+        "vehicle_label": vehicle["label"],
+        "liters": liters,
+        "price_per_liter": price,
+        "total_cost": round(liters * price, 2),
+        "station": rng.choice(STATIONS),
+        "odometer": rng.randint(5_000, 250_000),
+    }
+
+
+async def authenticate(client: httpx.AsyncClient, targets: Targets, email: str, password: str = PASSWORD) -> dict:
+    resp = await client.post(targets.login_url(), json={"email": email, "password": password})
+    resp.raise_for_status()
+    return resp.json()
+
+
+async def login(client: httpx.AsyncClient, targets: Targets, email: str, password: str = PASSWORD) -> str:
+    return (await authenticate(client, targets, email, password))["token"]
+
+
+async def _register_admin(client: httpx.AsyncClient, targets: Targets, email: str, full_name: str) -> dict:
+    payload = {
+        "email": email,
+        "full_name": full_name,
+        "password": PASSWORD,
+        "role": "admin",
+        "subscription_plan": "2_years",
+    }
+    resp = await client.post(targets.register_url(), json=payload)
+    if resp.status_code == 400 and "email" in resp.text:
+        return await authenticate(client, targets, email)
+    resp.raise_for_status()
+    return resp.json()
+
+
+async def seed_admin(client: httpx.AsyncClient, targets: Targets, args, index: int) -> dict:
+    rng = random.Random(f"{args.seed}:{index}")
+    email = f"bench-admin-{args.seed}-{index}@fleetify.local"
+    session = await _register_admin(client, targets, email, f"Bench Admin {index}")
+    headers = {"Authorization": f"Bearer {session['token']}"}
+
+    vehicles = []
+    for _ in range(args.vehicles):
+        resp = await client.post(targets.dashboard_url("/dashboard/vehicles"), json=vehicle_payload(rng), headers=headers)
+        resp.raise_for_status()
+        created = resp.json()
+        vehicles.append({
+            "id": created["id"],
+            "label": f"{created['make']} {created['model']} ({created['license_plate']})",
+            "consumption_l_100km": round(rng.uniform(4.5, 11.0), 2),
+            "fuel_type": created.get("fuel_type"),
+            "fuel_capacity": created.get("fuel_capacity"),
+            "odometer": created.get("odometer"),
+        })
+
+    now = datetime.now(timezone.utc)
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def post(path: str, payload: dict):
+        async with semaphore:
+            resp = await client.post(targets.dashboard_url(path), json=payload, headers=headers)
+            resp.raise_for_status()
+
+    writes = []
+    for vehicle in vehicles:
+        for day in range(args.history_days, 0, -1):
+            for _ in range(rng.choices([0, 1, 2], weights=[3, 5, 2])[0]):
+                started_at = now - timedelta(days=day, minutes=rng.randint(0, 24 * 60))
+                writes.append(post("/dashboard/trips", trip_payload(rng, vehicle, started_at)))
+            if rng.random() < 0.15:
+                writes.append(post("/dashboard/fuel-logs", fuel_payload(rng, vehicle)))
+    await asyncio.gather(*writes)
+
+    print(f"[bench] seeded {email}: {len(vehicles)} vehicles, {len(writes)} history rows")
+    return {"id": session["user"]["id"], "email": email, "password": PASSWORD, "vehicles": vehicles}
+
+
+async def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_target_arguments(parser)
+    parser.add_argument("--admins", type=int, default=3)
+    parser.add_argument("--vehicles", type=int, default=10, help="vehicles per admin")
+    parser.add_argument(
+        "--history-days", type=int, default=90,
+        help="days of trip/fuel history per vehicle posted through the API; use 0 and datagen.py for large histories",
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--state", type=Path, default=DEFAULT_STATE)
+    args = parser.parse_args(argv)
+
+    targets = Targets.from_args(args)
+    async with httpx.AsyncClient(timeout=30.0) as client:
+        admins = [await seed_admin(client, targets, args, index) for index in range(args.admins)]
+
+    args.state.parent.mkdir(parents=True, exist_ok=True)
+    args.state.write_text(json.dumps({
+        "seed": args.seed,
+        "admins": admins,
+        "history_days": args.history_days,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    }, indent=2))
+    print(f"[bench] fleet state written to {args.state}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
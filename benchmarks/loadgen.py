@@ -0,0 +1,208 @@
+"""
+Closed-loop load generator for the dashboard flows.
+
+Each scenario runs --concurrency workers for --duration seconds (after a
+--warmup that is not recorded). Every worker acts as one of the seeded admins
+and issues requests back to back. The run writes a JSON report with latency
+percentiles and throughput per scenario and per endpoint, tagged with the git
+commit, so it can be diffed against another commit with compare.py.
+
+    python benchmarks/loadgen.py --scenarios dashboard_admin,charts --duration 30
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+
+from fleet import DEFAULT_STATE, fuel_payload, login, trip_payload
+from targets import Targets, add_target_arguments
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+CHART_PATHS = [
+    "/dashboard/charts/fuel-consumption?days=30",
+    "/dashboard/charts/cost-breakdown?days=30",
+    "/dashboard/charts/vehicle-mileage?days=30&limit=10",
+    "/dashboard/charts/fuel-efficiency?days=30",
+    "/dashboard/charts/cost-trend?months=6",
+    "/dashboard/charts/fleet-summary",
+]
+
+
+def dashboard_admin(rng, admin):
+    return "dashboard_admin", "GET", "/dashboard/admin", None
+
+
+def charts(rng, admin):
+    path = rng.choice(CHART_PATHS)
+    return path.split("?", 1)[0].rsplit("/", 1)[-1], "GET", path, None
+
+
+def trip_write(rng, admin):
+    vehicle = rng.choice(admin["vehicles"])
+    return "trip_write", "POST", "/dashboard/trips", trip_payload(rng, vehicle, datetime.now(timezone.utc))
+
+
+def fuel_write(rng, admin):
+    vehicle = rng.choice(admin["vehicles"])
+    return "fuel_write", "POST", "/dashboard/fuel-logs", fuel_payload(rng, vehicle)
+
+
+def vehicle_update(rng, admin):
+    vehicle = rng.choice(admin["vehicles"])
+    payload = {"fuel_level": rng.randint(5, 100), "odometer": rng.randint(5_000, 250_000)}
+    return "vehicle_update", "PUT", f"/dashboard/vehicles/{vehicle['id']}", payload
+
+
+# Roughly what the UI does: dashboards and charts dominate, writes are a minority
+MIXED_WEIGHTS = [(dashboard_admin, 30), (charts, 50), (trip_write, 10), (fuel_write, 5), (vehicle_update, 5)]
+
+
+def mixed(rng, admin):
+    flows, weights = zip(*MIXED_WEIGHTS)
+    return rng.choices(flows, weights=weights)[0](rng, admin)
+
+
+SCENARIOS = {
+    "dashboard_admin": dashboard_admin,
+    "charts": charts,
+    "trip_write": trip_write,
+    "fuel_write": fuel_write,
+    "vehicle_update": vehicle_update,
+    "mixed": mixed,
+}
+
+
+def percentile(sorted_values, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+def summarize(samples, elapsed: float) -> dict:
+    latencies = sorted(latency for latency, ok in samples)
+    errors = sum(1 for _, ok in samples if not ok)
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "throughput_rps": round(len(samples) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "mean": round(sum(latencies) / len(latencies), 2) if latencies else 0.0,
+            "p50": round(percentile(latencies, 50), 2),
+            "p90": round(percentile(latencies, 90), 2),
+            "p95": round(percentile(latencies, 95), 2),
+            "p99": round(percentile(latencies, 99), 2),
+            "max": round(latencies[-1], 2) if latencies else 0.0,
+        },
+    }
+
+
+async def run_scenario(name, flow, sessions, targets: Targets, args) -> dict:
+    samples = {}
+    stop_at = time.monotonic() + args.warmup + args.duration
+    record_from = time.monotonic() + args.warmup
+
+    async def worker(index: int):
+        rng = random.Random(f"{args.seed}:{name}:{index}")
+        admin, headers = sessions[index % len(sessions)]
+        async with httpx.AsyncClient(timeout=args.timeout) as client:
+            while time.monotonic() < stop_at:
+                label, method, path, payload = flow(rng, admin)
+                started = time.perf_counter()
+                try:
+                    resp = await client.request(method, targets.dashboard_url(path), json=payload, headers=headers)
+                    ok = resp.status_code < 400
+                except httpx.HTTPError:
+                    ok = False
+                latency_ms = (time.perf_counter() - started) * 1000
+                if time.monotonic() >= record_from:
+                    samples.setdefault(label, []).append((latency_ms, ok))
+
+    await asyncio.gather(*(worker(index) for index in range(args.concurrency)))
+    everything = [sample for endpoint in samples.values() for sample in endpoint]
+    report = summarize(everything, args.duration)
+    if len(samples) > 1:
+        report["endpoints"] = {label: summarize(values, args.duration) for label, values in sorted(samples.items())}
+    print(
+        f"[bench] {name}: {report['requests']} req, {report['throughput_rps']} req/s, "
+        f"p50={report['latency_ms']['p50']}ms p99={report['latency_ms']['p99']}ms errors={report['errors']}"
+    )
+    return report
+
+
+def _git(*args) -> str:
+    try:
+        return subprocess.check_output(["git", *args], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+async def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_target_arguments(parser)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma-separated subset of " + ", ".join(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30.0, help="measured seconds per scenario")
+    parser.add_argument("--warmup", type=float, default=5.0, help="unrecorded seconds before measuring")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--state", type=Path, default=DEFAULT_STATE)
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args(argv)
+
+    unknown = [name for name in args.scenarios.split(",") if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+    if not args.state.exists():
+        parser.error(f"{args.state} not found - seed a fleet with fleet.py first")
+
+    targets = Targets.from_args(args)
+    fleet = json.loads(args.state.read_text())
+    async with httpx.AsyncClient(timeout=args.timeout) as client:
+        sessions = []
+        for admin in fleet["admins"]:
+            token = await login(client, targets, admin["email"], admin["password"])
+            sessions.append((admin, {"Authorization": f"Bearer {token}"}))
+
+    results = {}
+    for name in args.scenarios.split(","):
+        results[name] = await run_scenario(name, SCENARIOS[name], sessions, targets, args)
+
+    commit = _git("rev-parse", "--short", "HEAD")
+    report = {
+        "commit": commit,
+        "branch": _git("rev-parse", "--abbrev-ref", "HEAD"),
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "host": platform.node(),
+        "python": platform.python_version(),
+        "target": targets.gateway or targets.dashboard,
+        "params": {
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "warmup_s": args.warmup,
+            "seed": args.seed,
+            "admins": len(fleet["admins"]),
+            "vehicles_per_admin": len(fleet["admins"][0]["vehicles"]) if fleet["admins"] else 0,
+            "history_days": fleet.get("history_days"),
+        },
+        "scenarios": results,
+    }
+    output = args.output or RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}-{commit}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"[bench] report written to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
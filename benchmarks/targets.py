@@ -0,0 +1,42 @@
+"""
+Where the benchmark sends its requests.
+
+By default the dashboard and user-management services are hit directly on
+their compose ports, which keeps the gateway rate limit (10 r/s per client)
+out of the numbers. Pass --gateway to measure the full path through nginx.
+"""
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass(frozen=True)
+class Targets:
+    dashboard: str = "http://localhost:8002"
+    users: str = "http://localhost:8000"
+    gateway: Optional[str] = None
+
+    @classmethod
+    def from_args(cls, args) -> "Targets":
+        return cls(dashboard=args.dashboard_url.rstrip("/"), users=args.users_url.rstrip("/"), gateway=args.gateway)
+
+    def dashboard_url(self, path: str) -> str:
+        # /dashboard/admin -> {gateway}/api/dashboard/admin
+        if self.gateway:
+            return f"{self.gateway.rstrip('/')}/api{path}"
+        return f"{self.dashboard}{path}"
+
+    def login_url(self) -> str:
+        if self.gateway:
+            return f"{self.gateway.rstrip('/')}/api/login"
+        return f"{self.users}/api/auth/login"
+
+    def register_url(self) -> str:
+        if self.gateway:
+            return f"{self.gateway.rstrip('/')}/api/register"
+        return f"{self.users}/api/auth/register"
+
+
+def add_target_arguments(parser) -> None:
+    parser.add_argument("--dashboard-url", default=Targets.dashboard)
+    parser.add_argument("--users-url", default=Targets.users)
+    parser.add_argument("--gateway", default=None, help="e.g. http://localhost:8080 to go through nginx")
@@ -114,3 +114,16 @@ INSERT INTO user_costs (user_id, category, amount) VALUES
 INSERT INTO user_alerts (user_id, type, message, severity) VALUES
 ('00000000-0000-0000-0000-000000000001', 'Wypożyczenie', 'Pojazd #123 wypożyczony przez Jana Kowalskiego', 'info'),
 ('00000000-0000-0000-0000-000000000001', 'Serwis', 'Pojazd #456 wymaga wymiany oleju', 'warning');
+
+-- Transactional outbox: analytics events written with the trip/fuel change,
+-- published to the analytics exchange and deleted by analytics-service's relay
+CREATE TABLE outbox_events (
+    id BIGSERIAL PRIMARY KEY,
+    aggregate_id VARCHAR(64),
+    event_type VARCHAR(64) NOT NULL,
+    payload JSONB NOT NULL,
+    trace_context JSONB, -- traceparent of the request that queued the event
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,4 @@
+-- Keeps the trace context of the request that queued each outbox event.
+-- New databases get this from init.sql. Safe to run more than once.
+
+ALTER TABLE outbox_events ADD COLUMN IF NOT EXISTS trace_context JSONB;
@@ -14,8 +14,28 @@ CREATE TABLE IF NOT EXISTS notifications (
     action_required BOOLEAN NOT NULL DEFAULT FALSE,
     created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
     updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
-    responded_at TIMESTAMPTZ
+    responded_at TIMESTAMPTZ,
+    dedup_key TEXT, -- vehicle alerts: <vehicle_id>:<alert type>
+    occurrences INTEGER NOT NULL DEFAULT 1
 );
 
-CREATE INDEX IF NOT EXISTS idx_notifications_recipient ON notifications(recipient_id);
+-- Inbox pages (keyset on created_at, id); also serves plain recipient lookups
+CREATE INDEX IF NOT EXISTS idx_notifications_inbox ON notifications(recipient_id, created_at DESC, id DESC);
 CREATE INDEX IF NOT EXISTS idx_notifications_status ON notifications(status);
+-- Retention batches walk the oldest rows first
+CREATE INDEX IF NOT EXISTS idx_notifications_created ON notifications(created_at);
+-- At most one open (unread) notification per vehicle alert; repeats bump its occurrences
+CREATE UNIQUE INDEX IF NOT EXISTS uq_notifications_open_alert
+    ON notifications(recipient_id, dedup_key)
+    WHERE dedup_key IS NOT NULL AND status = 'unread';
+
+-- Unread notifications per recipient, maintained by the service in the same transaction as the notifications
+CREATE TABLE IF NOT EXISTS notification_counters (
+    recipient_id UUID PRIMARY KEY,
+    unread INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Read/answered notifications past retention; monthly partitions are created and dropped by the service
+CREATE TABLE IF NOT EXISTS notifications_archive (LIKE notifications INCLUDING DEFAULTS)
+    PARTITION BY RANGE (created_at);
@@ -0,0 +1,9 @@
+-- Adds vehicle alert deduplication to an existing notifications database.
+-- New databases get this from init.sql. Safe to run more than once.
+
+ALTER TABLE notifications ADD COLUMN IF NOT EXISTS dedup_key TEXT;
+ALTER TABLE notifications ADD COLUMN IF NOT EXISTS occurrences INTEGER NOT NULL DEFAULT 1;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_notifications_open_alert
+    ON notifications(recipient_id, dedup_key)
+    WHERE dedup_key IS NOT NULL AND status = 'unread';
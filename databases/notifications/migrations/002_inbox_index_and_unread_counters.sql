@@ -0,0 +1,21 @@
+-- Keyset inbox index and per-recipient unread counters for an existing notifications database.
+-- New databases get this from init.sql. Safe to run more than once; re-running recounts the counters.
+
+CREATE INDEX IF NOT EXISTS idx_notifications_inbox ON notifications(recipient_id, created_at DESC, id DESC);
+-- Prefix of idx_notifications_inbox, no longer needed
+DROP INDEX IF EXISTS idx_notifications_recipient;
+
+CREATE TABLE IF NOT EXISTS notification_counters (
+    recipient_id UUID PRIMARY KEY,
+    unread INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+BEGIN;
+-- Block notification writes while counting, so no change lands between the count and the upsert
+LOCK TABLE notifications IN SHARE MODE;
+UPDATE notification_counters SET unread = 0, updated_at = NOW();
+INSERT INTO notification_counters (recipient_id, unread)
+SELECT recipient_id, COUNT(*) FROM notifications WHERE status = 'unread' GROUP BY recipient_id
+ON CONFLICT (recipient_id) DO UPDATE SET unread = EXCLUDED.unread, updated_at = NOW();
+COMMIT;
@@ -0,0 +1,7 @@
+-- Adds the notifications archive used by the retention job to an existing notifications database.
+-- New databases get this from init.sql. Safe to run more than once.
+
+CREATE INDEX IF NOT EXISTS idx_notifications_created ON notifications(created_at);
+
+CREATE TABLE IF NOT EXISTS notifications_archive (LIKE notifications INCLUDING DEFAULTS)
+    PARTITION BY RANGE (created_at);
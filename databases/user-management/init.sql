@@ -71,6 +71,12 @@ CREATE TABLE IF NOT EXISTS login_attempts (
 CREATE INDEX IF NOT EXISTS idx_login_attempts_email ON login_attempts(email);
 CREATE INDEX IF NOT EXISTS idx_login_attempts_ip ON login_attempts(ip_address);
 CREATE INDEX IF NOT EXISTS idx_login_attempts_time ON login_attempts(attempted_at);
+-- Lockout check on every login: recent failures of one email
+CREATE INDEX IF NOT EXISTS idx_login_attempts_failed ON login_attempts(email, attempted_at) WHERE NOT success;
+
+-- Login attempts past retention (manage.py run_retention creates and drops the monthly partitions)
+CREATE TABLE IF NOT EXISTS login_attempts_archive (LIKE login_attempts INCLUDING DEFAULTS)
+    PARTITION BY RANGE (attempted_at);
 
 -- Security audit log for tracking important actions
 CREATE TABLE IF NOT EXISTS security_audit_log (
@@ -88,3 +94,20 @@ CREATE TABLE IF NOT EXISTS security_audit_log (
 CREATE INDEX IF NOT EXISTS idx_audit_log_user ON security_audit_log(user_id);
 CREATE INDEX IF NOT EXISTS idx_audit_log_action ON security_audit_log(action);
 CREATE INDEX IF NOT EXISTS idx_audit_log_time ON security_audit_log(created_at);
+
+-- Audit entries past retention; no foreign key, archived entries may outlive their user
+CREATE TABLE IF NOT EXISTS security_audit_log_archive (LIKE security_audit_log INCLUDING DEFAULTS)
+    PARTITION BY RANGE (created_at);
+
+-- Notifications waiting for delivery to notifications-service (manage.py run_notification_relay)
+CREATE TABLE IF NOT EXISTS notification_outbox (
+    id              UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    payload         JSONB NOT NULL,
+    attempts        INTEGER NOT NULL DEFAULT 0,
+    last_error      TEXT,
+    next_attempt_at TIMESTAMPTZ DEFAULT NOW(), -- NULL: parked, rejected by notifications-service
+    created_at      TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_notification_outbox_due ON notification_outbox(next_attempt_at)
+    WHERE next_attempt_at IS NOT NULL;
@@ -0,0 +1,10 @@
+-- Adds the retention archives and the lockout index to an existing user management database.
+-- New databases get this from init.sql. Safe to run more than once.
+
+CREATE INDEX IF NOT EXISTS idx_login_attempts_failed ON login_attempts(email, attempted_at) WHERE NOT success;
+
+CREATE TABLE IF NOT EXISTS login_attempts_archive (LIKE login_attempts INCLUDING DEFAULTS)
+    PARTITION BY RANGE (attempted_at);
+
+CREATE TABLE IF NOT EXISTS security_audit_log_archive (LIKE security_audit_log INCLUDING DEFAULTS)
+    PARTITION BY RANGE (created_at);
@@ -0,0 +1,14 @@
+-- Adds the notification outbox to an existing user management database.
+-- New databases get this from init.sql. Safe to run more than once.
+
+CREATE TABLE IF NOT EXISTS notification_outbox (
+    id              UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    payload         JSONB NOT NULL,
+    attempts        INTEGER NOT NULL DEFAULT 0,
+    last_error      TEXT,
+    next_attempt_at TIMESTAMPTZ DEFAULT NOW(),
+    created_at      TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_notification_outbox_due ON notification_outbox(next_attempt_at)
+    WHERE next_attempt_at IS NOT NULL;
@@ -14,13 +14,27 @@ CREATE TABLE vehicles (
     odometer INTEGER DEFAULT 0,
     latitude DOUBLE PRECISION,
     longitude DOUBLE PRECISION,
+    geohash VARCHAR(12) COLLATE "C", -- precision-9 geohash of latitude/longitude, for viewport/nearby queries
     city VARCHAR(120),
     last_service_date TIMESTAMP WITH TIME ZONE,
     current_driver_id VARCHAR(50),
+    next_service_due TIMESTAMP WITH TIME ZONE, -- last_service_date + service interval
+    service_alert_level VARCHAR(10), -- last service alert emitted: soon, overdue
+    open_issue_count INTEGER NOT NULL DEFAULT 0,
+    open_critical_issue_count INTEGER NOT NULL DEFAULT 0, -- open high/critical issues
+    last_telemetry_at TIMESTAMP WITH TIME ZONE, -- recorded_at of the newest applied telemetry sample
+    version INTEGER NOT NULL DEFAULT 1, -- bumped by every edit of the vehicle record; the API's ETag
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
+CREATE INDEX idx_vehicles_owner_id ON vehicles (owner_id);
+-- Sweeper and /vehicles/alerts only look at vehicles with a service date
+CREATE INDEX idx_vehicles_next_service_due ON vehicles (next_service_due) WHERE next_service_due IS NOT NULL;
+CREATE INDEX idx_vehicles_owner_service_due ON vehicles (owner_id, next_service_due) WHERE next_service_due IS NOT NULL;
+CREATE INDEX idx_vehicles_owner_open_critical ON vehicles (owner_id) WHERE open_critical_issue_count > 0;
+CREATE INDEX idx_vehicles_owner_geohash ON vehicles (owner_id, geohash) WHERE geohash IS NOT NULL;
+
 CREATE TABLE vehicle_logs (
     id SERIAL PRIMARY KEY,
     vehicle_id INTEGER REFERENCES vehicles(id),
@@ -29,6 +43,63 @@ CREATE TABLE vehicle_logs (
     timestamp TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
+-- High-frequency position/fuel samples. Kept narrow and without a foreign key:
+-- ingestion checks vehicle ownership once per batch instead of once per row.
+-- Partitioned by day; vehicle-service creates the daily partitions ahead of time
+-- and drops them after TELEMETRY_RAW_RETENTION_DAYS.
+CREATE TABLE vehicle_telemetry (
+    vehicle_id INTEGER NOT NULL,
+    recorded_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    latitude DOUBLE PRECISION,
+    longitude DOUBLE PRECISION,
+    fuel_level SMALLINT,
+    battery_level SMALLINT,
+    odometer INTEGER,
+    speed_kmh REAL,
+    PRIMARY KEY (vehicle_id, recorded_at)
+) PARTITION BY RANGE (recorded_at);
+
+-- Catches samples outside every daily partition (e.g. before the first maintenance run)
+CREATE TABLE vehicle_telemetry_default PARTITION OF vehicle_telemetry DEFAULT;
+
+-- Telemetry rolled up per minute (monthly partitions, TELEMETRY_1M_RETENTION_DAYS)
+-- and per hour (kept). Position is the bucket's last fix, levels and speed are averages.
+CREATE TABLE vehicle_telemetry_1m (
+    vehicle_id INTEGER NOT NULL,
+    bucket TIMESTAMP WITH TIME ZONE NOT NULL,
+    samples INTEGER NOT NULL,
+    latitude DOUBLE PRECISION,
+    longitude DOUBLE PRECISION,
+    fuel_level REAL,
+    battery_level REAL,
+    odometer INTEGER,
+    speed_kmh REAL,
+    speed_kmh_max REAL,
+    PRIMARY KEY (vehicle_id, bucket)
+) PARTITION BY RANGE (bucket);
+
+CREATE TABLE vehicle_telemetry_1m_default PARTITION OF vehicle_telemetry_1m DEFAULT;
+
+CREATE TABLE vehicle_telemetry_1h (
+    vehicle_id INTEGER NOT NULL,
+    bucket TIMESTAMP WITH TIME ZONE NOT NULL,
+    samples INTEGER NOT NULL,
+    latitude DOUBLE PRECISION,
+    longitude DOUBLE PRECISION,
+    fuel_level REAL,
+    battery_level REAL,
+    odometer INTEGER,
+    speed_kmh REAL,
+    speed_kmh_max REAL,
+    PRIMARY KEY (vehicle_id, bucket)
+);
+
+-- How far each rollup tier has been computed (exclusive upper bound)
+CREATE TABLE telemetry_rollups (
+    tier VARCHAR(8) PRIMARY KEY,
+    rolled_up_to TIMESTAMP WITH TIME ZONE NOT NULL
+);
+
 CREATE TABLE vehicle_issues (
     id SERIAL PRIMARY KEY,
     vehicle_id INTEGER REFERENCES vehicles(id) ON DELETE CASCADE,
@@ -41,3 +112,18 @@ CREATE TABLE vehicle_issues (
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     resolved_at TIMESTAMP WITH TIME ZONE
 );
+
+CREATE INDEX idx_vehicle_issues_vehicle_id ON vehicle_issues (vehicle_id);
+
+-- Transactional outbox: events written with the change they describe, published and
+-- deleted by vehicle-service's relay in id order
+CREATE TABLE outbox_events (
+    id BIGSERIAL PRIMARY KEY,
+    aggregate_id VARCHAR(64), -- e.g. vehicle:42
+    event_type VARCHAR(64) NOT NULL,
+    payload JSONB NOT NULL,
+    trace_context JSONB, -- traceparent of the request that queued the event
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,29 @@
+-- Brings a vehicle database created before next_service_due / issue counters up to date.
+-- New databases get this from init.sql. Safe to run more than once:
+--   docker compose exec -T vehicle-db psql -U user -d vehicle_db < databases/vehicle/migrations/001_service_due_and_issue_counters.sql
+
+ALTER TABLE vehicles ADD COLUMN IF NOT EXISTS next_service_due TIMESTAMP WITH TIME ZONE;
+ALTER TABLE vehicles ADD COLUMN IF NOT EXISTS service_alert_level VARCHAR(10);
+ALTER TABLE vehicles ADD COLUMN IF NOT EXISTS open_issue_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE vehicles ADD COLUMN IF NOT EXISTS open_critical_issue_count INTEGER NOT NULL DEFAULT 0;
+
+UPDATE vehicles SET next_service_due = last_service_date + INTERVAL '365 days'
+WHERE last_service_date IS NOT NULL;
+
+UPDATE vehicles v SET
+    open_issue_count = c.open_count,
+    open_critical_issue_count = c.critical_count
+FROM (
+    SELECT vehicle_id,
+           COUNT(*) FILTER (WHERE status <> 'resolved') AS open_count,
+           COUNT(*) FILTER (WHERE status <> 'resolved' AND severity IN ('high', 'critical')) AS critical_count
+    FROM vehicle_issues
+    GROUP BY vehicle_id
+) c
+WHERE c.vehicle_id = v.id;
+
+CREATE INDEX IF NOT EXISTS idx_vehicles_owner_id ON vehicles (owner_id);
+CREATE INDEX IF NOT EXISTS idx_vehicles_next_service_due ON vehicles (next_service_due) WHERE next_service_due IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_vehicles_owner_service_due ON vehicles (owner_id, next_service_due) WHERE next_service_due IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_vehicles_owner_open_critical ON vehicles (owner_id) WHERE open_critical_issue_count > 0;
+CREATE INDEX IF NOT EXISTS idx_vehicle_issues_vehicle_id ON vehicle_issues (vehicle_id);
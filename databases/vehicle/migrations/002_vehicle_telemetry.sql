@@ -0,0 +1,16 @@
+-- Adds the telemetry ingestion table and latest-sample marker to an existing vehicle database.
+-- New databases get this from init.sql. Safe to run more than once.
+
+ALTER TABLE vehicles ADD COLUMN IF NOT EXISTS last_telemetry_at TIMESTAMP WITH TIME ZONE;
+
+CREATE TABLE IF NOT EXISTS vehicle_telemetry (
+    vehicle_id INTEGER NOT NULL,
+    recorded_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    latitude DOUBLE PRECISION,
+    longitude DOUBLE PRECISION,
+    fuel_level SMALLINT,
+    battery_level SMALLINT,
+    odometer INTEGER,
+    speed_kmh REAL,
+    PRIMARY KEY (vehicle_id, recorded_at)
+);
@@ -0,0 +1,44 @@
+-- Adds the geohash column and index used by /vehicles/nearby and /vehicles/in-bounds,
+-- and backfills it with the same encoding as services/vehicle-service/app/geo.py.
+-- New databases get this from init.sql. Safe to run more than once.
+
+ALTER TABLE vehicles ADD COLUMN IF NOT EXISTS geohash VARCHAR(12) COLLATE "C";
+
+CREATE OR REPLACE FUNCTION pg_temp.geohash_encode(lat DOUBLE PRECISION, lon DOUBLE PRECISION, chars INTEGER)
+RETURNS TEXT AS $$
+DECLARE
+    base32 TEXT := '0123456789bcdefghjkmnpqrstuvwxyz';
+    lat_lo DOUBLE PRECISION := -90;
+    lat_hi DOUBLE PRECISION := 90;
+    lon_lo DOUBLE PRECISION := -180;
+    lon_hi DOUBLE PRECISION := 180;
+    mid DOUBLE PRECISION;
+    bits INTEGER := 0;
+    bit_count INTEGER := 0;
+    even BOOLEAN := TRUE;
+    result TEXT := '';
+BEGIN
+    WHILE length(result) < chars LOOP
+        IF even THEN
+            mid := (lon_lo + lon_hi) / 2;
+            IF lon >= mid THEN bits := bits * 2 + 1; lon_lo := mid; ELSE bits := bits * 2; lon_hi := mid; END IF;
+        ELSE
+            mid := (lat_lo + lat_hi) / 2;
+            IF lat >= mid THEN bits := bits * 2 + 1; lat_lo := mid; ELSE bits := bits * 2; lat_hi := mid; END IF;
+        END IF;
+        even := NOT even;
+        bit_count := bit_count + 1;
+        IF bit_count = 5 THEN
+            result := result || substr(base32, bits + 1, 1);
+            bits := 0;
+            bit_count := 0;
+        END IF;
+    END LOOP;
+    RETURN result;
+END;
+$$ LANGUAGE plpgsql IMMUTABLE;
+
+UPDATE vehicles SET geohash = pg_temp.geohash_encode(latitude, longitude, 9)
+WHERE latitude IS NOT NULL AND longitude IS NOT NULL AND geohash IS NULL;
+
+CREATE INDEX IF NOT EXISTS idx_vehicles_owner_geohash ON vehicles (owner_id, geohash) WHERE geohash IS NOT NULL;
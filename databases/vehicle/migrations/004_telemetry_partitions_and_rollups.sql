@@ -0,0 +1,77 @@
+-- Converts vehicle_telemetry to a day-partitioned table and adds the 1m/1h rollup tiers.
+-- New databases get this from init.sql. Safe to run more than once.
+-- Existing samples go to the default partition; vehicle-service moves them into daily
+-- partitions as it creates them and drops what is past TELEMETRY_RAW_RETENTION_DAYS.
+
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM pg_class
+        WHERE relname = 'vehicle_telemetry' AND relkind = 'r' AND relnamespace = 'public'::regnamespace
+    ) THEN
+        ALTER TABLE vehicle_telemetry RENAME TO vehicle_telemetry_unpartitioned;
+        ALTER TABLE vehicle_telemetry_unpartitioned RENAME CONSTRAINT vehicle_telemetry_pkey TO vehicle_telemetry_unpartitioned_pkey;
+    END IF;
+END
+$$;
+
+CREATE TABLE IF NOT EXISTS vehicle_telemetry (
+    vehicle_id INTEGER NOT NULL,
+    recorded_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    latitude DOUBLE PRECISION,
+    longitude DOUBLE PRECISION,
+    fuel_level SMALLINT,
+    battery_level SMALLINT,
+    odometer INTEGER,
+    speed_kmh REAL,
+    PRIMARY KEY (vehicle_id, recorded_at)
+) PARTITION BY RANGE (recorded_at);
+
+CREATE TABLE IF NOT EXISTS vehicle_telemetry_default PARTITION OF vehicle_telemetry DEFAULT;
+
+DO $$
+BEGIN
+    IF to_regclass('vehicle_telemetry_unpartitioned') IS NOT NULL THEN
+        INSERT INTO vehicle_telemetry
+        SELECT vehicle_id, recorded_at, latitude, longitude, fuel_level, battery_level, odometer, speed_kmh
+        FROM vehicle_telemetry_unpartitioned
+        ON CONFLICT DO NOTHING;
+        DROP TABLE vehicle_telemetry_unpartitioned;
+    END IF;
+END
+$$;
+
+CREATE TABLE IF NOT EXISTS vehicle_telemetry_1m (
+    vehicle_id INTEGER NOT NULL,
+    bucket TIMESTAMP WITH TIME ZONE NOT NULL,
+    samples INTEGER NOT NULL,
+    latitude DOUBLE PRECISION,
+    longitude DOUBLE PRECISION,
+    fuel_level REAL,
+    battery_level REAL,
+    odometer INTEGER,
+    speed_kmh REAL,
+    speed_kmh_max REAL,
+    PRIMARY KEY (vehicle_id, bucket)
+) PARTITION BY RANGE (bucket);
+
+CREATE TABLE IF NOT EXISTS vehicle_telemetry_1m_default PARTITION OF vehicle_telemetry_1m DEFAULT;
+
+CREATE TABLE IF NOT EXISTS vehicle_telemetry_1h (
+    vehicle_id INTEGER NOT NULL,
+    bucket TIMESTAMP WITH TIME ZONE NOT NULL,
+    samples INTEGER NOT NULL,
+    latitude DOUBLE PRECISION,
+    longitude DOUBLE PRECISION,
+    fuel_level REAL,
+    battery_level REAL,
+    odometer INTEGER,
+    speed_kmh REAL,
+    speed_kmh_max REAL,
+    PRIMARY KEY (vehicle_id, bucket)
+);
+
+CREATE TABLE IF NOT EXISTS telemetry_rollups (
+    tier VARCHAR(8) PRIMARY KEY,
+    rolled_up_to TIMESTAMP WITH TIME ZONE NOT NULL
+);
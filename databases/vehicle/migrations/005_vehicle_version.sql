@@ -0,0 +1,4 @@
+-- Adds the optimistic-concurrency version column to an existing vehicle database.
+-- New databases get this from init.sql. Safe to run more than once.
+
+ALTER TABLE vehicles ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1;
@@ -0,0 +1,12 @@
+-- Adds the transactional outbox table to an existing vehicle database.
+-- New databases get this from init.sql. Safe to run more than once.
+
+CREATE TABLE IF NOT EXISTS outbox_events (
+    id BIGSERIAL PRIMARY KEY,
+    aggregate_id VARCHAR(64),
+    event_type VARCHAR(64) NOT NULL,
+    payload JSONB NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
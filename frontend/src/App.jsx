@@ -9,6 +9,7 @@ import DashboardPage from "./components/DashboardPage";
 import TransitionOverlay from "./components/TransitionOverlay";
 import RegisterPage from "./components/RegisterPage";
 import { authApi, dashboardApi } from "./services/api";
+import { ACCESS_TOKEN_RENEW_MS, accessTokenExpiresIn, clearAuthTokens, storeAuthTokens } from "./services/config";
 import { adminPanel, employeePanel, featureCards } from "./constants";
 
 export default function App() {
@@ -35,7 +36,7 @@ export default function App() {
         await startAuthenticatedSession({ token, user });
       } catch (error) {
         console.error("Session restore failed:", error);
-        localStorage.removeItem("token");
+        clearAuthTokens();
         setSession({ status: "loggedOut" });
       } finally {
         setInitializing(false);
@@ -45,9 +46,30 @@ export default function App() {
     restoreSession();
   }, []);
 
+  // Keep a fresh access token while signed in; without one requests use the session token
+  useEffect(() => {
+    if (session.status !== "authenticated") return undefined;
+    let timer = null;
+    const renew = async () => {
+      if (accessTokenExpiresIn() > ACCESS_TOKEN_RENEW_MS) return;
+      try {
+        storeAuthTokens(await authApi.refreshToken());
+      } catch (error) {
+        if (error.status === 404) {
+          clearInterval(timer); // Server does not issue access tokens
+          return;
+        }
+        console.warn("Access token renewal failed", error);
+      }
+    };
+    renew();
+    timer = setInterval(renew, ACCESS_TOKEN_RENEW_MS / 4);
+    return () => clearInterval(timer);
+  }, [session.status]);
+
   const startAuthenticatedSession = async (authPayload) => {
     const role = authPayload.user.role === "employee" ? "employee" : "admin";
-    localStorage.setItem("token", authPayload.token);
+    storeAuthTokens(authPayload);
     setSession({ status: "authenticated", user: authPayload.user });
     setPreviewRole(role);
     setViewMode("transition");
@@ -67,7 +89,7 @@ export default function App() {
     } catch (error) {
       setSession({ status: "loggedOut" });
       setDashboardData(null);
-      localStorage.removeItem("token");
+      clearAuthTokens();
       setLoginState({ loading: false, error: error.message || "Nie udało się zalogować" });
       setViewMode("landing");
     }
@@ -89,7 +111,7 @@ export default function App() {
       // If registration succeeded but dashboard fetch failed, we might be in "transition" mode
       // We need to ensure we go back to register view and clean up session if needed
       if (localStorage.getItem("token")) {
-        localStorage.removeItem("token");
+        clearAuthTokens();
         setSession({ status: "loggedOut" });
         setDashboardData(null);
       }
@@ -104,7 +126,7 @@ export default function App() {
     } catch (error) {
       console.warn("Logout request failed", error);
     }
-    localStorage.removeItem("token");
+    clearAuthTokens();
     setSession({ status: "loggedOut" });
     setDashboardData(null);
     setPreviewRole("admin");
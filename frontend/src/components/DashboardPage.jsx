@@ -1,4 +1,4 @@
-import { useState } from "react";
+import { useEffect, useState } from "react";
 import AdminDashboard from "./AdminDashboard";
 import EmployeeDashboard from "./EmployeeDashboard";
 import VehiclesPage from "./VehiclesPage";
@@ -8,6 +8,7 @@ import NotificationsPage from "./NotificationsPage";
 import AnalyticsPage from "./AnalyticsPage";
 import AccountInfo from "./AccountInfo";
 import { authApi } from "../services/api/auth";
+import { dashboardApi } from "../services/api/dashboard";
 import logo from "../assets/logo.svg";
 
 const Icons = {
@@ -43,6 +44,36 @@ const WORKER_NAV = [
 export default function DashboardPage({ session, data, onLogout, onRefresh }) {
   const [activeView, setActiveView] = useState("dashboard");
   const [showAccountInfo, setShowAccountInfo] = useState(false);
+  const [unreadCount, setUnreadCount] = useState(0);
+  // Latest pushed notification (or resync marker), handed to the notifications page
+  const [pushed, setPushed] = useState(null);
+
+  useEffect(() => {
+    if (!session?.user) return undefined;
+    const refreshUnread = async () => {
+      try {
+        const { unread } = await dashboardApi.fetchUnreadCount();
+        setUnreadCount(unread);
+      } catch (err) {
+        console.error("Failed to load unread count", err);
+      }
+    };
+    let connectedBefore = false;
+    return dashboardApi.subscribeNotifications((event, payload) => {
+      if (event === "ready") {
+        setUnreadCount(payload.unread);
+        // After a reconnect pushes may have been missed
+        if (connectedBefore) setPushed({ resync: true });
+        connectedBefore = true;
+      } else if (event === "notification") {
+        setPushed(payload);
+        refreshUnread();
+      } else if (event === "resync") {
+        setPushed({ resync: true });
+        refreshUnread();
+      }
+    });
+  }, [session?.user]);
 
   if (!session?.user || !data) return null;
   const isAdmin = session.user.role === "admin";
@@ -85,7 +116,7 @@ export default function DashboardPage({ session, data, onLogout, onRefresh }) {
       case "employees":
         return <EmployeesPage />;
       case "notifications":
-        return <NotificationsPage />;
+        return <NotificationsPage pushed={pushed} />;
       default:
         return (
           <div className="p-5 text-center">
@@ -125,6 +156,9 @@ export default function DashboardPage({ session, data, onLogout, onRefresh }) {
                 {Icons[link.icon]}
               </span>
               {link.label}
+              {link.id === "notifications" && unreadCount > 0 && (
+                <span className="sidebar-link__badge">{unreadCount > 99 ? "99+" : unreadCount}</span>
+              )}
             </button>
           ))}
         </nav>
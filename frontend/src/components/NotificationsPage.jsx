@@ -72,6 +72,9 @@ function NotificationCard({ notification, onAck, onRespond }) {
           <div className="vp-notification-card__meta">
             <span className="vp-notification-card__type">{typeMap.label}</span>
             <span className={`vp-status vp-status--${mapping.variant}`}>{mapping.label}</span>
+            {notification.occurrences > 1 && (
+              <span className="vp-status vp-status--muted">×{notification.occurrences}</span>
+            )}
           </div>
           <h4 className="vp-notification-card__title">{notification.title}</h4>
         </div>
@@ -105,16 +108,21 @@ function NotificationCard({ notification, onAck, onRespond }) {
 /* ───────────────────────────────────────────────────────── */
 /*  Main Component                                           */
 /* ───────────────────────────────────────────────────────── */
-export default function NotificationsPage() {
+const PAGE_SIZE = 50;
+
+export default function NotificationsPage({ pushed }) {
   const [notifications, setNotifications] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [hasMore, setHasMore] = useState(false);
   const [error, setError] = useState(null);
 
   const loadNotifications = async () => {
     setLoading(true);
     try {
-      const data = await dashboardApi.fetchNotifications();
+      const data = await dashboardApi.fetchNotifications({ limit: PAGE_SIZE });
       setNotifications(data);
+      setHasMore(data.length === PAGE_SIZE);
       setError(null);
     } catch (err) {
       console.error("Failed to load notifications", err);
@@ -128,6 +136,20 @@ export default function NotificationsPage() {
     loadNotifications();
   }, []);
 
+  // Pushed over the notification stream: new ones go on top, changed ones are replaced in place
+  useEffect(() => {
+    if (!pushed) return;
+    if (pushed.resync) {
+      loadNotifications();
+      return;
+    }
+    setNotifications((current) =>
+      current.some((item) => item.id === pushed.id)
+        ? current.map((item) => (item.id === pushed.id ? pushed : item))
+        : [pushed, ...current]
+    );
+  }, [pushed]);
+
   const handleAck = async (id) => {
     try {
       await dashboardApi.ackNotification(id);
@@ -138,6 +160,39 @@ export default function NotificationsPage() {
     }
   };
 
+  const loadMore = async () => {
+    const last = notifications[notifications.length - 1];
+    if (!last) return;
+    setLoadingMore(true);
+    try {
+      const data = await dashboardApi.fetchNotifications({
+        limit: PAGE_SIZE,
+        before_created_at: last.created_at,
+        before_id: last.id,
+      });
+      setNotifications((current) => [...current, ...data]);
+      setHasMore(data.length === PAGE_SIZE);
+    } catch (err) {
+      console.error("Failed to load more notifications", err);
+      alert("Nie udało się pobrać kolejnych powiadomień");
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  const handleAckAll = async () => {
+    const newest = notifications[0];
+    if (!newest) return;
+    try {
+      // Everything up to the newest loaded notification: one request, one UPDATE
+      await dashboardApi.ackNotifications({ before: newest.created_at });
+      await loadNotifications();
+    } catch (err) {
+      console.error("Bulk ack failed", err);
+      alert("Nie udało się zaktualizować powiadomień");
+    }
+  };
+
   const handleRespond = async (id, action) => {
     try {
       await dashboardApi.respondToNotification(id, action);
@@ -175,9 +230,16 @@ export default function NotificationsPage() {
             Zarządzaj zaproszeniami i alertami operacyjnymi
           </p>
         </div>
-        <button className="vp-btn vp-btn--outline" onClick={loadNotifications}>
-          {Icons.refresh} Odśwież
-        </button>
+        <div className="vp-dashboard-header__actions">
+          {notifications.some((item) => item.status === "unread") && (
+            <button className="vp-btn vp-btn--outline" onClick={handleAckAll}>
+              {Icons.check} Oznacz wszystkie jako przeczytane
+            </button>
+          )}
+          <button className="vp-btn vp-btn--outline" onClick={loadNotifications}>
+            {Icons.refresh} Odśwież
+          </button>
+        </div>
       </header>
 
       {/* Content */}
@@ -197,6 +259,11 @@ export default function NotificationsPage() {
               onRespond={handleRespond}
             />
           ))}
+          {hasMore && (
+            <button className="vp-btn vp-btn--outline" onClick={loadMore} disabled={loadingMore}>
+              {loadingMore ? "Ładowanie..." : "Pokaż starsze"}
+            </button>
+          )}
         </div>
       )}
     </div>
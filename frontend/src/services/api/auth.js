@@ -45,10 +45,14 @@ export const authApi = {
 		return handleResponse(response, "Registration failed");
 	},
 
+	// New access token for the session; always authenticated with the session token itself
 	refreshToken: async () => {
 		const response = await fetch(`${API_BASE_URL}/api/refresh`, {
 			method: "POST",
-			headers: getDefaultHeaders(),
+			headers: {
+				...getDefaultHeaders(),
+				Authorization: `Bearer ${localStorage.getItem("token")}`,
+			},
 		});
 		return handleResponse(response, "Token refresh failed");
 	},
@@ -175,14 +175,78 @@ export const dashboardApi = {
 		return handleResponse(response, "Failed to assign tasks");
 	},
 
-	fetchNotifications: async () => {
-		const response = await fetch(`${API_BASE_URL}/api/dashboard/notifications`, {
+	// params: limit, before_created_at + before_id (from the last item of the previous page), status, type
+	fetchNotifications: async (params = {}) => {
+		const query = new URLSearchParams(
+			Object.entries(params).filter(([, value]) => value !== undefined && value !== null)
+		).toString();
+		const response = await fetch(`${API_BASE_URL}/api/dashboard/notifications${query ? `?${query}` : ""}`, {
 			method: "GET",
 			headers: getDefaultHeaders(),
 		});
 		return handleResponse(response, "Failed to load notifications");
 	},
 
+	// Server-Sent Events over fetch (EventSource cannot send the Authorization header).
+	// onEvent(name, data) gets "ready" ({ unread }), "notification" (a notification) and "resync".
+	// Reconnects with backoff until the returned function is called.
+	subscribeNotifications: (onEvent) => {
+		const controller = new AbortController();
+		let retryMs = 1000;
+
+		const dispatch = (block) => {
+			let name = "message";
+			const data = [];
+			for (const line of block.split("\n")) {
+				if (line.startsWith("event:")) name = line.slice(6).trim();
+				else if (line.startsWith("data:")) data.push(line.slice(5).trim());
+			}
+			if (data.length) onEvent(name, JSON.parse(data.join("\n")));
+		};
+
+		const connect = async () => {
+			try {
+				const response = await fetch(`${API_BASE_URL}/api/dashboard/notifications/stream`, {
+					method: "GET",
+					headers: { ...getDefaultHeaders(), Accept: "text/event-stream" },
+					signal: controller.signal,
+				});
+				if (!response.ok) throw new Error(`Notification stream failed: ${response.status}`);
+				retryMs = 1000;
+				const reader = response.body.getReader();
+				const decoder = new TextDecoder();
+				let buffer = "";
+				for (;;) {
+					const { value, done } = await reader.read();
+					if (done) break;
+					buffer += decoder.decode(value, { stream: true });
+					let boundary;
+					while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+						dispatch(buffer.slice(0, boundary));
+						buffer = buffer.slice(boundary + 2);
+					}
+				}
+			} catch (err) {
+				if (controller.signal.aborted) return;
+				console.error("Notification stream interrupted", err);
+			}
+			if (controller.signal.aborted) return;
+			setTimeout(connect, retryMs);
+			retryMs = Math.min(retryMs * 2, 30000);
+		};
+
+		connect();
+		return () => controller.abort();
+	},
+
+	fetchUnreadCount: async () => {
+		const response = await fetch(`${API_BASE_URL}/api/dashboard/notifications/unread-count`, {
+			method: "GET",
+			headers: getDefaultHeaders(),
+		});
+		return handleResponse(response, "Failed to load unread count");
+	},
+
 	ackNotification: async (notificationId) => {
 		const response = await fetch(`${API_BASE_URL}/api/dashboard/notifications/${notificationId}/ack`, {
 			method: "POST",
@@ -192,6 +256,16 @@ export const dashboardApi = {
 		return handleResponse(response, "Failed to update notification");
 	},
 
+	// payload: { ids: [...] } or { before: "<created_at>" } (every unread notification up to then)
+	ackNotifications: async (payload) => {
+		const response = await fetch(`${API_BASE_URL}/api/dashboard/notifications/ack`, {
+			method: "POST",
+			headers: getDefaultHeaders(),
+			body: JSON.stringify(payload),
+		});
+		return handleResponse(response, "Failed to update notifications");
+	},
+
 	respondToNotification: async (notificationId, action) => {
 		const response = await fetch(`${API_BASE_URL}/api/dashboard/notifications/${notificationId}/respond`, {
 			method: "POST",
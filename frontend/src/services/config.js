@@ -11,8 +11,40 @@ export const API_BASE_URL = VITE_API_BASE_URL ?? REACT_APP_API_BASE_URL ?? "";
 export const API_KEY = VITE_API_KEY ?? REACT_APP_API_KEY ?? "";
 export const HMAC_SECRET = VITE_HMAC_SECRET ?? REACT_APP_HMAC_SECRET ?? "";
 
+// Renew the access token this long before it expires; closer to expiry requests use the session token
+export const ACCESS_TOKEN_RENEW_MS = 60 * 1000;
+
+export function storeAuthTokens({ token, access_token, access_expires_at }) {
+    if (token) localStorage.setItem("token", token);
+    if (access_token) {
+        localStorage.setItem("accessToken", access_token);
+        localStorage.setItem("accessExpiresAt", access_expires_at);
+    }
+}
+
+export function clearAuthTokens() {
+    localStorage.removeItem("token");
+    localStorage.removeItem("accessToken");
+    localStorage.removeItem("accessExpiresAt");
+}
+
+export function accessTokenExpiresIn() {
+    const expiresAt = Date.parse(localStorage.getItem("accessExpiresAt") || "");
+    return Number.isNaN(expiresAt) ? 0 : expiresAt - Date.now();
+}
+
+// Services check the short-lived access token themselves; the session token costs them a call to
+// user-management, so it is only sent while there is no fresh access token
+export function getAuthToken() {
+    const accessToken = localStorage.getItem("accessToken");
+    if (accessToken && accessTokenExpiresIn() > ACCESS_TOKEN_RENEW_MS / 2) {
+        return accessToken;
+    }
+    return localStorage.getItem("token");
+}
+
 export function getDefaultHeaders() {
-    const token = localStorage.getItem("token");
+    const token = getAuthToken();
     return {
         "Content-Type": "application/json",
         ...(token ? { Authorization: `Bearer ${token}` } : {}),
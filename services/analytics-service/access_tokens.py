@@ -0,0 +1,51 @@
+"""
+Local verification of user-management's access tokens.
+
+A valid access token (see fleetify_auth, shared with the other services)
+stands in for the /api/users/me call get_current_user would otherwise make.
+Revocations from AUTH_REVOCATIONS_EXCHANGE are kept by a listener thread, and
+tokens (and gateway identities) are only trusted locally once it has
+followed the feed for a whole ACCESS_TOKEN_TTL_SECONDS. Otherwise, and for session tokens or anything that
+fails a check, callers ask /api/users/me, which checks the session itself.
+"""
+import threading
+from typing import Any, Dict, Optional
+
+import pika
+
+import fleetify_auth
+from config import (
+    ACCESS_TOKEN_SECRET,
+    ACCESS_TOKEN_TTL_SECONDS,
+    AUTH_REVOCATIONS_EXCHANGE,
+    GATEWAY_HMAC_SECRET,
+    RABBITMQ_HOST,
+    RABBITMQ_PASS,
+    RABBITMQ_USER,
+)
+from metrics import ACCESS_TOKEN_CHECKS
+
+revocations = fleetify_auth.RevocationList(ACCESS_TOKEN_TTL_SECONDS)
+
+
+def verify_access_token(authorization: Optional[str]) -> Optional[Dict[str, Any]]:
+    """The caller as /api/users/me would describe it (id, role, manager_id, email, full_name), or None to ask /me."""
+    user, result = fleetify_auth.verify_access_token(authorization, ACCESS_TOKEN_SECRET, revocations)
+    if result:
+        ACCESS_TOKEN_CHECKS.labels(result).inc()
+    return user
+
+
+def _connect() -> pika.BlockingConnection:
+    credentials = pika.PlainCredentials(RABBITMQ_USER, RABBITMQ_PASS)
+    return pika.BlockingConnection(pika.ConnectionParameters(host=RABBITMQ_HOST, credentials=credentials))
+
+
+def start_revocation_listener() -> None:
+    # Gateway identities are checked against the same feed
+    if ACCESS_TOKEN_SECRET or GATEWAY_HMAC_SECRET:
+        threading.Thread(
+            target=fleetify_auth.run_revocation_listener,
+            args=(revocations, _connect, AUTH_REVOCATIONS_EXCHANGE, "[Analytics] "),
+            daemon=True,
+        ).start()
@@ -15,3 +15,31 @@ RABBITMQ_HOST = os.getenv("RABBITMQ_HOST", "rabbitmq")
 RABBITMQ_USER = os.getenv("RABBITMQ_USER")
 RABBITMQ_PASS = os.getenv("RABBITMQ_PASS")
 ANALYTICS_QUEUE = os.getenv("ANALYTICS_QUEUE", "analytics_events")
+# Fanout exchange: the chart worker queue and dashboard-service both subscribe
+ANALYTICS_EXCHANGE = os.getenv("ANALYTICS_EXCHANGE", "analytics_events")
+
+# Outbox relay: events are published from outbox_events in batches; failures back off up to the max
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "200"))
+OUTBOX_POLL_INTERVAL_SECONDS = float(os.getenv("OUTBOX_POLL_INTERVAL_SECONDS", "1"))
+OUTBOX_MAX_BACKOFF_SECONDS = float(os.getenv("OUTBOX_MAX_BACKOFF_SECONDS", "60"))
+
+# Access tokens: verified locally with the secret user-management signs them with (unset: always ask
+# /api/users/me); revocations arrive on the fanout exchange, trusted once followed for a whole TTL
+ACCESS_TOKEN_SECRET = os.getenv("ACCESS_TOKEN_SECRET", "")
+ACCESS_TOKEN_TTL_SECONDS = float(os.getenv("ACCESS_TOKEN_TTL_SECONDS", "300"))
+AUTH_REVOCATIONS_EXCHANGE = os.getenv("AUTH_REVOCATIONS_EXCHANGE", "auth.revocations")
+
+# Identity headers signed by nginx-gateway (lua/auth.lua) with INTERNAL_HMAC_SECRET (unset: ignored),
+# accepted for this long after signing while the revocation feed above is trusted
+GATEWAY_HMAC_SECRET = os.getenv("INTERNAL_HMAC_SECRET", "")
+GATEWAY_IDENTITY_MAX_AGE_SECONDS = float(os.getenv("GATEWAY_IDENTITY_MAX_AGE_SECONDS", "30"))
+
+# Tracing: OTLP/HTTP collector (e.g. http://jaeger:4318) or a JSON-lines file fallback
+OTEL_SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "analytics-service")
+OTEL_EXPORTER_OTLP_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "")
+OTEL_TRACES_FILE = os.getenv("OTEL_TRACES_FILE", "")
+
+# SQL profiling (opt-in): per-request X-DB-Time/X-DB-Queries headers and slow-query EXPLAIN logging
+DB_PROFILING_ENABLED = os.getenv("DB_PROFILING_ENABLED", "").lower() in {"1", "true", "yes"}
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "10"))
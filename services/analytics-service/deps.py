@@ -1,7 +1,11 @@
-from fastapi import Header, HTTPException, status
+from fastapi import Header, HTTPException, Request, status
 import httpx
 
+from access_tokens import verify_access_token
+from gateway_identity import verify_gateway_identity
 from config import USER_MANAGEMENT_URL
+from metrics import observe_downstream
+from tracing import client_span
 
 
 def get_authorization_header(authorization: str = Header(None)) -> str:
@@ -14,19 +18,24 @@ def get_authorization_header(authorization: str = Header(None)) -> str:
     return authorization
 
 
-async def get_current_user(authorization: str = Header(None)):
+async def get_current_user(request: Request, authorization: str = Header(None)):
     if not authorization:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Authorization header missing",
         )
+    user = verify_gateway_identity(request.headers, authorization) or verify_access_token(authorization)
+    if user is not None:
+        return user
 
     async with httpx.AsyncClient() as client:
         try:
-            response = await client.get(
-                f"{USER_MANAGEMENT_URL}/api/users/me",
-                headers={"Authorization": authorization}
-            )
+            headers = {"Authorization": authorization}
+            with observe_downstream("user-management"), client_span("GET user-management", headers):
+                response = await client.get(
+                    f"{USER_MANAGEMENT_URL}/api/users/me",
+                    headers=headers
+                )
             if response.status_code != 200:
                 raise HTTPException(
                     status_code=status.HTTP_401_UNAUTHORIZED,
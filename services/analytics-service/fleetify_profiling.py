@@ -0,0 +1,174 @@
+"""
+Opt-in SQL profiling shared by the Fleetify services that own a database.
+
+This is the canonical copy. Each service's build context gets a byte-identical
+copy (services/shared/sync.py writes them, the shared tests fail while one
+differs), so edit this file and re-run the sync, never a copy.
+
+Every statement is fingerprinted, timed and counted against the current request or
+background block; statements slower than SLOW_QUERY_MS are logged with their EXPLAIN plan,
+and responses carry X-DB-Time / X-DB-Queries headers. Each service's profiling.py builds
+a SqlProfiler from its own configuration (DB_PROFILING_ENABLED, SLOW_QUERY_MS,
+N_PLUS_ONE_THRESHOLD) and re-exports its methods; a disabled profiler attaches nothing.
+"""
+import logging
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from sqlalchemy import event
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_BIND_PARAM = re.compile(r"%\(\w+\)s|%s")
+_IN_LIST = re.compile(r"\bIN \(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def fingerprint(statement: str) -> str:
+    """Normalise a statement so queries that differ only in their parameters group together."""
+    normalised = _STRING_LITERAL.sub("?", statement)
+    normalised = _BIND_PARAM.sub("?", normalised)
+    normalised = _NUMBER_LITERAL.sub("?", normalised)
+    normalised = _WHITESPACE.sub(" ", normalised).strip()
+    return _IN_LIST.sub("IN (...)", normalised)
+
+
+class QueryStats:
+    """Statements executed within one request or background block, grouped by fingerprint."""
+
+    def __init__(self, label: str):
+        self.label = label
+        self.count = 0
+        self.total_seconds = 0.0
+        self.rows = 0
+        self.by_fingerprint: Dict[str, list] = {}
+
+    def record(self, statement_fingerprint: str, duration: float, rowcount: int) -> None:
+        self.count += 1
+        self.total_seconds += duration
+        self.rows += max(rowcount, 0)
+        entry = self.by_fingerprint.setdefault(statement_fingerprint, [0, 0.0, 0])
+        entry[0] += 1
+        entry[1] += duration
+        entry[2] += max(rowcount, 0)
+
+    def summary(self, top: int = 3) -> str:
+        heaviest = sorted(self.by_fingerprint.items(), key=lambda item: item[1][1], reverse=True)[:top]
+        parts = [f"{count}x {duration * 1000:.1f}ms rows={rows} {fp[:160]}" for fp, (count, duration, rows) in heaviest]
+        return (
+            f"{self.label} db={self.total_seconds * 1000:.1f}ms queries={self.count} rows={self.rows}"
+            + "".join(f"\n    {part}" for part in parts)
+        )
+
+    def repeated_statements(self, threshold: int) -> List[str]:
+        return [fp for fp, (count, _, _) in self.by_fingerprint.items() if count >= threshold]
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("db_query_stats", default=None)
+
+
+def _explain(conn, statement: str, parameters) -> str:
+    # Use a raw cursor inside a savepoint so the caller's cursor and transaction are untouched
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute("SAVEPOINT sql_profiler_explain")
+        try:
+            cursor.execute(f"EXPLAIN {statement}", parameters)
+            plan = "\n".join(f"    {row[0]}" for row in cursor.fetchall())
+        except Exception as exc:
+            cursor.execute("ROLLBACK TO SAVEPOINT sql_profiler_explain")
+            plan = f"    EXPLAIN failed: {exc}"
+        cursor.execute("RELEASE SAVEPOINT sql_profiler_explain")
+        return plan
+    finally:
+        cursor.close()
+
+
+class SqlProfiler:
+    """One service's profiling settings; logs to logger_name (e.g. "vehicle.sql")."""
+
+    def __init__(self, logger_name: str, enabled: bool, slow_query_ms: float, n_plus_one_threshold: int):
+        self.enabled = enabled
+        self.slow_query_ms = slow_query_ms
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.logger = logging.getLogger(logger_name)
+        if not self.logger.handlers:
+            handler = logging.StreamHandler()
+            handler.setFormatter(logging.Formatter("[%(name)s] %(levelname)s %(message)s"))
+            self.logger.addHandler(handler)
+            self.logger.setLevel(logging.INFO)
+            self.logger.propagate = False
+
+    def profile_engine(self, engine) -> None:
+        """Attach the profiling listeners to the engine when profiling is enabled."""
+        if not self.enabled:
+            return
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("profiling_start_time", []).append(time.perf_counter())
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            duration = time.perf_counter() - conn.info["profiling_start_time"].pop()
+            statement_fingerprint = fingerprint(statement)
+            stats = _current_stats.get()
+            if stats is not None:
+                stats.record(statement_fingerprint, duration, cursor.rowcount)
+            if duration * 1000 < self.slow_query_ms:
+                return
+            where = stats.label if stats is not None else "outside request"
+            message = f"slow query {duration * 1000:.1f}ms rows={cursor.rowcount} ({where}): {statement_fingerprint}"
+            if not executemany and statement.lstrip()[:6].upper() == "SELECT":
+                message += "\n" + _explain(conn, statement, parameters)
+            self.logger.warning(message)
+
+        @event.listens_for(engine, "handle_error")
+        def _handle_error(context):
+            stack = context.connection.info.get("profiling_start_time") if context.connection else None
+            if stack:
+                stack.pop()
+
+    @contextmanager
+    def profile_block(self, label: str):
+        """Collect query stats for background work (consumers, sweepers) and log a summary."""
+        if not self.enabled:
+            yield None
+            return
+        stats = QueryStats(label)
+        token = _current_stats.set(stats)
+        try:
+            yield stats
+        finally:
+            _current_stats.reset(token)
+            self._log_stats(stats)
+
+    def _log_stats(self, stats: QueryStats) -> None:
+        if stats.count == 0:
+            return
+        self.logger.info(stats.summary())
+        for statement_fingerprint in stats.repeated_statements(self.n_plus_one_threshold):
+            count = stats.by_fingerprint[statement_fingerprint][0]
+            self.logger.warning(f"possible N+1 in {stats.label}: {count}x {statement_fingerprint[:200]}")
+
+    def profile_app(self, app: FastAPI) -> None:
+        """Register the middleware that scopes query stats to a request and reports them in headers."""
+        if not self.enabled:
+            return
+
+        @app.middleware("http")
+        async def db_profiling_middleware(request: Request, call_next):
+            stats = QueryStats(f"{request.method} {request.url.path}")
+            token = _current_stats.set(stats)
+            try:
+                response = await call_next(request)
+            finally:
+                _current_stats.reset(token)
+            response.headers["X-DB-Time"] = f"{stats.total_seconds * 1000:.2f}"
+            response.headers["X-DB-Queries"] = str(stats.count)
+            self._log_stats(stats)
+            return response
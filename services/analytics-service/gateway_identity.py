@@ -0,0 +1,27 @@
+"""
+Caller identity asserted by nginx-gateway.
+
+The gateway (lua/auth.lua) checks a bearer token once per request and
+forwards the caller in signed headers bound to that token (see
+fleetify_auth). A valid signature younger than GATEWAY_IDENTITY_MAX_AGE_SECONDS
+makes any further check unnecessary, as long as the revocation feed
+(access_tokens.revocations) is trusted and has not ended the session or
+changed the user since the gateway asked user-management. Calls that do not
+come through the gateway carry no signature and are checked as before.
+"""
+from typing import Any, Dict, Mapping, Optional
+
+import fleetify_auth
+from access_tokens import revocations
+from config import GATEWAY_HMAC_SECRET, GATEWAY_IDENTITY_MAX_AGE_SECONDS
+from metrics import ACCESS_TOKEN_CHECKS
+
+
+def verify_gateway_identity(headers: Mapping[str, str], authorization: Optional[str]) -> Optional[Dict[str, Any]]:
+    """The caller (id, role, manager_id, full_name) if the gateway vouched for this token, else None."""
+    user, result = fleetify_auth.verify_gateway_identity(
+        headers, authorization, GATEWAY_HMAC_SECRET, GATEWAY_IDENTITY_MAX_AGE_SECONDS, revocations
+    )
+    if result:
+        ACCESS_TOKEN_CHECKS.labels(result).inc()
+    return user
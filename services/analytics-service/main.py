@@ -8,8 +8,18 @@ from typing import List, Dict, Any, Optional
 from pydantic import BaseModel
 import models
 from database import engine, get_db, SessionLocal
+from access_tokens import start_revocation_listener
 from deps import get_current_user, get_authorization_header
-from config import RABBITMQ_HOST, RABBITMQ_USER, RABBITMQ_PASS, ANALYTICS_QUEUE, USER_MANAGEMENT_URL
+from config import RABBITMQ_HOST, RABBITMQ_USER, RABBITMQ_PASS, ANALYTICS_EXCHANGE, ANALYTICS_QUEUE, USER_MANAGEMENT_URL
+from metrics import (
+    WORKER_QUEUE_LAG,
+    ChartTimer,
+    instrument_app,
+    observe_downstream,
+)
+from outbox import enqueue_analytics_event, run_outbox_relay
+from profiling import profile_app, profile_block
+from tracing import client_span, consumer_span, trace_app
 import json
 import threading
 import time
@@ -20,35 +30,28 @@ import httpx
 models.Base.metadata.create_all(bind=engine)
 
 app = FastAPI(title="Analytics Service")
+instrument_app(app)
+trace_app(app)
+profile_app(app)
 
 
 # =====================================================
 # RABBITMQ & BACKGROUND WORKER
 # =====================================================
 
-def publish_analytics_event(event_type: str, vehicle_id: str = None):
-    """Publikuj event do kolejki - triggeruje przeliczenie w tle"""
-    try:
-        credentials = pika.PlainCredentials(RABBITMQ_USER, RABBITMQ_PASS)
-        params = pika.ConnectionParameters(host=RABBITMQ_HOST, credentials=credentials)
-        connection = pika.BlockingConnection(params)
-        channel = connection.channel()
-        channel.queue_declare(queue=ANALYTICS_QUEUE, durable=True)
-        
-        message = json.dumps({"type": event_type, "vehicle_id": vehicle_id})
-        channel.basic_publish(exchange="", routing_key=ANALYTICS_QUEUE, body=message,
-                              properties=pika.BasicProperties(delivery_mode=2))
-        connection.close()
-        print(f"[Analytics] Event published: {event_type}, vehicle={vehicle_id}")
-    except Exception as e:
-        print(f"[Analytics] Failed to publish event: {e}")
+def owner_of(current_user: dict) -> Optional[str]:
+    """Admin, do którego należy zespół użytkownika (dla pracownika - jego manager)"""
+    if current_user.get("role") == "admin":
+        return current_user.get("id")
+    return current_user.get("manager_id")
 
 
 def get_worker_db():
     return SessionLocal()
 
 
-def save_precomputed(db: Session, chart_type: str, vehicle_id: str, period_days: int, data: dict):
+def save_precomputed(db: Session, chart_type: str, vehicle_id: str, period_days: int, data: dict,
+                     timer: Optional[ChartTimer] = None):
     """Zapisz przeliczone dane do cache (upsert)"""
     stmt = insert(models.PrecomputedChart).values(
         chart_type=chart_type, vehicle_id=vehicle_id, period_days=period_days,
@@ -59,12 +62,15 @@ def save_precomputed(db: Session, chart_type: str, vehicle_id: str, period_days:
     )
     db.execute(stmt)
     db.commit()
+    if timer:
+        timer.lap(chart_type)
 
 
 def compute_and_cache_charts(db: Session, vehicle_id: str = None):
     """Przelicz wszystkie wykresy i zapisz do cache"""
     periods = [7, 30, 90, 180, 365]
     vid = vehicle_id
+    timer = ChartTimer()
     
     for days in periods:
         start_date = datetime.now() - timedelta(days=days)
@@ -81,7 +87,7 @@ def compute_and_cache_charts(db: Session, vehicle_id: str = None):
         
         fuel_data = [{"date": r.date.isoformat(), "liters": float(r.liters or 0), "cost": float(r.cost or 0)} 
                      for r in fuel_q.all() if r.date]
-        save_precomputed(db, "fuel_consumption", vid, days, {"data": fuel_data, "period_days": days})
+        save_precomputed(db, "fuel_consumption", vid, days, {"data": fuel_data, "period_days": days}, timer)
         
         # Cost breakdown (format zgodny z frontendem: category, amount)
         fuel_cost = db.query(sql_func.sum(models.FuelLog.total_cost)).filter(
@@ -103,7 +109,7 @@ def compute_and_cache_charts(db: Session, vehicle_id: str = None):
             breakdown.append({"category": "Paliwo", "amount": fuel_cost})
         if tolls_cost > 0:
             breakdown.append({"category": "Opłaty drogowe", "amount": tolls_cost})
-        save_precomputed(db, "cost_breakdown", vid, days, {"data": breakdown, "total": fuel_cost + tolls_cost})
+        save_precomputed(db, "cost_breakdown", vid, days, {"data": breakdown, "total": fuel_cost + tolls_cost}, timer)
         
         # Vehicle mileage (format zgodny z frontendem: distance_km)
         mileage_q = db.query(
@@ -117,7 +123,7 @@ def compute_and_cache_charts(db: Session, vehicle_id: str = None):
         
         mileage_data = [{"vehicle_id": r.vehicle_id, "vehicle_label": r.vehicle_label or r.vehicle_id,
                          "distance_km": float(r.total_km or 0), "trips_count": r.trips} for r in mileage_q.all()]
-        save_precomputed(db, "vehicle_mileage", vid, days, {"data": mileage_data})
+        save_precomputed(db, "vehicle_mileage", vid, days, {"data": mileage_data}, timer)
         
         # Fuel efficiency (l/100km)
         efficiency_q = db.query(
@@ -144,7 +150,7 @@ def compute_and_cache_charts(db: Session, vehicle_id: str = None):
                 "distance_km": total_km,
                 "fuel_used_l": total_fuel
             })
-        save_precomputed(db, "fuel_efficiency", vid, days, {"data": efficiency_data, "period_days": days})
+        save_precomputed(db, "fuel_efficiency", vid, days, {"data": efficiency_data, "period_days": days}, timer)
         
         # Cost trend (monthly)
         months = max(1, days // 30)
@@ -170,7 +176,7 @@ def compute_and_cache_charts(db: Session, vehicle_id: str = None):
         trend_data = [{"month": m.strftime("%Y-%m"), "month_label": m.strftime("%b %Y"),
                        "fuel_cost": fuel_m.get(m, 0), "tolls_cost": tolls_m.get(m, 0),
                        "total_cost": fuel_m.get(m, 0) + tolls_m.get(m, 0)} for m in all_months if m]
-        save_precomputed(db, "cost_trend", vid, days, {"data": trend_data})
+        save_precomputed(db, "cost_trend", vid, days, {"data": trend_data}, timer)
         
         # Cost prediction (regression)
         try:
@@ -226,12 +232,12 @@ def compute_and_cache_charts(db: Session, vehicle_id: str = None):
                     "summary": {"avg_daily_cost": round(np.mean(y), 2),
                                 "predicted_next_period_cost": round(sum(p["predicted_cost"] for p in prediction), 2)}
                 }
-                save_precomputed(db, "cost_prediction", vid, days, pred_data)
+                save_precomputed(db, "cost_prediction", vid, days, pred_data, timer)
             else:
-                save_precomputed(db, "cost_prediction", vid, days, {"historical": [], "prediction": [], "model_stats": {"error": "Za mało danych"}})
+                save_precomputed(db, "cost_prediction", vid, days, {"historical": [], "prediction": [], "model_stats": {"error": "Za mało danych"}}, timer)
         except Exception as e:
             print(f"[Analytics] Prediction error: {e}")
-            save_precomputed(db, "cost_prediction", vid, days, {"historical": [], "prediction": [], "model_stats": {"error": str(e)}})
+            save_precomputed(db, "cost_prediction", vid, days, {"historical": [], "prediction": [], "model_stats": {"error": str(e)}}, timer)
     
     # Fleet summary (only for all vehicles)
     if not vid:
@@ -257,7 +263,7 @@ def compute_and_cache_charts(db: Session, vehicle_id: str = None):
             "current_month": {"fuel_cost": cur_fuel, "total_distance_km": cur_dist, "trips_count": cur_trips},
             "deltas": {"fuel_cost": delta(cur_fuel, last_fuel), "distance": delta(cur_dist, last_dist)}
         }
-        save_precomputed(db, "fleet_summary", None, 0, summary)
+        save_precomputed(db, "fleet_summary", None, 0, summary, timer)
         
         # Vehicles list
         trip_v = db.query(models.TripLog.vehicle_id, models.TripLog.vehicle_label).filter(
@@ -268,7 +274,7 @@ def compute_and_cache_charts(db: Session, vehicle_id: str = None):
         for v in trip_v + fuel_v:
             if v.vehicle_id and v.vehicle_id not in vehicles_map:
                 vehicles_map[v.vehicle_id] = v.vehicle_label or v.vehicle_id
-        save_precomputed(db, "vehicles_list", None, 0, {"vehicles": [{"id": k, "label": v} for k, v in vehicles_map.items()]})
+        save_precomputed(db, "vehicles_list", None, 0, {"vehicles": [{"id": k, "label": v} for k, v in vehicles_map.items()]}, timer)
     
     print(f"[Analytics] Cache updated for vehicle_id={vid or 'ALL'}")
 
@@ -278,8 +284,9 @@ def process_analytics_event(event: dict):
     db = get_worker_db()
     try:
         vehicle_id = event.get("vehicle_id")
-        compute_and_cache_charts(db, vehicle_id)
-        compute_and_cache_charts(db, None)  # Też globalne
+        with profile_block(f"charts event={event.get('type')} vehicle={vehicle_id}"):
+            compute_and_cache_charts(db, vehicle_id)
+            compute_and_cache_charts(db, None)  # Też globalne
     except Exception as e:
         print(f"[Analytics Worker] Error: {e}")
     finally:
@@ -294,14 +301,20 @@ def analytics_worker():
             params = pika.ConnectionParameters(host=RABBITMQ_HOST, credentials=credentials, heartbeat=600)
             connection = pika.BlockingConnection(params)
             channel = connection.channel()
+            channel.exchange_declare(exchange=ANALYTICS_EXCHANGE, exchange_type="fanout", durable=True)
             channel.queue_declare(queue=ANALYTICS_QUEUE, durable=True)
+            channel.queue_bind(queue=ANALYTICS_QUEUE, exchange=ANALYTICS_EXCHANGE)
             channel.basic_qos(prefetch_count=1)
             
             def callback(ch, method, props, body):
                 try:
                     event = json.loads(body)
+                    if event.get("emitted_at"):
+                        WORKER_QUEUE_LAG.observe(max(0.0, time.time() - float(event["emitted_at"])))
                     print(f"[Analytics Worker] Processing: {event}")
-                    process_analytics_event(event)
+                    with consumer_span(f"{ANALYTICS_QUEUE} process", props.headers) as span:
+                        span.set_attribute("analytics.event_type", str(event.get("type")))
+                        process_analytics_event(event)
                 except Exception as e:
                     print(f"[Analytics Worker] Callback error: {e}")
                 ch.basic_ack(delivery_tag=method.delivery_tag)
@@ -324,8 +337,10 @@ def initial_cache_build():
         vehicle_ids = [v.vehicle_id for v in vehicles]
         
         for vid in vehicle_ids:
-            compute_and_cache_charts(db, vid)
-        compute_and_cache_charts(db, None)
+            with profile_block(f"charts initial vehicle={vid}"):
+                compute_and_cache_charts(db, vid)
+        with profile_block("charts initial vehicle=None"):
+            compute_and_cache_charts(db, None)
         print("[Analytics] Initial cache build complete")
     except Exception as e:
         print(f"[Analytics] Initial cache error: {e}")
@@ -338,6 +353,8 @@ async def startup_event():
     """Uruchom worker i początkowe przeliczenie"""
     threading.Thread(target=initial_cache_build, daemon=True).start()
     threading.Thread(target=analytics_worker, daemon=True).start()
+    threading.Thread(target=run_outbox_relay, daemon=True).start()
+    start_revocation_listener()
     print("[Analytics Service] Background worker started")
 
 
@@ -523,11 +540,13 @@ async def get_team_user_ids(authorization: str, current_user: dict) -> List[str]
     
     try:
         async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{USER_MANAGEMENT_URL}/api/users/team",
-                headers={"Authorization": authorization},
-                timeout=10.0
-            )
+            headers = {"Authorization": authorization}
+            with observe_downstream("user-management"), client_span("GET user-management", headers):
+                response = await client.get(
+                    f"{USER_MANAGEMENT_URL}/api/users/team",
+                    headers=headers,
+                    timeout=10.0
+                )
             if response.status_code == 200:
                 data = response.json()
                 user_ids = [current_user["id"]]  # Admin's own ID
@@ -754,9 +773,9 @@ def create_trip_log(
         started_at=payload.started_at or datetime.utcnow(),
     )
     db.add(log)
+    enqueue_analytics_event(db, "trip_added", payload.vehicle_id, owner_of(current_user))
     db.commit()
     db.refresh(log)
-    publish_analytics_event("trip_added", payload.vehicle_id)
     return serialize_trip(log)
 
 
@@ -781,9 +800,9 @@ def update_trip_log(
         log.user_id = target_user
     for field, value in updates.items():
         setattr(log, field, value)
+    enqueue_analytics_event(db, "trip_updated", log.vehicle_id, owner_of(current_user))
     db.commit()
     db.refresh(log)
-    publish_analytics_event("trip_updated", log.vehicle_id)
     return serialize_trip(log)
 
 
@@ -800,8 +819,8 @@ def delete_trip_log(
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
     vehicle_id = log.vehicle_id
     db.delete(log)
+    enqueue_analytics_event(db, "trip_deleted", vehicle_id, owner_of(current_user))
     db.commit()
-    publish_analytics_event("trip_deleted", vehicle_id)
     return {"status": "deleted"}
 
 
@@ -849,9 +868,9 @@ def create_fuel_log(
         notes=payload.notes,
     )
     db.add(log)
+    enqueue_analytics_event(db, "fuel_added", payload.vehicle_id, owner_of(current_user))
     db.commit()
     db.refresh(log)
-    publish_analytics_event("fuel_added", payload.vehicle_id)
     return serialize_fuel(log)
 
 
@@ -876,9 +895,9 @@ def update_fuel_log(
         log.user_id = target_user
     for field, value in updates.items():
         setattr(log, field, value)
+    enqueue_analytics_event(db, "fuel_updated", log.vehicle_id, owner_of(current_user))
     db.commit()
     db.refresh(log)
-    publish_analytics_event("fuel_updated", log.vehicle_id)
     return serialize_fuel(log)
 
 
@@ -895,8 +914,8 @@ def delete_fuel_log(
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
     vehicle_id = log.vehicle_id
     db.delete(log)
+    enqueue_analytics_event(db, "fuel_deleted", vehicle_id, owner_of(current_user))
     db.commit()
-    publish_analytics_event("fuel_deleted", vehicle_id)
     return {"status": "deleted"}
 
 @app.get("/analytics/employee/assignment")
@@ -0,0 +1,42 @@
+"""
+Prometheus instrumentation for Analytics Service.
+Exposes /metrics with HTTP, database, RabbitMQ and background worker timings.
+Metrics that several services report are defined once in fleetify_metrics (a
+copy of services/shared); the ones below are this service's own.
+"""
+import time
+
+from prometheus_client import Histogram
+
+from fleetify_metrics import (
+    ACCESS_TOKEN_CHECKS,
+    OUTBOX_EVENTS,
+    RABBITMQ_PUBLISH_FAILURES,
+    RABBITMQ_PUBLISH_LATENCY,
+    instrument_app,
+    instrument_engine,
+    observe_downstream,
+)
+
+WORKER_QUEUE_LAG = Histogram(
+    "analytics_worker_queue_lag_seconds",
+    "Time between publishing an analytics event and the worker picking it up",
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0),
+)
+CHART_RECOMPUTE_SECONDS = Histogram(
+    "analytics_chart_recompute_duration_seconds",
+    "Time spent recomputing and caching a chart",
+    ["chart_type"],
+)
+
+
+class ChartTimer:
+    """Attributes the time since the previous lap to the chart that was just saved."""
+
+    def __init__(self):
+        self._last = time.perf_counter()
+
+    def lap(self, chart_type: str) -> None:
+        now = time.perf_counter()
+        CHART_RECOMPUTE_SECONDS.labels(chart_type).observe(now - self._last)
+        self._last = now
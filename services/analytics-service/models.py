@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Numeric, DateTime, Text
+from sqlalchemy import BigInteger, Column, Integer, String, Numeric, DateTime, Text
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.sql import func
 from database import Base
@@ -111,3 +111,17 @@ class PrecomputedChart(Base):
     period_days = Column(Integer, default=30)
     data_json = Column(JSONB, nullable=False)
     computed_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class OutboxEvent(Base):
+    """Event analityczny zapisany w tej samej transakcji co zmiana; usuwany po publikacji"""
+    __tablename__ = "outbox_events"
+
+    id = Column(BigInteger, primary_key=True)
+    aggregate_id = Column(String(64), nullable=True)  # np. vehicle:42
+    event_type = Column(String(64), nullable=False)
+    payload = Column(JSONB, nullable=False)
+    trace_context = Column(JSONB, nullable=True)  # traceparent żądania, które dodało event; publikacja kontynuuje ten trace
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
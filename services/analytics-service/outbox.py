@@ -0,0 +1,182 @@
+"""
+Transactional outbox for analytics events.
+
+Trip and fuel handlers add their analytics event to outbox_events in the same
+transaction as the change, so a committed change always gets its recompute
+trigger even if RabbitMQ is down at that moment. A relay thread publishes
+committed rows in id order over one connection with publisher confirms and
+deletes them once the broker has acknowledged them (at-least-once; the chart
+worker recomputes idempotently). Each row keeps the trace context of the
+request that queued it, so the publish stays in that request's trace.
+
+Only one replica relays at a time (advisory lock) and a row that fails to
+publish holds back every row after it, so per-vehicle order is kept. Commits
+that added events wake the relay, so requests never wait on RabbitMQ.
+"""
+import json
+import threading
+import time
+from typing import Optional, Tuple
+
+import pika
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+import models
+from config import (
+    ANALYTICS_EXCHANGE,
+    ANALYTICS_QUEUE,
+    OUTBOX_BATCH_SIZE,
+    OUTBOX_MAX_BACKOFF_SECONDS,
+    OUTBOX_POLL_INTERVAL_SECONDS,
+    RABBITMQ_HOST,
+    RABBITMQ_PASS,
+    RABBITMQ_USER,
+)
+from database import SessionLocal
+from metrics import OUTBOX_EVENTS, RABBITMQ_PUBLISH_FAILURES, RABBITMQ_PUBLISH_LATENCY
+from tracing import producer_span, trace_headers
+
+# pg_try_advisory_xact_lock key shared by all analytics-service replicas
+RELAY_LOCK_KEY = 0xA7A1_0001
+
+_wake = threading.Event()
+
+
+def enqueue_analytics_event(db: Session, event_type: str, vehicle_id: str = None, owner_id: str = None) -> None:
+    """Add an analytics event to the caller's transaction; it is published after db.commit()."""
+    db.add(models.OutboxEvent(
+        aggregate_id=f"vehicle:{vehicle_id}" if vehicle_id is not None else None,
+        event_type=event_type,
+        payload={
+            "type": event_type,
+            "vehicle_id": vehicle_id,
+            "owner_id": owner_id,
+            "emitted_at": time.time(),
+        },
+        trace_context=trace_headers() or None,
+    ))
+    db.info["outbox_pending"] = True
+    OUTBOX_EVENTS.labels("enqueued").inc()
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _wake_relay(session):
+    if session.info.pop("outbox_pending", False):
+        _wake.set()
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_pending(session):
+    session.info.pop("outbox_pending", None)
+
+
+class Publisher:
+    """Long-lived confirmed channel to the analytics exchange; reopened after any failure."""
+
+    def __init__(self):
+        self._connection = None
+        self._channel = None
+
+    def _channel_open(self):
+        if self._channel is None or not self._channel.is_open:
+            self.close()
+            credentials = pika.PlainCredentials(RABBITMQ_USER, RABBITMQ_PASS)
+            params = pika.ConnectionParameters(host=RABBITMQ_HOST, credentials=credentials)
+            self._connection = pika.BlockingConnection(params)
+            self._channel = self._connection.channel()
+            self._channel.confirm_delivery()
+            self._channel.exchange_declare(exchange=ANALYTICS_EXCHANGE, exchange_type="fanout", durable=True)
+            # Bind the worker queue here too, so events are kept even before the worker first connects
+            self._channel.queue_declare(queue=ANALYTICS_QUEUE, durable=True)
+            self._channel.queue_bind(queue=ANALYTICS_QUEUE, exchange=ANALYTICS_EXCHANGE)
+        return self._channel
+
+    def publish(self, payload: dict, trace_context: Optional[dict] = None) -> None:
+        started = time.perf_counter()
+        try:
+            channel = self._channel_open()
+            headers = {}
+            with producer_span(f"{ANALYTICS_EXCHANGE} publish", headers, trace_context):
+                channel.basic_publish(exchange=ANALYTICS_EXCHANGE, routing_key="", body=json.dumps(payload),
+                                      properties=pika.BasicProperties(delivery_mode=2, headers=headers))
+        except Exception:
+            RABBITMQ_PUBLISH_FAILURES.labels(ANALYTICS_EXCHANGE).inc()
+            self.close()
+            raise
+        RABBITMQ_PUBLISH_LATENCY.labels(ANALYTICS_EXCHANGE).observe(time.perf_counter() - started)
+
+    def keepalive(self) -> None:
+        """Service heartbeats between batches so an idle connection is not dropped."""
+        if self._connection is not None and self._connection.is_open:
+            try:
+                self._connection.process_data_events(0)
+            except Exception:
+                self.close()
+
+    def close(self) -> None:
+        try:
+            if self._connection is not None and self._connection.is_open:
+                self._connection.close()
+        except Exception:
+            pass
+        self._connection = None
+        self._channel = None
+
+
+def relay_batch(publisher: Publisher) -> Tuple[int, Optional[Exception]]:
+    """
+    Publish up to OUTBOX_BATCH_SIZE events in id order and delete the published ones.
+    Returns (published, error); error is the exception that stopped the batch, if any.
+    """
+    db = SessionLocal()
+    try:
+        if not db.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": RELAY_LOCK_KEY}).scalar():
+            return 0, None
+        rows = (
+            db.query(models.OutboxEvent)
+            .order_by(models.OutboxEvent.id)
+            .limit(OUTBOX_BATCH_SIZE)
+            .all()
+        )
+        published, error = [], None
+        for row in rows:
+            try:
+                publisher.publish(row.payload, row.trace_context)
+            except Exception as e:
+                row.attempts += 1
+                row.last_error = str(e)[:500]
+                error = e
+                break
+            published.append(row.id)
+        if published:
+            db.query(models.OutboxEvent).filter(models.OutboxEvent.id.in_(published)).delete(synchronize_session=False)
+        db.commit()
+        OUTBOX_EVENTS.labels("published").inc(len(published))
+        if error is not None:
+            OUTBOX_EVENTS.labels("failed").inc()
+        return len(published), error
+    finally:
+        db.close()
+
+
+def run_outbox_relay() -> None:
+    """Relay thread: publish on every wake-up or poll tick, backing off while the broker is down."""
+    publisher = Publisher()
+    failures = 0
+    while True:
+        _wake.clear()
+        try:
+            published, error = relay_batch(publisher)
+        except Exception as e:
+            published, error = 0, e
+        if error is not None:
+            failures += 1
+            print(f"[Analytics] Outbox relay failed (attempt {failures}): {error}")
+            time.sleep(min(OUTBOX_MAX_BACKOFF_SECONDS, OUTBOX_POLL_INTERVAL_SECONDS * 2 ** failures))
+            continue
+        failures = 0
+        if published >= OUTBOX_BATCH_SIZE:
+            continue  # Backlog: keep draining
+        _wake.wait(OUTBOX_POLL_INTERVAL_SECONDS)
+        publisher.keepalive()
@@ -0,0 +1,104 @@
+"""
+Fleet health for the admin dashboard: service and issue alerts, per-vehicle
+health rows and the open-issue summary, derived from vehicle-service records.
+"""
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+
+def _service_due(vehicle: Dict[str, Any]):
+    # vehicle-service precomputes next_service_due; older payloads only carry last_service_date
+    due = vehicle.get("next_service_due")
+    interval = timedelta(0)
+    if not due:
+        due = vehicle.get("last_service_date")
+        interval = timedelta(days=365)
+    if not due:
+        return None
+    try:
+        return datetime.fromisoformat(due.replace('Z', '+00:00')) + interval
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+
+def _service_alert(vehicle: Dict[str, Any], vehicle_label: str):
+    service_due = _service_due(vehicle)
+    if service_due is None:
+        return None
+    now = datetime.now(service_due.tzinfo) if service_due.tzinfo else datetime.utcnow()
+    days_remaining = (service_due - now).days
+
+    if days_remaining < 0:
+        return {
+            "type": "Serwis przeterminowany",
+            "message": f"{vehicle_label} - serwis przeterminowany o {abs(days_remaining)} dni!",
+            "severity": "danger",
+            "vehicle_id": vehicle["id"],
+        }
+    if days_remaining <= 30:
+        return {
+            "type": "Serwis wkrótce",
+            "message": f"{vehicle_label} - serwis za {days_remaining} dni",
+            "severity": "warning",
+            "vehicle_id": vehicle["id"],
+        }
+    return None
+
+
+def _location(vehicle: Dict[str, Any]) -> str:
+    if vehicle.get("city"):
+        return vehicle["city"]
+    if vehicle.get("latitude") is not None and vehicle.get("longitude") is not None:
+        return f"{vehicle.get('latitude'):.4f}, {vehicle.get('longitude'):.4f}"
+    return "Unknown"
+
+
+def summarize_fleet(vehicles: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Build the alerts, fleetHealth and issueSummary sections of /dashboard/admin."""
+    alerts = []
+    fleet_health = []
+    issue_summary = {"open": 0, "byVehicle": []}
+
+    for v in vehicles:
+        issues = v.get("issues") or []
+        open_count = sum(1 for issue in issues if issue.get("status") != "resolved")
+        vehicle_label = f"{v['make']} {v['model']}"
+
+        service_alert = _service_alert(v, vehicle_label)
+        if service_alert:
+            alerts.append(service_alert)
+
+        # Generate issue alerts for high/critical
+        for issue in issues:
+            if issue.get("status") != "resolved" and issue.get("severity") in ("high", "critical"):
+                severity_label = "Krytyczny" if issue.get("severity") == "critical" else "Wysoki"
+                alerts.append({
+                    "type": f"Problem - {severity_label}",
+                    "message": f"{vehicle_label}: {issue.get('title', 'Problem z pojazdem')}",
+                    "severity": "danger" if issue.get("severity") == "critical" else "warning",
+                    "vehicle_id": v["id"],
+                    "issue_id": issue.get("id"),
+                })
+
+        fleet_health.append({
+            "id": v["id"],
+            "model": vehicle_label,
+            "status": v["status"],
+            "location": _location(v),
+            "battery": v.get("battery_level", 0) if v.get("fuel_type") in ["electric", "hybrid"] else v.get("fuel_level", 0),
+            "fuel_level": v.get("fuel_level", 0),
+            "fuel_type": v.get("fuel_type", "gasoline"),
+            "last_service_date": v.get("last_service_date"),
+            "open_issues": open_count,
+        })
+        if open_count:
+            issue_summary["open"] += open_count
+            issue_summary["byVehicle"].append({
+                "vehicle_id": v["id"],
+                "vehicle_label": vehicle_label,
+                "open_issues": open_count,
+                "last_service_date": v.get("last_service_date"),
+            })
+
+    alerts = [{"id": alert_id, **alert} for alert_id, alert in enumerate(alerts, start=1)]
+    return {"alerts": alerts, "fleetHealth": fleet_health, "issueSummary": issue_summary}
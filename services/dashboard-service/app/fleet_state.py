@@ -0,0 +1,229 @@
+"""
+In-memory fleet state per owner, kept current by vehicle_events.
+
+An owner's vehicles are loaded from vehicle-service once, on the first admin
+dashboard build, and from then on every vehicle/issue event is applied to that
+copy. Events carry the full vehicle row, so applying one is an upsert and a
+replayed or duplicated event is harmless.
+
+Events that arrive while an owner is being loaded are buffered and replayed on
+top of the loaded copy. If the consumer loses its connection (its queue is
+exclusive, so events are lost meanwhile) every owner is reloaded on next use,
+and FLEET_STATE_RESYNC_SECONDS bounds the drift from any event we never saw.
+
+Positions of loaded ("hot") fleets are also bucketed into a coarse lat/lon grid,
+so the fleet map's nearby/viewport queries are answered from memory.
+
+Like SnapshotStore, all state lives on the event loop; the consumer thread
+only calls apply_event / invalidate_all, which hop onto the loop.
+"""
+import asyncio
+import math
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from app.metrics import FLEET_STATE_EVENTS
+
+Loader = Callable[[str], Awaitable[List[Dict[str, Any]]]]
+
+# Vehicle columns included in every vehicle event (vehicle-service _serialize_vehicle)
+VEHICLE_FIELDS = (
+    "owner_id", "vin", "make", "model", "year", "license_plate", "status",
+    "fuel_type", "fuel_level", "fuel_capacity", "battery_level", "odometer",
+    "latitude", "longitude", "city", "current_driver_id", "last_service_date",
+    "next_service_due", "open_issue_count", "open_critical_issue_count",
+    "version", "created_at", "updated_at",
+)
+
+# Grid cell size in degrees (~5.5 km of latitude)
+GRID_DEGREES = 0.05
+EARTH_RADIUS_KM = 6371.0088
+
+Cell = Tuple[int, int]
+BBox = Tuple[float, float, float, float]  # min_lat, min_lon, max_lat, max_lon
+
+
+def _cell(latitude: float, longitude: float) -> Cell:
+    return math.floor(latitude / GRID_DEGREES), math.floor(longitude / GRID_DEGREES)
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = math.sin((phi2 - phi1) / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def map_summary(vehicle: Dict[str, Any]) -> Dict[str, Any]:
+    """Same shape as vehicle-service's fields=summary rows."""
+    summary = {key: value for key, value in vehicle.items() if key != "issues"}
+    if "open_issue_count" not in summary:
+        issues = vehicle.get("issues") or []
+        open_issues = [issue for issue in issues if issue.get("status") != "resolved"]
+        summary["open_issue_count"] = len(open_issues)
+        summary["open_critical_issue_count"] = sum(1 for issue in open_issues if issue.get("severity") in ("high", "critical"))
+    return summary
+
+
+class FleetState:
+    def __init__(self, resync_seconds: float):
+        self._resync = resync_seconds
+        self._vehicles: Dict[str, Dict[int, Dict[str, Any]]] = {}
+        self._loaded_at: Dict[str, float] = {}
+        self._loading: Dict[str, asyncio.Future] = {}
+        self._pending: Dict[str, List[Dict[str, Any]]] = {}
+        self._grid: Dict[str, Dict[Cell, Set[int]]] = {}
+        self._cells: Dict[str, Dict[int, Cell]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def bind_loop(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+
+    async def vehicles(self, owner_id: str, loader: Loader, authorization: str) -> List[Dict[str, Any]]:
+        """Return the owner's vehicles in /vehicles/ shape, loading them on first use."""
+        owner_id = str(owner_id)
+        loaded_at = self._loaded_at.get(owner_id)
+        if loaded_at is None or time.monotonic() - loaded_at > self._resync:
+            vehicles = await self._load(owner_id, loader, authorization)
+        else:
+            vehicles = self._vehicles[owner_id]
+        return [dict(vehicle, issues=list(vehicle["issues"])) for vehicle in vehicles.values()]
+
+    async def _load(self, owner_id: str, loader: Loader, authorization: str) -> Dict[int, Dict[str, Any]]:
+        pending = self._loading.get(owner_id)
+        if pending is not None:
+            return await asyncio.shield(pending)
+        future = asyncio.get_running_loop().create_future()
+        self._loading[owner_id] = future
+        self._pending[owner_id] = []
+        try:
+            rows = await loader(authorization)
+            vehicles = {}
+            for row in rows:
+                vehicle = dict(row)
+                vehicle["issues"] = list(vehicle.get("issues") or [])
+                vehicles[vehicle["id"]] = vehicle
+            self._vehicles[owner_id] = vehicles
+            self._loaded_at[owner_id] = time.monotonic()
+            self._grid[owner_id], self._cells[owner_id] = {}, {}
+            for vehicle in vehicles.values():
+                self._index(owner_id, vehicle)
+            # Replay what arrived during the load; the loaded rows may predate it
+            for event in self._pending.pop(owner_id):
+                self._apply(event)
+            future.set_result(vehicles)
+            return vehicles
+        except BaseException as exc:
+            future.set_exception(exc)
+            future.exception()  # mark retrieved when nobody else was waiting
+            raise
+        finally:
+            del self._loading[owner_id]
+            self._pending.pop(owner_id, None)
+
+    def _apply(self, event: Dict[str, Any]) -> None:
+        owner_id = event.get("owner_id")
+        vehicle_id = event.get("vehicle_id")
+        if owner_id is None or vehicle_id is None:
+            FLEET_STATE_EVENTS.labels("ignored").inc()
+            return
+        owner_id = str(owner_id)
+        if owner_id in self._pending:
+            self._pending[owner_id].append(event)
+            FLEET_STATE_EVENTS.labels("buffered").inc()
+            return
+        vehicles = self._vehicles.get(owner_id)
+        if vehicles is None:
+            # Nobody has asked for this fleet yet; it is loaded fresh when they do
+            FLEET_STATE_EVENTS.labels("ignored").inc()
+            return
+
+        vehicle_id = int(vehicle_id)
+        if (event.get("event_type") or event.get("event")) == "vehicle_deleted":
+            vehicles.pop(vehicle_id, None)
+            self._unindex(owner_id, vehicle_id)
+            FLEET_STATE_EVENTS.labels("applied").inc()
+            return
+
+        vehicle = vehicles.setdefault(vehicle_id, {"id": vehicle_id, "issues": []})
+        for key in VEHICLE_FIELDS:
+            if key in event:
+                vehicle[key] = event[key]
+        issue = event.get("issue")
+        if issue and issue.get("id") is not None:
+            vehicle["issues"] = [i for i in vehicle["issues"] if i.get("id") != issue["id"]] + [issue]
+        self._index(owner_id, vehicle)
+        FLEET_STATE_EVENTS.labels("applied").inc()
+
+    def _index(self, owner_id: str, vehicle: Dict[str, Any]) -> None:
+        latitude, longitude = vehicle.get("latitude"), vehicle.get("longitude")
+        cell = _cell(latitude, longitude) if latitude is not None and longitude is not None else None
+        if self._cells[owner_id].get(vehicle["id"]) == cell:
+            return
+        self._unindex(owner_id, vehicle["id"])
+        if cell is not None:
+            self._cells[owner_id][vehicle["id"]] = cell
+            self._grid[owner_id].setdefault(cell, set()).add(vehicle["id"])
+
+    def _unindex(self, owner_id: str, vehicle_id: int) -> None:
+        cell = self._cells[owner_id].pop(vehicle_id, None)
+        if cell is None:
+            return
+        members = self._grid[owner_id][cell]
+        members.discard(vehicle_id)
+        if not members:
+            del self._grid[owner_id][cell]
+
+    def is_hot(self, owner_id: str) -> bool:
+        """True when the owner's fleet is loaded and recent enough to answer map queries."""
+        loaded_at = self._loaded_at.get(str(owner_id))
+        return loaded_at is not None and time.monotonic() - loaded_at <= self._resync
+
+    def in_bounds(self, owner_id: str, box: BBox) -> List[Dict[str, Any]]:
+        """Vehicles of a hot fleet inside the box (no antimeridian wrap), ordered by id."""
+        owner_id = str(owner_id)
+        min_lat, min_lon, max_lat, max_lon = box
+        grid, vehicles = self._grid[owner_id], self._vehicles[owner_id]
+        (low_row, low_col), (high_row, high_col) = _cell(min_lat, min_lon), _cell(max_lat, max_lon)
+        if (high_row - low_row + 1) * (high_col - low_col + 1) <= len(grid):
+            cells = [(row, col) for row in range(low_row, high_row + 1) for col in range(low_col, high_col + 1)]
+        else:
+            cells = list(grid)  # Viewport wider than the fleet: walk occupied cells instead
+        found = []
+        for cell in cells:
+            for vehicle_id in grid.get(cell, ()):
+                vehicle = vehicles[vehicle_id]
+                if min_lat <= vehicle["latitude"] <= max_lat and min_lon <= vehicle["longitude"] <= max_lon:
+                    found.append(map_summary(vehicle))
+        found.sort(key=lambda vehicle: vehicle["id"])
+        return found
+
+    def nearby(self, owner_id: str, latitude: float, longitude: float, radius_km: float) -> Optional[List[Dict[str, Any]]]:
+        """Vehicles of a hot fleet within radius_km, nearest first; None if the circle wraps."""
+        dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+        dlon = math.degrees(radius_km / (EARTH_RADIUS_KM * max(math.cos(math.radians(latitude)), 1e-6)))
+        box = (latitude - dlat, longitude - dlon, latitude + dlat, longitude + dlon)
+        if box[0] < -90 or box[2] > 90 or box[1] < -180 or box[3] > 180:
+            return None
+        found = []
+        for vehicle in self.in_bounds(owner_id, box):
+            distance = haversine_km(latitude, longitude, vehicle["latitude"], vehicle["longitude"])
+            if distance <= radius_km:
+                found.append(dict(vehicle, distance_km=round(distance, 3)))
+        found.sort(key=lambda vehicle: vehicle["distance_km"])
+        return found
+
+    def _invalidate_all(self) -> None:
+        self._vehicles.clear()
+        self._loaded_at.clear()
+        self._grid.clear()
+        self._cells.clear()
+
+    def apply_event(self, event: Dict[str, Any]) -> None:
+        """Thread-safe: called from the RabbitMQ consumer for every vehicle event."""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._apply, event)
+
+    def invalidate_all(self) -> None:
+        """Thread-safe: called when the consumer (re)connects and may have missed events."""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._invalidate_all)
@@ -0,0 +1,257 @@
+"""
+Access tokens, gateway identities and revocations, shared by every Fleetify
+Python service.
+
+This is the canonical copy. Each service's build context gets a byte-identical
+copy (services/shared/sync.py writes them, the shared tests fail while one
+differs), so edit this file and re-run the sync, never a copy.
+
+Standard library only and free of service config: secrets, lifetimes and
+the RabbitMQ connection are passed in by each service's access_tokens.py and
+gateway_identity.py, which also count the results in their own metrics.
+
+An access token is a JWT signed with ACCESS_TOKEN_SECRET (HS256) carrying
+the user's id (sub), session (sid), role, manager_id, email and full name
+(name), issued by user-management. Revocations are broadcast on a fanout
+exchange: a session that logged out ({"sid", "until"}) or a user whose
+tokens issued up to some moment are void ({"sub", "issued_before",
+"until"}). A RevocationList keeps them until the tokens they cover have
+expired, and tokens are only trusted while its listener has been connected
+for a whole token lifetime, so no revocation of a token still in use can
+have been missed.
+
+nginx-gateway (lua/auth.lua) checks bearer tokens against a short cache of
+user-management answers and forwards the caller as X-User-Id, X-User-Role,
+X-User-Manager-Id, X-User-Name (percent-encoded) and X-Session-Id, with
+X-Identity-Checked-At (when user-management answered) and
+X-Identity-Timestamp (when the gateway forwarded the request).
+X-Identity-Signature is an HMAC-SHA256 (INTERNAL_HMAC_SECRET, hex) over
+those values and the SHA-256 of the token, one per line, so the headers are
+useless with any other Authorization. The answer is treated like a token
+issued at X-Identity-Checked-At: it is only accepted while the revocation
+feed is trusted and nothing since then revoked the session or the user.
+"""
+import base64
+import binascii
+import hashlib
+import hmac
+import json
+import threading
+import time
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+from urllib.parse import unquote
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def _b64decode(segment: str) -> bytes:
+    return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+
+
+def _json(value: Dict[str, Any]) -> str:
+    return _b64encode(json.dumps(value, separators=(",", ":")).encode())
+
+
+HEADER = _json({"alg": "HS256", "typ": "JWT"})
+
+
+def _sign(secret: str, signing_input: str) -> str:
+    return _b64encode(hmac.new(secret.encode(), signing_input.encode(), hashlib.sha256).digest())
+
+
+def is_access_token(token: str) -> bool:
+    # Session tokens come from token_urlsafe and never contain a dot
+    return token.count(".") == 2
+
+
+def encode_access_token(claims: Dict[str, Any], secret: str) -> str:
+    signing_input = f"{HEADER}.{_json(claims)}"
+    return f"{signing_input}.{_sign(secret, signing_input)}"
+
+
+def decode_access_token(token: str, secret: str) -> Optional[Dict[str, Any]]:
+    """The claims of a correctly signed, unexpired access token, else None."""
+    try:
+        header, payload, signature = token.split(".")
+    except ValueError:
+        return None
+    # Bytes: compare_digest refuses str with non-ASCII characters, and the token is caller input
+    if not hmac.compare_digest(signature.encode(), _sign(secret, f"{header}.{payload}").encode()):
+        return None
+    try:
+        claims = json.loads(_b64decode(payload))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if not isinstance(claims, dict) or not claims.get("sub") or not claims.get("sid"):
+        return None
+    if not isinstance(claims.get("exp"), (int, float)) or claims["exp"] <= time.time():
+        return None
+    return claims
+
+
+class RevocationList:
+    """Revoked sessions and users until their last token expires; safe from any thread."""
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, float] = {}
+        self._users: Dict[str, Tuple[int, float]] = {}
+        self._subscribers: List[Callable[[Dict[str, Any]], None]] = []
+        # time.monotonic() since which the feed has been received without a gap
+        self.live_since: Optional[float] = None
+
+    def subscribe(self, callback: Callable[[Dict[str, Any]], None]) -> None:
+        """Also hand every revocation added from now on to callback, on the adding thread."""
+        self._subscribers.append(callback)
+
+    def add(self, message: Dict[str, Any]) -> None:
+        until = float(message.get("until", 0))
+        with self._lock:
+            now = time.time()
+            if until <= now:
+                return
+            self._sessions = {sid: end for sid, end in self._sessions.items() if end > now}
+            self._users = {sub: entry for sub, entry in self._users.items() if entry[1] > now}
+            if message.get("sid"):
+                self._sessions[str(message["sid"])] = max(until, self._sessions.get(str(message["sid"]), 0))
+            if message.get("sub"):
+                issued_before, end = self._users.get(str(message["sub"]), (0, 0))
+                self._users[str(message["sub"])] = (
+                    max(issued_before, int(message.get("issued_before", 0))),
+                    max(end, until),
+                )
+        for callback in self._subscribers:
+            callback(message)
+
+    def is_revoked(self, claims: Dict[str, Any]) -> bool:
+        with self._lock:
+            if str(claims.get("sid")) in self._sessions:
+                return True
+            entry = self._users.get(str(claims.get("sub")))
+            return entry is not None and int(claims.get("iat", 0)) <= entry[0]
+
+    def trusted(self) -> bool:
+        return self.live_since is not None and time.monotonic() - self.live_since >= self.ttl_seconds
+
+
+def bearer_token(authorization: Optional[str]) -> Optional[str]:
+    if not authorization or not authorization.startswith("Bearer "):
+        return None
+    return authorization[len("Bearer "):].strip()
+
+
+def verify_access_token(
+    authorization: Optional[str], secret: str, revocations: RevocationList
+) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """
+    (caller, result): the caller as /api/users/me would describe it (id, role,
+    manager_id, email, full_name, session_id), or None to ask /me; result is the outcome to count, or
+    None when there was no bearer token to look at.
+    """
+    token = bearer_token(authorization)
+    if not secret or not token:
+        return None, None
+    if not is_access_token(token):
+        return None, "session_token"
+    if not revocations.trusted():
+        return None, "untrusted"
+    claims = decode_access_token(token, secret)
+    if claims is None:
+        return None, "invalid"
+    if revocations.is_revoked(claims):
+        return None, "revoked"
+    caller = {
+        "id": claims["sub"],
+        "role": claims.get("role", "employee"),
+        "manager_id": claims.get("manager_id"),
+        "email": claims.get("email"),
+        "full_name": claims.get("name"),
+        "session_id": claims["sid"],
+    }
+    return caller, "verified"
+
+
+# Identity headers nginx-gateway sets, in the order they are signed
+GATEWAY_HEADERS = (
+    "x-user-id",
+    "x-user-role",
+    "x-user-manager-id",
+    "x-user-name",
+    "x-session-id",
+    "x-identity-checked-at",
+    "x-identity-timestamp",
+)
+
+
+def gateway_signature(values: List[str], token: str, secret: str) -> str:
+    token_hash = hashlib.sha256(token.encode()).hexdigest()
+    message = "\n".join([*values, token_hash])
+    return hmac.new(secret.encode(), message.encode(), hashlib.sha256).hexdigest()
+
+
+def verify_gateway_identity(
+    headers: Mapping[str, str],
+    authorization: Optional[str],
+    secret: str,
+    max_age_seconds: float,
+    revocations: RevocationList,
+) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """
+    (caller, result): the caller (id, role, manager_id, full_name,
+    session_id) if the gateway vouched for this token and nothing revoked it
+    since, else None; result is the outcome to count, or None when the
+    request carried no gateway identity.
+    """
+    signature = headers.get("x-identity-signature")
+    if not secret or not signature or not authorization or not authorization.startswith("Bearer "):
+        return None, None
+    values = [headers.get(name, "") for name in GATEWAY_HEADERS]
+    user_id, role, manager_id, name, session_id, checked_at, timestamp = values
+    expected = gateway_signature(values, authorization[len("Bearer "):], secret)
+    try:
+        fresh = abs(time.time() - int(timestamp)) <= max_age_seconds
+        checked_at = int(checked_at)
+    except ValueError:
+        fresh = False
+    if not fresh or not user_id or not hmac.compare_digest(signature.encode(), expected.encode()):
+        return None, "gateway_invalid"
+    if not revocations.trusted():
+        return None, "gateway_untrusted"
+    if revocations.is_revoked({"sub": user_id, "sid": session_id, "iat": checked_at}):
+        return None, "gateway_revoked"
+    caller = {
+        "id": user_id,
+        "role": role or "employee",
+        "manager_id": manager_id or None,
+        "full_name": unquote(name) or None,
+        "session_id": session_id or None,
+    }
+    return caller, "gateway"
+
+
+def run_revocation_listener(
+    revocations: RevocationList, connect: Callable[[], Any], exchange: str, log_prefix: str = ""
+) -> None:
+    """Follow the revocation exchange forever; connect() returns a new pika BlockingConnection."""
+    while True:
+        try:
+            connection = connect()
+            channel = connection.channel()
+            channel.exchange_declare(exchange=exchange, exchange_type="fanout", durable=True)
+            # Queue of this instance only; it disappears with the connection
+            revocation_queue = channel.queue_declare(queue="", exclusive=True, auto_delete=True).method.queue
+            channel.queue_bind(queue=revocation_queue, exchange=exchange)
+            revocations.live_since = time.monotonic()
+            for _method, _properties, body in channel.consume(revocation_queue, auto_ack=True):
+                try:
+                    revocations.add(json.loads(body))
+                except (TypeError, ValueError):
+                    pass
+        except Exception as e:
+            print(f"{log_prefix}Token revocation listener failed, retrying in 5 seconds: {e}")
+        # Whatever was published meanwhile is lost: stop trusting tokens until a full TTL has been seen
+        revocations.live_since = None
+        time.sleep(5)
@@ -0,0 +1,111 @@
+"""
+OpenTelemetry tracing shared by every Fleetify Python service.
+
+This is the canonical copy. Each service's build context gets a byte-identical
+copy (services/shared/sync.py writes them, the shared tests fail while one
+differs), so edit this file and re-run the sync, never a copy.
+
+Services continue the W3C traceparent sent by the gateway (or by the service
+that called them) and forward it on every downstream call and RabbitMQ
+message, so one user request is one trace across all services. Each service's
+tracing.py passes in its own configuration and re-exports the helpers below.
+FastAPI is imported by trace_app() only: user-management (Django) wraps
+server_span() in its own middleware.
+"""
+from contextlib import contextmanager
+from typing import Mapping, Optional
+
+from opentelemetry import propagate, trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+from opentelemetry.trace import SpanKind, Status, StatusCode
+
+UNTRACED_PATHS = {"/metrics", "/health"}
+
+# Spans are told apart by the service.name resource set in setup_tracing()
+tracer = trace.get_tracer("fleetify")
+
+
+def setup_tracing(service_name: str, otlp_endpoint: Optional[str], traces_file: Optional[str]) -> None:
+    """Install the tracer provider. Spans go to an OTLP collector, or to a JSON-lines file when no collector is set."""
+    provider = TracerProvider(resource=Resource.create({"service.name": service_name}))
+    if otlp_endpoint:
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
+        exporter = OTLPSpanExporter(endpoint=f"{otlp_endpoint.rstrip('/')}/v1/traces")
+        provider.add_span_processor(BatchSpanProcessor(exporter))
+    elif traces_file:
+        out = open(traces_file, "a", buffering=1)
+        exporter = ConsoleSpanExporter(out=out, formatter=lambda span: span.to_json(indent=None) + "\n")
+        provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(provider)
+
+
+@contextmanager
+def server_span(method: str, path: str, headers: Mapping):
+    """Span for an incoming request, parented to its traceparent header; callers rename it to the route."""
+    parent = propagate.extract(headers)
+    with tracer.start_as_current_span(f"{method} {path}", context=parent, kind=SpanKind.SERVER) as span:
+        span.set_attribute("http.request.method", method)
+        span.set_attribute("url.path", path)
+        yield span
+
+
+def finish_server_span(span, method: str, route: Optional[str], status_code: int) -> None:
+    if route:
+        span.update_name(f"{method} {route}")
+    span.set_attribute("http.response.status_code", status_code)
+    if status_code >= 500:
+        span.set_status(Status(StatusCode.ERROR))
+
+
+def trace_app(app, service_name: str, otlp_endpoint: Optional[str], traces_file: Optional[str]) -> None:
+    """Install the tracer provider and start a server span per request of a FastAPI app."""
+    from fastapi import Request
+
+    setup_tracing(service_name, otlp_endpoint, traces_file)
+
+    @app.middleware("http")
+    async def tracing_middleware(request: Request, call_next):
+        if request.url.path in UNTRACED_PATHS:
+            return await call_next(request)
+        with server_span(request.method, request.url.path, request.headers) as span:
+            response = await call_next(request)
+            route = getattr(request.scope.get("route"), "path", None)
+            finish_server_span(span, request.method, route, response.status_code)
+            return response
+
+
+@contextmanager
+def client_span(name: str, headers: dict, kind: SpanKind = SpanKind.CLIENT, parent: Optional[Mapping] = None):
+    """Open a span for an outgoing call and write its traceparent into headers."""
+    context = propagate.extract(parent) if parent else None
+    with tracer.start_as_current_span(name, context=context, kind=kind) as span:
+        propagate.inject(headers)
+        yield span
+
+
+def trace_headers() -> dict:
+    """traceparent/tracestate of the current span, to continue the trace later (e.g. from an outbox row)."""
+    headers: dict = {}
+    propagate.inject(headers)
+    return headers
+
+
+@contextmanager
+def producer_span(name: str, headers: dict, parent: Optional[Mapping] = None):
+    """
+    Open a span for a RabbitMQ publish and carry its traceparent in the message headers.
+    parent: trace_headers() saved when the message was queued; defaults to the current span.
+    """
+    with client_span(name, headers, kind=SpanKind.PRODUCER, parent=parent) as span:
+        yield span
+
+
+@contextmanager
+def consumer_span(name: str, headers: Optional[Mapping] = None):
+    """Continue the trace carried in RabbitMQ message headers."""
+    parent = propagate.extract(headers or {})
+    with tracer.start_as_current_span(name, context=parent, kind=SpanKind.CONSUMER) as span:
+        yield span
@@ -0,0 +1,61 @@
+"""
+Caller identity asserted by nginx-gateway.
+
+The gateway (lua/auth.lua) checks a bearer token once per request and
+forwards the caller in signed headers bound to that token (see
+fleetify_auth). A valid signature younger than GATEWAY_IDENTITY_MAX_AGE_SECONDS
+makes any further check unnecessary, as long as the revocation feed
+(access_tokens.revocations) is trusted and has not ended the session or
+changed the user since the gateway asked user-management. Calls that do not
+come through the gateway carry no signature and are checked as before.
+
+Handlers here get the caller through resolve_user(authorization), so
+gateway_app() checks the headers once per request and gateway_user() hands
+the result to whatever resolves that same token during the request.
+"""
+from contextvars import ContextVar
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from fastapi import FastAPI, Request
+
+from config import GATEWAY_HMAC_SECRET, GATEWAY_IDENTITY_MAX_AGE_SECONDS
+from app import fleetify_auth
+from app.access_tokens import revocations
+from app.metrics import ACCESS_TOKEN_CHECKS
+
+# (Authorization header, caller) the gateway vouched for in the current request
+_caller: ContextVar[Optional[Tuple[str, Dict[str, Any]]]] = ContextVar("gateway_caller", default=None)
+
+
+def verify_gateway_identity(headers: Mapping[str, str], authorization: Optional[str]) -> Optional[Dict[str, Any]]:
+    """The caller (id, role, manager_id, full_name) if the gateway vouched for this token, else None."""
+    user, result = fleetify_auth.verify_gateway_identity(
+        headers, authorization, GATEWAY_HMAC_SECRET, GATEWAY_IDENTITY_MAX_AGE_SECONDS, revocations
+    )
+    if result:
+        ACCESS_TOKEN_CHECKS.labels(result).inc()
+    return user
+
+
+def gateway_user(authorization: Optional[str]) -> Optional[Dict[str, Any]]:
+    """The caller the gateway vouched for in this request, if it presented this token."""
+    caller = _caller.get()
+    if caller is None or caller[0] != authorization:
+        return None
+    return dict(caller[1])
+
+
+def gateway_app(app: FastAPI) -> None:
+    """Register the middleware that checks the gateway's identity headers once per request."""
+
+    @app.middleware("http")
+    async def gateway_identity_middleware(request: Request, call_next):
+        authorization = request.headers.get("authorization")
+        user = verify_gateway_identity(request.headers, authorization)
+        if user is None:
+            return await call_next(request)
+        token = _caller.set((authorization, user))
+        try:
+            return await call_next(request)
+        finally:
+            _caller.reset(token)
@@ -2,13 +2,34 @@ import pika
 import json
 import time
 
-from config import RABBITMQ_HOST, RABBITMQ_USER, RABBITMQ_PASS
+from config import RABBITMQ_HOST, RABBITMQ_USER, RABBITMQ_PASS, ANALYTICS_EXCHANGE, VEHICLE_EVENT_EXCHANGE
+from app.metrics import EVENTS_CONSUMED
+from app.tracing import consumer_span
 
-def callback(ch, method, properties, body):
-    print(f" [x] Received {body}")
-    # Here we would update the dashboard state/cache
 
-def consume_messages():
+def make_callback(source, on_event):
+    def callback(ch, method, properties, body):
+        EVENTS_CONSUMED.labels(source).inc()
+        with consumer_span(f"{source} receive", properties.headers):
+            try:
+                event = json.loads(body)
+            except (TypeError, ValueError):
+                print(f" [x] Ignoring malformed {source} message")
+                return
+            if isinstance(event, dict):
+                on_event(event)
+    return callback
+
+
+def _bind_private_queue(channel, exchange):
+    # Exclusive, server-named queue: every dashboard replica gets its own copy of every event
+    channel.exchange_declare(exchange=exchange, exchange_type='fanout', durable=True)
+    queue = channel.queue_declare(queue='', exclusive=True).method.queue
+    channel.queue_bind(queue=queue, exchange=exchange)
+    return queue
+
+
+def consume_messages(on_vehicle_event, on_analytics_event, on_connected=lambda: None):
     while True:
         try:
             credentials = pika.PlainCredentials(RABBITMQ_USER, RABBITMQ_PASS)
@@ -16,9 +37,20 @@ def consume_messages():
             connection = pika.BlockingConnection(parameters)
             channel = connection.channel()
 
-            channel.queue_declare(queue='vehicle_events')
-
-            channel.basic_consume(queue='vehicle_events', on_message_callback=callback, auto_ack=True)
+            vehicle_queue = _bind_private_queue(channel, VEHICLE_EVENT_EXCHANGE)
+            channel.basic_consume(
+                queue=vehicle_queue,
+                on_message_callback=make_callback(VEHICLE_EVENT_EXCHANGE, on_vehicle_event),
+                auto_ack=True,
+            )
+            analytics_queue = _bind_private_queue(channel, ANALYTICS_EXCHANGE)
+            channel.basic_consume(
+                queue=analytics_queue,
+                on_message_callback=make_callback(ANALYTICS_EXCHANGE, on_analytics_event),
+                auto_ack=True,
+            )
+            # Anything published while we were disconnected never reached our queues
+            on_connected()
 
             print(' [*] Waiting for messages. To exit press CTRL+C')
             channel.start_consuming()
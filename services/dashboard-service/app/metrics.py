@@ -0,0 +1,24 @@
+"""
+Prometheus instrumentation for Dashboard Service.
+Exposes /metrics with per-route latency and the latency of every downstream hop.
+Metrics that several services report are defined once in fleetify_metrics (a
+copy of services/shared); the ones below are this service's own.
+"""
+from prometheus_client import Counter, Histogram
+
+from app.fleetify_metrics import ACCESS_TOKEN_CHECKS, EVENTS_CONSUMED, instrument_app, observe_downstream
+
+SNAPSHOT_RESULTS = Counter(
+    "dashboard_snapshot_requests_total",
+    "Admin dashboard loads by snapshot outcome (hit, stale, miss, bypass)",
+    ["result"],
+)
+FLEET_STATE_EVENTS = Counter(
+    "dashboard_fleet_state_events_total",
+    "Vehicle events seen by the in-memory fleet state (applied, buffered, ignored)",
+    ["result"],
+)
+SNAPSHOT_BUILD_SECONDS = Histogram(
+    "dashboard_snapshot_build_duration_seconds",
+    "Time to rebuild an admin dashboard snapshot from downstream services",
+)
@@ -0,0 +1,212 @@
+"""
+Per-admin snapshots of /dashboard/admin with stale-while-revalidate semantics.
+
+A page load is a dictionary read. A snapshot is "fresh" for SNAPSHOT_FRESH_SECONDS;
+after that, or once a RabbitMQ event says the admin's fleet or logs changed, it is
+served as "stale" while one background refresh rebuilds it. Past
+SNAPSHOT_MAX_STALE_SECONDS it is rebuilt inline ("miss").
+
+Snapshots are keyed by admin id. Tokens are mapped to users for
+SNAPSHOT_TOKEN_TTL_SECONDS in an LRU of at most SNAPSHOT_TOKEN_CACHE_SIZE entries,
+so an unknown or expired token costs one resolve (usually local, else
+/api/users/me). Revocations (a logout, a changed user) drop the entries they
+cover at once. The newest token seen for an admin is kept for background
+refreshes, and a refresh that gets 401/403 drops the snapshot.
+
+All state lives on the event loop. The consumer and revocation threads only call
+notify_owner_changed / notify_revoked, which hop onto the loop with
+call_soon_threadsafe.
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi import HTTPException
+
+from app.metrics import SNAPSHOT_BUILD_SECONDS, SNAPSHOT_RESULTS
+
+Builder = Callable[[str], Awaitable[Dict[str, Any]]]
+Resolver = Callable[[str], Awaitable[Dict[str, Any]]]
+
+
+@dataclass
+class Snapshot:
+    data: Dict[str, Any]
+    built_at: float
+    authorization: str
+    last_read: float = field(default_factory=time.monotonic)
+    dirty: bool = False
+
+
+class SnapshotStore:
+    def __init__(
+        self,
+        builder: Builder,
+        resolver: Resolver,
+        fresh_seconds: float,
+        max_stale_seconds: float,
+        token_ttl_seconds: float,
+        token_cache_size: int = 10000,
+        debounce_seconds: float = 0.5,
+    ):
+        self._builder = builder
+        self._resolver = resolver
+        self._fresh = fresh_seconds
+        self._max_stale = max_stale_seconds
+        self._token_ttl = token_ttl_seconds
+        self._token_cache_size = token_cache_size
+        self._debounce = debounce_seconds
+        self._snapshots: Dict[str, Snapshot] = {}
+        # Least recently used first
+        self._tokens: "OrderedDict[str, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self._refreshing: Dict[str, asyncio.Task] = {}
+        self._building: Dict[str, asyncio.Future] = {}
+        self._versions: Dict[str, int] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def bind_loop(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+
+    async def user_for(self, authorization: str) -> Dict[str, Any]:
+        """Resolve a token to its user through the short-lived token cache."""
+        now = time.monotonic()
+        cached = self._tokens.get(authorization)
+        if cached and cached[1] > now:
+            self._tokens.move_to_end(authorization)
+            return cached[0]
+        user = await self._resolver(authorization)
+        self._tokens[authorization] = (user, now + self._token_ttl)
+        self._tokens.move_to_end(authorization)
+        while len(self._tokens) > self._token_cache_size:
+            self._tokens.popitem(last=False)
+        return user
+
+    async def get(self, authorization: str) -> Tuple[Dict[str, Any], str, float]:
+        """Return (dashboard, "hit" | "stale" | "miss" | "bypass", age in seconds)."""
+        user = await self.user_for(authorization)
+        if user.get("role") != "admin" or not user.get("id"):
+            SNAPSHOT_RESULTS.labels("bypass").inc()
+            return await self._builder(authorization), "bypass", 0.0
+
+        admin_id = str(user["id"])
+        now = time.monotonic()
+        snapshot = self._snapshots.get(admin_id)
+        if snapshot is not None:
+            snapshot.authorization = authorization
+            snapshot.last_read = now
+            age = now - snapshot.built_at
+            if age < self._fresh and not snapshot.dirty:
+                SNAPSHOT_RESULTS.labels("hit").inc()
+                return snapshot.data, "hit", age
+            if age < self._max_stale:
+                self._schedule_refresh(admin_id, delay=0.0)
+                SNAPSHOT_RESULTS.labels("stale").inc()
+                return snapshot.data, "stale", age
+
+        SNAPSHOT_RESULTS.labels("miss").inc()
+        self._evict_idle(now)
+        snapshot = await self._build(admin_id, authorization)
+        return snapshot.data, "miss", 0.0
+
+    async def _build(self, admin_id: str, authorization: str) -> Snapshot:
+        # Concurrent misses for the same admin share one build
+        pending = self._building.get(admin_id)
+        if pending is not None:
+            return await asyncio.shield(pending)
+        future = asyncio.get_running_loop().create_future()
+        self._building[admin_id] = future
+        version = self._versions.get(admin_id, 0)
+        try:
+            started = time.perf_counter()
+            data = await self._builder(authorization)
+            SNAPSHOT_BUILD_SECONDS.observe(time.perf_counter() - started)
+            snapshot = Snapshot(data=data, built_at=time.monotonic(), authorization=authorization)
+            # An event that arrived mid-build may not be reflected in the data we just fetched
+            snapshot.dirty = self._versions.get(admin_id, 0) != version
+            self._snapshots[admin_id] = snapshot
+            future.set_result(snapshot)
+            return snapshot
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as exc:
+            future.set_exception(exc)
+            future.exception()  # mark retrieved when nobody else was waiting
+            raise
+        finally:
+            del self._building[admin_id]
+
+    def _schedule_refresh(self, admin_id: str, delay: float) -> None:
+        if admin_id in self._refreshing or admin_id in self._building:
+            return
+        self._refreshing[admin_id] = asyncio.get_running_loop().create_task(self._refresh(admin_id, delay))
+
+    async def _refresh(self, admin_id: str, delay: float) -> None:
+        follow_up = False
+        try:
+            if delay:
+                await asyncio.sleep(delay)
+            snapshot = self._snapshots.get(admin_id)
+            if snapshot is None:
+                return
+            snapshot.dirty = False
+            try:
+                rebuilt = await self._build(admin_id, snapshot.authorization)
+                follow_up = rebuilt.dirty
+            except HTTPException as exc:
+                if exc.status_code in (401, 403):
+                    # The token we kept is no longer valid; rebuild on the admin's next visit
+                    self._snapshots.pop(admin_id, None)
+                    self._tokens.pop(snapshot.authorization, None)
+                else:
+                    snapshot.dirty = True
+                print(f"Dashboard snapshot refresh failed for {admin_id}: {exc.detail}")
+            except Exception as exc:
+                # Left dirty: the next page load serves it stale and retries the refresh
+                snapshot.dirty = True
+                print(f"Dashboard snapshot refresh failed for {admin_id}: {exc}")
+        finally:
+            self._refreshing.pop(admin_id, None)
+            self._evict_idle(time.monotonic())
+        if follow_up:
+            self._schedule_refresh(admin_id, delay=self._debounce)
+
+    def _mark_dirty(self, owner_id: str) -> None:
+        self._versions[owner_id] = self._versions.get(owner_id, 0) + 1
+        snapshot = self._snapshots.get(owner_id)
+        if snapshot is None:
+            return
+        snapshot.dirty = True
+        # Bursts of events (a batch import, a trip with several updates) collapse into one rebuild
+        self._schedule_refresh(owner_id, delay=self._debounce)
+
+    def notify_owner_changed(self, owner_id: Optional[str]) -> None:
+        """Thread-safe: called from the RabbitMQ consumer when an admin's data changed."""
+        if not owner_id or self._loop is None:
+            return
+        self._loop.call_soon_threadsafe(self._mark_dirty, str(owner_id))
+
+    def _forget_revoked(self, message: Dict[str, Any]) -> None:
+        session_id, user_id = message.get("sid"), message.get("sub")
+        revoked = [
+            token
+            for token, (user, _) in self._tokens.items()
+            if (session_id and str(user.get("session_id")) == str(session_id))
+            or (user_id and str(user.get("id")) == str(user_id))
+        ]
+        for token in revoked:
+            del self._tokens[token]
+
+    def notify_revoked(self, message: Dict[str, Any]) -> None:
+        """Thread-safe: called by the revocation listener for a logged-out session or changed user."""
+        if self._loop is None:
+            return
+        self._loop.call_soon_threadsafe(self._forget_revoked, dict(message))
+
+    def _evict_idle(self, now: float) -> None:
+        for admin_id in [key for key, snap in self._snapshots.items() if now - snap.last_read > self._max_stale]:
+            del self._snapshots[admin_id]
+        for token in [key for key, (_, expires) in self._tokens.items() if expires <= now]:
+            del self._tokens[token]
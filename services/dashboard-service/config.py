@@ -15,3 +15,30 @@ NOTIFICATIONS_SERVICE_TOKEN = os.getenv("NOTIFICATIONS_SERVICE_TOKEN", "")
 RABBITMQ_HOST = os.getenv("RABBITMQ_HOST", "rabbitmq")
 RABBITMQ_USER = os.getenv("RABBITMQ_USER")
 RABBITMQ_PASS = os.getenv("RABBITMQ_PASS")
+ANALYTICS_EXCHANGE = os.getenv("ANALYTICS_EXCHANGE", "analytics_events")
+VEHICLE_EVENT_EXCHANGE = os.getenv("VEHICLE_EVENT_EXCHANGE", "vehicle_events")
+
+# In-memory fleet state: reload an owner's vehicles from vehicle-service at least this often
+FLEET_STATE_RESYNC_SECONDS = float(os.getenv("FLEET_STATE_RESYNC_SECONDS", "900"))
+
+# /dashboard/admin snapshots: fresh window, how long a stale copy may be served, token->user cache (TTL, entries)
+SNAPSHOT_FRESH_SECONDS = float(os.getenv("SNAPSHOT_FRESH_SECONDS", "30"))
+SNAPSHOT_MAX_STALE_SECONDS = float(os.getenv("SNAPSHOT_MAX_STALE_SECONDS", "600"))
+SNAPSHOT_TOKEN_TTL_SECONDS = float(os.getenv("SNAPSHOT_TOKEN_TTL_SECONDS", "60"))
+SNAPSHOT_TOKEN_CACHE_SIZE = int(os.getenv("SNAPSHOT_TOKEN_CACHE_SIZE", "10000"))
+
+# Access tokens: verified locally with the secret user-management signs them with (unset: always ask
+# /api/users/me); revocations arrive on the fanout exchange, trusted once followed for a whole TTL
+ACCESS_TOKEN_SECRET = os.getenv("ACCESS_TOKEN_SECRET", "")
+ACCESS_TOKEN_TTL_SECONDS = float(os.getenv("ACCESS_TOKEN_TTL_SECONDS", "300"))
+AUTH_REVOCATIONS_EXCHANGE = os.getenv("AUTH_REVOCATIONS_EXCHANGE", "auth.revocations")
+
+# Identity headers signed by nginx-gateway (lua/auth.lua) with INTERNAL_HMAC_SECRET (unset: ignored),
+# accepted for this long after signing while the revocation feed above is trusted
+GATEWAY_HMAC_SECRET = os.getenv("INTERNAL_HMAC_SECRET", "")
+GATEWAY_IDENTITY_MAX_AGE_SECONDS = float(os.getenv("GATEWAY_IDENTITY_MAX_AGE_SECONDS", "30"))
+
+# Tracing: OTLP/HTTP collector (e.g. http://jaeger:4318) or a JSON-lines file fallback
+OTEL_SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "dashboard-service")
+OTEL_EXPORTER_OTLP_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "")
+OTEL_TRACES_FILE = os.getenv("OTEL_TRACES_FILE", "")
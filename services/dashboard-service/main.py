@@ -1,11 +1,21 @@
-from fastapi import FastAPI, HTTPException, Header, Body, status
+from fastapi import FastAPI, HTTPException, Header, Body, Query, Response, status
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
 import asyncio
 import httpx
 import threading
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
+from urllib.parse import urlencode
 
+from app.access_tokens import revocations, start_revocation_listener, verify_access_token
+from app.fleet_health import summarize_fleet
+from app.fleet_state import FleetState
+from app.gateway_identity import gateway_app, gateway_user
 from app.messaging import consume_messages
+from app.metrics import instrument_app, observe_downstream
+from app.snapshots import SnapshotStore
+from app.tracing import client_span, trace_app
 
 from config import (
     ANALYTICS_SERVICE_URL,
@@ -13,14 +23,23 @@ from config import (
     USER_MANAGEMENT_URL,
     NOTIFICATIONS_SERVICE_URL,
     NOTIFICATIONS_SERVICE_TOKEN,
+    FLEET_STATE_RESYNC_SECONDS,
+    SNAPSHOT_FRESH_SECONDS,
+    SNAPSHOT_MAX_STALE_SECONDS,
+    SNAPSHOT_TOKEN_CACHE_SIZE,
+    SNAPSHOT_TOKEN_TTL_SECONDS,
 )
 
 app = FastAPI(title="Dashboard Service")
+instrument_app(app)
+trace_app(app)
+gateway_app(app)
 
 
 def build_query(params: Dict[str, Optional[Any]]) -> str:
-    query = [f"{key}={value}" for key, value in params.items() if value is not None]
-    return f"?{'&'.join(query)}" if query else ""
+    # Encoded, so cursor timestamps with a UTC offset ("+00:00") survive the hop
+    query = urlencode({key: value for key, value in params.items() if value is not None})
+    return f"?{query}" if query else ""
 
 
 class VehicleCreate(BaseModel):
@@ -61,11 +80,37 @@ class VehicleUpdate(BaseModel):
 class NotificationResponse(BaseModel):
     action: str
 
+class NotificationBulkAck(BaseModel):
+    ids: Optional[List[str]] = None
+    before: Optional[str] = None  # ISO timestamp, passed through as is
+
 @app.on_event("startup")
 async def startup_event():
-    # Start RabbitMQ consumer in background thread
-    thread = threading.Thread(target=consume_messages, daemon=True)
+    # Start RabbitMQ consumer in background thread; vehicle events update the fleet state,
+    # and any event invalidates the owning admin's snapshot
+    loop = asyncio.get_running_loop()
+    fleet_state.bind_loop(loop)
+    admin_snapshots.bind_loop(loop)
+
+    def on_vehicle_event(event):
+        fleet_state.apply_event(event)
+        # Telemetry pings only move positions/fuel; the snapshot picks them up on its next refresh
+        if event.get("event_type") != "vehicle_telemetry":
+            admin_snapshots.notify_owner_changed(event.get("owner_id"))
+
+    def on_analytics_event(event):
+        admin_snapshots.notify_owner_changed(event.get("owner_id"))
+
+    thread = threading.Thread(
+        target=consume_messages,
+        args=(on_vehicle_event, on_analytics_event, fleet_state.invalidate_all),
+        daemon=True,
+    )
     thread.start()
+    # Revoked access tokens, so callers can be identified without asking user-management;
+    # cached token->user entries go with them
+    revocations.subscribe(admin_snapshots.notify_revoked)
+    start_revocation_listener()
 
 @app.get("/health")
 def health_check():
@@ -78,15 +123,20 @@ async def _request_service(
     authorization: Optional[str] = None,
     data: Optional[dict] = None,
     error_context: str = "requesting",
+    extra_headers: Optional[Dict[str, str]] = None,
 ):
-    headers = {}
+    headers = dict(extra_headers or {})
     if authorization:
         headers["Authorization"] = authorization
 
+    host = httpx.URL(url).host
     async with httpx.AsyncClient(follow_redirects=True) as client:
         try:
-            response = await client.request(method, f"{url}{endpoint}", json=data, headers=headers)
-            response.raise_for_status()
+            with observe_downstream(host, method), client_span(f"{method} {host}", headers) as span:
+                span.set_attribute("url.full", f"{url}{endpoint}")
+                response = await client.request(method, f"{url}{endpoint}", json=data, headers=headers)
+                span.set_attribute("http.response.status_code", response.status_code)
+                response.raise_for_status()
             if response.status_code == status.HTTP_204_NO_CONTENT or not response.content:
                 return None
             return response.json()
@@ -106,8 +156,9 @@ async def post_data(url: str, endpoint: str, data: dict, authorization: str = No
     return await _request_service("POST", url, endpoint, authorization, data, "posting")
 
 
-async def put_data(url: str, endpoint: str, data: dict, authorization: str = None):
-    return await _request_service("PUT", url, endpoint, authorization, data, "updating")
+async def put_data(url: str, endpoint: str, data: dict, authorization: str = None, if_match: Optional[str] = None):
+    headers = {"If-Match": if_match} if if_match else None
+    return await _request_service("PUT", url, endpoint, authorization, data, "updating", headers)
 
 
 async def patch_data(url: str, endpoint: str, data: dict, authorization: str = None):
@@ -127,118 +178,99 @@ async def send_service_notification(payload: dict):
     }
     async with httpx.AsyncClient(follow_redirects=True) as client:
         try:
-            await client.post(f"{NOTIFICATIONS_SERVICE_URL}/notifications", json=payload, headers=headers)
+            with observe_downstream(httpx.URL(NOTIFICATIONS_SERVICE_URL).host, "POST"), \
+                    client_span("POST notifications-service", headers):
+                await client.post(f"{NOTIFICATIONS_SERVICE_URL}/notifications", json=payload, headers=headers)
         except httpx.RequestError as exc:
             print(f"Notification service error: {exc}")
 
-@app.get("/dashboard/admin")
-async def get_admin_dashboard(authorization: str = Header(None)):
-    stats = await fetch_data(ANALYTICS_SERVICE_URL, "/analytics/admin/stats", authorization)
-    costs = await fetch_data(ANALYTICS_SERVICE_URL, "/analytics/admin/costs", authorization)
-    recent_trips = await fetch_data(ANALYTICS_SERVICE_URL, "/analytics/trips?limit=100", authorization)
-    recent_fuel_logs = await fetch_data(ANALYTICS_SERVICE_URL, "/analytics/fuel-logs?limit=100", authorization)
-    
-    # Fetch real vehicles from Vehicle Service instead of Analytics Service mock
-    alerts = []
-    alert_id = 1
+fleet_state = FleetState(resync_seconds=FLEET_STATE_RESYNC_SECONDS)
+
+
+async def fetch_all_vehicles(authorization: str) -> list:
+    """Page through /vehicles/ with keyset pagination on id."""
+    vehicles, page_size = [], 500
+    while True:
+        query = build_query({"limit": page_size, "after_id": vehicles[-1]["id"] if vehicles else None})
+        page = await fetch_data(VEHICLE_SERVICE_URL, f"/vehicles/{query}", authorization)
+        vehicles.extend(page or [])
+        if not page or len(page) < page_size:
+            return vehicles
+
+
+async def fleet_owner_id(authorization: str) -> Optional[str]:
+    """Admin's own id, or an employee's manager id: whose vehicles the caller sees."""
+    user = await admin_snapshots.user_for(authorization)
+    return user["id"] if user.get("role") == "admin" else user.get("manager_id")
+
+
+async def build_admin_dashboard(authorization: str) -> Dict[str, Any]:
+    """Fetch everything the admin dashboard shows; the downstream calls run concurrently."""
+
+    async def fetch_vehicles():
+        # Fleet health comes from the event-driven fleet state; vehicle-service is only
+        # called to load an admin's fleet the first time (or after a resync/reconnect).
+        # It degrades to empty instead of failing the whole dashboard.
+        try:
+            owner_id = await fleet_owner_id(authorization)
+            if not owner_id:
+                return None
+            return await fleet_state.vehicles(owner_id, fetch_all_vehicles, authorization)
+        except Exception as e:
+            print(f"Failed to load vehicles for fleet health: {e}")
+            return None
+
+    stats, costs, recent_trips, recent_fuel_logs, vehicles = await asyncio.gather(
+        fetch_data(ANALYTICS_SERVICE_URL, "/analytics/admin/stats", authorization),
+        fetch_data(ANALYTICS_SERVICE_URL, "/analytics/admin/costs", authorization),
+        fetch_data(ANALYTICS_SERVICE_URL, "/analytics/trips?limit=100", authorization),
+        fetch_data(ANALYTICS_SERVICE_URL, "/analytics/fuel-logs?limit=100", authorization),
+        fetch_vehicles(),
+    )
     try:
-        vehicles = await fetch_data(VEHICLE_SERVICE_URL, "/vehicles/", authorization)
-        # Transform vehicle data to match fleet health format if needed
-        fleet_health = []
-        issue_summary = {"open": 0, "byVehicle": []}
-        for v in vehicles:
-            issues = v.get("issues") or []
-            open_count = sum(1 for issue in issues if issue.get("status") != "resolved")
-            vehicle_label = f"{v['make']} {v['model']}"
-            
-            # Generate service alerts
-            last_service = v.get("last_service_date")
-            if last_service:
-                from datetime import datetime, timedelta
-                try:
-                    service_date = datetime.fromisoformat(last_service.replace('Z', '+00:00'))
-                    now = datetime.now(service_date.tzinfo) if service_date.tzinfo else datetime.utcnow()
-                    one_year = service_date + timedelta(days=365)
-                    days_remaining = (one_year - now).days
-                    
-                    if days_remaining < 0:
-                        alerts.append({
-                            "id": alert_id,
-                            "type": "Serwis przeterminowany",
-                            "message": f"{vehicle_label} - serwis przeterminowany o {abs(days_remaining)} dni!",
-                            "severity": "danger",
-                            "vehicle_id": v["id"],
-                        })
-                        alert_id += 1
-                    elif days_remaining <= 30:
-                        alerts.append({
-                            "id": alert_id,
-                            "type": "Serwis wkrótce",
-                            "message": f"{vehicle_label} - serwis za {days_remaining} dni",
-                            "severity": "warning",
-                            "vehicle_id": v["id"],
-                        })
-                        alert_id += 1
-                except (ValueError, TypeError):
-                    pass
-            
-            # Generate issue alerts for high/critical
-            for issue in issues:
-                if issue.get("status") != "resolved" and issue.get("severity") in ("high", "critical"):
-                    severity_label = "Krytyczny" if issue.get("severity") == "critical" else "Wysoki"
-                    alerts.append({
-                        "id": alert_id,
-                        "type": f"Problem - {severity_label}",
-                        "message": f"{vehicle_label}: {issue.get('title', 'Problem z pojazdem')}",
-                        "severity": "danger" if issue.get("severity") == "critical" else "warning",
-                        "vehicle_id": v["id"],
-                        "issue_id": issue.get("id"),
-                    })
-                    alert_id += 1
-            
-            fleet_health.append({
-                "id": v["id"],
-                "model": f"{v['make']} {v['model']}",
-                "status": v["status"],
-                "location": (
-                    v.get("city")
-                    or (
-                        f"{v.get('latitude'):.4f}, {v.get('longitude'):.4f}"
-                        if v.get("latitude") is not None and v.get("longitude") is not None
-                        else "Unknown"
-                    )
-                ),
-                "battery": v.get("battery_level", 0) if v.get("fuel_type") in ["electric", "hybrid"] else v.get("fuel_level", 0),
-                "fuel_level": v.get("fuel_level", 0),
-                "fuel_type": v.get("fuel_type", "gasoline"),
-                "last_service_date": v.get("last_service_date"),
-                "open_issues": open_count,
-            })
-            if open_count:
-                issue_summary["open"] += open_count
-                issue_summary["byVehicle"].append(
-                    {
-                        "vehicle_id": v["id"],
-                        "vehicle_label": f"{v['make']} {v['model']}",
-                        "open_issues": open_count,
-                        "last_service_date": v.get("last_service_date"),
-                    }
-                )
+        fleet = summarize_fleet(vehicles or [])
     except Exception as e:
-        print(f"Failed to fetch vehicles for fleet health: {e}")
-        fleet_health = []
-        issue_summary = {"open": 0, "byVehicle": []}
+        print(f"Failed to build fleet health: {e}")
+        fleet = summarize_fleet([])
 
     return {
         "stats": stats,
         "costBreakdown": costs,
-        "alerts": alerts,
-        "fleetHealth": fleet_health,
+        "alerts": fleet["alerts"],
+        "fleetHealth": fleet["fleetHealth"],
         "recentTrips": recent_trips,
         "recentFuelLogs": recent_fuel_logs,
-        "issueSummary": issue_summary,
+        "issueSummary": fleet["issueSummary"],
     }
 
+
+async def resolve_user(authorization: str) -> Dict[str, Any]:
+    return (
+        gateway_user(authorization)
+        or verify_access_token(authorization)
+        or await fetch_data(USER_MANAGEMENT_URL, "/api/users/me", authorization)
+    )
+
+
+admin_snapshots = SnapshotStore(
+    build_admin_dashboard,
+    resolve_user,
+    fresh_seconds=SNAPSHOT_FRESH_SECONDS,
+    max_stale_seconds=SNAPSHOT_MAX_STALE_SECONDS,
+    token_ttl_seconds=SNAPSHOT_TOKEN_TTL_SECONDS,
+    token_cache_size=SNAPSHOT_TOKEN_CACHE_SIZE,
+)
+
+
+@app.get("/dashboard/admin")
+async def get_admin_dashboard(response: Response, authorization: str = Header(None)):
+    if not authorization:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Authorization header missing")
+    data, snapshot_state, age = await admin_snapshots.get(authorization)
+    response.headers["X-Dashboard-Snapshot"] = snapshot_state
+    response.headers["X-Dashboard-Snapshot-Age"] = f"{age:.1f}"
+    return data
+
 @app.get("/dashboard/employee")
 async def get_employee_dashboard(authorization: str = Header(None)):
     assignment = await fetch_data(ANALYTICS_SERVICE_URL, "/analytics/employee/assignment", authorization)
@@ -268,8 +300,51 @@ async def get_stats(authorization: str = Header(None)):
     return result
 
 @app.get("/dashboard/vehicles")
-async def get_vehicles(authorization: str = Header(None)):
-    return await fetch_data(VEHICLE_SERVICE_URL, "/vehicles/", authorization)
+async def get_vehicles(
+    fields: Optional[str] = None,
+    after_id: Optional[int] = None,
+    limit: Optional[int] = None,
+    authorization: str = Header(None),
+):
+    query = build_query({"fields": fields, "after_id": after_id, "limit": limit})
+    return await fetch_data(VEHICLE_SERVICE_URL, f"/vehicles/{query}", authorization)
+
+
+@app.get("/dashboard/vehicles/nearby")
+async def get_vehicles_nearby(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    radius_km: float = Query(5.0, gt=0, le=500),
+    limit: int = Query(100, ge=1, le=1000),
+    authorization: str = Header(None),
+):
+    """Fleet map: answered from the in-memory fleet grid when the fleet is hot, else by vehicle-service."""
+    if authorization:
+        owner_id = await fleet_owner_id(authorization)
+        if owner_id and fleet_state.is_hot(owner_id):
+            found = fleet_state.nearby(owner_id, lat, lon, radius_km)
+            if found is not None:
+                return found[:limit]
+    query = build_query({"lat": lat, "lon": lon, "radius_km": radius_km, "limit": limit})
+    return await fetch_data(VEHICLE_SERVICE_URL, f"/vehicles/nearby{query}", authorization)
+
+
+@app.get("/dashboard/vehicles/in-bounds")
+async def get_vehicles_in_bounds(
+    min_lat: float = Query(..., ge=-90, le=90),
+    min_lon: float = Query(..., ge=-180, le=180),
+    max_lat: float = Query(..., ge=-90, le=90),
+    max_lon: float = Query(..., ge=-180, le=180),
+    limit: int = Query(500, ge=1, le=5000),
+    authorization: str = Header(None),
+):
+    """Fleet map viewport; boxes crossing the antimeridian always go to vehicle-service."""
+    if authorization and min_lat <= max_lat and min_lon <= max_lon:
+        owner_id = await fleet_owner_id(authorization)
+        if owner_id and fleet_state.is_hot(owner_id):
+            return fleet_state.in_bounds(owner_id, (min_lat, min_lon, max_lat, max_lon))[:limit]
+    query = build_query({"min_lat": min_lat, "min_lon": min_lon, "max_lat": max_lat, "max_lon": max_lon, "limit": limit})
+    return await fetch_data(VEHICLE_SERVICE_URL, f"/vehicles/in-bounds{query}", authorization)
 
 
 @app.get("/dashboard/vehicles/me")
@@ -312,13 +387,15 @@ async def update_vehicle(
     vehicle_id: int,
     payload: Dict[str, Any] = Body(...),
     authorization: str = Header(None),
+    if_match: Optional[str] = Header(None),
 ):
-    """Update vehicle with any fields (odometer, fuel_level, etc.)"""
+    """Update vehicle with any fields (odometer, fuel_level, etc.); If-Match: "<version>" guards against lost updates"""
     return await put_data(
         VEHICLE_SERVICE_URL,
         f"/vehicles/{vehicle_id}",
         payload,
         authorization,
+        if_match,
     )
 
 
@@ -371,8 +448,71 @@ async def get_team(authorization: str = Header(None)):
 
 
 @app.get("/dashboard/notifications")
-async def list_notifications(authorization: str = Header(None)):
-    return await fetch_data(NOTIFICATIONS_SERVICE_URL, "/notifications", authorization)
+async def list_notifications(
+    limit: Optional[int] = None,
+    before_created_at: Optional[str] = None,
+    before_id: Optional[str] = None,
+    status_filter: Optional[str] = Query(None, alias="status"),
+    type_filter: Optional[str] = Query(None, alias="type"),
+    authorization: str = Header(None),
+):
+    query = build_query({
+        "limit": limit,
+        "before_created_at": before_created_at,
+        "before_id": before_id,
+        "status": status_filter,
+        "type": type_filter,
+    })
+    return await fetch_data(NOTIFICATIONS_SERVICE_URL, f"/notifications{query}", authorization)
+
+
+@app.get("/dashboard/notifications/unread-count")
+async def notifications_unread_count(authorization: str = Header(None)):
+    return await fetch_data(NOTIFICATIONS_SERVICE_URL, "/notifications/unread-count", authorization)
+
+
+@app.get("/dashboard/notifications/stream")
+async def stream_notifications(authorization: str = Header(None)):
+    """Relays the notifications-service SSE stream byte for byte; replaces polling the inbox."""
+    if not authorization:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Authorization header missing")
+    # No read timeout: the stream stays open, upstream heartbeats keep it alive
+    client = httpx.AsyncClient(timeout=httpx.Timeout(None, connect=5.0))
+    headers = {"Authorization": authorization}
+    try:
+        with client_span("GET notifications-service stream", headers):
+            upstream = await client.send(
+                client.build_request("GET", f"{NOTIFICATIONS_SERVICE_URL}/notifications/stream", headers=headers),
+                stream=True,
+            )
+    except httpx.RequestError:
+        await client.aclose()
+        raise HTTPException(status_code=503, detail=f"Service unavailable: {NOTIFICATIONS_SERVICE_URL}")
+    if upstream.status_code != 200:
+        await upstream.aclose()
+        await client.aclose()
+        raise HTTPException(status_code=upstream.status_code, detail="Error opening notification stream")
+
+    async def close_upstream():
+        await upstream.aclose()
+        await client.aclose()
+
+    return StreamingResponse(
+        upstream.aiter_raw(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(close_upstream),
+    )
+
+
+@app.post("/dashboard/notifications/ack")
+async def acknowledge_notifications(payload: NotificationBulkAck, authorization: str = Header(None)):
+    return await post_data(
+        NOTIFICATIONS_SERVICE_URL,
+        "/notifications/ack",
+        payload.dict(exclude_none=True),
+        authorization,
+    )
 
 
 @app.post("/dashboard/notifications/{notification_id}/ack")
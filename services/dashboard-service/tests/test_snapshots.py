@@ -0,0 +1,85 @@
+import asyncio
+
+from app.snapshots import SnapshotStore
+
+
+def store_for(users, token_cache_size=10000):
+    resolved = []
+
+    async def builder(authorization):
+        return {"stats": authorization}
+
+    async def resolver(authorization):
+        resolved.append(authorization)
+        return dict(users[authorization])
+
+    store = SnapshotStore(
+        builder,
+        resolver,
+        fresh_seconds=30,
+        max_stale_seconds=600,
+        token_ttl_seconds=60,
+        token_cache_size=token_cache_size,
+    )
+    return store, resolved
+
+
+USERS = {
+    "Bearer a": {"id": "admin-1", "role": "admin", "session_id": "s-a"},
+    "Bearer b": {"id": "admin-1", "role": "admin", "session_id": "s-b"},
+    "Bearer c": {"id": "admin-2", "role": "admin", "session_id": "s-c"},
+}
+
+
+def test_tokens_are_cached():
+    async def run():
+        store, resolved = store_for(USERS)
+        await store.user_for("Bearer a")
+        await store.user_for("Bearer a")
+        return resolved
+
+    assert asyncio.run(run()) == ["Bearer a"]
+
+
+def test_token_cache_is_bounded_lru():
+    async def run():
+        store, resolved = store_for(USERS, token_cache_size=2)
+        await store.user_for("Bearer a")
+        await store.user_for("Bearer b")
+        await store.user_for("Bearer a")  # b is now least recently used
+        await store.user_for("Bearer c")
+        await store.user_for("Bearer a")
+        await store.user_for("Bearer b")
+        return resolved
+
+    assert asyncio.run(run()) == ["Bearer a", "Bearer b", "Bearer c", "Bearer b"]
+
+
+def test_logout_drops_only_that_session():
+    async def run():
+        store, resolved = store_for(USERS)
+        store.bind_loop(asyncio.get_running_loop())
+        for token in USERS:
+            await store.user_for(token)
+        store.notify_revoked({"sid": "s-a", "until": 0})
+        await asyncio.sleep(0)
+        for token in USERS:
+            await store.user_for(token)
+        return resolved
+
+    assert asyncio.run(run())[len(USERS):] == ["Bearer a"]
+
+
+def test_user_revocation_drops_all_their_tokens():
+    async def run():
+        store, resolved = store_for(USERS)
+        store.bind_loop(asyncio.get_running_loop())
+        for token in USERS:
+            await store.user_for(token)
+        store.notify_revoked({"sub": "admin-1", "issued_before": 0, "until": 0})
+        await asyncio.sleep(0)
+        for token in USERS:
+            await store.user_for(token)
+        return resolved
+
+    assert asyncio.run(run())[len(USERS):] == ["Bearer a", "Bearer b"]
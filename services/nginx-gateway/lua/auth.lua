@@ -1,30 +1,125 @@
+local cjson = require "cjson.safe"
+local hmac_lib = require "resty.hmac"
+local resty_sha256 = require "resty.sha256"
+local resty_string = require "resty.string"
+
 local api_keys_str = os.getenv("GATEWAY_API_KEYS")
+local secret = os.getenv("INTERNAL_HMAC_SECRET")
 local request_key = ngx.req.get_headers()["X-API-Key"]
 local auth_header = ngx.req.get_headers()["Authorization"]
 
+-- Wyniki sprawdzenia tokenu (user-management /api/users/me), współdzielone przez workery
+local introspection = ngx.shared.auth_introspection
+-- Backendy odrzucają tożsamość sprawdzoną przed wylogowaniem lub zmianą użytkownika
+-- (kanał auth.revocations), więc cache nie opóźnia unieważnienia
+local IDENTITY_TTL = 30
+local INVALID_TTL = 10
+
 -- Strategia autoryzacji:
--- 1. Bearer token (frontend) - przepuść, downstream service zwaliduje JWT
+-- 1. Bearer token (frontend) - sprawdzany tu raz; backendy dostają podpisaną tożsamość
+--    (X-User-Id, X-User-Role, X-User-Manager-Id, X-User-Name, X-Session-Id) i nie pytają już user-management
 -- 2. API key (backend-to-backend) - waliduj tutaj
 -- 3. Brak obu - odmów dostępu
 
--- Jeśli jest Bearer token - przepuść (frontend request)
+local function reject(status, message)
+    ngx.status = status
+    ngx.header.content_type = "application/json"
+    ngx.say(cjson.encode({ message = message }))
+    ngx.exit(status)
+end
+
+local function sha256_hex(value)
+    local sha = resty_sha256:new()
+    sha:update(value)
+    return resty_string.to_hex(sha:final())
+end
+
+local function text(value)
+    if value == nil or value == cjson.null then
+        return ""
+    end
+    return tostring(value)
+end
+
+-- Tożsamość ustawia wyłącznie gateway
+local IDENTITY_HEADERS = {
+    "X-User-Id", "X-User-Role", "X-User-Manager-Id", "X-User-Name", "X-Session-Id",
+    "X-Identity-Checked-At", "X-Identity-Timestamp",
+}
+for _, name in ipairs(IDENTITY_HEADERS) do
+    ngx.req.clear_header(name)
+end
+ngx.req.clear_header("X-Identity-Signature")
+
+local function lookup_identity(token_hash)
+    local cached = introspection:get(token_hash)
+    if cached == "invalid" then
+        return nil, true
+    end
+    if cached then
+        return cjson.decode(cached), false
+    end
+
+    local res = ngx.location.capture("/_auth/introspect")
+    if res.status == 401 or res.status == 403 then
+        introspection:set(token_hash, "invalid", INVALID_TTL)
+        return nil, true
+    end
+    local user = res.status == 200 and cjson.decode(res.body)
+    if not user or not user.id then
+        -- user-management nieosiągalny: przepuść bez tożsamości, backend sprawdzi token sam
+        ngx.log(ngx.WARN, "Token introspection failed with status ", res.status)
+        return nil, false
+    end
+    local identity = {
+        id = text(user.id),
+        role = text(user.role),
+        manager_id = text(user.manager_id),
+        -- Nagłówki są ASCII, imię i nazwisko może nie być
+        name = ngx.escape_uri(text(user.full_name)),
+        session_id = text(user.session_id),
+        -- Od tej chwili liczą się unieważnienia sesji i użytkownika
+        checked_at = tostring(ngx.time()),
+    }
+    introspection:set(token_hash, cjson.encode(identity), IDENTITY_TTL)
+    return identity, false
+end
+
+-- Jeśli jest Bearer token - zweryfikuj (z cache) i przekaż podpisaną tożsamość
 if auth_header and string.sub(auth_header, 1, 7) == "Bearer " then
+    local token_hash = sha256_hex(string.sub(auth_header, 8))
+    local identity, invalid = lookup_identity(token_hash)
+    if invalid then
+        reject(401, "Invalid or expired token")
+    end
+    if identity and secret then
+        -- Podpis obejmuje skrót tokenu, więc nagłówków nie da się użyć z innym tokenem
+        local values = {
+            identity.id,
+            identity.role,
+            identity.manager_id,
+            text(identity.name),
+            text(identity.session_id),
+            text(identity.checked_at),
+            tostring(ngx.time()),
+        }
+        local hmac = hmac_lib:new(secret, hmac_lib.ALG_SHA256)
+        for i, name in ipairs(IDENTITY_HEADERS) do
+            ngx.req.set_header(name, values[i])
+        end
+        values[#values + 1] = token_hash
+        ngx.req.set_header("X-Identity-Signature", resty_string.to_hex(hmac:final(table.concat(values, "\n"))))
+    end
     return
 end
 
 -- Jeśli jest API key - waliduj (backend-to-backend)
 if request_key then
-    if not api_keys_str or not string.find("," .. api_keys_str .. ",", "," .. request_key .. ",") then
-        ngx.status = 403
-        ngx.header.content_type = "application/json"
-        ngx.say('{"message": "Invalid API key"}')
-        ngx.exit(403)
+    if not api_keys_str or not string.find("," .. api_keys_str .. ",", "," .. request_key .. ",", 1, true) then
+        reject(403, "Invalid API key")
     end
     return
 end
 
 -- Brak autoryzacji
-ngx.status = 401
-ngx.header.content_type = "application/json"
-ngx.say('{"message": "Authorization required"}')
-ngx.exit(401)
+reject(401, "Authorization required")
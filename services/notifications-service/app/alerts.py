@@ -0,0 +1,74 @@
+"""
+Turning vehicle events into owner notifications.
+
+Pure functions: the consumer decides which events alert and builds the
+notification rows here, then stores a whole batch in one transaction.
+Rows carry a dedup_key so repeats of the same vehicle problem fold into one
+notification (see dedup.py).
+"""
+from typing import Any, Dict, Optional
+from uuid import UUID
+
+ALERT_STATUSES = {"maintenance", "issue", "alert"}
+ALERT_EVENT_TYPES = {"vehicle_issue_created", "vehicle_service_alert"}
+
+
+def should_raise_alert(payload: dict) -> bool:
+    event_type = payload.get("event_type")
+
+    # Always raise alert for specific event types
+    if event_type in ALERT_EVENT_TYPES:
+        return True
+
+    updates = payload.get("updates", {}) or {}
+    if isinstance(updates, dict):
+        status = updates.get("status")
+        if status in ALERT_STATUSES:
+            return True
+        if updates.get("issues"):
+            return True
+    if payload.get("severity") in {"high", "critical"}:
+        return True
+    return False
+
+
+def build_vehicle_alert(event_payload: dict) -> Optional[Dict[str, Any]]:
+    """Notification column values for an alerting event, or None if it has no owner to notify."""
+    # Get owner_id from the event - only notify the vehicle owner, not all admins
+    owner_id = event_payload.get("owner_id")
+    if not owner_id:
+        # Fallback: if no owner_id in payload, skip (shouldn't happen)
+        print(f"[Notifications] No owner_id in vehicle alert payload, skipping")
+        return None
+
+    event_type = event_payload.get("event_type", "vehicle_alert")
+    severity = event_payload.get("severity", "medium")
+    vehicle_label = event_payload.get("vehicle_label", "")
+    vin = event_payload.get("vin", "")
+
+    # Determine title based on event type
+    if event_type == "vehicle_service_alert":
+        title = f"⚠️ Serwis pojazdu {vehicle_label or vin}"
+        alert_type = "service_alert"
+    elif event_type == "vehicle_issue_created":
+        severity_emoji = "🔴" if severity == "critical" else "🟠" if severity == "high" else "🟡"
+        title = f"{severity_emoji} Problem z pojazdem {vehicle_label or vin}"
+        alert_type = "issue_alert"
+    else:
+        title = f"Alert pojazdu {vehicle_label or vin}"
+        alert_type = "vehicle_alert"
+
+    vehicle_id = event_payload.get("vehicle_id")
+
+    # Send only to vehicle owner
+    return {
+        "recipient_id": UUID(str(owner_id)),
+        "type": alert_type,
+        "title": title,
+        "body": event_payload.get("message", "Wykryto problem z pojazdem"),
+        "metadata": event_payload,
+        "status": "unread",
+        "action_required": severity in ("high", "critical"),
+        "dedup_key": f"{vehicle_id}:{alert_type}" if vehicle_id else None,
+        "occurrences": 1,
+    }
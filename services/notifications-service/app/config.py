@@ -13,4 +13,55 @@ USER_MANAGEMENT_SERVICE_TOKEN = os.getenv("INTERNAL_SERVICE_TOKEN", "")
 RABBITMQ_HOST = os.getenv("RABBITMQ_HOST", "rabbitmq")
 RABBITMQ_USER = os.getenv("RABBITMQ_USER")
 RABBITMQ_PASS = os.getenv("RABBITMQ_PASS")
-QUEUE_NAME = os.getenv("VEHICLE_EVENT_QUEUE", "vehicle_events")
+VEHICLE_EVENT_EXCHANGE = os.getenv("VEHICLE_EVENT_EXCHANGE", "vehicle_events")
+# Durable queue of our own on the fanout exchange, so events wait here while the service restarts
+QUEUE_NAME = os.getenv("VEHICLE_EVENT_QUEUE", "notifications.vehicle_events")
+# Messages that can never be processed (malformed, rejected by the database) are parked here
+DEAD_LETTER_QUEUE = os.getenv("VEHICLE_EVENT_DEAD_LETTER_QUEUE", f"{QUEUE_NAME}.dead")
+
+# Consumer: unacked messages in flight, alerts stored per transaction, and worker threads
+CONSUMER_PREFETCH = int(os.getenv("CONSUMER_PREFETCH", "200"))
+ALERT_BATCH_SIZE = int(os.getenv("ALERT_BATCH_SIZE", "100"))
+ALERT_BATCH_WAIT_SECONDS = float(os.getenv("ALERT_BATCH_WAIT_SECONDS", "0.2"))
+ALERT_WORKERS = int(os.getenv("ALERT_WORKERS", "4"))
+
+# Alert deduplication: repeats of a vehicle alert fold into its open notification while it is younger
+# than the dedup window; repeats within the coalesce window are counted in memory and written once
+ALERT_DEDUP_WINDOW_SECONDS = int(os.getenv("ALERT_DEDUP_WINDOW_SECONDS", "3600"))
+ALERT_COALESCE_SECONDS = float(os.getenv("ALERT_COALESCE_SECONDS", "30"))
+
+# Push delivery (SSE): every instance publishes committed notifications to this fanout exchange and
+# streams the ones it receives to its own connected users
+NOTIFICATIONS_PUSH_EXCHANGE = os.getenv("NOTIFICATIONS_PUSH_EXCHANGE", "notifications.push")
+PUSH_HEARTBEAT_SECONDS = float(os.getenv("PUSH_HEARTBEAT_SECONDS", "15"))
+PUSH_STREAM_BUFFER = int(os.getenv("PUSH_STREAM_BUFFER", "100"))
+
+# Retention: dealt-with notifications move to notifications_archive after NOTIFICATIONS_RETENTION_DAYS,
+# archive months are dropped after NOTIFICATIONS_ARCHIVE_RETENTION_DAYS; rows move in short batches
+NOTIFICATIONS_RETENTION_DAYS = int(os.getenv("NOTIFICATIONS_RETENTION_DAYS", "90"))
+NOTIFICATIONS_ARCHIVE_RETENTION_DAYS = int(os.getenv("NOTIFICATIONS_ARCHIVE_RETENTION_DAYS", "365"))
+RETENTION_BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", "1000"))
+RETENTION_BATCH_PAUSE_SECONDS = float(os.getenv("RETENTION_BATCH_PAUSE_SECONDS", "0.1"))
+RETENTION_MAX_BATCHES = int(os.getenv("RETENTION_MAX_BATCHES", "100"))
+RETENTION_INTERVAL_SECONDS = float(os.getenv("RETENTION_INTERVAL_SECONDS", "3600"))
+
+# Access tokens: verified locally with the secret user-management signs them with (unset: always ask
+# /api/users/me); revocations arrive on the fanout exchange, trusted once followed for a whole TTL
+ACCESS_TOKEN_SECRET = os.getenv("ACCESS_TOKEN_SECRET", "")
+ACCESS_TOKEN_TTL_SECONDS = float(os.getenv("ACCESS_TOKEN_TTL_SECONDS", "300"))
+AUTH_REVOCATIONS_EXCHANGE = os.getenv("AUTH_REVOCATIONS_EXCHANGE", "auth.revocations")
+
+# Identity headers signed by nginx-gateway (lua/auth.lua) with INTERNAL_HMAC_SECRET (unset: ignored),
+# accepted for this long after signing while the revocation feed above is trusted
+GATEWAY_HMAC_SECRET = os.getenv("INTERNAL_HMAC_SECRET", "")
+GATEWAY_IDENTITY_MAX_AGE_SECONDS = float(os.getenv("GATEWAY_IDENTITY_MAX_AGE_SECONDS", "30"))
+
+# Tracing: OTLP/HTTP collector (e.g. http://jaeger:4318) or a JSON-lines file fallback
+OTEL_SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "notifications-service")
+OTEL_EXPORTER_OTLP_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "")
+OTEL_TRACES_FILE = os.getenv("OTEL_TRACES_FILE", "")
+
+# SQL profiling (opt-in): per-request X-DB-Time/X-DB-Queries headers and slow-query EXPLAIN logging
+DB_PROFILING_ENABLED = os.getenv("DB_PROFILING_ENABLED", "").lower() in {"1", "true", "yes"}
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "10"))
@@ -0,0 +1,63 @@
+"""
+Unread counters per recipient.
+
+notification_counters holds the number of unread notifications of every
+recipient, so the badge poll is a primary key lookup instead of a count over
+the inbox. The counter changes in the same transaction as the notifications:
+ORM writes are counted by an after_flush hook on SessionLocal (new and
+deleted rows, status changes), Core statements report their own deltas
+through adjust_unread().
+"""
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict
+from uuid import UUID
+
+from sqlalchemy import event, func, inspect
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from . import models
+from .database import SessionLocal
+
+counters = models.NotificationCounter.__table__
+
+
+def _is_unread(status) -> bool:
+    return (status or "unread") == "unread"
+
+
+def adjust_unread(db: Session, deltas: Dict[UUID, int]) -> None:
+    """Apply per-recipient unread deltas in the caller's transaction."""
+    now = datetime.utcnow()
+    connection = db.connection()
+    # Fixed order, so two transactions touching the same recipients cannot deadlock
+    for recipient_id in sorted(r for r, delta in deltas.items() if delta):
+        delta = deltas[recipient_id]
+        connection.execute(
+            insert(counters)
+            .values(recipient_id=recipient_id, unread=max(delta, 0), updated_at=now)
+            .on_conflict_do_update(
+                index_elements=[counters.c.recipient_id],
+                set_={"unread": func.greatest(counters.c.unread + delta, 0), "updated_at": now},
+            )
+        )
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _count_flushed(session, flush_context):
+    deltas: Dict[UUID, int] = defaultdict(int)
+    for obj in session.new:
+        if isinstance(obj, models.Notification) and _is_unread(obj.status):
+            deltas[obj.recipient_id] += 1
+    for obj in session.deleted:
+        if isinstance(obj, models.Notification) and _is_unread(obj.status):
+            deltas[obj.recipient_id] -= 1
+    for obj in session.dirty:
+        if not isinstance(obj, models.Notification):
+            continue
+        history = inspect(obj).attrs.status.history
+        if history.deleted:
+            deltas[obj.recipient_id] += _is_unread(obj.status) - _is_unread(history.deleted[0])
+    if any(deltas.values()):
+        adjust_unread(session, deltas)
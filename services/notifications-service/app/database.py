@@ -2,8 +2,12 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 
 from .config import DATABASE_URL
+from .metrics import instrument_engine
+from .profiling import profile_engine
 
 engine = create_engine(DATABASE_URL)
+instrument_engine(engine)
+profile_engine(engine)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 Base = declarative_base()
 
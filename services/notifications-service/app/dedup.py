@@ -0,0 +1,195 @@
+"""
+Vehicle alert deduplication.
+
+A vehicle that keeps reporting the same problem should produce one
+notification with a growing counter, not one row per event. Alerts are keyed
+by (owner, vehicle, alert type): the owner is recipient_id, the rest is
+dedup_key.
+
+Two layers:
+- AlertAggregator (in memory, per process) writes the first alert of a key
+  straight away and, once that write has succeeded, folds repeats that
+  arrive within ALERT_COALESCE_SECONDS into one pending row, flushed once
+  that window has passed. A flood of repeats costs one write per key per
+  window. Repeats are acked when folded, so a crash loses at most one window
+  of counts, never the notification.
+- store_alerts() upserts into the unique partial index on
+  (recipient_id, dedup_key) over unread rows. A repeat bumps occurrences and
+  refreshes the text of the open notification, as long as that notification
+  is younger than ALERT_DEDUP_WINDOW_SECONDS. Older ones are closed to
+  deduplication and a fresh notification is created. Once the owner reads or
+  answers a notification, the next alert starts a new one.
+"""
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import literal_column, text, tuple_, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from . import models, push
+from .config import ALERT_COALESCE_SECONDS, ALERT_DEDUP_WINDOW_SECONDS
+from .counters import adjust_unread
+from .metrics import ALERT_WRITES
+
+notifications = models.Notification.__table__
+
+OPEN_ALERT_WHERE = text("dedup_key IS NOT NULL AND status = 'unread'")
+
+Key = Tuple[Any, str]
+
+
+def _key(row: Dict[str, Any]) -> Key:
+    return row["recipient_id"], row["dedup_key"]
+
+
+def _merge(older: Dict[str, Any], newer: Dict[str, Any]) -> Dict[str, Any]:
+    """One row standing for both: newest text, summed count, action required if either was."""
+    merged = dict(newer)
+    merged["occurrences"] = older.get("occurrences", 1) + newer.get("occurrences", 1)
+    merged["action_required"] = bool(older.get("action_required") or newer.get("action_required"))
+    return merged
+
+
+class AlertAggregator:
+    """Coalesces repeats of an alert key within ALERT_COALESCE_SECONDS of its last successful write."""
+
+    def __init__(self, window_seconds: float = ALERT_COALESCE_SECONDS):
+        self._window = window_seconds
+        self._lock = threading.Lock()
+        self._written_at: Dict[Key, float] = {}
+        self._pending: Dict[Key, Dict[str, Any]] = {}
+
+    def offer(self, row: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        The row to write now, or None if it was folded into the key's pending row.
+        Rows returned are only folded into from written() on, so report them there once stored.
+        """
+        if not row.get("dedup_key"):
+            return row
+        key = _key(row)
+        now = time.monotonic()
+        with self._lock:
+            written_at = self._written_at.get(key)
+            if written_at is not None and now - written_at < self._window:
+                pending = self._pending.get(key)
+                self._pending[key] = _merge(pending, row) if pending else row
+                return None
+            return row
+
+    def written(self, rows: List[Dict[str, Any]]) -> None:
+        """Rows offer() returned are stored: repeats of their keys fold for the next window."""
+        now = time.monotonic()
+        with self._lock:
+            for row in rows:
+                if row.get("dedup_key"):
+                    self._written_at[_key(row)] = now
+
+    def drain(self) -> List[Dict[str, Any]]:
+        """
+        Pending rows whose window has passed; the caller writes them, hands them
+        back to restore() if the database is unavailable, or drops them.
+        """
+        now = time.monotonic()
+        due = []
+        with self._lock:
+            for key, written_at in list(self._written_at.items()):
+                if now - written_at < self._window:
+                    continue
+                row = self._pending.pop(key, None)
+                if row is None:
+                    del self._written_at[key]  # Quiet key: forget it
+                else:
+                    self._written_at[key] = now
+                    due.append(row)
+        return due
+
+    def restore(self, rows: List[Dict[str, Any]]) -> None:
+        """Put rows that failed to write back, merged with anything folded in meanwhile."""
+        with self._lock:
+            for row in rows:
+                key = _key(row)
+                pending = self._pending.get(key)
+                self._pending[key] = _merge(row, pending) if pending else row
+                self._written_at.setdefault(key, time.monotonic())
+
+
+def _collapse(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    collapsed: Dict[Key, Dict[str, Any]] = {}
+    for row in rows:
+        key = _key(row)
+        collapsed[key] = _merge(collapsed[key], row) if key in collapsed else row
+    return list(collapsed.values())
+
+
+def _values(row: Dict[str, Any], now: datetime) -> Dict[str, Any]:
+    values = dict(row)
+    values.setdefault("id", uuid.uuid4())
+    values.setdefault("occurrences", 1)
+    values.setdefault("created_at", now)
+    values["updated_at"] = now
+    return values
+
+
+def _upsert(db: Session, rows: List[Dict[str, Any]], now: datetime, window_applies: bool) -> List[Tuple[Key, bool]]:
+    """Insert or fold into the open notification; returns (key, inserted) for the rows it handled."""
+    stmt = insert(notifications).values([_values(row, now) for row in rows])
+    excluded = stmt.excluded
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[notifications.c.recipient_id, notifications.c.dedup_key],
+        index_where=OPEN_ALERT_WHERE,
+        set_={
+            "occurrences": notifications.c.occurrences + excluded.occurrences,
+            "title": excluded.title,
+            "body": excluded.body,
+            "metadata": excluded["metadata"],
+            "action_required": notifications.c.action_required | excluded.action_required,
+            "updated_at": excluded.updated_at,
+        },
+        # Skipped (and not returned) when the open notification has outlived the dedup window
+        where=(notifications.c.created_at >= now - timedelta(seconds=ALERT_DEDUP_WINDOW_SECONDS))
+        if window_applies else None,
+    ).returning(*notifications.c, literal_column("xmax = 0").label("inserted"))
+    handled = []
+    written = []
+    for row in db.execute(stmt).mappings():
+        ALERT_WRITES.labels("inserted" if row["inserted"] else "merged").inc()
+        handled.append(((row["recipient_id"], row["dedup_key"]), row["inserted"]))
+        written.append({column.key: row[column.key] for column in notifications.c})
+    push.stage(db, written)
+    return handled
+
+
+def _count_inserted(db: Session, handled: List[Tuple[Key, bool]]) -> None:
+    adjust_unread(db, Counter(key[0] for key, inserted in handled if inserted))
+
+
+def store_alerts(db: Session, rows: List[Dict[str, Any]]) -> None:
+    """Add alert rows to the caller's transaction, deduplicating those with a dedup_key."""
+    now = datetime.utcnow()
+    plain = [row for row in rows if not row.get("dedup_key")]
+    if plain:
+        db.add_all([models.Notification(**row) for row in plain])
+        ALERT_WRITES.labels("inserted").inc(len(plain))
+
+    keyed = _collapse([row for row in rows if row.get("dedup_key")])
+    if not keyed:
+        return
+    handled = _upsert(db, keyed, now, window_applies=True)
+    _count_inserted(db, handled)
+    handled_keys = {key for key, _ in handled}
+    expired = [row for row in keyed if _key(row) not in handled_keys]
+    if not expired:
+        return
+    # Close the stale notifications to deduplication and start fresh ones
+    db.execute(
+        update(notifications)
+        .where(tuple_(notifications.c.recipient_id, notifications.c.dedup_key).in_([_key(row) for row in expired]))
+        .where(OPEN_ALERT_WHERE)
+        .values(dedup_key=None)
+    )
+    _count_inserted(db, _upsert(db, expired, now, window_applies=False))
@@ -1,16 +1,25 @@
-from fastapi import Depends, Header, HTTPException, status
+from fastapi import Depends, Header, HTTPException, Request, status
 import httpx
 
+from .access_tokens import verify_access_token
+from .gateway_identity import verify_gateway_identity
 from .config import USER_MANAGEMENT_URL, USER_MANAGEMENT_SERVICE_TOKEN, SERVICE_TOKEN
+from .metrics import observe_downstream
+from .tracing import client_span
 
-async def get_current_user(authorization: str = Header(None)):
+async def get_current_user(request: Request, authorization: str = Header(None)):
     if not authorization:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing Authorization header")
+    user = verify_gateway_identity(request.headers, authorization) or verify_access_token(authorization)
+    if user is not None:
+        return user
 
     async with httpx.AsyncClient(follow_redirects=True) as client:
         try:
-            resp = await client.get(f"{USER_MANAGEMENT_URL}/api/users/me", headers={"Authorization": authorization})
-            resp.raise_for_status()
+            headers = {"Authorization": authorization}
+            with observe_downstream("user-management"), client_span("GET user-management", headers):
+                resp = await client.get(f"{USER_MANAGEMENT_URL}/api/users/me", headers=headers)
+                resp.raise_for_status()
             return resp.json()
         except httpx.HTTPStatusError as exc:
             raise HTTPException(status_code=exc.response.status_code, detail="Invalid token") from exc
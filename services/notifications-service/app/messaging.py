@@ -1,68 +1,258 @@
+"""
+Vehicle event consumer.
+
+One thread owns the RabbitMQ connection (pika is not thread-safe): it pulls
+messages under a CONSUMER_PREFETCH window, groups them into batches of up to
+ALERT_BATCH_SIZE (or whatever arrived within ALERT_BATCH_WAIT_SECONDS) and
+hands each batch to a small worker pool. Workers store a batch's alerts in one
+transaction and settle every message through add_callback_threadsafe, so acks
+always happen on the connection thread.
+
+Repeats of an alert are folded by an AlertAggregator before they reach the
+database; the connection thread hands the folded rows to the pool for
+writing about once a second (see dedup.py).
+
+Malformed messages and alerts the database rejects are copied to
+DEAD_LETTER_QUEUE (with the reason in a header) and acked. Database outages
+requeue the message instead. Unacked messages are redelivered if the
+connection drops. Folded repeats have been acked already: a flush the
+database is unavailable for is kept for the next one, a folded row it rejects
+is dead-lettered as JSON.
+"""
 import json
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
 
 import pika
+from sqlalchemy.exc import OperationalError
 
-from .config import QUEUE_NAME, RABBITMQ_HOST, RABBITMQ_PASS, RABBITMQ_USER
+from .alerts import build_vehicle_alert, should_raise_alert
+from .dedup import AlertAggregator, store_alerts
+from .config import (
+    ALERT_BATCH_SIZE,
+    ALERT_BATCH_WAIT_SECONDS,
+    ALERT_WORKERS,
+    CONSUMER_PREFETCH,
+    DEAD_LETTER_QUEUE,
+    QUEUE_NAME,
+    RABBITMQ_HOST,
+    RABBITMQ_PASS,
+    RABBITMQ_USER,
+    VEHICLE_EVENT_EXCHANGE,
+)
 from .database import SessionLocal
-from .routes import create_vehicle_alert
-
-ALERT_STATUSES = {"maintenance", "issue", "alert"}
-ALERT_EVENT_TYPES = {"vehicle_issue_created", "vehicle_service_alert"}
-
-def should_raise_alert(payload: dict) -> bool:
-    event_type = payload.get("event_type")
-    
-    # Always raise alert for specific event types
-    if event_type in ALERT_EVENT_TYPES:
-        return True
-    
-    updates = payload.get("updates", {}) or {}
-    if isinstance(updates, dict):
-        status = updates.get("status")
-        if status in ALERT_STATUSES:
-            return True
-        if updates.get("issues"):
-            return True
-    if payload.get("severity") in {"high", "critical"}:
-        return True
-    return False
-
-def process_message(body: bytes):
+from .metrics import ALERT_MESSAGES, ALERT_PROCESSING_SECONDS, ALERT_WRITES, EVENTS_CONSUMED
+from .profiling import profile_block
+from .tracing import consumer_span
+
+# How often the connection thread hands folded repeats to the pool
+FLUSH_INTERVAL_SECONDS = 1.0
+
+aggregator = AlertAggregator()
+
+
+class Delivery(NamedTuple):
+    tag: int
+    headers: Optional[dict]
+    body: bytes
+
+
+class Settler:
+    """Acks, requeues and dead-letters from worker threads, run on the connection thread."""
+
+    def __init__(self, connection, channel):
+        self._connection = connection
+        self._channel = channel
+
+    def _call(self, callback):
+        try:
+            self._connection.add_callback_threadsafe(callback)
+        except Exception:
+            pass  # Connection gone: the broker redelivers everything we did not ack
+
+    def ack(self, delivery: Delivery, outcome: str) -> None:
+        ALERT_MESSAGES.labels(outcome).inc()
+        self._call(lambda: self._channel.basic_ack(delivery_tag=delivery.tag))
+
+    def requeue(self, delivery: Delivery) -> None:
+        ALERT_MESSAGES.labels("requeued").inc()
+        self._call(lambda: self._channel.basic_nack(delivery_tag=delivery.tag, requeue=True))
+
+    def _publish_dead_letter(self, body: bytes, headers: Optional[dict], reason: str) -> None:
+        headers = dict(headers or {})
+        headers["x-dead-letter-reason"] = reason[:500]
+        headers["x-original-queue"] = QUEUE_NAME
+        self._channel.basic_publish(
+            exchange="",
+            routing_key=DEAD_LETTER_QUEUE,
+            body=body,
+            properties=pika.BasicProperties(delivery_mode=2, headers=headers),
+        )
+
+    def dead_letter(self, delivery: Delivery, reason: str) -> None:
+        ALERT_MESSAGES.labels("dead_lettered").inc()
+        print(f"[Notifications] Dead-lettering message: {reason}")
+
+        def _publish_and_ack():
+            self._publish_dead_letter(delivery.body, delivery.headers, reason)
+            self._channel.basic_ack(delivery_tag=delivery.tag)
+
+        self._call(_publish_and_ack)
+
+    def dead_letter_row(self, row: Dict[str, Any], reason: str) -> None:
+        """Dead-letter a folded alert row; the messages it stands for were acked when folded."""
+        ALERT_WRITES.labels("dead_lettered").inc()
+        print(f"[Notifications] Dead-lettering coalesced alert: {reason}")
+        body = json.dumps(row, default=str).encode("utf-8")
+        self._call(lambda: self._publish_dead_letter(body, None, reason))
+
+
+def _parse(delivery: Delivery) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """(payload, None) or (None, reason it is unusable)."""
     try:
-        payload = json.loads(body.decode("utf-8"))
-    except json.JSONDecodeError:
-        return
+        payload = json.loads(delivery.body.decode("utf-8"))
+    except (UnicodeDecodeError, ValueError) as e:
+        return None, f"malformed JSON: {e}"
+    if not isinstance(payload, dict):
+        return None, "payload is not a JSON object"
+    return payload, None
 
-    if not should_raise_alert(payload):
-        return
 
+def _store(rows: List[Dict[str, Any]]) -> None:
     db = SessionLocal()
     try:
-        payload.setdefault("message", "Wykryto problem z pojazdem")
-        import asyncio
-        asyncio.run(create_vehicle_alert(payload, db))
+        store_alerts(db, rows)
+        db.commit()
     finally:
         db.close()
 
+
+def process_batch(batch: List[Delivery], settler: Settler) -> None:
+    alerts: List[Tuple[Delivery, Dict[str, Any]]] = []
+    for delivery in batch:
+        EVENTS_CONSUMED.labels(QUEUE_NAME).inc()
+        with consumer_span(f"{QUEUE_NAME} process", delivery.headers) as span:
+            payload, problem = _parse(delivery)
+            if problem:
+                settler.dead_letter(delivery, problem)
+                continue
+            span.set_attribute("messaging.event_type", str(payload.get("event_type") or payload.get("event")))
+            if not should_raise_alert(payload):
+                settler.ack(delivery, "skipped")
+                continue
+            payload.setdefault("message", "Wykryto problem z pojazdem")
+            try:
+                row = build_vehicle_alert(payload)
+            except (TypeError, ValueError) as e:
+                settler.dead_letter(delivery, f"invalid alert payload: {e}")
+                continue
+            if row is None:
+                settler.ack(delivery, "skipped")
+            elif aggregator.offer(row) is None:
+                settler.ack(delivery, "coalesced")
+            else:
+                alerts.append((delivery, row))
+
+    if not alerts:
+        return
+    with ALERT_PROCESSING_SECONDS.time(), profile_block(f"{QUEUE_NAME} alert batch"):
+        try:
+            _store([row for _, row in alerts])
+        except Exception as e:
+            print(f"[Notifications] Batch of {len(alerts)} alerts failed, retrying one by one: {e}")
+        else:
+            aggregator.written([row for _, row in alerts])
+            for delivery, _ in alerts:
+                settler.ack(delivery, "stored")
+            return
+
+        # Isolate the message that broke the batch; the rest still go through
+        for delivery, row in alerts:
+            try:
+                _store([row])
+            except OperationalError as e:
+                print(f"[Notifications] Database unavailable, requeueing: {e}")
+                time.sleep(1)
+                settler.requeue(delivery)
+            except Exception as e:
+                settler.dead_letter(delivery, f"rejected by database: {e}")
+            else:
+                aggregator.written([row])
+                settler.ack(delivery, "stored")
+
+
+def flush_coalesced(settler: Settler) -> None:
+    """Write repeats folded since each key's last write; kept while the database is unavailable."""
+    rows = aggregator.drain()
+    if not rows:
+        return
+    with ALERT_PROCESSING_SECONDS.time():
+        try:
+            _store(rows)
+        except OperationalError as e:
+            print(f"[Notifications] Database unavailable, keeping {len(rows)} coalesced alerts for later: {e}")
+            aggregator.restore(rows)
+            return
+        except Exception as e:
+            print(f"[Notifications] Flushing {len(rows)} coalesced alerts failed, retrying one by one: {e}")
+        else:
+            return
+
+        # A row the database rejects would fail every later flush too
+        for row in rows:
+            try:
+                _store([row])
+            except OperationalError:
+                aggregator.restore([row])
+            except Exception as e:
+                settler.dead_letter_row(row, f"rejected by database: {e}")
+
+
+def _log_failure(future) -> None:
+    if future.exception() is not None:
+        # Its messages stay unacked and come back after the next reconnect
+        print(f"[Notifications] Alert batch crashed: {future.exception()}")
+
+
+def _consume(executor: ThreadPoolExecutor, parameters: pika.ConnectionParameters) -> None:
+    connection = pika.BlockingConnection(parameters)
+    channel = connection.channel()
+    channel.exchange_declare(exchange=VEHICLE_EVENT_EXCHANGE, exchange_type="fanout", durable=True)
+    channel.queue_declare(queue=QUEUE_NAME, durable=True)
+    channel.queue_bind(queue=QUEUE_NAME, exchange=VEHICLE_EVENT_EXCHANGE)
+    channel.queue_declare(queue=DEAD_LETTER_QUEUE, durable=True)
+    channel.basic_qos(prefetch_count=CONSUMER_PREFETCH)
+    settler = Settler(connection, channel)
+
+    batch: List[Delivery] = []
+    deadline = 0.0
+    next_flush = time.monotonic() + FLUSH_INTERVAL_SECONDS
+    for method_frame, properties, body in channel.consume(QUEUE_NAME, inactivity_timeout=ALERT_BATCH_WAIT_SECONDS):
+        if method_frame is not None:
+            if not batch:
+                deadline = time.monotonic() + ALERT_BATCH_WAIT_SECONDS
+            batch.append(Delivery(method_frame.delivery_tag, properties.headers, body))
+        if batch and (len(batch) >= ALERT_BATCH_SIZE or method_frame is None or time.monotonic() >= deadline):
+            executor.submit(process_batch, batch, settler).add_done_callback(_log_failure)
+            batch = []
+        if time.monotonic() >= next_flush:
+            executor.submit(flush_coalesced, settler).add_done_callback(_log_failure)
+            next_flush = time.monotonic() + FLUSH_INTERVAL_SECONDS
+
+
 def start_consumer():
     credentials = pika.PlainCredentials(RABBITMQ_USER, RABBITMQ_PASS)
     parameters = pika.ConnectionParameters(host=RABBITMQ_HOST, credentials=credentials, heartbeat=0)
+    executor = ThreadPoolExecutor(max_workers=ALERT_WORKERS, thread_name_prefix="alerts")
 
     def _run():
         while True:
             try:
-                connection = pika.BlockingConnection(parameters)
-                channel = connection.channel()
-                channel.queue_declare(queue=QUEUE_NAME, durable=False)
-
-                for method_frame, _, body in channel.consume(QUEUE_NAME, inactivity_timeout=5):
-                    if body:
-                        process_message(body)
-                    if method_frame is None:
-                        connection.sleep(1)
-            except Exception:
+                _consume(executor, parameters)
+            except Exception as e:
+                print(f"[Notifications] Consumer connection failed, retrying in 5 seconds: {e}")
                 time.sleep(5)
 
     thread = threading.Thread(target=_run, daemon=True)
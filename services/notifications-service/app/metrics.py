@@ -0,0 +1,42 @@
+"""
+Prometheus instrumentation for Notifications Service.
+Exposes /metrics with HTTP, database and RabbitMQ consumer timings. Metrics
+that several services report are defined once in fleetify_metrics (a copy of
+services/shared); the ones below are this service's own.
+"""
+from prometheus_client import Counter, Gauge, Histogram
+
+from .fleetify_metrics import (
+    ACCESS_TOKEN_CHECKS,
+    EVENTS_CONSUMED,
+    RETENTION_PARTITIONS_DROPPED,
+    RETENTION_ROWS_ARCHIVED,
+    instrument_app,
+    instrument_engine,
+    observe_downstream,
+)
+
+ALERT_PROCESSING_SECONDS = Histogram(
+    "notifications_alert_processing_duration_seconds",
+    "Time spent storing one batch of vehicle alerts",
+)
+ALERT_MESSAGES = Counter(
+    "notifications_alert_messages_total",
+    "Vehicle event messages by outcome (stored, coalesced, skipped, requeued, dead_lettered)",
+    ["outcome"],
+)
+ALERT_WRITES = Counter(
+    "notifications_alert_writes_total",
+    "Vehicle alert rows written: inserted as new notifications or merged into an open one (dead_lettered: rejected)",
+    ["result"],
+)
+
+PUSH_STREAMS = Gauge(
+    "notifications_push_streams",
+    "Open SSE notification streams on this instance",
+)
+PUSH_MESSAGES = Counter(
+    "notifications_push_messages_total",
+    "Notification pushes by outcome (published, local_only, dropped, delivered, overflowed)",
+    ["outcome"],
+)
@@ -1,7 +1,7 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import Boolean, Column, DateTime, Enum, JSON, String
+from sqlalchemy import Boolean, Column, DateTime, Enum, Index, Integer, JSON, String, text
 from sqlalchemy.dialects.postgresql import UUID
 
 from .database import Base
@@ -23,6 +23,23 @@ class Notification(Base):
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     responded_at = Column(DateTime, nullable=True)
+    # Vehicle alerts: "<vehicle_id>:<alert type>"; repeats bump occurrences on the open (unread) row
+    dedup_key = Column(String, nullable=True)
+    occurrences = Column(Integer, nullable=False, default=1)
+
+    __table_args__ = (
+        # Inbox pages: WHERE recipient_id = ? AND (created_at, id) < (?, ?) ORDER BY created_at DESC, id DESC
+        Index("idx_notifications_inbox", recipient_id, created_at.desc(), id.desc()),
+        # Retention batches: oldest rows first
+        Index("idx_notifications_created", created_at),
+        Index(
+            "uq_notifications_open_alert",
+            "recipient_id",
+            "dedup_key",
+            unique=True,
+            postgresql_where=text("dedup_key IS NOT NULL AND status = 'unread'"),
+        ),
+    )
 
     def mark(self, status: str):
         self.status = status
@@ -34,6 +51,15 @@ class Notification(Base):
         self.updated_at = datetime.utcnow()
 
 
+class NotificationCounter(Base):
+    """Unread notifications per recipient, kept in step by counters.py."""
+    __tablename__ = "notification_counters"
+
+    recipient_id = Column(UUID(as_uuid=True), primary_key=True)
+    unread = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
 def _get_metadata(self):
     return self.metadata_payload or {}
 
@@ -0,0 +1,16 @@
+"""
+Opt-in SQL profiling for Notifications Service (DB_PROFILING_ENABLED=1).
+Every statement is fingerprinted, timed and counted against the current request or
+background block; statements slower than SLOW_QUERY_MS are logged with their EXPLAIN plan,
+and responses carry X-DB-Time / X-DB-Queries headers.
+The profiler is fleetify_profiling's (a copy of services/shared); this module
+supplies the service's configuration.
+"""
+from .config import DB_PROFILING_ENABLED, N_PLUS_ONE_THRESHOLD, SLOW_QUERY_MS
+from .fleetify_profiling import SqlProfiler
+
+profiler = SqlProfiler("notifications.sql", DB_PROFILING_ENABLED, SLOW_QUERY_MS, N_PLUS_ONE_THRESHOLD)
+
+profile_engine = profiler.profile_engine
+profile_block = profiler.profile_block
+profile_app = profiler.profile_app
@@ -0,0 +1,219 @@
+"""
+Push delivery of notifications over Server-Sent Events.
+
+Users hold a stream open on GET /notifications/stream. Every committed insert
+or change of a notification is published to NOTIFICATIONS_PUSH_EXCHANGE (a
+fanout exchange); each instance consumes it through its own exclusive queue
+and hands the messages to its PushHub, which fans them out to the streams of
+the recipient. A user gets the push whichever instance wrote the notification
+and whichever one holds the stream.
+
+Writes are collected per session: an after_flush hook picks up Notification
+rows flushed through the ORM, Core writes (alert upsert, bulk ack) call
+stage() or stage_resync().
+after_commit hands them to the publisher thread, so rolled back writes are
+never pushed and requests never wait on RabbitMQ. While the broker is down
+the publisher delivers to this instance's streams only. Pushes are best
+effort: a client that reconnects reloads its inbox.
+"""
+import asyncio
+import json
+import queue
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, Iterable, Optional, Set
+
+import pika
+from fastapi import Request
+from sqlalchemy import event, inspect
+
+from . import models, schemas
+from .config import (
+    NOTIFICATIONS_PUSH_EXCHANGE,
+    PUSH_HEARTBEAT_SECONDS,
+    PUSH_STREAM_BUFFER,
+    RABBITMQ_HOST,
+    RABBITMQ_PASS,
+    RABBITMQ_USER,
+)
+from .database import SessionLocal
+from .metrics import PUSH_MESSAGES, PUSH_STREAMS
+
+# Committed notifications waiting for the publisher thread
+_outgoing: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=10000)
+
+
+class PushHub:
+    """Per-recipient fan-out to the SSE streams of this instance; dispatch() is safe from any thread."""
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._streams: Dict[str, Set[asyncio.Queue]] = defaultdict(set)
+
+    def bind(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+
+    def subscribe(self, recipient_id: str) -> asyncio.Queue:
+        stream = asyncio.Queue(maxsize=PUSH_STREAM_BUFFER)
+        self._streams[recipient_id].add(stream)
+        PUSH_STREAMS.inc()
+        return stream
+
+    def unsubscribe(self, recipient_id: str, stream: asyncio.Queue) -> None:
+        streams = self._streams.get(recipient_id)
+        if streams is not None and stream in streams:
+            streams.discard(stream)
+            PUSH_STREAMS.dec()
+            if not streams:
+                del self._streams[recipient_id]
+
+    def dispatch(self, notification: Dict[str, Any]) -> None:
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._deliver, notification)
+
+    def _deliver(self, notification: Dict[str, Any]) -> None:
+        # Bulk changes arrive as a bare {"recipient_id", "resync": true}
+        event_name = "resync" if notification.get("resync") else "notification"
+        for stream in self._streams.get(str(notification.get("recipient_id")), ()):
+            try:
+                stream.put_nowait((event_name, {} if event_name == "resync" else notification))
+                PUSH_MESSAGES.labels("delivered").inc()
+            except asyncio.QueueFull:
+                # Client is not keeping up: drop its backlog and let it reload the inbox
+                while not stream.empty():
+                    stream.get_nowait()
+                stream.put_nowait(("resync", {}))
+                PUSH_MESSAGES.labels("overflowed").inc()
+
+
+hub = PushHub()
+
+
+def _serialize(notification: Any) -> Dict[str, Any]:
+    if isinstance(notification, models.Notification):
+        # Column values by column name: the "metadata" column is mapped as metadata_payload
+        notification = {
+            column.key: getattr(notification, attribute.key)
+            for attribute in inspect(models.Notification).column_attrs
+            for column in attribute.columns
+        }
+    return schemas.NotificationOut.model_validate(notification).model_dump(mode="json")
+
+
+def stage(db, notifications: Iterable[Any]) -> None:
+    """Push these notifications (ORM objects or column dicts) once the caller's transaction commits."""
+    db.info.setdefault("push_pending", []).extend(_serialize(n) for n in notifications)
+
+
+def stage_resync(db, recipient_id) -> None:
+    """Tell the recipient's streams to reload once the caller's transaction commits (bulk changes)."""
+    db.info.setdefault("push_pending", []).append({"recipient_id": str(recipient_id), "resync": True})
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _stage_flushed(session, flush_context):
+    flushed = [
+        obj for obj in list(session.new) + list(session.dirty)
+        if isinstance(obj, models.Notification) and (obj in session.new or session.is_modified(obj))
+    ]
+    if flushed:
+        stage(session, flushed)
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _publish_committed(session):
+    for notification in session.info.pop("push_pending", ()):
+        try:
+            _outgoing.put_nowait(notification)
+        except queue.Full:
+            PUSH_MESSAGES.labels("dropped").inc()
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_pending(session):
+    session.info.pop("push_pending", None)
+
+
+def _sse(event_name: str, data: Dict[str, Any]) -> str:
+    return f"event: {event_name}\ndata: {json.dumps(data)}\n\n"
+
+
+async def event_stream(request: Request, recipient_id: str, unread: int):
+    """SSE body: a ready event with the unread count, then pushes, with comment heartbeats in between."""
+    stream = hub.subscribe(recipient_id)
+    try:
+        yield _sse("ready", {"unread": unread})
+        while True:
+            try:
+                event_name, data = await asyncio.wait_for(stream.get(), PUSH_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                yield ": keepalive\n\n"
+                continue
+            yield _sse(event_name, data)
+    finally:
+        hub.unsubscribe(recipient_id, stream)
+
+
+def _connection_parameters() -> pika.ConnectionParameters:
+    credentials = pika.PlainCredentials(RABBITMQ_USER, RABBITMQ_PASS)
+    return pika.ConnectionParameters(host=RABBITMQ_HOST, credentials=credentials)
+
+
+def _run_publisher() -> None:
+    connection = channel = None
+    while True:
+        try:
+            notification = _outgoing.get(timeout=10)
+        except queue.Empty:
+            # Service heartbeats so the idle connection is not dropped
+            if connection is not None and connection.is_open:
+                try:
+                    connection.process_data_events(0)
+                except Exception:
+                    connection = channel = None
+            continue
+        try:
+            if channel is None or not channel.is_open:
+                connection = pika.BlockingConnection(_connection_parameters())
+                channel = connection.channel()
+                channel.exchange_declare(exchange=NOTIFICATIONS_PUSH_EXCHANGE, exchange_type="fanout", durable=True)
+            channel.basic_publish(exchange=NOTIFICATIONS_PUSH_EXCHANGE, routing_key="", body=json.dumps(notification))
+            PUSH_MESSAGES.labels("published").inc()
+        except Exception as e:
+            print(f"[Notifications] Push publish failed, delivering locally only: {e}")
+            try:
+                if connection is not None and connection.is_open:
+                    connection.close()
+            except Exception:
+                pass
+            connection = channel = None
+            hub.dispatch(notification)
+            PUSH_MESSAGES.labels("local_only").inc()
+
+
+def _run_subscriber() -> None:
+    while True:
+        try:
+            connection = pika.BlockingConnection(_connection_parameters())
+            channel = connection.channel()
+            channel.exchange_declare(exchange=NOTIFICATIONS_PUSH_EXCHANGE, exchange_type="fanout", durable=True)
+            # Queue of this instance only; it disappears with the connection
+            push_queue = channel.queue_declare(queue="", exclusive=True, auto_delete=True).method.queue
+            channel.queue_bind(queue=push_queue, exchange=NOTIFICATIONS_PUSH_EXCHANGE)
+            for _method, _properties, body in channel.consume(push_queue, auto_ack=True):
+                try:
+                    hub.dispatch(json.loads(body))
+                except ValueError:
+                    pass
+        except Exception as e:
+            print(f"[Notifications] Push subscriber connection failed, retrying in 5 seconds: {e}")
+            time.sleep(5)
+
+
+def start_push(loop: asyncio.AbstractEventLoop) -> None:
+    hub.bind(loop)
+    threading.Thread(target=_run_publisher, daemon=True).start()
+    threading.Thread(target=_run_subscriber, daemon=True).start()
@@ -0,0 +1,160 @@
+"""
+Retention for the notifications table.
+
+Notifications the owner has dealt with (anything but unread or pending) move
+to notifications_archive once they are older than NOTIFICATIONS_RETENTION_DAYS,
+so the inbox table and its indexes only hold what users still look at.
+Unread notifications are never moved, so the unread counters are unaffected,
+and neither are pending ones: a team invite waits for an answer however old
+it is, and /respond only finds it in the inbox table.
+
+Rows move in batches of RETENTION_BATCH_SIZE, one short transaction each
+(DELETE ... RETURNING into the archive, SKIP LOCKED so acks never wait), with
+a pause in between. notifications_archive is range-partitioned by month of
+created_at; months past NOTIFICATIONS_ARCHIVE_RETENTION_DAYS are dropped
+whole. One replica runs at a time (advisory lock).
+"""
+import asyncio
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from . import models
+from .config import (
+    NOTIFICATIONS_ARCHIVE_RETENTION_DAYS,
+    NOTIFICATIONS_RETENTION_DAYS,
+    RETENTION_BATCH_PAUSE_SECONDS,
+    RETENTION_BATCH_SIZE,
+    RETENTION_MAX_BATCHES,
+)
+from .database import engine
+from .metrics import RETENTION_PARTITIONS_DROPPED, RETENTION_ROWS_ARCHIVED
+
+TABLE = "notifications"
+ARCHIVE = "notifications_archive"
+# pg_try_advisory_lock key shared by all notifications-service replicas
+RETENTION_LOCK_KEY = 0x4E07_0001
+
+COLUMNS = ", ".join(column.name for column in models.Notification.__table__.c)
+
+MOVE_BATCH = text(f"""
+    WITH moved AS (
+        DELETE FROM {TABLE} WHERE id IN (
+            SELECT id FROM {TABLE}
+            WHERE created_at < :cutoff AND status NOT IN ('unread', 'pending')
+            ORDER BY created_at
+            LIMIT :batch_size
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING {COLUMNS}
+    )
+    INSERT INTO {ARCHIVE} ({COLUMNS}) SELECT {COLUMNS} FROM moved
+""")
+
+
+def _month_start(day: date) -> datetime:
+    return datetime(day.year, day.month, 1, tzinfo=timezone.utc)
+
+
+def _next_month(day: date) -> date:
+    return date(day.year + day.month // 12, day.month % 12 + 1, 1)
+
+
+def _utc(value: datetime) -> datetime:
+    return value.astimezone(timezone.utc) if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def ensure_archive_partitions(conn: Connection, cutoff: datetime) -> None:
+    """The archive (for databases built by create_all) and its months from the oldest live row through the cutoff."""
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {ARCHIVE} (LIKE {TABLE} INCLUDING DEFAULTS) PARTITION BY RANGE (created_at)"
+    ))
+    conn.commit()
+    oldest = conn.execute(text(f"SELECT min(created_at) FROM {TABLE} WHERE created_at < :cutoff"), {"cutoff": cutoff}).scalar()
+    if oldest is None:
+        return
+    month = _utc(oldest).date().replace(day=1)
+    while month <= cutoff.date():
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {ARCHIVE}_p{month:%Y%m} PARTITION OF {ARCHIVE} "
+            f"FOR VALUES FROM ('{_month_start(month).isoformat()}') TO ('{_month_start(_next_month(month)).isoformat()}')"
+        ))
+        month = _next_month(month)
+    conn.commit()
+
+
+def _archive_partitions(conn: Connection) -> List[str]:
+    return list(conn.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = CAST(:parent AS regclass)"
+        ),
+        {"parent": ARCHIVE},
+    ).scalars())
+
+
+def drop_expired_archive(conn: Connection, now: datetime) -> int:
+    cutoff = now - timedelta(days=NOTIFICATIONS_ARCHIVE_RETENTION_DAYS)
+    prefix = f"{ARCHIVE}_p"
+    dropped = 0
+    for name in _archive_partitions(conn):
+        if not name.startswith(prefix):
+            continue
+        try:
+            month = datetime.strptime(name[len(prefix):], "%Y%m").date()
+        except ValueError:
+            continue
+        if _month_start(_next_month(month)) <= cutoff:
+            conn.execute(text(f"DROP TABLE {name}"))
+            conn.commit()
+            dropped += 1
+    RETENTION_PARTITIONS_DROPPED.labels(ARCHIVE).inc(dropped)
+    return dropped
+
+
+def archive_batches(conn: Connection, now: datetime) -> int:
+    """Move expired rows batch by batch; stops after RETENTION_MAX_BATCHES so one run stays bounded."""
+    cutoff = now - timedelta(days=NOTIFICATIONS_RETENTION_DAYS)
+    ensure_archive_partitions(conn, cutoff)
+    moved = 0
+    for _ in range(RETENTION_MAX_BATCHES):
+        count = conn.execute(MOVE_BATCH, {"cutoff": cutoff, "batch_size": RETENTION_BATCH_SIZE}).rowcount
+        conn.commit()
+        moved += count
+        RETENTION_ROWS_ARCHIVED.labels(TABLE).inc(count)
+        if count < RETENTION_BATCH_SIZE:
+            break
+        time.sleep(RETENTION_BATCH_PAUSE_SECONDS)
+    return moved
+
+
+def run_retention(now: Optional[datetime] = None) -> bool:
+    """One retention pass; False when another replica holds the lock."""
+    now = now or datetime.now(timezone.utc)
+    with engine.connect() as conn:
+        locked = conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": RETENTION_LOCK_KEY}).scalar()
+        conn.commit()
+        if not locked:
+            return False
+        try:
+            moved = archive_batches(conn, now)
+            dropped = drop_expired_archive(conn, now)
+            if moved or dropped:
+                print(f"[Notifications] Retention: archived {moved} notifications, dropped {dropped} archive partitions")
+        finally:
+            conn.rollback()
+            conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": RETENTION_LOCK_KEY})
+            conn.commit()
+    return True
+
+
+async def run_retention_loop(interval_seconds: float) -> None:
+    while True:
+        try:
+            await asyncio.to_thread(run_retention)
+        except Exception as e:
+            print(f"[Notifications] Retention failed: {e}")
+        await asyncio.sleep(interval_seconds)
@@ -1,27 +1,92 @@
 from datetime import datetime
-from typing import List
+from typing import List, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import tuple_, update
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session
 
 from .database import get_db
-from . import models, schemas
+from . import models, push, schemas
+from .counters import adjust_unread
 from .deps import get_current_user, require_service_token
 from .service_clients import fetch_admin_ids, set_worker_manager
 
 router = APIRouter(prefix="/notifications", tags=["notifications"])
 
+def _csv(value: Optional[str]) -> List[str]:
+    return [item.strip() for item in (value or "").split(",") if item.strip()]
+
 @router.get("", response_model=List[schemas.NotificationOut])
-async def list_notifications(current_user: dict = Depends(get_current_user), db: Session = Depends(get_db)):
+async def list_notifications(
+    limit: int = Query(50, ge=1, le=200),
+    before_created_at: Optional[datetime] = None,
+    before_id: Optional[UUID] = None,
+    status_filter: Optional[str] = Query(None, alias="status", description="Comma-separated, e.g. unread,pending"),
+    type_filter: Optional[str] = Query(None, alias="type", description="Comma-separated notification types"),
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """
+    The caller's inbox, newest first.
+
+    - before_created_at + before_id: keyset pagination; pass created_at and id of the last item of the previous page
+    - status, type: only notifications with one of the given values
+    """
     user_id = current_user["id"]
+    statuses = _csv(status_filter)
+    unknown = set(statuses) - set(models.NOTIFICATION_STATUSES)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown status: {', '.join(sorted(unknown))}")
+
+    query = db.query(models.Notification).filter(models.Notification.recipient_id == UUID(user_id))
+    if statuses:
+        query = query.filter(models.Notification.status.in_(statuses))
+    if type_filter:
+        query = query.filter(models.Notification.type.in_(_csv(type_filter)))
+    if before_created_at is not None:
+        if before_id is not None:
+            # Row comparison walks idx_notifications_inbox from the cursor; ties on created_at break by id
+            query = query.filter(
+                tuple_(models.Notification.created_at, models.Notification.id) < (before_created_at, before_id)
+            )
+        else:
+            query = query.filter(models.Notification.created_at < before_created_at)
     return (
-        db.query(models.Notification)
-        .filter(models.Notification.recipient_id == UUID(user_id))
-        .order_by(models.Notification.created_at.desc())
+        query.order_by(models.Notification.created_at.desc(), models.Notification.id.desc())
+        .limit(limit)
         .all()
     )
 
+@router.get("/unread-count", response_model=schemas.UnreadCount)
+async def unread_count(current_user: dict = Depends(get_current_user), db: Session = Depends(get_db)):
+    """Badge count from notification_counters: one primary key lookup, whatever the inbox size."""
+    counter = db.get(models.NotificationCounter, UUID(current_user["id"]))
+    return {"unread": counter.unread if counter else 0}
+
+@router.get("/stream")
+async def stream_notifications(
+    request: Request,
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Server-Sent Events: `ready` with the unread count, then a `notification` event (NotificationOut)
+    whenever one of the caller's notifications is created or changes, and `resync` if the client fell behind.
+    """
+    user_id = current_user["id"]
+    counter = db.get(models.NotificationCounter, UUID(user_id))
+    unread = counter.unread if counter else 0
+    db.close()  # Do not hold a pooled connection for the life of the stream
+    return StreamingResponse(
+        push.event_stream(request, user_id, unread),
+        media_type="text/event-stream",
+        # X-Accel-Buffering: the gateway must pass events through as they come
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @router.post("", response_model=schemas.NotificationOut, status_code=status.HTTP_201_CREATED)
 async def create_notification(
     payload: schemas.NotificationCreate,
@@ -34,6 +99,72 @@ async def create_notification(
     db.refresh(notification)
     return notification
 
+@router.post("/batch", response_model=schemas.NotificationBatchResult, status_code=status.HTTP_201_CREATED)
+async def create_notifications(
+    payload: List[schemas.NotificationBatchItem],
+    _: None = Depends(require_service_token),
+    db: Session = Depends(get_db),
+):
+    """Insert many notifications in one statement; ids already stored are skipped (at-least-once senders)."""
+    if not payload:
+        return {"created": 0, "duplicates": 0}
+    now = datetime.utcnow()
+    notifications = models.Notification.__table__
+    stmt = (
+        insert(notifications)
+        .values([{**item.dict(), "created_at": now, "updated_at": now, "occurrences": 1} for item in payload])
+        .on_conflict_do_nothing(index_elements=[notifications.c.id])
+        .returning(*notifications.c)
+    )
+    rows = [dict(row) for row in db.execute(stmt).mappings()]
+
+    # Core INSERT: counter and push are done here rather than by the ORM flush hooks
+    unread = {}
+    for row in rows:
+        if row["status"] == "unread":
+            unread[row["recipient_id"]] = unread.get(row["recipient_id"], 0) + 1
+    adjust_unread(db, unread)
+    push.stage(db, rows)
+    db.commit()
+    return {"created": len(rows), "duplicates": len(payload) - len(rows)}
+
+# Bulk acks push individual rows up to this many, a resync event above it
+BULK_PUSH_LIMIT = 50
+
+@router.post("/ack", response_model=schemas.BulkAckResult)
+async def acknowledge_notifications(
+    payload: schemas.BulkAck,
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Mark unread notifications as read in one owner-scoped UPDATE ... RETURNING; others are left as they are."""
+    if (payload.ids is None) == (payload.before is None):
+        raise HTTPException(status_code=400, detail="Pass either ids or before")
+    recipient_id = UUID(current_user["id"])
+    notifications = models.Notification.__table__
+    stmt = (
+        update(notifications)
+        .where(notifications.c.recipient_id == recipient_id, notifications.c.status == "unread")
+        .values(status="read", updated_at=datetime.utcnow())
+        .returning(*notifications.c)
+    )
+    if payload.ids is not None:
+        stmt = stmt.where(notifications.c.id.in_(payload.ids))
+    else:
+        stmt = stmt.where(notifications.c.created_at <= payload.before)
+    rows = [dict(row) for row in db.execute(stmt).mappings()] if payload.ids or payload.before else []
+
+    # Core UPDATE: the ORM flush hooks do not see it, so counter and push are done here
+    adjust_unread(db, {recipient_id: -len(rows)})
+    if len(rows) <= BULK_PUSH_LIMIT:
+        push.stage(db, rows)
+    else:
+        push.stage_resync(db, recipient_id)
+    db.commit()
+
+    counter = db.get(models.NotificationCounter, recipient_id)
+    return {"acknowledged": len(rows), "ids": [row["id"] for row in rows], "unread": counter.unread if counter else 0}
+
 @router.post("/{notification_id}/ack", response_model=schemas.NotificationOut)
 async def acknowledge_notification(
     notification_id: UUID,
@@ -83,52 +214,16 @@ async def handle_team_invite_response(notification: models.Notification, action:
     if action == "decline":
         await set_worker_manager(current_user["id"], None, action="decline")
     if manager_id:
+        # Identities from older access tokens carry no name
+        name = current_user.get("full_name") or notification.metadata.get("invitee_email") or current_user["id"]
         follow_up = models.Notification(
             recipient_id=UUID(manager_id),
             sender_id=UUID(current_user["id"]),
             type="team_invite_response",
             title="Odpowiedź na zaproszenie",
-            body=f"{current_user['full_name']} {('dołączył' if action == 'accept' else 'odmówił')} zespołu.",
+            body=f"{name} {('dołączył' if action == 'accept' else 'odmówił')} zespołu.",
             metadata={"invite_id": str(notification.id), "status": action},
             status="unread",
         )
         db.add(follow_up)
         db.commit()
-
-async def create_vehicle_alert(event_payload: dict, db: Session):
-    # Get owner_id from the event - only notify the vehicle owner, not all admins
-    owner_id = event_payload.get("owner_id")
-    if not owner_id:
-        # Fallback: if no owner_id in payload, skip (shouldn't happen)
-        print(f"[Notifications] No owner_id in vehicle alert payload, skipping")
-        return
-    
-    event_type = event_payload.get("event_type", "vehicle_alert")
-    severity = event_payload.get("severity", "medium")
-    vehicle_label = event_payload.get("vehicle_label", "")
-    vin = event_payload.get("vin", "")
-    
-    # Determine title based on event type
-    if event_type == "vehicle_service_alert":
-        title = f"⚠️ Serwis pojazdu {vehicle_label or vin}"
-        alert_type = "service_alert"
-    elif event_type == "vehicle_issue_created":
-        severity_emoji = "🔴" if severity == "critical" else "🟠" if severity == "high" else "🟡"
-        title = f"{severity_emoji} Problem z pojazdem {vehicle_label or vin}"
-        alert_type = "issue_alert"
-    else:
-        title = f"Alert pojazdu {vehicle_label or vin}"
-        alert_type = "vehicle_alert"
-    
-    # Send only to vehicle owner
-    alert = models.Notification(
-        recipient_id=UUID(owner_id),
-        type=alert_type,
-        title=title,
-        body=event_payload.get("message", "Wykryto problem z pojazdem"),
-        metadata=event_payload,
-        status="unread",
-        action_required=severity in ("high", "critical"),
-    )
-    db.add(alert)
-    db.commit()
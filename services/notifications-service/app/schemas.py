@@ -1,8 +1,8 @@
 from datetime import datetime
-from typing import Any, Optional
+from typing import Any, List, Optional
 from uuid import UUID
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 class NotificationBase(BaseModel):
     recipient_id: UUID
@@ -17,6 +17,13 @@ class NotificationBase(BaseModel):
 class NotificationCreate(NotificationBase):
     pass
 
+class NotificationBatchItem(NotificationBase):
+    id: UUID  # Chosen by the sender; an id that already exists is skipped, so redelivery is harmless
+
+class NotificationBatchResult(BaseModel):
+    created: int
+    duplicates: int
+
 class NotificationOut(BaseModel):
     id: UUID
     recipient_id: UUID
@@ -30,9 +37,22 @@ class NotificationOut(BaseModel):
     created_at: datetime
     updated_at: datetime
     responded_at: Optional[datetime]
+    occurrences: int = 1  # Repeats of the same vehicle alert folded into this notification
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class NotificationAction(BaseModel):
     action: str = Field(pattern="^(ack|accept|decline)$")
+
+class BulkAck(BaseModel):
+    """Either ids, or before: every unread notification created at or before that moment."""
+    ids: Optional[List[UUID]] = Field(default=None, max_length=1000)
+    before: Optional[datetime] = None
+
+class BulkAckResult(BaseModel):
+    acknowledged: int
+    ids: List[UUID]
+    unread: int
+
+class UnreadCount(BaseModel):
+    unread: int
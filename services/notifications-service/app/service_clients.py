@@ -1,6 +1,8 @@
 import httpx
 
 from .config import USER_MANAGEMENT_URL, USER_MANAGEMENT_SERVICE_TOKEN
+from .metrics import observe_downstream
+from .tracing import client_span
 
 async def set_worker_manager(user_id: str, manager_id: str | None, action: str = "accept"):
     if not USER_MANAGEMENT_SERVICE_TOKEN:
@@ -11,14 +13,16 @@ async def set_worker_manager(user_id: str, manager_id: str | None, action: str =
     }
     payload = {"user_id": user_id, "manager_id": manager_id, "action": action}
     async with httpx.AsyncClient(follow_redirects=True) as client:
-        await client.post(f"{USER_MANAGEMENT_URL}/api/internal/team/accept", json=payload, headers=headers)
+        with observe_downstream("user-management", "POST"), client_span("POST user-management", headers):
+            await client.post(f"{USER_MANAGEMENT_URL}/api/internal/team/accept", json=payload, headers=headers)
 
 async def fetch_admin_ids() -> list[str]:
     if not USER_MANAGEMENT_SERVICE_TOKEN:
         return []
     headers = {"X-Service-Token": USER_MANAGEMENT_SERVICE_TOKEN}
     async with httpx.AsyncClient(follow_redirects=True) as client:
-        resp = await client.get(f"{USER_MANAGEMENT_URL}/api/internal/admins", headers=headers)
+        with observe_downstream("user-management"), client_span("GET user-management", headers):
+            resp = await client.get(f"{USER_MANAGEMENT_URL}/api/internal/admins", headers=headers)
         if resp.status_code == 200:
             data = resp.json()
             return [item["id"] for item in data]
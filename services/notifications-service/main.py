@@ -1,17 +1,35 @@
+import asyncio
+
 from fastapi import FastAPI
 
+from app.access_tokens import start_revocation_listener
+from app.config import RETENTION_INTERVAL_SECONDS
 from app.database import Base, engine
 from app.routes import router
 from app.messaging import start_consumer
+from app.push import start_push
+from app.retention import run_retention_loop
+from app.metrics import instrument_app
+from app.profiling import profile_app
+from app.tracing import trace_app
 
 Base.metadata.create_all(bind=engine)
 
 app = FastAPI(title="Notifications Service")
+instrument_app(app)
+trace_app(app)
+profile_app(app)
 app.include_router(router)
 
 @app.on_event("startup")
-def startup_event():
+async def startup_event():
     start_consumer()
+    # SSE fan-out: streams live on this loop, the broker threads hand pushes to it
+    start_push(asyncio.get_running_loop())
+    # Move old, dealt-with notifications to the archive
+    asyncio.create_task(run_retention_loop(RETENTION_INTERVAL_SECONDS))
+    # Revoked access tokens, so callers can be identified without asking user-management
+    start_revocation_listener()
 
 @app.get("/health")
 def health_check():
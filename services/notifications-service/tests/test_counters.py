@@ -0,0 +1,90 @@
+import uuid
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
+from app import counters, models
+
+ALICE, BOB = uuid.uuid4(), uuid.uuid4()
+
+
+@pytest.fixture
+def applied(monkeypatch):
+    """Every delta set _count_flushed hands to adjust_unread."""
+    calls = []
+    monkeypatch.setattr(counters, "adjust_unread", lambda session, deltas: calls.append(dict(deltas)))
+    return calls
+
+
+@pytest.fixture
+def db(applied):
+    engine = create_engine("sqlite://")
+    models.Notification.__table__.create(engine)
+    with Session(engine) as session:
+        # The hook SessionLocal runs, on a session of our own
+        event.listen(session, "after_flush", counters._count_flushed)
+        yield session
+
+
+def notification(recipient_id, status=None):
+    return models.Notification(
+        recipient_id=recipient_id,
+        type="vehicle_alert",
+        title="Alert",
+        body="Vehicle needs attention",
+        status=status,
+        created_at=datetime(2026, 3, 1),
+    )
+
+
+def test_new_unread_rows_count_per_recipient(db, applied):
+    db.add_all([notification(ALICE), notification(ALICE, "unread"), notification(BOB), notification(BOB, "pending")])
+    db.flush()
+
+    assert applied == [{ALICE: 2, BOB: 1}]
+
+
+def test_status_changes_count_both_ways(db, applied):
+    read, unread, pending = notification(ALICE), notification(ALICE), notification(BOB, "pending")
+    db.add_all([read, unread, pending])
+    db.flush()
+    applied.clear()
+
+    read.status = "read"
+    pending.status = "unread"
+    unread.title = "Alert (2)"  # not a status change
+    db.flush()
+    assert applied == [{ALICE: -1, BOB: 1}]
+
+    applied.clear()
+    read.status = "read"  # unchanged value
+    db.flush()
+    assert applied == []
+
+
+def test_deleted_unread_rows_are_subtracted(db, applied):
+    unread, read = notification(ALICE), notification(ALICE, "read")
+    db.add_all([unread, read])
+    db.flush()
+    applied.clear()
+
+    db.delete(unread)
+    db.delete(read)
+    db.flush()
+
+    assert applied == [{ALICE: -1}]
+
+
+def test_offsetting_changes_do_not_write(db, applied):
+    first, second = notification(ALICE), notification(ALICE, "read")
+    db.add_all([first, second])
+    db.flush()
+    applied.clear()
+
+    first.status = "read"
+    second.status = "unread"
+    db.flush()
+
+    assert applied == []
@@ -0,0 +1,163 @@
+import uuid
+
+import pytest
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from app import dedup, messaging
+
+OWNER = uuid.uuid4()
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(dedup.time, "monotonic", clock)
+    return clock
+
+
+def alert(vehicle="v1", alert_type="engine", recipient_id=OWNER, **extra):
+    return {
+        "recipient_id": recipient_id,
+        "dedup_key": f"{vehicle}:{alert_type}",
+        "type": "vehicle_alert",
+        "title": "Alert",
+        "body": extra.pop("body", "Problem"),
+        "action_required": extra.pop("action_required", False),
+        **extra,
+    }
+
+
+def test_first_alert_is_written_and_repeats_fold_after_it_is_stored(clock):
+    aggregator = dedup.AlertAggregator(window_seconds=10)
+    first = alert()
+    assert aggregator.offer(first) is first
+    # Not stored yet: a repeat is written too, not folded into a write that may fail
+    assert aggregator.offer(alert()) is not None
+
+    aggregator.written([first])
+    assert aggregator.offer(alert(body="Again")) is None
+    assert aggregator.offer(alert(body="Latest", action_required=True)) is None
+    assert aggregator.drain() == []
+
+    clock.now += 10
+    [row] = aggregator.drain()
+    assert row["occurrences"] == 2
+    assert row["body"] == "Latest"
+    assert row["action_required"] is True
+
+
+def test_alerts_without_key_are_never_folded(clock):
+    aggregator = dedup.AlertAggregator(window_seconds=10)
+    plain = alert(dedup_key=None)
+    aggregator.written([plain])
+    assert aggregator.offer(plain) is plain
+    assert aggregator.offer(plain) is plain
+
+
+def test_keys_are_per_owner_vehicle_and_type(clock):
+    aggregator = dedup.AlertAggregator(window_seconds=10)
+    aggregator.written([alert()])
+    assert aggregator.offer(alert(vehicle="v2")) is not None
+    assert aggregator.offer(alert(alert_type="tires")) is not None
+    assert aggregator.offer(alert(recipient_id=uuid.uuid4())) is not None
+
+
+def test_quiet_keys_are_forgotten(clock):
+    aggregator = dedup.AlertAggregator(window_seconds=10)
+    aggregator.written([alert()])
+    clock.now += 10
+    assert aggregator.drain() == []
+    assert aggregator.offer(alert()) is not None
+
+
+def test_restore_merges_with_repeats_folded_meanwhile(clock):
+    aggregator = dedup.AlertAggregator(window_seconds=10)
+    aggregator.written([alert()])
+    aggregator.offer(alert(body="One"))
+    clock.now += 10
+    drained = aggregator.drain()
+    aggregator.offer(alert(body="Two"))
+
+    aggregator.restore(drained)
+    clock.now += 10
+    [row] = aggregator.drain()
+    assert row["occurrences"] == 2
+    assert row["body"] == "Two"
+
+
+def test_collapse_merges_rows_of_one_key():
+    rows = dedup._collapse([alert(body="a"), alert(vehicle="v2"), alert(body="b", occurrences=3)])
+    assert len(rows) == 2
+    merged = next(row for row in rows if row["dedup_key"] == "v1:engine")
+    assert merged["occurrences"] == 4
+    assert merged["body"] == "b"
+
+
+def test_collapse_keeps_owners_apart():
+    other = uuid.uuid4()
+    rows = dedup._collapse([alert(), alert(recipient_id=other)])
+    assert sorted(str(row["recipient_id"]) for row in rows) == sorted([str(OWNER), str(other)])
+
+
+class Settler:
+    def __init__(self):
+        self.dead_lettered = []
+
+    def dead_letter_row(self, row, reason):
+        self.dead_lettered.append(row)
+
+
+def folded_aggregator(clock, *rows):
+    aggregator = dedup.AlertAggregator(window_seconds=10)
+    for row in rows:
+        aggregator.written([row])
+        aggregator.offer(row)
+    clock.now += 10
+    return aggregator
+
+
+def test_flush_keeps_rows_while_database_is_unavailable(clock, monkeypatch):
+    monkeypatch.setattr(messaging, "aggregator", folded_aggregator(clock, alert()))
+
+    def unavailable(rows):
+        raise OperationalError("INSERT", {}, Exception("connection refused"))
+
+    monkeypatch.setattr(messaging, "_store", unavailable)
+    settler = Settler()
+    messaging.flush_coalesced(settler)
+    assert settler.dead_lettered == []
+
+    stored = []
+    monkeypatch.setattr(messaging, "_store", stored.extend)
+    clock.now += 10
+    messaging.flush_coalesced(settler)
+    assert [row["dedup_key"] for row in stored] == ["v1:engine"]
+
+
+def test_flush_dead_letters_rejected_rows(clock, monkeypatch):
+    good, bad = alert(), alert(vehicle="broken")
+    monkeypatch.setattr(messaging, "aggregator", folded_aggregator(clock, good, bad))
+    stored = []
+
+    def store(rows):
+        if any(row["dedup_key"] == "broken:engine" for row in rows):
+            raise IntegrityError("INSERT", {}, Exception("violates check constraint"))
+        stored.extend(rows)
+
+    monkeypatch.setattr(messaging, "_store", store)
+    settler = Settler()
+    messaging.flush_coalesced(settler)
+    assert [row["dedup_key"] for row in stored] == ["v1:engine"]
+    assert [row["dedup_key"] for row in settler.dead_lettered] == ["broken:engine"]
+
+    clock.now += 10
+    messaging.flush_coalesced(settler)
+    assert len(settler.dead_lettered) == 1
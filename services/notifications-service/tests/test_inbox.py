@@ -0,0 +1,90 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app import models, routes
+
+OWNER = uuid.uuid4()
+START = datetime(2026, 3, 1, 12, 0, 0)
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    models.Notification.__table__.create(engine)
+    with Session(engine) as session:
+        yield session
+
+
+def add(db, created_at, recipient_id=OWNER, **fields):
+    notification = models.Notification(
+        recipient_id=recipient_id,
+        type=fields.pop("type", "vehicle_alert"),
+        title="Alert",
+        body="Vehicle needs attention",
+        created_at=created_at,
+        **fields,
+    )
+    db.add(notification)
+    db.commit()
+    return notification
+
+
+def page(db, user_id=OWNER, **params):
+    params = {"limit": 50, "before_created_at": None, "before_id": None, "status_filter": None, "type_filter": None, **params}
+    return asyncio.run(routes.list_notifications(current_user={"id": str(user_id)}, db=db, **params))
+
+
+def walk(db, limit, **params):
+    """Every page of the inbox, following the cursor of each last item."""
+    seen, cursor = [], {}
+    while True:
+        items = page(db, limit=limit, **cursor, **params)
+        seen.extend(items)
+        if len(items) < limit:
+            return seen
+        cursor = {"before_created_at": items[-1].created_at, "before_id": items[-1].id}
+
+
+def test_keyset_pages_break_created_at_ties_by_id(db):
+    # Several notifications share a timestamp, as alerts written in one batch do
+    for i in range(9):
+        add(db, START + timedelta(seconds=i // 3))
+    add(db, START, recipient_id=uuid.uuid4())
+
+    expected = sorted(
+        db.query(models.Notification).filter(models.Notification.recipient_id == OWNER),
+        key=lambda n: (n.created_at, n.id),
+        reverse=True,
+    )
+    for limit in (1, 2, 4, 50):
+        assert [n.id for n in walk(db, limit)] == [n.id for n in expected]
+
+
+def test_created_at_cursor_alone_skips_the_whole_timestamp(db):
+    older = add(db, START)
+    tied = [add(db, START + timedelta(seconds=1)) for _ in range(2)]
+
+    items = page(db, before_created_at=tied[0].created_at)
+
+    assert [n.id for n in items] == [older.id]
+
+
+def test_cursor_combines_with_status_and_type_filters(db):
+    keep = [add(db, START + timedelta(seconds=i), status="unread") for i in range(4)]
+    add(db, START + timedelta(seconds=10), status="read")
+    add(db, START + timedelta(seconds=11), status="unread", type="team_invite")
+
+    items = walk(db, 2, status_filter="unread", type_filter="vehicle_alert")
+
+    assert [n.id for n in items] == [n.id for n in reversed(keep)]
+
+
+def test_unknown_status_is_rejected(db):
+    with pytest.raises(routes.HTTPException) as error:
+        page(db, status_filter="unread,archived")
+    assert error.value.status_code == 400
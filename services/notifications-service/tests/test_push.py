@@ -0,0 +1,96 @@
+import queue
+import uuid
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+
+from app import counters, models, push
+from app.database import SessionLocal
+
+OWNER = uuid.uuid4()
+
+
+@pytest.fixture
+def db(monkeypatch):
+    """A SessionLocal session, so its after_flush/after_commit hooks run, on sqlite."""
+    engine = create_engine("sqlite://")
+    models.Notification.__table__.create(engine)
+    # The counter upsert is PostgreSQL only
+    monkeypatch.setattr(counters, "adjust_unread", lambda session, deltas: None)
+    monkeypatch.setattr(push, "_outgoing", queue.Queue())
+    with SessionLocal(bind=engine) as session:
+        yield session
+
+
+def published():
+    items = []
+    while not push._outgoing.empty():
+        items.append(push._outgoing.get_nowait())
+    return items
+
+
+def test_flushed_notifications_are_pushed_after_commit(db):
+    notification = models.Notification(
+        recipient_id=OWNER, type="vehicle_alert", title="Alert", body="Low fuel", metadata={"vehicle_id": 7}
+    )
+    db.add(notification)
+    db.flush()
+    assert published() == []
+
+    db.commit()
+
+    [pushed] = published()
+    assert pushed["id"] == str(notification.id)
+    assert pushed["recipient_id"] == str(OWNER)
+    assert pushed["metadata"] == {"vehicle_id": 7}
+    assert pushed["status"] == "unread"
+    assert pushed["occurrences"] == 1
+
+
+def test_status_changes_are_pushed(db):
+    notification = models.Notification(recipient_id=OWNER, type="vehicle_alert", title="Alert", body="Low fuel")
+    db.add(notification)
+    db.commit()
+    published()
+
+    notification.status = "read"
+    db.commit()
+
+    [pushed] = published()
+    assert pushed["status"] == "read"
+    assert pushed["metadata"] == {}
+
+
+def test_rolled_back_writes_are_not_pushed(db):
+    db.add(models.Notification(recipient_id=OWNER, type="vehicle_alert", title="Alert", body="Low fuel"))
+    db.flush()
+    db.rollback()
+
+    assert published() == []
+
+
+def test_core_rows_are_staged_by_column_name(db):
+    # As the batch insert, the alert upsert and the bulk ack return them
+    row = {
+        "id": uuid.uuid4(),
+        "recipient_id": OWNER,
+        "type": "vehicle_alert",
+        "title": "Alert",
+        "body": "Low fuel",
+        "metadata": {"vehicle_id": 7},
+        "status": "unread",
+        "action_required": False,
+        "created_at": datetime(2026, 3, 1),
+        "updated_at": datetime(2026, 3, 1),
+        "sender_id": None,
+        "responded_at": None,
+        "dedup_key": "7:fuel",
+        "occurrences": 3,
+    }
+    push.stage(db, [row])
+    db.commit()
+
+    [pushed] = published()
+    assert pushed["metadata"] == {"vehicle_id": 7}
+    assert pushed["occurrences"] == 3
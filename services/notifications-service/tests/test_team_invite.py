@@ -0,0 +1,99 @@
+import asyncio
+import time
+import uuid
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app import access_tokens, fleetify_auth, models, routes, schemas
+
+SECRET = "test-secret"
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    models.Notification.__table__.create(engine)
+    with Session(engine) as session:
+        yield session
+
+
+@pytest.fixture
+def local_identity(monkeypatch):
+    """An employee identified from their access token alone, as get_current_user does behind the gateway."""
+    monkeypatch.setattr(access_tokens, "ACCESS_TOKEN_SECRET", SECRET)
+    monkeypatch.setattr(access_tokens.revocations, "live_since", time.monotonic() - access_tokens.revocations.ttl_seconds)
+
+    def identify(employee_id, **claims):
+        now = int(time.time())
+        token = fleetify_auth.encode_access_token(
+            {"sub": employee_id, "sid": str(uuid.uuid4()), "role": "employee", "iat": now, "exp": now + 300, **claims},
+            SECRET,
+        )
+        user = access_tokens.verify_access_token(f"Bearer {token}")
+        assert user is not None
+        return user
+
+    return identify
+
+
+@pytest.fixture(autouse=True)
+def no_user_management(monkeypatch):
+    calls = []
+
+    async def set_worker_manager(user_id, manager_id, action="accept"):
+        calls.append((user_id, manager_id, action))
+
+    monkeypatch.setattr(routes, "set_worker_manager", set_worker_manager)
+    return calls
+
+
+def invite(db, employee_id, manager_id):
+    notification = models.Notification(
+        recipient_id=uuid.UUID(employee_id),
+        sender_id=uuid.UUID(manager_id),
+        type="team_invite",
+        title="Zaproszenie do zespołu",
+        body="Anna zaprasza Cię do swojego zespołu.",
+        metadata={"manager_id": manager_id, "invitee_email": "jan@example.com"},
+        action_required=True,
+        status="pending",
+    )
+    db.add(notification)
+    db.commit()
+    return notification
+
+
+def respond(db, notification, user, action):
+    return asyncio.run(
+        routes.respond_to_notification(notification.id, schemas.NotificationAction(action=action), user, db)
+    )
+
+
+def follow_ups(db):
+    return db.query(models.Notification).filter(models.Notification.type == "team_invite_response").all()
+
+
+def test_accept_with_local_identity_notifies_manager(db, local_identity, no_user_management):
+    employee_id, manager_id = str(uuid.uuid4()), str(uuid.uuid4())
+    notification = invite(db, employee_id, manager_id)
+    user = local_identity(employee_id, name="Jan Kowalski")
+
+    assert respond(db, notification, user, "accept").status == "accepted"
+
+    [follow_up] = follow_ups(db)
+    assert follow_up.recipient_id == uuid.UUID(manager_id)
+    assert follow_up.body == "Jan Kowalski dołączył zespołu."
+    assert no_user_management == [(employee_id, manager_id, "accept")]
+
+
+def test_decline_with_token_without_name(db, local_identity):
+    employee_id, manager_id = str(uuid.uuid4()), str(uuid.uuid4())
+    notification = invite(db, employee_id, manager_id)
+    user = local_identity(employee_id)
+
+    assert respond(db, notification, user, "decline").status == "declined"
+
+    [follow_up] = follow_ups(db)
+    assert follow_up.body == "jan@example.com odmówił zespołu."
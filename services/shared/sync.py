@@ -0,0 +1,73 @@
+"""
+Copy the shared modules into the build context of every service that uses them.
+
+Each service is built from its own directory, so it cannot import from here;
+it gets a byte-identical copy instead. Run after editing anything in this
+directory:
+
+    python services/shared/sync.py          # write the copies
+    python services/shared/sync.py --check  # only list the copies that differ
+"""
+import sys
+from pathlib import Path
+
+SHARED = Path(__file__).resolve().parent
+SERVICES = SHARED.parent
+
+# Shared module -> where each service imports it from
+COPIES = {
+    "fleetify_auth.py": [
+        "analytics-service/fleetify_auth.py",
+        "dashboard-service/app/fleetify_auth.py",
+        "notifications-service/app/fleetify_auth.py",
+        "user-managment/user_managment/fleetify_auth.py",
+        "vehicle-service/app/fleetify_auth.py",
+    ],
+    "fleetify_metrics.py": [
+        "analytics-service/fleetify_metrics.py",
+        "dashboard-service/app/fleetify_metrics.py",
+        "notifications-service/app/fleetify_metrics.py",
+        "user-managment/user_managment/fleetify_metrics.py",
+        "vehicle-service/app/fleetify_metrics.py",
+    ],
+    "fleetify_profiling.py": [
+        "analytics-service/fleetify_profiling.py",
+        "notifications-service/app/fleetify_profiling.py",
+        "vehicle-service/app/fleetify_profiling.py",
+    ],
+    "fleetify_tracing.py": [
+        "analytics-service/fleetify_tracing.py",
+        "dashboard-service/app/fleetify_tracing.py",
+        "notifications-service/app/fleetify_tracing.py",
+        "user-managment/user_managment/fleetify_tracing.py",
+        "vehicle-service/app/fleetify_tracing.py",
+    ],
+}
+
+
+def stale_copies():
+    """(source, copy) for every copy missing or differing from its source."""
+    stale = []
+    for name, targets in COPIES.items():
+        source = SHARED / name
+        for target in targets:
+            copy = SERVICES / target
+            if not copy.exists() or copy.read_bytes() != source.read_bytes():
+                stale.append((source, copy))
+    return stale
+
+
+def main(argv) -> int:
+    stale = stale_copies()
+    if "--check" in argv:
+        for _source, copy in stale:
+            print(f"out of date: {copy.relative_to(SERVICES)}")
+        return 1 if stale else 0
+    for source, copy in stale:
+        copy.write_bytes(source.read_bytes())
+        print(f"updated: {copy.relative_to(SERVICES)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,136 @@
+import time
+
+import pytest
+
+import fleetify_auth
+
+SECRET = "test-secret"
+
+
+def claims(**overrides):
+    now = int(time.time())
+    values = {
+        "sub": "user-1",
+        "sid": "session-1",
+        "role": "admin",
+        "manager_id": None,
+        "email": "admin@example.com",
+        "name": "Anna Nowak",
+        "iat": now,
+        "exp": now + 300,
+    }
+    values.update(overrides)
+    return values
+
+
+def live_revocations():
+    revocations = fleetify_auth.RevocationList(ttl_seconds=300)
+    revocations.live_since = time.monotonic() - 300
+    return revocations
+
+
+def test_round_trip():
+    expected = claims()
+    token = fleetify_auth.encode_access_token(expected, SECRET)
+    assert fleetify_auth.is_access_token(token)
+    assert fleetify_auth.decode_access_token(token, SECRET) == expected
+
+
+def test_rejects_tampered_payload():
+    header, _payload, signature = fleetify_auth.encode_access_token(claims(), SECRET).split(".")
+    forged_payload = fleetify_auth.encode_access_token(claims(role="admin", sub="user-2"), SECRET).split(".")[1]
+    assert fleetify_auth.decode_access_token(f"{header}.{forged_payload}.{signature}", SECRET) is None
+
+
+def test_rejects_other_secret():
+    token = fleetify_auth.encode_access_token(claims(), SECRET)
+    assert fleetify_auth.decode_access_token(token, "other-secret") is None
+
+
+def test_rejects_expired_token():
+    token = fleetify_auth.encode_access_token(claims(exp=int(time.time()) - 1), SECRET)
+    assert fleetify_auth.decode_access_token(token, SECRET) is None
+
+
+@pytest.mark.parametrize("token", ["", "a.b", "a.b.c", "not-a-jwt-at-all"])
+def test_rejects_garbage(token):
+    assert fleetify_auth.decode_access_token(token, SECRET) is None
+
+
+def test_rejects_non_ascii_signature():
+    header, payload, _signature = fleetify_auth.encode_access_token(claims(), SECRET).split(".")
+    token = f"{header}.{payload}.zażółć"
+    assert fleetify_auth.decode_access_token(token, SECRET) is None
+    revocations = fleetify_auth.RevocationList(ttl_seconds=300)
+    revocations.live_since = time.monotonic() - 300
+    assert fleetify_auth.verify_access_token(f"Bearer {token}", SECRET, revocations) == (None, "invalid")
+
+
+def test_revoked_session():
+    revocations = fleetify_auth.RevocationList(ttl_seconds=300)
+    revocations.add({"sid": "session-1", "until": time.time() + 300})
+    assert revocations.is_revoked(claims())
+    assert not revocations.is_revoked(claims(sid="session-2"))
+
+
+def test_revoked_user_only_covers_tokens_issued_before():
+    now = int(time.time())
+    revocations = fleetify_auth.RevocationList(ttl_seconds=300)
+    revocations.add({"sub": "user-1", "issued_before": now, "until": now + 300})
+    assert revocations.is_revoked(claims(iat=now - 10))
+    assert revocations.is_revoked(claims(iat=now))
+    assert not revocations.is_revoked(claims(iat=now + 1))
+    assert not revocations.is_revoked(claims(sub="user-2", iat=now - 10))
+
+
+def test_revocations_are_forgotten_once_expired():
+    revocations = fleetify_auth.RevocationList(ttl_seconds=300)
+    revocations.add({"sid": "session-1", "until": time.time() - 1})
+    assert not revocations.is_revoked(claims())
+
+
+def test_subscribers_get_revocations():
+    received = []
+    revocations = fleetify_auth.RevocationList(ttl_seconds=300)
+    revocations.subscribe(received.append)
+    message = {"sid": "session-1", "until": time.time() + 300}
+    revocations.add(message)
+    assert received == [message]
+
+
+def test_trusted_only_after_a_whole_ttl():
+    revocations = fleetify_auth.RevocationList(ttl_seconds=300)
+    assert not revocations.trusted()
+    revocations.live_since = time.monotonic() - 10
+    assert not revocations.trusted()
+    revocations.live_since = time.monotonic() - 300
+    assert revocations.trusted()
+
+
+def test_verify_access_token():
+    token = fleetify_auth.encode_access_token(claims(), SECRET)
+    user, result = fleetify_auth.verify_access_token(f"Bearer {token}", SECRET, live_revocations())
+    assert result == "verified"
+    assert user == {
+        "id": "user-1",
+        "role": "admin",
+        "manager_id": None,
+        "email": "admin@example.com",
+        "full_name": "Anna Nowak",
+        "session_id": "session-1",
+    }
+
+
+def test_verify_access_token_outcomes():
+    token = fleetify_auth.encode_access_token(claims(), SECRET)
+    revoked = live_revocations()
+    revoked.add({"sid": "session-1", "until": time.time() + 300})
+
+    assert fleetify_auth.verify_access_token(None, SECRET, live_revocations()) == (None, None)
+    assert fleetify_auth.verify_access_token(f"Bearer {token}", "", live_revocations()) == (None, None)
+    assert fleetify_auth.verify_access_token("Bearer opaque", SECRET, live_revocations()) == (None, "session_token")
+    assert fleetify_auth.verify_access_token(
+        f"Bearer {token}", SECRET, fleetify_auth.RevocationList(300)
+    ) == (None, "untrusted")
+    assert fleetify_auth.verify_access_token(f"Bearer {token}x", SECRET, live_revocations()) == (None, "invalid")
+    assert fleetify_auth.verify_access_token(f"Bearer {token}", SECRET, revoked) == (None, "revoked")
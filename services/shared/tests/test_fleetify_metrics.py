@@ -0,0 +1,70 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine, text
+
+import fleetify_metrics
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+@pytest.mark.parametrize(
+    "statement, operation",
+    [("SELECT 1", "SELECT"), ("\n  update vehicles SET x = 1", "UPDATE"), ("", "OTHER")],
+)
+def test_statement_operation(statement, operation):
+    assert fleetify_metrics.statement_operation(statement) == operation
+
+
+def test_observe_downstream_labels_the_outcome():
+    before_ok = sample("downstream_request_duration_seconds_count", target="svc", method="GET", outcome="ok")
+    before_error = sample("downstream_request_duration_seconds_count", target="svc", method="POST", outcome="error")
+
+    with fleetify_metrics.observe_downstream("svc"):
+        pass
+    with pytest.raises(RuntimeError):
+        with fleetify_metrics.observe_downstream("svc", "POST"):
+            raise RuntimeError
+
+    assert sample("downstream_request_duration_seconds_count", target="svc", method="GET", outcome="ok") == before_ok + 1
+    assert (
+        sample("downstream_request_duration_seconds_count", target="svc", method="POST", outcome="error")
+        == before_error + 1
+    )
+
+
+def test_instrument_app_times_requests_by_route_template():
+    app = FastAPI()
+    fleetify_metrics.instrument_app(app)
+
+    @app.get("/vehicles/{vehicle_id}")
+    def read_vehicle(vehicle_id: int):
+        return {"id": vehicle_id}
+
+    labels = {"method": "GET", "route": "/vehicles/{vehicle_id}", "status": "200"}
+    before = sample("http_request_duration_seconds_count", **labels)
+    client = TestClient(app)
+    client.get("/vehicles/1")
+    client.get("/vehicles/2")
+
+    assert sample("http_request_duration_seconds_count", **labels) == before + 2
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert "http_requests_in_flight" in response.text
+
+
+def test_instrument_engine_times_statements():
+    engine = create_engine("sqlite://")
+    fleetify_metrics.instrument_engine(engine)
+    before = sample("db_query_duration_seconds_count", operation="SELECT")
+
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+        with pytest.raises(Exception):
+            connection.execute(text("SELECT * FROM missing_table"))
+        connection.execute(text("SELECT 2"))
+
+    assert sample("db_query_duration_seconds_count", operation="SELECT") == before + 2
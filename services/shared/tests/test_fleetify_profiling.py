@@ -0,0 +1,92 @@
+import logging
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+import fleetify_profiling
+
+
+@pytest.mark.parametrize(
+    "statement, expected",
+    [
+        ("SELECT * FROM vehicles WHERE id = 42", "SELECT * FROM vehicles WHERE id = ?"),
+        ("SELECT * FROM vehicles WHERE number = 'WX 1234'", "SELECT * FROM vehicles WHERE number = ?"),
+        ("SELECT *\n  FROM vehicles WHERE id = %(id_1)s", "SELECT * FROM vehicles WHERE id = ?"),
+        ("SELECT * FROM vehicles WHERE id IN (%s, %s, %s)", "SELECT * FROM vehicles WHERE id IN (...)"),
+    ],
+)
+def test_fingerprint(statement, expected):
+    assert fleetify_profiling.fingerprint(statement) == expected
+
+
+def test_query_stats_flags_repeated_statements():
+    stats = fleetify_profiling.QueryStats("GET /vehicles")
+    for _ in range(3):
+        stats.record("SELECT * FROM vehicle_issues WHERE vehicle_id = ?", 0.001, 2)
+    stats.record("SELECT * FROM vehicles", 0.004, -1)
+
+    assert stats.count == 4
+    assert stats.rows == 6
+    assert stats.repeated_statements(3) == ["SELECT * FROM vehicle_issues WHERE vehicle_id = ?"]
+    assert stats.repeated_statements(4) == []
+    assert stats.summary(top=1).splitlines()[1].strip().startswith("1x 4.0ms rows=0 SELECT * FROM vehicles")
+
+
+def profiler(enabled=True, n_plus_one_threshold=3):
+    return fleetify_profiling.SqlProfiler("test.sql", enabled, 10_000, n_plus_one_threshold)
+
+
+def test_profile_block_counts_statements_and_warns_about_n_plus_one(caplog):
+    sql = profiler()
+    engine = create_engine("sqlite://")
+    sql.profile_engine(engine)
+    sql.logger.propagate = True
+
+    with caplog.at_level(logging.INFO, logger="test.sql"):
+        with sql.profile_block("sweeper") as stats:
+            with engine.connect() as connection:
+                for value in range(3):
+                    connection.execute(text(f"SELECT {value}"))
+                with pytest.raises(Exception):
+                    connection.execute(text("SELECT * FROM missing_table"))
+
+    assert stats.count == 3
+    assert list(stats.by_fingerprint) == ["SELECT ?"]
+    assert "possible N+1 in sweeper: 3x SELECT ?" in caplog.text
+
+
+def test_disabled_profiler_attaches_nothing():
+    sql = profiler(enabled=False)
+    engine = create_engine("sqlite://")
+    sql.profile_engine(engine)
+    app = FastAPI()
+    sql.profile_app(app)
+
+    with sql.profile_block("sweeper") as stats:
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+
+    assert stats is None
+    assert app.user_middleware == []
+
+
+def test_profile_app_reports_query_headers():
+    sql = profiler()
+    engine = create_engine("sqlite://")
+    sql.profile_engine(engine)
+    app = FastAPI()
+    sql.profile_app(app)
+
+    @app.get("/vehicles")
+    def read_vehicles():
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+            connection.execute(text("SELECT 2"))
+        return []
+
+    response = TestClient(app).get("/vehicles")
+
+    assert response.headers["X-DB-Queries"] == "2"
+    assert float(response.headers["X-DB-Time"]) >= 0
@@ -0,0 +1,87 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from opentelemetry import trace
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from opentelemetry.trace import SpanKind, StatusCode
+
+import fleetify_tracing
+
+spans = InMemorySpanExporter()
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+TRACEPARENT = f"00-{TRACE_ID}-00f067aa0ba902b7-01"
+
+
+@pytest.fixture(scope="module", autouse=True)
+def tracer_provider():
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(spans))
+    trace.set_tracer_provider(provider)
+
+
+@pytest.fixture(autouse=True)
+def clear_spans():
+    spans.clear()
+
+
+def finished(kind):
+    return [span for span in spans.get_finished_spans() if span.kind == kind]
+
+
+def test_server_span_continues_the_incoming_trace():
+    with fleetify_tracing.server_span("GET", "/vehicles/7", {"traceparent": TRACEPARENT}) as span:
+        fleetify_tracing.finish_server_span(span, "GET", "/vehicles/{vehicle_id}", 503)
+
+    [server] = finished(SpanKind.SERVER)
+    assert format(server.context.trace_id, "032x") == TRACE_ID
+    assert server.name == "GET /vehicles/{vehicle_id}"
+    assert server.status.status_code == StatusCode.ERROR
+
+
+def test_client_span_writes_its_traceparent_into_the_headers():
+    headers = {}
+    with fleetify_tracing.server_span("GET", "/", {"traceparent": TRACEPARENT}):
+        with fleetify_tracing.client_span("GET user-management", headers):
+            pass
+
+    [client] = finished(SpanKind.CLIENT)
+    assert headers["traceparent"] == f"00-{TRACE_ID}-{client.context.span_id:016x}-01"
+
+
+def test_producer_span_continues_saved_trace_headers():
+    with fleetify_tracing.server_span("PUT", "/vehicles/7", {"traceparent": TRACEPARENT}):
+        saved = fleetify_tracing.trace_headers()
+    assert fleetify_tracing.trace_headers() == {}
+
+    headers = {}
+    with fleetify_tracing.producer_span("vehicle_events publish", headers, saved):
+        pass
+    with fleetify_tracing.consumer_span("vehicle_events process", headers):
+        pass
+
+    [server], [producer], [consumer] = finished(SpanKind.SERVER), finished(SpanKind.PRODUCER), finished(SpanKind.CONSUMER)
+    assert producer.parent.span_id == server.context.span_id
+    assert consumer.parent.span_id == producer.context.span_id
+    assert {format(s.context.trace_id, "032x") for s in (server, producer, consumer)} == {TRACE_ID}
+
+
+def test_trace_app_names_spans_by_route(monkeypatch):
+    monkeypatch.setattr(fleetify_tracing, "setup_tracing", lambda *config: None)
+    app = FastAPI()
+    fleetify_tracing.trace_app(app, "test-service", None, None)
+
+    @app.get("/vehicles/{vehicle_id}")
+    def read_vehicle(vehicle_id: int):
+        return {"id": vehicle_id}
+
+    client = TestClient(app)
+    client.get("/vehicles/7", headers={"traceparent": TRACEPARENT})
+    client.get("/health")
+
+    # Newer FastAPI versions add server spans of their own
+    [server] = [span for span in finished(SpanKind.SERVER) if span.instrumentation_scope.name == "fleetify"]
+    assert server.name == "GET /vehicles/{vehicle_id}"
+    assert server.attributes["http.response.status_code"] == 200
+    assert format(server.context.trace_id, "032x") == TRACE_ID
@@ -0,0 +1,85 @@
+import time
+
+import fleetify_auth
+
+SECRET = "gateway-secret"
+TOKEN = "opaque-session-token"
+
+
+def live_revocations():
+    revocations = fleetify_auth.RevocationList(ttl_seconds=300)
+    revocations.live_since = time.monotonic() - 300
+    return revocations
+
+
+def signed_headers(token=TOKEN, secret=SECRET, checked_at=None, timestamp=None, **overrides):
+    now = int(time.time())
+    values = {
+        "x-user-id": "user-1",
+        "x-user-role": "employee",
+        "x-user-manager-id": "admin-1",
+        "x-user-name": "Zofia%20%C5%BB%C3%B3%C5%82w",
+        "x-session-id": "session-1",
+        "x-identity-checked-at": str(checked_at if checked_at is not None else now),
+        "x-identity-timestamp": str(timestamp if timestamp is not None else now),
+    }
+    signature = fleetify_auth.gateway_signature([values[name] for name in fleetify_auth.GATEWAY_HEADERS], token, secret)
+    values["x-identity-signature"] = signature
+    values.update(overrides)
+    return values
+
+
+def verify(headers, authorization=f"Bearer {TOKEN}", revocations=None):
+    return fleetify_auth.verify_gateway_identity(
+        headers, authorization, SECRET, 30, revocations or live_revocations()
+    )
+
+
+def test_accepts_signed_identity():
+    assert verify(signed_headers()) == (
+        {"id": "user-1", "role": "employee", "manager_id": "admin-1", "full_name": "Zofia Żółw", "session_id": "session-1"},
+        "gateway",
+    )
+
+
+def test_ignores_requests_without_identity():
+    assert verify({}) == (None, None)
+    assert verify(signed_headers(), authorization=None) == (None, None)
+
+
+def test_rejects_changed_header():
+    assert verify(signed_headers(**{"x-user-role": "admin"})) == (None, "gateway_invalid")
+
+
+def test_rejects_non_ascii_signature():
+    assert verify(signed_headers(**{"x-identity-signature": "podpis-zażółć"})) == (None, "gateway_invalid")
+
+
+def test_rejects_other_token():
+    assert verify(signed_headers(), authorization="Bearer another-token") == (None, "gateway_invalid")
+
+
+def test_rejects_other_secret():
+    assert verify(signed_headers(secret="other-secret")) == (None, "gateway_invalid")
+
+
+def test_rejects_stale_signature():
+    assert verify(signed_headers(timestamp=int(time.time()) - 60)) == (None, "gateway_invalid")
+
+
+def test_untrusted_without_revocation_feed():
+    assert verify(signed_headers(), revocations=fleetify_auth.RevocationList(300)) == (None, "gateway_untrusted")
+
+
+def test_rejects_logged_out_session():
+    revocations = live_revocations()
+    revocations.add({"sid": "session-1", "until": time.time() + 300})
+    assert verify(signed_headers(), revocations=revocations) == (None, "gateway_revoked")
+
+
+def test_rejects_user_changed_after_check():
+    now = int(time.time())
+    revocations = live_revocations()
+    revocations.add({"sub": "user-1", "issued_before": now, "until": now + 300})
+    assert verify(signed_headers(checked_at=now - 20), revocations=revocations) == (None, "gateway_revoked")
+    assert verify(signed_headers(checked_at=now + 1), revocations=revocations)[1] == "gateway"
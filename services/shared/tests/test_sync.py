@@ -0,0 +1,10 @@
+import sync
+
+
+def test_copies_match_the_shared_modules():
+    assert sync.stale_copies() == []
+
+
+def test_every_shared_module_is_copied():
+    shared = {path.name for path in sync.SHARED.glob("*.py")} - {"sync.py"}
+    assert shared == set(sync.COPIES)
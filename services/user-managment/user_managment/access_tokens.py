@@ -0,0 +1,155 @@
+"""
+Short-lived signed access tokens.
+
+Login, register and POST /api/auth/refresh return an access token next to the
+session (refresh) token: a JWT signed with ACCESS_TOKEN_SECRET (HS256) that
+carries sub (user id), sid (session id), role, manager_id, email and name, and
+expires after ACCESS_TOKEN_TTL_SECONDS. The FastAPI services check it with
+the same secret instead of calling /api/users/me for every request, all with
+the same code (fleetify_auth, copied from services/shared). Without a secret
+no access tokens are issued and everything keeps using the session token.
+
+An access token cannot be called back, so whatever should end it early is
+broadcast on the AUTH_REVOCATIONS_EXCHANGE fanout exchange once committed:
+- {"sid", "until"} when a session logs out,
+- {"sub", "issued_before", "until"} when a user's status, role, manager,
+  email or name changes, or the user is deleted.
+"until" is when the last token the entry covers expires, so services can
+forget it then. The same feed voids the identities nginx-gateway caches and
+forwards (at most a minute old, well within a token lifetime), so it is
+published even without access tokens. Publishing is best effort; services that are not on the
+feed, or have not been on it for a whole token lifetime, send tokens to
+/api/users/me instead, and this service checks the session behind an access
+token on every request (see SessionTokenAuthentication).
+"""
+import json
+import queue
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+import pika
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import fleetify_auth
+from .metrics import ACCESS_TOKEN_REVOCATIONS
+from .models import User, UserSession
+
+# User fields that end up in the token
+CLAIM_FIELDS = {"status", "role", "manager", "email", "full_name"}
+
+# Committed revocations waiting for the publisher thread
+_outgoing: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=10000)
+_publisher_started = threading.Event()
+_publisher_lock = threading.Lock()
+
+
+def enabled() -> bool:
+    return bool(settings.ACCESS_TOKEN_SECRET)
+
+
+def is_access_token(token: str) -> bool:
+    return fleetify_auth.is_access_token(token)
+
+
+def issue(session: UserSession) -> Optional[Tuple[str, datetime]]:
+    """(token, expires_at) for the session's user, never outliving the session; None when disabled."""
+    if not enabled():
+        return None
+    now = timezone.now()
+    expires_at = min(now + timedelta(seconds=settings.ACCESS_TOKEN_TTL_SECONDS), session.expires_at)
+    user = session.user
+    claims = {
+        "sub": str(user.id),
+        "sid": str(session.id),
+        "role": user.role,
+        "manager_id": str(user.manager_id) if user.manager_id else None,
+        "email": user.email,
+        "name": user.full_name,
+        "iat": int(now.timestamp()),
+        "exp": int(expires_at.timestamp()),
+    }
+    return fleetify_auth.encode_access_token(claims, settings.ACCESS_TOKEN_SECRET), expires_at
+
+
+def decode(token: str) -> Optional[Dict[str, Any]]:
+    """The claims of a correctly signed, unexpired access token, else None."""
+    if not enabled():
+        return None
+    return fleetify_auth.decode_access_token(token, settings.ACCESS_TOKEN_SECRET)
+
+
+def _connection_parameters() -> pika.ConnectionParameters:
+    credentials = pika.PlainCredentials(settings.RABBITMQ_USER, settings.RABBITMQ_PASS)
+    return pika.ConnectionParameters(host=settings.RABBITMQ_HOST, credentials=credentials)
+
+
+def _run_publisher() -> None:
+    connection = channel = None
+    while True:
+        message = _outgoing.get()
+        try:
+            if channel is None or not channel.is_open:
+                connection = pika.BlockingConnection(_connection_parameters())
+                channel = connection.channel()
+                channel.exchange_declare(exchange=settings.AUTH_REVOCATIONS_EXCHANGE, exchange_type="fanout", durable=True)
+            channel.basic_publish(exchange=settings.AUTH_REVOCATIONS_EXCHANGE, routing_key="", body=json.dumps(message))
+            ACCESS_TOKEN_REVOCATIONS.labels("published").inc()
+        except Exception as e:
+            # Services that missed it still send these tokens to /api/users/me once they notice the gap
+            print(f"[UserManagement] Publishing token revocation failed: {e}")
+            ACCESS_TOKEN_REVOCATIONS.labels("failed").inc()
+            try:
+                if connection is not None and connection.is_open:
+                    connection.close()
+            except Exception:
+                pass
+            connection = channel = None
+
+
+def _publish(message: Dict[str, Any]) -> None:
+    if not _publisher_started.is_set():
+        with _publisher_lock:
+            if not _publisher_started.is_set():
+                threading.Thread(target=_run_publisher, daemon=True).start()
+                _publisher_started.set()
+    try:
+        _outgoing.put_nowait(message)
+    except queue.Full:
+        ACCESS_TOKEN_REVOCATIONS.labels("dropped").inc()
+
+
+def _until() -> int:
+    return int(time.time() + settings.ACCESS_TOKEN_TTL_SECONDS)
+
+
+def revoke_session(session: UserSession) -> None:
+    """End the session's access tokens and gateway identities once the caller's transaction commits (logout)."""
+    if settings.AUTH_REVOCATIONS_ENABLED:
+        session_id = str(session.id)
+        transaction.on_commit(lambda: _publish({"sid": session_id, "until": _until()}))
+
+
+def revoke_user(user_id) -> None:
+    """End every access token or gateway identity of a user issued up to the moment the caller's transaction commits."""
+    if settings.AUTH_REVOCATIONS_ENABLED:
+        user_id = str(user_id)
+        transaction.on_commit(
+            lambda: _publish({"sub": user_id, "issued_before": int(time.time()), "until": _until()})
+        )
+
+
+@receiver(post_save, sender=User, dispatch_uid="access_tokens_user_saved")
+def _user_saved(sender, instance, created, update_fields=None, **kwargs):
+    if not created and (update_fields is None or CLAIM_FIELDS & set(update_fields)):
+        revoke_user(instance.pk)
+
+
+@receiver(post_delete, sender=User, dispatch_uid="access_tokens_user_deleted")
+def _user_deleted(sender, instance, **kwargs):
+    revoke_user(instance.pk)
@@ -5,3 +5,6 @@ class UserManagmentConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "user_managment"
     verbose_name = "User Management"
+
+    def ready(self):
+        from . import access_tokens, session_cache  # noqa: F401  (register the user change hooks)
@@ -1,13 +1,19 @@
 from __future__ import annotations
 
-from django.utils import timezone
 from rest_framework import authentication, exceptions
 
-from .models import UserSession
+from . import access_tokens
+from .session_cache import lookup, lookup_session
 
 
 class SessionTokenAuthentication(authentication.BaseAuthentication):
-    """Simple bearer-token auth backed by the user_sessions table."""
+    """
+    Bearer-token auth backed by the user_sessions table (lookups cached, see session_cache).
+
+    Takes session tokens and access tokens. An access token is only as good as
+    the session it was issued for, so it stops working here at logout and
+    always resolves to the user as they are now.
+    """
 
     keyword = "Bearer"
 
@@ -20,12 +26,11 @@ class SessionTokenAuthentication(authentication.BaseAuthentication):
         if len(auth_header) == 1:
             raise exceptions.AuthenticationFailed("Invalid authorization header format.")
         token = auth_header[1].decode()
-        try:
-            session = (
-                UserSession.objects.select_related("user")
-                .filter(refresh_token=token, expires_at__gt=timezone.now())
-                .get()
-            )
-        except UserSession.DoesNotExist as exc:
-            raise exceptions.AuthenticationFailed("Invalid or expired session token.") from exc
+        if access_tokens.is_access_token(token):
+            claims = access_tokens.decode(token)
+            session = lookup_session(claims["sid"]) if claims else None
+        else:
+            session = lookup(token)
+        if session is None:
+            raise exceptions.AuthenticationFailed("Invalid or expired session token.")
         return session.user, session
@@ -0,0 +1,148 @@
+"""
+Prometheus metrics shared by every Fleetify Python service.
+
+This is the canonical copy. Each service's build context gets a byte-identical
+copy (services/shared/sync.py writes them, the shared tests fail while one
+differs), so edit this file and re-run the sync, never a copy.
+
+The metrics defined here are the ones more than one service reports, so their
+names, labels and buckets cannot drift apart between services; each service's
+metrics.py re-exports them next to its own. instrument_app() and
+instrument_engine() wire them into FastAPI and SQLAlchemy. Neither is imported
+at module level: user-management (Django) times its requests with its own
+middleware and the dashboard has no database.
+"""
+import time
+from contextlib import contextmanager
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency per route",
+    ["method", "route", "status"],
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being served",
+)
+DOWNSTREAM_LATENCY = Histogram(
+    "downstream_request_duration_seconds",
+    "Latency of calls to other services",
+    ["target", "method", "outcome"],
+)
+DB_QUERY_LATENCY = Histogram(
+    "db_query_duration_seconds",
+    "Database statement execution time",
+    ["operation"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+RABBITMQ_PUBLISH_LATENCY = Histogram(
+    "rabbitmq_publish_duration_seconds",
+    "Time spent publishing a message to RabbitMQ (connect + publish)",
+    ["queue"],
+)
+RABBITMQ_PUBLISH_FAILURES = Counter(
+    "rabbitmq_publish_failures_total",
+    "Messages that could not be published to RabbitMQ",
+    ["queue"],
+)
+EVENTS_CONSUMED = Counter(
+    "rabbitmq_messages_consumed_total",
+    "Messages received from RabbitMQ",
+    ["queue"],
+)
+OUTBOX_EVENTS = Counter(
+    "outbox_events_total",
+    "Outbox events by stage (enqueued, published, failed)",
+    ["stage"],
+)
+ACCESS_TOKEN_CHECKS = Counter(
+    "access_token_checks_total",
+    "Callers identified locally by result (gateway, gateway_invalid, gateway_untrusted, gateway_revoked, verified, revoked, invalid, untrusted, session_token)",
+    ["result"],
+)
+RETENTION_ROWS_ARCHIVED = Counter(
+    "retention_rows_archived_total",
+    "Rows moved from a hot table to its archive by the retention job",
+    ["table"],
+)
+RETENTION_PARTITIONS_DROPPED = Counter(
+    "retention_partitions_dropped_total",
+    "Archive partitions dropped after their retention",
+    ["table"],
+)
+
+
+def statement_operation(statement: str) -> str:
+    """DB_QUERY_LATENCY label of a SQL statement: its first keyword."""
+    return statement.lstrip().split(" ", 1)[0].upper() or "OTHER"
+
+
+def metrics_body():
+    """(body, content type) of the /metrics response."""
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+def instrument_app(app) -> None:
+    """Register the request metrics middleware and the /metrics endpoint on a FastAPI app."""
+    from fastapi import Request, Response
+
+    def route_label(request: Request) -> str:
+        # Use the route template (/vehicles/{vehicle_id}) so label cardinality stays bounded
+        route = request.scope.get("route")
+        return getattr(route, "path", None) or "unmatched"
+
+    @app.middleware("http")
+    async def metrics_middleware(request: Request, call_next):
+        if request.url.path == "/metrics":
+            return await call_next(request)
+        REQUESTS_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        status_code = 500
+        try:
+            response = await call_next(request)
+            status_code = response.status_code
+            return response
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            REQUEST_LATENCY.labels(request.method, route_label(request), str(status_code)).observe(
+                time.perf_counter() - started
+            )
+
+    @app.get("/metrics", include_in_schema=False)
+    def metrics():
+        body, content_type = metrics_body()
+        return Response(body, media_type=content_type)
+
+
+def instrument_engine(engine) -> None:
+    """Record the duration of every statement executed through a SQLAlchemy engine."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_start_time"].pop()
+        DB_QUERY_LATENCY.labels(statement_operation(statement)).observe(time.perf_counter() - started)
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(context):
+        stack = context.connection.info.get("query_start_time") if context.connection else None
+        if stack:
+            stack.pop()
+
+
+@contextmanager
+def observe_downstream(target: str, method: str = "GET"):
+    """Time a call to another service, labelled by target and outcome."""
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        DOWNSTREAM_LATENCY.labels(target, method, outcome).observe(time.perf_counter() - started)
@@ -0,0 +1,26 @@
+import time
+
+import httpx
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from prometheus_client import start_http_server
+
+from user_managment.notification_outbox import relay_batch
+
+
+class Command(BaseCommand):
+    help = "Deliver queued notifications to notifications-service (see notification_outbox.py)"
+
+    def handle(self, *args, **options):
+        if not settings.NOTIFICATIONS_SERVICE_TOKEN or not settings.NOTIFICATIONS_SERVICE_URL:
+            self.stderr.write("NOTIFICATIONS_SERVICE_URL/TOKEN not set, notifications stay queued")
+        start_http_server(settings.NOTIFICATION_RELAY_METRICS_PORT)
+        with httpx.Client(timeout=10.0, follow_redirects=True) as client:
+            while True:
+                try:
+                    claimed = relay_batch(client)
+                except Exception as exc:
+                    self.stderr.write(f"Notification relay failed: {exc}")
+                    claimed = 0
+                if claimed < settings.NOTIFICATION_RELAY_BATCH_SIZE:
+                    time.sleep(settings.NOTIFICATION_RELAY_POLL_INTERVAL_SECONDS)
@@ -0,0 +1,35 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from prometheus_client import start_http_server
+
+from user_managment.retention import run_retention
+
+
+class Command(BaseCommand):
+    help = "Move old login attempts and audit log entries to their archive tables (see retention.py)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Run a single pass and exit")
+
+    def handle(self, *args, **options):
+        if options["once"]:
+            self._run_pass()
+            return
+        # Long-running scheduler: expose the retention counters for Prometheus
+        start_http_server(settings.RETENTION_METRICS_PORT)
+        while True:
+            try:
+                self._run_pass()
+            except Exception as exc:
+                self.stderr.write(f"Retention pass failed: {exc}")
+            time.sleep(settings.RETENTION_INTERVAL_SECONDS)
+
+    def _run_pass(self):
+        archived = run_retention()
+        if archived is None:
+            self.stdout.write("Another retention runner holds the lock, skipping")
+        elif any(archived.values()):
+            summary = ", ".join(f"{table}: {count}" for table, count in archived.items())
+            self.stdout.write(f"Archived rows - {summary}")
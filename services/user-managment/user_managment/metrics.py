@@ -0,0 +1,77 @@
+"""
+Prometheus instrumentation for the user management service.
+
+MetricsMiddleware records per-route latency, in-flight requests and the time
+each request spends in the database; metrics_view exposes them on /metrics.
+Metrics that several services report are defined once in fleetify_metrics (a
+copy of services/shared); the ones below are this service's own.
+"""
+import time
+
+from django.db import connection
+from django.http import HttpResponse
+from prometheus_client import Counter
+
+from .fleetify_metrics import (
+    DB_QUERY_LATENCY,
+    REQUEST_LATENCY,
+    REQUESTS_IN_FLIGHT,
+    RETENTION_PARTITIONS_DROPPED,
+    RETENTION_ROWS_ARCHIVED,
+    metrics_body,
+    observe_downstream,
+    statement_operation,
+)
+
+AUTH_CACHE = Counter(
+    "auth_cache_lookups_total",
+    "Session token lookups by cache result (hit, negative_hit, miss)",
+    ["result"],
+)
+ACCESS_TOKEN_REVOCATIONS = Counter(
+    "access_token_revocations_total",
+    "Access token revocations sent to the broker by outcome (published, failed, dropped)",
+    ["outcome"],
+)
+NOTIFICATION_OUTBOX = Counter(
+    "notification_outbox_total",
+    "Queued notifications by outcome (enqueued, delivered, retried, parked)",
+    ["outcome"],
+)
+
+
+def _time_query(execute, sql, params, many, context):
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        DB_QUERY_LATENCY.labels(statement_operation(sql)).observe(time.perf_counter() - started)
+
+
+class MetricsMiddleware:
+    """Times every request, labelled by the matched URL pattern rather than the raw path."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.path == "/metrics":
+            return self.get_response(request)
+        REQUESTS_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        status_code = 500
+        try:
+            with connection.execute_wrapper(_time_query):
+                response = self.get_response(request)
+            status_code = response.status_code
+            return response
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            match = getattr(request, "resolver_match", None)
+            route = match.route if match and match.route else "unmatched"
+            REQUEST_LATENCY.labels(request.method, route, str(status_code)).observe(time.perf_counter() - started)
+
+
+def metrics_view(request):
+    body, content_type = metrics_body()
+    return HttpResponse(body, content_type=content_type)
@@ -180,8 +180,10 @@ class LoginAttempt(models.Model):
     def get_recent_failed_attempts(cls, email: str, minutes: int = 15) -> int:
         """Count failed login attempts in the last N minutes"""
         cutoff = timezone.now() - timezone.timedelta(minutes=minutes)
+        # email is CITEXT, so plain equality is already case-insensitive and, unlike iexact's
+        # UPPER(email::text), can use idx_login_attempts_failed
         return cls.objects.filter(
-            email__iexact=email,
+            email=email,
             success=False,
             attempted_at__gte=cutoff
         ).count()
@@ -235,3 +237,19 @@ class SecurityAuditLog(models.Model):
             user_agent=user_agent,
             details=details or {}
         )
+
+
+class NotificationOutbox(models.Model):
+    """Notifications waiting for delivery to notifications-service (see notification_outbox.py)"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    payload = models.JSONField()
+    attempts = models.IntegerField(default=0)
+    last_error = models.TextField(null=True, blank=True)
+    # NULL once parked: notifications-service rejected the payload itself
+    next_attempt_at = models.DateTimeField(null=True, default=timezone.now)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = "notification_outbox"
+        managed = False
+        ordering = ["created_at"]
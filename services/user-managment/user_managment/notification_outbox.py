@@ -0,0 +1,128 @@
+"""
+Durable, asynchronous delivery of notifications to notifications-service.
+
+Views call queue_notification() inside the transaction that makes the
+notification true (an invite), so the row exists exactly when the change
+committed and the request never waits on notifications-service. The relay
+(`manage.py run_notification_relay`) claims due rows with FOR UPDATE SKIP
+LOCKED and leases them (next_attempt_at pushed NOTIFICATION_RELAY_LEASE_SECONDS
+ahead) in one short transaction, so several relays can run side by side and
+no lock is held while it posts them in batches to POST /notifications/batch.
+A second short transaction then deletes delivered rows and schedules failed
+ones for a retry with exponential backoff. Rows of a relay that died mid-batch
+come due again when their lease runs out.
+
+Each row's id becomes the notification id and notifications-service ignores
+ids it already has, so a batch that is delivered but not deleted (crash,
+timeout) is not shown twice. A payload notifications-service rejects as
+invalid (4xx) is parked (next_attempt_at NULL) instead of retried forever.
+"""
+import logging
+from datetime import timedelta
+from typing import List, Tuple
+
+import httpx
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .metrics import NOTIFICATION_OUTBOX, observe_downstream
+from .models import NotificationOutbox
+from .tracing import client_span
+
+logger = logging.getLogger(__name__)
+
+
+def queue_notification(payload: dict) -> None:
+    """Add a notification to the caller's transaction; the relay delivers it after commit."""
+    NotificationOutbox.objects.create(payload=payload)
+    NOTIFICATION_OUTBOX.labels("enqueued").inc()
+
+
+def _post(client: httpx.Client, rows: List[NotificationOutbox]) -> None:
+    headers = {"X-Service-Token": settings.NOTIFICATIONS_SERVICE_TOKEN}
+    body = [{**row.payload, "id": str(row.id)} for row in rows]
+    with observe_downstream("notifications-service", "POST"), client_span("POST notifications-service", headers):
+        response = client.post(f"{settings.NOTIFICATIONS_SERVICE_URL}/notifications/batch", json=body, headers=headers)
+        response.raise_for_status()
+
+
+def _is_rejection(exc: Exception) -> bool:
+    """The payload itself is wrong, so retrying will not help (auth problems and throttling are retried)."""
+    return (
+        isinstance(exc, httpx.HTTPStatusError)
+        and 400 <= exc.response.status_code < 500
+        and exc.response.status_code not in (401, 403, 408, 429)
+    )
+
+
+def _retry_later(row: NotificationOutbox, exc: Exception, now) -> None:
+    row.attempts += 1
+    row.last_error = str(exc)[:500]
+    delay = min(settings.NOTIFICATION_RELAY_MAX_BACKOFF_SECONDS,
+                settings.NOTIFICATION_RELAY_POLL_INTERVAL_SECONDS * 2 ** row.attempts)
+    row.next_attempt_at = now + timedelta(seconds=delay)
+    row.save(update_fields=["attempts", "last_error", "next_attempt_at"])
+    NOTIFICATION_OUTBOX.labels("retried").inc()
+
+
+def _park(row: NotificationOutbox, exc: Exception) -> None:
+    row.attempts += 1
+    row.last_error = str(exc)[:500]
+    row.next_attempt_at = None
+    row.save(update_fields=["attempts", "last_error", "next_attempt_at"])
+    NOTIFICATION_OUTBOX.labels("parked").inc()
+    logger.error("Notification %s rejected by notifications-service, parked: %s", row.id, exc)
+
+
+def _claim(now) -> List[NotificationOutbox]:
+    """Lease up to NOTIFICATION_RELAY_BATCH_SIZE due rows to this relay."""
+    with transaction.atomic():
+        rows = list(
+            NotificationOutbox.objects.select_for_update(skip_locked=True)
+            .filter(next_attempt_at__lte=now)
+            .order_by("created_at")[: settings.NOTIFICATION_RELAY_BATCH_SIZE]
+        )
+        if rows:
+            lease_until = now + timedelta(seconds=settings.NOTIFICATION_RELAY_LEASE_SECONDS)
+            NotificationOutbox.objects.filter(id__in=[row.id for row in rows]).update(next_attempt_at=lease_until)
+    return rows
+
+
+def _deliver(client: httpx.Client, rows: List[NotificationOutbox]) -> Tuple[list, list, list]:
+    """(delivered, to retry, rejected): rows by outcome, the failed ones with their error."""
+    try:
+        _post(client, rows)
+    except httpx.HTTPError as exc:
+        if not _is_rejection(exc):
+            return [], [(row, exc) for row in rows], []
+    else:
+        return rows, [], []
+    # One bad payload fails the whole batch: find it, deliver the rest
+    delivered, retry, rejected = [], [], []
+    for row in rows:
+        try:
+            _post(client, [row])
+        except httpx.HTTPError as row_exc:
+            (rejected if _is_rejection(row_exc) else retry).append((row, row_exc))
+        else:
+            delivered.append(row)
+    return delivered, retry, rejected
+
+
+def relay_batch(client: httpx.Client) -> int:
+    """Deliver up to NOTIFICATION_RELAY_BATCH_SIZE due rows; returns how many rows were claimed."""
+    now = timezone.now()
+    rows = _claim(now)
+    if not rows:
+        return 0
+    delivered, retry, rejected = _deliver(client, rows)
+    settled_at = timezone.now()
+    with transaction.atomic():
+        NotificationOutbox.objects.filter(id__in=[row.id for row in delivered]).delete()
+        for row, exc in retry:
+            _retry_later(row, exc, settled_at)
+        for row, exc in rejected:
+            _park(row, exc)
+    NOTIFICATION_OUTBOX.labels("delivered").inc(len(delivered))
+    return len(rows)
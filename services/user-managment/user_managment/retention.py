@@ -0,0 +1,154 @@
+"""
+Retention for the append-only security tables.
+
+login_attempts and security_audit_log only ever grow, and every login counts
+recent failures in login_attempts. Each table has a policy: rows older than
+keep_days move to <table>_archive, a table range-partitioned by month of the
+row's timestamp, and archive months older than archive_days are dropped
+whole.
+
+Rows move in batches (DELETE ... RETURNING into the archive, SKIP LOCKED),
+each in its own short transaction with a pause in between, so logins never
+wait behind the job. Run by `manage.py run_retention`; one runner at a time
+(advisory lock).
+"""
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional, Type
+
+from django.conf import settings
+from django.db import connection, models, transaction
+
+from .metrics import RETENTION_PARTITIONS_DROPPED, RETENTION_ROWS_ARCHIVED
+from .models import LoginAttempt, SecurityAuditLog
+
+# pg_try_advisory_lock key shared by all retention runners
+RETENTION_LOCK_KEY = 0x05EC_0001
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    model: Type[models.Model]
+    time_column: str
+    keep_days: int
+    archive_days: int
+
+    @property
+    def table(self) -> str:
+        return self.model._meta.db_table
+
+    @property
+    def archive(self) -> str:
+        return f"{self.table}_archive"
+
+    @property
+    def columns(self) -> str:
+        return ", ".join(field.column for field in self.model._meta.concrete_fields)
+
+
+def policies() -> List[RetentionPolicy]:
+    return [
+        RetentionPolicy(LoginAttempt, "attempted_at",
+                        settings.LOGIN_ATTEMPTS_RETENTION_DAYS, settings.LOGIN_ATTEMPTS_ARCHIVE_RETENTION_DAYS),
+        RetentionPolicy(SecurityAuditLog, "created_at",
+                        settings.AUDIT_LOG_RETENTION_DAYS, settings.AUDIT_LOG_ARCHIVE_RETENTION_DAYS),
+    ]
+
+
+def _month_start(day: date) -> datetime:
+    return datetime(day.year, day.month, 1, tzinfo=timezone.utc)
+
+
+def _next_month(day: date) -> date:
+    return date(day.year + day.month // 12, day.month % 12 + 1, 1)
+
+
+def ensure_archive_partitions(cursor, policy: RetentionPolicy, cutoff: datetime) -> None:
+    """Monthly archive partitions from the oldest live row through the cutoff month."""
+    cursor.execute(
+        f"SELECT min({policy.time_column}) FROM {policy.table} WHERE {policy.time_column} < %s", [cutoff]
+    )
+    oldest = cursor.fetchone()[0]
+    if oldest is None:
+        return
+    month = oldest.astimezone(timezone.utc).date().replace(day=1)
+    while month <= cutoff.date():
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {policy.archive}_p{month:%Y%m} PARTITION OF {policy.archive} "
+            f"FOR VALUES FROM ('{_month_start(month).isoformat()}') TO ('{_month_start(_next_month(month)).isoformat()}')"
+        )
+        month = _next_month(month)
+
+
+def archive_batches(policy: RetentionPolicy, now: datetime) -> int:
+    """Move expired rows batch by batch; stops after RETENTION_MAX_BATCHES so one run stays bounded."""
+    cutoff = now - timedelta(days=policy.keep_days)
+    with connection.cursor() as cursor:
+        ensure_archive_partitions(cursor, policy, cutoff)
+    move_batch = f"""
+        WITH moved AS (
+            DELETE FROM {policy.table} WHERE id IN (
+                SELECT id FROM {policy.table}
+                WHERE {policy.time_column} < %s
+                ORDER BY {policy.time_column}
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING {policy.columns}
+        )
+        INSERT INTO {policy.archive} ({policy.columns}) SELECT {policy.columns} FROM moved
+    """
+    moved = 0
+    for _ in range(settings.RETENTION_MAX_BATCHES):
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(move_batch, [cutoff, settings.RETENTION_BATCH_SIZE])
+            count = cursor.rowcount
+        moved += count
+        RETENTION_ROWS_ARCHIVED.labels(policy.table).inc(count)
+        if count < settings.RETENTION_BATCH_SIZE:
+            break
+        time.sleep(settings.RETENTION_BATCH_PAUSE_SECONDS)
+    return moved
+
+
+def drop_expired_archive(policy: RetentionPolicy, now: datetime) -> int:
+    cutoff = now - timedelta(days=policy.archive_days)
+    prefix = f"{policy.archive}_p"
+    dropped = 0
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = CAST(%s AS regclass)",
+            [policy.archive],
+        )
+        for (name,) in cursor.fetchall():
+            if not name.startswith(prefix):
+                continue
+            try:
+                month = datetime.strptime(name[len(prefix):], "%Y%m").date()
+            except ValueError:
+                continue
+            if _month_start(_next_month(month)) <= cutoff:
+                cursor.execute(f"DROP TABLE {name}")
+                dropped += 1
+    RETENTION_PARTITIONS_DROPPED.labels(policy.archive).inc(dropped)
+    return dropped
+
+
+def run_retention(now: Optional[datetime] = None) -> Optional[Dict[str, int]]:
+    """One pass over every policy: rows archived per table, or None when another runner holds the lock."""
+    now = now or datetime.now(timezone.utc)
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_try_advisory_lock(%s)", [RETENTION_LOCK_KEY])
+        if not cursor.fetchone()[0]:
+            return None
+    try:
+        archived = {}
+        for policy in policies():
+            archived[policy.table] = archive_batches(policy, now)
+            drop_expired_archive(policy, now)
+        return archived
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_unlock(%s)", [RETENTION_LOCK_KEY])
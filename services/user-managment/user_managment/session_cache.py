@@ -0,0 +1,130 @@
+"""
+Cache of bearer-token lookups for SessionTokenAuthentication.
+
+Every request to this service, including the /api/users/me call the other
+services make for each of theirs, resolves its token to a session and user.
+Resolved sessions (with their user) are cached in the "auth" cache for up to
+AUTH_CACHE_TTL_SECONDS, never past the session's expiry. Unknown or expired
+tokens are cached as invalid for AUTH_CACHE_NEGATIVE_TTL_SECONDS, so a client
+retrying a dead token does not hit the database either. Keys are hashes of
+the tokens, never the tokens themselves. Sessions behind access tokens are
+cached the same way under their id.
+
+The "auth" cache is a bounded in-process LRU by default, or Redis shared by
+all replicas when AUTH_CACHE_REDIS_URL is set (see settings).
+
+Invalidation:
+- logout forgets its session;
+- saving or deleting a user (status, role, manager, subscription) and
+  logging in replace the user's version. Cached sessions remember the
+  version current when they were read and are ignored once it changes, so
+  all of a user's tokens drop out at once without tracking them. A version
+  evicted from the cache counts as changed. A change that commits in the
+  instant between a lookup's query and its cache write can still be served
+  stale, for at most AUTH_CACHE_TTL_SECONDS.
+"""
+import hashlib
+import uuid
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .metrics import AUTH_CACHE
+from .models import User, UserSession
+
+# Cached in place of a session for tokens that matched nothing
+INVALID = "invalid"
+
+
+def _cache():
+    return caches["auth"]
+
+
+def _token_key(token: str) -> str:
+    return "session:" + hashlib.sha256(token.encode()).hexdigest()
+
+
+def _version_key(user_id) -> str:
+    return f"session-user:{user_id}"
+
+
+def _user_version(user_id) -> str:
+    """The user's current version, starting a new one if it was never set or has been evicted."""
+    cache = _cache()
+    key = _version_key(user_id)
+    cache.add(key, uuid.uuid4().hex, settings.AUTH_CACHE_TTL_SECONDS * 2)
+    return cache.get(key) or ""
+
+
+def _session_key(session_id) -> str:
+    return f"session-id:{session_id}"
+
+
+def _load(**match) -> Optional[UserSession]:
+    try:
+        return (
+            UserSession.objects.select_related("user")
+            .filter(expires_at__gt=timezone.now(), **match)
+            .get()
+        )
+    except (UserSession.DoesNotExist, ValidationError):
+        return None
+
+
+def _lookup(key: str, **match) -> Optional[UserSession]:
+    if settings.AUTH_CACHE_TTL_SECONDS <= 0:
+        return _load(**match)
+    cache = _cache()
+    cached = cache.get(key)
+    if cached == INVALID:
+        AUTH_CACHE.labels("negative_hit").inc()
+        return None
+    if cached is not None:
+        session, version = cached
+        if session.expires_at > timezone.now() and cache.get(_version_key(session.user_id)) == version:
+            AUTH_CACHE.labels("hit").inc()
+            return session
+    AUTH_CACHE.labels("miss").inc()
+
+    session = _load(**match)
+    if session is None:
+        cache.set(key, INVALID, settings.AUTH_CACHE_NEGATIVE_TTL_SECONDS)
+        return None
+    version = _user_version(session.user_id)
+    ttl = min(settings.AUTH_CACHE_TTL_SECONDS, (session.expires_at - timezone.now()).total_seconds())
+    if ttl > 0:
+        cache.set(key, (session, version), ttl)
+    return session
+
+
+def lookup(token: str) -> Optional[UserSession]:
+    """The live session (with .user loaded) for a session token, or None; from the cache when possible."""
+    return _lookup(_token_key(token), refresh_token=token)
+
+
+def lookup_session(session_id) -> Optional[UserSession]:
+    """The live session (with .user loaded) with this id, for access tokens; cached like lookup()."""
+    return _lookup(_session_key(session_id), id=session_id)
+
+
+def forget_session(session: UserSession) -> None:
+    """Drop a session under its token and its id once the caller's transaction commits (logout)."""
+    keys = [_token_key(session.refresh_token), _session_key(session.id)]
+    transaction.on_commit(lambda: _cache().delete_many(keys))
+
+
+def invalidate_user(user_id) -> None:
+    """Drop every cached session of a user once the caller's transaction commits."""
+    transaction.on_commit(lambda: _cache().delete(_version_key(user_id)))
+
+
+@receiver(post_save, sender=User, dispatch_uid="session_cache_user_saved")
+@receiver(post_delete, sender=User, dispatch_uid="session_cache_user_deleted")
+def _user_changed(sender, instance, **kwargs):
+    invalidate_user(instance.pk)
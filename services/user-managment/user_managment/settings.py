@@ -50,6 +50,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'user_managment.metrics.MetricsMiddleware',
+    'user_managment.tracing.TracingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -95,10 +97,70 @@ DATABASES = {
     }
 }
 
+# Session token cache (session_cache.py): resolved sessions are kept up to AUTH_CACHE_TTL_SECONDS (0 disables),
+# unknown tokens AUTH_CACHE_NEGATIVE_TTL_SECONDS; in-process LRU of AUTH_CACHE_MAX_ENTRIES per worker unless
+# AUTH_CACHE_REDIS_URL (e.g. redis://redis:6379/1, needs the redis package) shares it between replicas
+AUTH_CACHE_TTL_SECONDS = float(os.environ.get('AUTH_CACHE_TTL_SECONDS', '60'))
+AUTH_CACHE_NEGATIVE_TTL_SECONDS = float(os.environ.get('AUTH_CACHE_NEGATIVE_TTL_SECONDS', '30'))
+AUTH_CACHE_MAX_ENTRIES = int(os.environ.get('AUTH_CACHE_MAX_ENTRIES', '10000'))
+AUTH_CACHE_REDIS_URL = os.environ.get('AUTH_CACHE_REDIS_URL', '')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'auth': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': AUTH_CACHE_REDIS_URL,
+        'KEY_PREFIX': 'auth',
+    } if AUTH_CACHE_REDIS_URL else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'auth',
+        'OPTIONS': {'MAX_ENTRIES': AUTH_CACHE_MAX_ENTRIES},
+    },
+}
+
+# Access tokens (access_tokens.py): signed with ACCESS_TOKEN_SECRET, shared with the FastAPI services that
+# verify them (unset: none are issued); revocations go to a fanout exchange every service listens on, also
+# for nginx-gateway identities, so they are published either way unless AUTH_REVOCATIONS_ENABLED=false
+ACCESS_TOKEN_SECRET = os.environ.get('ACCESS_TOKEN_SECRET', '')
+ACCESS_TOKEN_TTL_SECONDS = int(os.environ.get('ACCESS_TOKEN_TTL_SECONDS', '300'))
+AUTH_REVOCATIONS_ENABLED = os.environ.get('AUTH_REVOCATIONS_ENABLED', 'true').lower() == 'true'
+AUTH_REVOCATIONS_EXCHANGE = os.environ.get('AUTH_REVOCATIONS_EXCHANGE', 'auth.revocations')
+RABBITMQ_HOST = os.environ.get('RABBITMQ_HOST', 'rabbitmq')
+RABBITMQ_USER = os.environ.get('RABBITMQ_USER')
+RABBITMQ_PASS = os.environ.get('RABBITMQ_PASS')
+
 NOTIFICATIONS_SERVICE_URL = os.environ.get('NOTIFICATIONS_SERVICE_URL', 'http://notifications-service:8000')
 NOTIFICATIONS_SERVICE_TOKEN = os.environ.get('NOTIFICATIONS_SERVICE_TOKEN', '')
 INTERNAL_SERVICE_TOKEN = os.environ.get('INTERNAL_SERVICE_TOKEN', '')
 
+# Notification relay (manage.py run_notification_relay): queued notifications are posted in batches,
+# failures retried with exponential backoff up to the cap
+NOTIFICATION_RELAY_BATCH_SIZE = int(os.environ.get('NOTIFICATION_RELAY_BATCH_SIZE', '100'))
+NOTIFICATION_RELAY_POLL_INTERVAL_SECONDS = float(os.environ.get('NOTIFICATION_RELAY_POLL_INTERVAL_SECONDS', '1'))
+NOTIFICATION_RELAY_MAX_BACKOFF_SECONDS = float(os.environ.get('NOTIFICATION_RELAY_MAX_BACKOFF_SECONDS', '300'))
+# How long claimed rows stay hidden from other relays while one posts them; outlive a batch's requests
+NOTIFICATION_RELAY_LEASE_SECONDS = float(os.environ.get('NOTIFICATION_RELAY_LEASE_SECONDS', '300'))
+NOTIFICATION_RELAY_METRICS_PORT = int(os.environ.get('NOTIFICATION_RELAY_METRICS_PORT', '9100'))
+
+# Retention (manage.py run_retention): rows older than the *_RETENTION_DAYS move to <table>_archive,
+# archive months older than the *_ARCHIVE_RETENTION_DAYS are dropped; rows move in short batches
+LOGIN_ATTEMPTS_RETENTION_DAYS = int(os.environ.get('LOGIN_ATTEMPTS_RETENTION_DAYS', '30'))
+LOGIN_ATTEMPTS_ARCHIVE_RETENTION_DAYS = int(os.environ.get('LOGIN_ATTEMPTS_ARCHIVE_RETENTION_DAYS', '365'))
+AUDIT_LOG_RETENTION_DAYS = int(os.environ.get('AUDIT_LOG_RETENTION_DAYS', '90'))
+AUDIT_LOG_ARCHIVE_RETENTION_DAYS = int(os.environ.get('AUDIT_LOG_ARCHIVE_RETENTION_DAYS', '730'))
+RETENTION_BATCH_SIZE = int(os.environ.get('RETENTION_BATCH_SIZE', '1000'))
+RETENTION_BATCH_PAUSE_SECONDS = float(os.environ.get('RETENTION_BATCH_PAUSE_SECONDS', '0.1'))
+RETENTION_MAX_BATCHES = int(os.environ.get('RETENTION_MAX_BATCHES', '100'))
+RETENTION_INTERVAL_SECONDS = float(os.environ.get('RETENTION_INTERVAL_SECONDS', '3600'))
+RETENTION_METRICS_PORT = int(os.environ.get('RETENTION_METRICS_PORT', '9100'))
+
+# Tracing: OTLP/HTTP collector (e.g. http://jaeger:4318) or a JSON-lines file fallback
+OTEL_SERVICE_NAME = os.environ.get('OTEL_SERVICE_NAME', 'user-management')
+OTEL_EXPORTER_OTLP_ENDPOINT = os.environ.get('OTEL_EXPORTER_OTLP_ENDPOINT', '')
+OTEL_TRACES_FILE = os.environ.get('OTEL_TRACES_FILE', '')
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -0,0 +1,33 @@
+"""
+OpenTelemetry tracing for the user management service.
+
+TracingMiddleware continues the W3C traceparent forwarded by the gateway and the
+other services, so /api/users/me lookups appear inside the caller's trace. The
+spans themselves come from fleetify_tracing (a copy of services/shared).
+"""
+from django.conf import settings
+
+from . import fleetify_tracing
+from .fleetify_tracing import client_span
+
+UNTRACED_PATHS = {"/metrics"}
+
+
+class TracingMiddleware:
+    """Starts a server span per request, parented to the incoming traceparent header."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        fleetify_tracing.setup_tracing(
+            settings.OTEL_SERVICE_NAME, settings.OTEL_EXPORTER_OTLP_ENDPOINT, settings.OTEL_TRACES_FILE
+        )
+
+    def __call__(self, request):
+        if request.path in UNTRACED_PATHS:
+            return self.get_response(request)
+        with fleetify_tracing.server_span(request.method, request.path, request.headers) as span:
+            response = self.get_response(request)
+            match = getattr(request, "resolver_match", None)
+            route = match.route if match and match.route else None
+            fleetify_tracing.finish_server_span(span, request.method, route, response.status_code)
+            return response
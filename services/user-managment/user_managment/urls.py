@@ -17,12 +17,14 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path
 
-from . import views
+from . import metrics, views
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', metrics.metrics_view, name='metrics'),
     path('api/auth/register', views.RegisterView.as_view(), name='auth-register'),
     path('api/auth/login', views.LoginView.as_view(), name='auth-login'),
+    path('api/auth/refresh', views.RefreshView.as_view(), name='auth-refresh'),
     path('api/auth/logout', views.LogoutView.as_view(), name='auth-logout'),
     path('api/subscription/renew', views.SubscriptionRenewalView.as_view(), name='subscription-renew'),
     path('api/users/me', views.MeView.as_view(), name='users-me'),
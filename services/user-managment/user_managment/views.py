@@ -4,14 +4,16 @@ import logging
 import secrets
 from datetime import timedelta
 
-import httpx
 from django.conf import settings
-from django.db import connection
+from django.db import connection, transaction
 from django.db.models import Q
 from django.utils import timezone
 from rest_framework import generics, permissions, response, status, views
 
 from .models import User, UserSession, WorkerProfile, LoginAttempt, SecurityAuditLog, ensure_profile_for_user
+from .notification_outbox import queue_notification
+from . import access_tokens
+from .session_cache import forget_session, invalidate_user
 from .serializers import LoginSerializer, RegistrationSerializer, UserSerializer, UserInviteSerializer, SubscriptionRenewalSerializer
 
 # Security logger for audit events
@@ -95,27 +97,6 @@ class ServiceTokenPermission(permissions.BasePermission):
         return bool(expected) and request.headers.get("X-Service-Token") == expected
 
 
-def send_notification(payload: dict):
-    token = settings.NOTIFICATIONS_SERVICE_TOKEN
-    url = settings.NOTIFICATIONS_SERVICE_URL
-    if not token or not url:
-        return
-    headers = {
-        "X-Service-Token": token,
-        "Content-Type": "application/json",
-    }
-    try:
-        httpx.post(
-            f"{url}/notifications",
-            json=payload,
-            headers=headers,
-            timeout=5.0,
-            follow_redirects=True,
-        )
-    except httpx.RequestError:
-        pass
-
-
 def assign_manager(user: User, manager: User | None, *, status: str | None = None):
     ensure_profile_for_user(user)
     fields = ["manager", "updated_at"]
@@ -152,9 +133,20 @@ def create_session(user: User) -> UserSession:
     expires_at = timezone.now() + SESSION_TTL
     session = UserSession.objects.create(user=user, refresh_token=token, expires_at=expires_at)
     User.objects.filter(id=user.id).update(last_login_at=timezone.now(), updated_at=timezone.now())
+    # Queryset updates skip the post_save hook; cached sessions would keep the old last_login_at
+    invalidate_user(user.id)
     return session
 
 
+def access_token_body(session: UserSession) -> dict:
+    """Response fields for a fresh access token of the session; empty while access tokens are disabled."""
+    issued = access_tokens.issue(session)
+    if issued is None:
+        return {}
+    token, expires_at = issued
+    return {"access_token": token, "access_expires_at": expires_at}
+
+
 class LoginView(views.APIView):
     permission_classes = [permissions.AllowAny]
 
@@ -233,6 +225,7 @@ class LoginView(views.APIView):
             {
                 "token": session.refresh_token,
                 "expires_at": session.expires_at,
+                **access_token_body(session),
                 "user": UserSerializer(user).data,
             },
             status=status.HTTP_200_OK,
@@ -251,12 +244,25 @@ class RegisterView(views.APIView):
             {
                 "token": session.refresh_token,
                 "expires_at": session.expires_at,
+                **access_token_body(session),
                 "user": UserSerializer(user).data,
             },
             status=status.HTTP_201_CREATED,
         )
 
 
+class RefreshView(views.APIView):
+    """A new access token for the caller's session (sent with the session token or a current access token)."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        session: UserSession = request.auth
+        body = access_token_body(session)
+        if not body:
+            return response.Response({"detail": "Access tokens are not enabled."}, status=status.HTTP_404_NOT_FOUND)
+        return response.Response(body, status=status.HTTP_200_OK)
+
+
 class LogoutView(views.APIView):
     permission_classes = [permissions.IsAuthenticated]
 
@@ -264,6 +270,8 @@ class LogoutView(views.APIView):
         session: UserSession = request.auth
         if session:
             session.delete()
+            forget_session(session)
+            access_tokens.revoke_session(session)
         return response.Response(status=status.HTTP_204_NO_CONTENT)
 
 
@@ -273,6 +281,13 @@ class MeView(generics.RetrieveAPIView):
     def get_object(self):
         return self.request.user
 
+    def retrieve(self, request, *args, **kwargs):
+        resp = super().retrieve(request, *args, **kwargs)
+        # Callers that cache the answer (nginx-gateway, dashboard) match logout revocations against it
+        if isinstance(request.auth, UserSession):
+            resp.data["session_id"] = str(request.auth.id)
+        return resp
+
 
 class UserListView(generics.ListAPIView):
     serializer_class = UserSerializer
@@ -337,6 +352,8 @@ class TeamView(views.APIView):
 class InviteUserView(views.APIView):
     permission_classes = [permissions.IsAuthenticated]
 
+    # The invite notification is queued in the same transaction as the invite itself
+    @transaction.atomic
     def post(self, request):
         serializer = UserInviteSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -389,7 +406,7 @@ class InviteUserView(views.APIView):
             "action_required": True,
             "status": "pending",
         }
-        send_notification(notification_payload)
+        queue_notification(notification_payload)
 
         return response.Response(
             {
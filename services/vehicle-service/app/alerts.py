@@ -0,0 +1,208 @@
+"""
+Service-due and open-issue alerts backed by the precomputed vehicle columns.
+
+next_service_due is kept by a mapper hook (models._sync_next_service_due), the
+open issue counters are adjusted in the same transaction as every issue write,
+and service_alert_level remembers the last service alert emitted for a vehicle
+so the sweeper only publishes when a vehicle crosses a threshold.
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+
+from . import models
+from .config import SERVICE_DUE_SOON_DAYS
+from .database import SessionLocal
+from .events import emit_vehicle_event
+
+HIGH_SEVERITIES = ("high", "critical")
+SWEEP_BATCH_SIZE = 200
+
+
+def _utc(value: datetime) -> datetime:
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def days_until(due: datetime, now: datetime) -> int:
+    return (_utc(due) - now).days
+
+
+def service_alert_level(next_service_due: Optional[datetime], now: datetime) -> Optional[str]:
+    """"overdue", "soon" (within SERVICE_DUE_SOON_DAYS) or None."""
+    if next_service_due is None:
+        return None
+    days_remaining = days_until(next_service_due, now)
+    if days_remaining < 0:
+        return "overdue"
+    if days_remaining <= SERVICE_DUE_SOON_DAYS:
+        return "soon"
+    return None
+
+
+def service_alert_payload(level: str, days_remaining: int) -> Dict[str, Any]:
+    """Extra fields of a vehicle_service_alert event."""
+    if level == "overdue":
+        return {
+            "severity": "critical",
+            "message": f"Serwis przeterminowany o {abs(days_remaining)} dni!",
+            "days_remaining": days_remaining,
+        }
+    return {
+        "severity": "high",
+        "message": f"Serwis za {days_remaining} dni",
+        "days_remaining": days_remaining,
+    }
+
+
+def _issue_flags(state: Optional[Tuple[str, str]]) -> Tuple[int, int]:
+    if state is None:
+        return 0, 0
+    status, severity = state
+    is_open = status != "resolved"
+    return int(is_open), int(is_open and severity in HIGH_SEVERITIES)
+
+
+def adjust_issue_counters(
+    db: Session,
+    vehicle_id: int,
+    before: Optional[Tuple[str, str]],
+    after: Optional[Tuple[str, str]],
+) -> int:
+    """
+    Apply one issue's (status, severity) change to its vehicle's open counters.
+    Uses relative updates so concurrent issue writes cannot lose a count.
+    Returns the vehicle's open high/critical count after the change.
+    """
+    open_before, critical_before = _issue_flags(before)
+    open_after, critical_after = _issue_flags(after)
+    open_delta = open_after - open_before
+    critical_delta = critical_after - critical_before
+    if open_delta or critical_delta:
+        db.query(models.Vehicle).filter(models.Vehicle.id == vehicle_id).update(
+            {
+                models.Vehicle.open_issue_count: models.Vehicle.open_issue_count + open_delta,
+                models.Vehicle.open_critical_issue_count: models.Vehicle.open_critical_issue_count + critical_delta,
+            },
+            synchronize_session=False,
+        )
+    return (
+        db.query(models.Vehicle.open_critical_issue_count)
+        .filter(models.Vehicle.id == vehicle_id)
+        .scalar()
+    ) or 0
+
+
+def list_alerts(db: Session, owner_id: str, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """Service alerts (due soon / overdue) and open high/critical issues for one owner."""
+    now = now or datetime.now(timezone.utc)
+    alerts: List[Dict[str, Any]] = []
+
+    due_vehicles = (
+        db.query(models.Vehicle)
+        .filter(models.Vehicle.owner_id == owner_id)
+        .filter(models.Vehicle.next_service_due <= now + timedelta(days=SERVICE_DUE_SOON_DAYS))
+        .order_by(models.Vehicle.next_service_due)
+        .all()
+    )
+    for vehicle in due_vehicles:
+        days_remaining = days_until(vehicle.next_service_due, now)
+        level = service_alert_level(vehicle.next_service_due, now)
+        payload = service_alert_payload(level, days_remaining)
+        alerts.append({
+            "type": "service_overdue" if level == "overdue" else "service_due_soon",
+            "vehicle_id": vehicle.id,
+            "vehicle_label": f"{vehicle.make} {vehicle.model}",
+            "license_plate": vehicle.license_plate,
+            "severity": payload["severity"],
+            "message": payload["message"],
+            "days_remaining": days_remaining,
+            "next_service_due": vehicle.next_service_due,
+        })
+
+    # The counter keeps vehicles without open high/critical issues out of the join
+    issue_rows = (
+        db.query(models.VehicleIssue, models.Vehicle)
+        .join(models.Vehicle, models.Vehicle.id == models.VehicleIssue.vehicle_id)
+        .filter(models.Vehicle.owner_id == owner_id)
+        .filter(models.Vehicle.open_critical_issue_count > 0)
+        .filter(models.VehicleIssue.status != "resolved")
+        .filter(models.VehicleIssue.severity.in_(HIGH_SEVERITIES))
+        .order_by(models.VehicleIssue.created_at.desc())
+        .all()
+    )
+    for issue, vehicle in issue_rows:
+        alerts.append({
+            "type": "issue",
+            "vehicle_id": vehicle.id,
+            "vehicle_label": f"{vehicle.make} {vehicle.model}",
+            "license_plate": vehicle.license_plate,
+            "severity": issue.severity,
+            "message": issue.title,
+            "issue_id": issue.id,
+        })
+    return alerts
+
+
+def claim_service_transitions(db: Session, now: datetime) -> List[Tuple[models.Vehicle, str, int]]:
+    """
+    Lock a batch of vehicles whose service alert level changed since the last alert,
+    record the new level, queue the alert events and commit. SKIP LOCKED lets several
+    replicas sweep at once without emitting the same alert twice.
+    Returns (vehicle, level, days_remaining).
+    """
+    soon_cutoff = now + timedelta(days=SERVICE_DUE_SOON_DAYS)
+    level = models.Vehicle.service_alert_level
+    vehicles = (
+        db.query(models.Vehicle)
+        .filter(models.Vehicle.next_service_due <= soon_cutoff)
+        .filter(or_(
+            and_(models.Vehicle.next_service_due < now, or_(level.is_(None), level != "overdue")),
+            and_(models.Vehicle.next_service_due >= now, level.is_(None)),
+        ))
+        .order_by(models.Vehicle.next_service_due)
+        .limit(SWEEP_BATCH_SIZE)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    transitions = []
+    for vehicle in vehicles:
+        new_level = service_alert_level(vehicle.next_service_due, now)
+        transitions.append((vehicle, new_level, days_until(vehicle.next_service_due, now)))
+        # Bookkeeping only: keep updated_at meaning "the vehicle itself changed"
+        db.query(models.Vehicle).filter(models.Vehicle.id == vehicle.id).update(
+            {level: new_level, models.Vehicle.updated_at: models.Vehicle.updated_at},
+            synchronize_session=False,
+        )
+    for vehicle, new_level, days_remaining in transitions:
+        emit_vehicle_event(db, "vehicle_service_alert", vehicle, service_alert_payload(new_level, days_remaining))
+    db.commit()
+    return transitions
+
+
+def sweep_service_alerts(now: Optional[datetime] = None) -> int:
+    """Emit vehicle_service_alert for every vehicle that crossed a threshold since its last alert."""
+    now = now or datetime.now(timezone.utc)
+    emitted = 0
+    while True:
+        db = SessionLocal()
+        try:
+            transitions = claim_service_transitions(db, now)
+        finally:
+            db.close()
+        emitted += len(transitions)
+        if len(transitions) < SWEEP_BATCH_SIZE:
+            return emitted
+
+
+async def run_service_sweeper(interval_seconds: float) -> None:
+    while True:
+        try:
+            emitted = await asyncio.to_thread(sweep_service_alerts)
+            if emitted:
+                print(f"Service alert sweep: {emitted} alerts emitted")
+        except Exception as e:
+            print(f"Service alert sweep failed: {e}")
+        await asyncio.sleep(interval_seconds)
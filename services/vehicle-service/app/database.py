@@ -3,8 +3,12 @@ from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
 from .config import DATABASE_URL
+from .metrics import instrument_engine
+from .profiling import profile_engine
 
 engine = create_engine(DATABASE_URL)
+instrument_engine(engine)
+profile_engine(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
@@ -2,27 +2,39 @@
 Authorization dependencies for Vehicle Service.
 Validates user token and extracts user context.
 """
-from fastapi import Header, HTTPException
+from fastapi import Header, HTTPException, Request
 import httpx
 import os
 
+from .access_tokens import verify_access_token
+from .config import SERVICE_TOKEN
+from .gateway_identity import verify_gateway_identity
+from .metrics import observe_downstream
+from .tracing import client_span
+
 USER_MANAGEMENT_URL = os.getenv("USER_MANAGEMENT_URL", "http://user-management:8000")
 
 
-async def get_current_user(authorization: str = Header(...)):
+async def get_current_user(request: Request, authorization: str = Header(...)):
     """
-    Validate authorization token and get current user info from user-management service.
+    Validate authorization token and get current user info: from the gateway's signed identity
+    headers or the access token itself when they check out, otherwise from user-management.
     Returns dict with user id, role, and manager_id (for employees).
     """
     if not authorization:
         raise HTTPException(status_code=401, detail="Authorization header required")
+    user = verify_gateway_identity(request.headers, authorization) or verify_access_token(authorization)
+    if user is not None:
+        return user
     
     try:
         async with httpx.AsyncClient(timeout=5.0) as client:
-            resp = await client.get(
-                f"{USER_MANAGEMENT_URL}/api/users/me",
-                headers={"Authorization": authorization}
-            )
+            headers = {"Authorization": authorization}
+            with observe_downstream("user-management"), client_span("GET user-management", headers):
+                resp = await client.get(
+                    f"{USER_MANAGEMENT_URL}/api/users/me",
+                    headers=headers
+                )
         
         if resp.status_code != 200:
             raise HTTPException(status_code=401, detail="Invalid or expired token")
@@ -58,3 +70,9 @@ def get_owner_id(current_user: dict) -> str:
                 detail="Employee not assigned to any admin. Contact your administrator."
             )
         return manager_id
+
+
+async def require_service_token(x_service_token: str = Header(None)):
+    """Guard for /internal/* endpoints called by other services instead of users."""
+    if not SERVICE_TOKEN or x_service_token != SERVICE_TOKEN:
+        raise HTTPException(status_code=403, detail="Invalid service token")
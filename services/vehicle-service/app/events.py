@@ -0,0 +1,88 @@
+"""
+Vehicle event payloads published to the vehicle_events exchange.
+"""
+from typing import Any, Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from . import models, outbox
+
+
+def iso(value):
+    if value is None:
+        return None
+    return value.isoformat() if hasattr(value, "isoformat") else value
+
+
+def serialize_vehicle(vehicle: models.Vehicle) -> Dict[str, Any]:
+    return {
+        "vehicle_id": vehicle.id,
+        "owner_id": vehicle.owner_id,
+        "vin": vehicle.vin,
+        "make": vehicle.make,
+        "model": vehicle.model,
+        "year": vehicle.year,
+        "license_plate": vehicle.license_plate,
+        "status": vehicle.status,
+        "fuel_type": vehicle.fuel_type,
+        "fuel_level": vehicle.fuel_level,
+        "fuel_capacity": vehicle.fuel_capacity,
+        "battery_level": vehicle.battery_level,
+        "odometer": vehicle.odometer,
+        "latitude": vehicle.latitude,
+        "longitude": vehicle.longitude,
+        "city": vehicle.city,
+        "current_driver_id": vehicle.current_driver_id,
+        "last_service_date": iso(vehicle.last_service_date),
+        "next_service_due": iso(vehicle.next_service_due),
+        "open_issue_count": vehicle.open_issue_count,
+        "open_critical_issue_count": vehicle.open_critical_issue_count,
+        "version": vehicle.version,
+        "created_at": iso(vehicle.created_at),
+        "updated_at": iso(vehicle.updated_at),
+    }
+
+
+def serialize_issue(issue: models.VehicleIssue) -> Dict[str, Any]:
+    return {
+        "id": issue.id,
+        "vehicle_id": issue.vehicle_id,
+        "reporter_id": issue.reporter_id,
+        "severity": issue.severity,
+        "title": issue.title,
+        "description": issue.description,
+        "status": issue.status,
+        "created_at": iso(issue.created_at),
+        "updated_at": iso(issue.updated_at),
+        "resolved_at": iso(issue.resolved_at),
+    }
+
+
+def serialize_updates(updates: Dict[str, Any]) -> Dict[str, Any]:
+    serialized: Dict[str, Any] = {}
+    for key, value in updates.items():
+        serialized[key] = iso(value) if hasattr(value, "isoformat") else value
+    return serialized
+
+
+def vehicle_event(event_name: str, vehicle: models.Vehicle, extra: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    payload = serialize_vehicle(vehicle)
+    payload["event_type"] = event_name
+    payload["vehicle_label"] = f"{vehicle.make} {vehicle.model}"
+    if extra:
+        payload.update(extra)
+    return payload
+
+
+def emit_vehicle_event(
+    db: Session,
+    event_name: str,
+    vehicle: models.Vehicle,
+    extra: Optional[Dict[str, Any]] = None,
+) -> None:
+    """Queue the event in the caller's transaction (see outbox.py); call before db.commit()."""
+    if isinstance(vehicle, models.Vehicle):
+        # Serialize what will be committed: hooks, version bump and bulk counter updates included
+        db.flush()
+        db.refresh(vehicle)
+    outbox.enqueue(db, event_name, vehicle_event(event_name, vehicle, extra))
@@ -0,0 +1,119 @@
+"""
+Geohash helpers for nearby and bounding-box vehicle queries.
+
+vehicles.geohash (precision 9, ~5 m) is stored with the "C" collation, so a
+B-tree on (owner_id, geohash) serves prefix matches. A query box is covered
+with a handful of geohash cells at the finest precision that keeps the cover
+small, the index narrows the rows to those cells, and exact latitude/longitude
+(or haversine distance) checks trim the cell edges.
+"""
+import math
+from typing import List, Optional, Set, Tuple
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+STORED_PRECISION = 9
+MAX_COVER_CELLS = 32
+EARTH_RADIUS_KM = 6371.0088
+
+BBox = Tuple[float, float, float, float]  # min_lat, min_lon, max_lat, max_lon
+
+
+def encode(latitude: float, longitude: float, precision: int = STORED_PRECISION) -> str:
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars, bits, bit_count, even = [], 0, 0, True
+    while len(chars) < precision:
+        value, rng = (longitude, lon_range) if even else (latitude, lat_range)
+        mid = (rng[0] + rng[1]) / 2
+        bits <<= 1
+        if value >= mid:
+            bits |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(BASE32[bits])
+            bits, bit_count = 0, 0
+    return "".join(chars)
+
+
+def encode_optional(latitude: Optional[float], longitude: Optional[float]) -> Optional[str]:
+    if latitude is None or longitude is None:
+        return None
+    return encode(latitude, longitude)
+
+
+def _cell_size(precision: int) -> Tuple[float, float]:
+    """(height in degrees latitude, width in degrees longitude) of a geohash cell."""
+    bits = 5 * precision
+    return 180.0 / (1 << (bits // 2)), 360.0 / (1 << (bits - bits // 2))
+
+
+def _split_antimeridian(box: BBox) -> List[BBox]:
+    min_lat, min_lon, max_lat, max_lon = box
+    if min_lon <= max_lon:
+        return [box]
+    return [(min_lat, min_lon, max_lat, 180.0), (min_lat, -180.0, max_lat, max_lon)]
+
+
+def cover(box: BBox) -> List[str]:
+    """Geohash prefixes whose cells together contain the box (min_lon > max_lon wraps the antimeridian)."""
+    boxes = _split_antimeridian(box)
+
+    def cells_needed(precision: int) -> int:
+        height, width = _cell_size(precision)
+        return sum(
+            (math.floor((b[2] - b[0]) / height) + 2) * (math.floor((b[3] - b[1]) / width) + 2)
+            for b in boxes
+        )
+
+    precision = 1
+    while precision < STORED_PRECISION and cells_needed(precision + 1) <= MAX_COVER_CELLS:
+        precision += 1
+
+    height, width = _cell_size(precision)
+    prefixes: Set[str] = set()
+    for min_lat, min_lon, max_lat, max_lon in boxes:
+        lat = min_lat
+        while True:
+            lon = min_lon
+            while True:
+                prefixes.add(encode(min(lat, 90.0), min(lon, 180.0), precision))
+                if lon >= max_lon:
+                    break
+                lon = min(lon + width, max_lon)
+            if lat >= max_lat:
+                break
+            lat = min(lat + height, max_lat)
+    return sorted(prefixes)
+
+
+def radius_bbox(latitude: float, longitude: float, radius_km: float) -> BBox:
+    """Smallest lat/lon box containing the circle (longitudes may wrap)."""
+    dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    min_lat, max_lat = max(latitude - dlat, -90.0), min(latitude + dlat, 90.0)
+    if min_lat <= -90.0 or max_lat >= 90.0:
+        return min_lat, -180.0, max_lat, 180.0
+    dlon = math.degrees(radius_km / (EARTH_RADIUS_KM * math.cos(math.radians(latitude))))
+    if dlon >= 180.0:
+        return min_lat, -180.0, max_lat, 180.0
+    min_lon = longitude - dlon if longitude - dlon >= -180.0 else longitude - dlon + 360.0
+    max_lon = longitude + dlon if longitude + dlon <= 180.0 else longitude + dlon - 360.0
+    return min_lat, min_lon, max_lat, max_lon
+
+
+def in_bbox(latitude: float, longitude: float, box: BBox) -> bool:
+    return any(
+        b[0] <= latitude <= b[2] and b[1] <= longitude <= b[3]
+        for b in _split_antimeridian(box)
+    )
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
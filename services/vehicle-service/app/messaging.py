@@ -1,33 +1,79 @@
 import json
+import time
 from datetime import datetime, timezone
 
 import pika
 
-from .config import RABBITMQ_HOST, RABBITMQ_USER, RABBITMQ_PASS, VEHICLE_EVENT_QUEUE
+from .config import RABBITMQ_HOST, RABBITMQ_USER, RABBITMQ_PASS, VEHICLE_EVENT_EXCHANGE
+from .metrics import RABBITMQ_PUBLISH_FAILURES, RABBITMQ_PUBLISH_LATENCY
+from .tracing import producer_span
 
 def get_connection():
     credentials = pika.PlainCredentials(RABBITMQ_USER, RABBITMQ_PASS)
     parameters = pika.ConnectionParameters(host=RABBITMQ_HOST, credentials=credentials)
     return pika.BlockingConnection(parameters)
 
-def publish_message(event_type, message=None):
-    try:
-        connection = get_connection()
-        channel = connection.channel()
-        channel.queue_declare(queue=VEHICLE_EVENT_QUEUE)
-
-        payload = dict(message or {})
-        payload.setdefault("event", event_type)
-        payload.setdefault("emitted_at", datetime.now(timezone.utc).isoformat())
+def _publish(channel, event_type, message, trace_context=None):
+    payload = dict(message or {})
+    payload.setdefault("event", event_type)
+    payload.setdefault("emitted_at", datetime.now(timezone.utc).isoformat())
 
+    headers = {}
+    with producer_span(f"{VEHICLE_EVENT_EXCHANGE} publish", headers, trace_context) as span:
+        span.set_attribute("messaging.event_type", event_type)
         channel.basic_publish(
-            exchange="",
-            routing_key=VEHICLE_EVENT_QUEUE,
+            exchange=VEHICLE_EVENT_EXCHANGE,
+            routing_key="",
             body=json.dumps(payload),
+            properties=pika.BasicProperties(delivery_mode=2, headers=headers),
         )
-        connection.close()
-    except Exception as e:
-        print(f"Failed to publish message: {e}")
+
+class Publisher:
+    """
+    One long-lived connection with publisher confirms, used by the outbox relay.
+    publish() returns once the broker has the message and raises otherwise;
+    the connection is reopened on the next call after a failure.
+    """
+
+    def __init__(self):
+        self._connection = None
+        self._channel = None
+
+    def _channel_open(self):
+        if self._channel is None or not self._channel.is_open:
+            self.close()
+            self._connection = get_connection()
+            self._channel = self._connection.channel()
+            self._channel.confirm_delivery()
+            self._channel.exchange_declare(exchange=VEHICLE_EVENT_EXCHANGE, exchange_type="fanout", durable=True)
+        return self._channel
+
+    def publish(self, event_type, message, trace_context=None):
+        started = time.perf_counter()
+        try:
+            _publish(self._channel_open(), event_type, message, trace_context)
+        except Exception:
+            RABBITMQ_PUBLISH_FAILURES.labels(VEHICLE_EVENT_EXCHANGE).inc()
+            self.close()
+            raise
+        RABBITMQ_PUBLISH_LATENCY.labels(VEHICLE_EVENT_EXCHANGE).observe(time.perf_counter() - started)
+
+    def keepalive(self):
+        """Service heartbeats between batches so an idle connection is not dropped."""
+        if self._connection is not None and self._connection.is_open:
+            try:
+                self._connection.process_data_events(0)
+            except Exception:
+                self.close()
+
+    def close(self):
+        try:
+            if self._connection is not None and self._connection.is_open:
+                self._connection.close()
+        except Exception:
+            pass
+        self._connection = None
+        self._channel = None
 
 async def consume_messages():
     # Placeholder for consuming messages if needed
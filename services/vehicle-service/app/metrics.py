@@ -0,0 +1,23 @@
+"""
+Prometheus instrumentation for Vehicle Service.
+Exposes /metrics with HTTP, database and RabbitMQ publish timings. Metrics that
+several services report are defined once in fleetify_metrics (a copy of
+services/shared); the ones below are this service's own.
+"""
+from prometheus_client import Counter
+
+from .fleetify_metrics import (
+    ACCESS_TOKEN_CHECKS,
+    OUTBOX_EVENTS,
+    RABBITMQ_PUBLISH_FAILURES,
+    RABBITMQ_PUBLISH_LATENCY,
+    instrument_app,
+    instrument_engine,
+    observe_downstream,
+)
+
+TELEMETRY_SAMPLES = Counter(
+    "vehicle_telemetry_samples_total",
+    "Telemetry samples received (accepted, rejected)",
+    ["result"],
+)
@@ -1,7 +1,11 @@
 import datetime
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Float
+from sqlalchemy import BigInteger, Column, Integer, SmallInteger, String, DateTime, Text, ForeignKey, Float, event
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 
+from .config import SERVICE_INTERVAL_DAYS
+from .geo import encode_optional
+
 from .database import Base
 
 class Vehicle(Base):
@@ -24,14 +28,81 @@ class Vehicle(Base):
     odometer = Column(Integer, default=0) # km
     latitude = Column(Float, nullable=True)
     longitude = Column(Float, nullable=True)
+    geohash = Column(String(12, collation="C"), nullable=True) # Derived from latitude/longitude, see geo.py
     city = Column(String, nullable=True)
     last_service_date = Column(DateTime(timezone=True), nullable=True)
     current_driver_id = Column(String, nullable=True) # User ID
+
+    # Maintained on write so alert queries never parse dates or scan issues
+    next_service_due = Column(DateTime(timezone=True), nullable=True, index=True)
+    service_alert_level = Column(String, nullable=True) # Last service alert emitted: soon, overdue
+    open_issue_count = Column(Integer, nullable=False, default=0)
+    open_critical_issue_count = Column(Integer, nullable=False, default=0) # Open high/critical issues
+    last_telemetry_at = Column(DateTime(timezone=True), nullable=True) # recorded_at of the newest applied sample
+    # Bumped by every edit of the vehicle record (not by telemetry or counter bookkeeping); exposed as the ETag
+    version = Column(Integer, nullable=False, default=1)
     
     created_at = Column(DateTime(timezone=True), default=datetime.datetime.utcnow)
     updated_at = Column(DateTime(timezone=True), default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
     issues = relationship("VehicleIssue", back_populates="vehicle", cascade="all, delete-orphan")
 
+    # ORM flushes check and bump version, raising StaleDataError if the row changed underneath
+    __mapper_args__ = {"version_id_col": version}
+
+
+def next_service_due_for(last_service_date):
+    if last_service_date is None:
+        return None
+    return last_service_date + datetime.timedelta(days=SERVICE_INTERVAL_DAYS)
+
+
+@event.listens_for(Vehicle, "before_insert")
+@event.listens_for(Vehicle, "before_update")
+def _sync_next_service_due(mapper, connection, target):
+    target.next_service_due = next_service_due_for(target.last_service_date)
+
+
+@event.listens_for(Vehicle, "before_insert")
+@event.listens_for(Vehicle, "before_update")
+def _sync_geohash(mapper, connection, target):
+    target.geohash = encode_optional(target.latitude, target.longitude)
+
+
+class VehicleTelemetry(Base):
+    """Append-only position/fuel samples; (vehicle_id, recorded_at) makes retried batches idempotent."""
+    __tablename__ = "vehicle_telemetry"
+
+    vehicle_id = Column(Integer, primary_key=True)
+    recorded_at = Column(DateTime(timezone=True), primary_key=True)
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
+    fuel_level = Column(SmallInteger, nullable=True)
+    battery_level = Column(SmallInteger, nullable=True)
+    odometer = Column(Integer, nullable=True)
+    speed_kmh = Column(Float, nullable=True)
+
+
+class TelemetryRollupMixin:
+    """One bucket of a vehicle's telemetry: last position, averages, odometer and speed maxima."""
+    vehicle_id = Column(Integer, primary_key=True)
+    bucket = Column(DateTime(timezone=True), primary_key=True)
+    samples = Column(Integer, nullable=False)
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
+    fuel_level = Column(Float, nullable=True)
+    battery_level = Column(Float, nullable=True)
+    odometer = Column(Integer, nullable=True)
+    speed_kmh = Column(Float, nullable=True)
+    speed_kmh_max = Column(Float, nullable=True)
+
+
+class VehicleTelemetryMinute(TelemetryRollupMixin, Base):
+    __tablename__ = "vehicle_telemetry_1m"
+
+
+class VehicleTelemetryHour(TelemetryRollupMixin, Base):
+    __tablename__ = "vehicle_telemetry_1h"
+
 
 class VehicleIssue(Base):
     __tablename__ = "vehicle_issues"
@@ -47,3 +118,17 @@ class VehicleIssue(Base):
     updated_at = Column(DateTime(timezone=True), default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
     resolved_at = Column(DateTime(timezone=True), nullable=True)
     vehicle = relationship("Vehicle", back_populates="issues")
+
+
+class OutboxEvent(Base):
+    """A vehicle event written with the change it describes; deleted once the relay has published it."""
+    __tablename__ = "outbox_events"
+
+    id = Column(BigInteger, primary_key=True)
+    aggregate_id = Column(String, nullable=True)  # e.g. "vehicle:42"
+    event_type = Column(String, nullable=False)
+    payload = Column(JSONB, nullable=False)
+    trace_context = Column(JSONB, nullable=True)  # traceparent of the request that queued it, continued by the publish
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), default=datetime.datetime.utcnow)
@@ -0,0 +1,120 @@
+"""
+Transactional outbox for vehicle_events.
+
+Handlers add events to outbox_events in the same transaction as the change
+they describe, so an event exists exactly when the change committed. A relay
+thread publishes committed rows in id order over one connection with publisher
+confirms and deletes them once the broker has acknowledged them. Delivery is
+at-least-once; consumers already treat events as upserts. Each row keeps the
+trace context of the request that queued it, so the publish and the consumers
+stay in that request's trace.
+
+Only one replica relays at a time (advisory lock) and a row that fails to
+publish holds back every row after it, so events of a vehicle are never
+reordered. Commits that added events wake the relay, so requests never wait
+on RabbitMQ.
+"""
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from . import messaging, models
+from .config import OUTBOX_BATCH_SIZE, OUTBOX_MAX_BACKOFF_SECONDS, OUTBOX_POLL_INTERVAL_SECONDS
+from .database import SessionLocal
+from .metrics import OUTBOX_EVENTS
+from .tracing import trace_headers
+
+# pg_try_advisory_xact_lock key shared by all vehicle-service replicas
+RELAY_LOCK_KEY = 0x7E1E_0002
+
+_wake = threading.Event()
+
+
+def enqueue(db: Session, event_type: str, payload: Dict[str, Any]) -> None:
+    """Add an event to the caller's transaction; it is published after db.commit()."""
+    vehicle_id = payload.get("vehicle_id")
+    db.add(models.OutboxEvent(
+        aggregate_id=f"vehicle:{vehicle_id}" if vehicle_id is not None else None,
+        event_type=event_type,
+        payload=payload,
+        trace_context=trace_headers() or None,
+    ))
+    db.info["outbox_pending"] = True
+    OUTBOX_EVENTS.labels("enqueued").inc()
+
+
+def enqueue_many(db: Session, events: Iterable[Tuple[str, Dict[str, Any]]]) -> None:
+    for event_type, payload in events:
+        enqueue(db, event_type, payload)
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _wake_relay(session):
+    if session.info.pop("outbox_pending", False):
+        _wake.set()
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_pending(session):
+    session.info.pop("outbox_pending", None)
+
+
+def relay_batch(publisher: messaging.Publisher) -> Tuple[int, Optional[Exception]]:
+    """
+    Publish up to OUTBOX_BATCH_SIZE events in id order and delete the published ones.
+    Returns (published, error); error is the exception that stopped the batch, if any.
+    """
+    db = SessionLocal()
+    try:
+        if not db.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": RELAY_LOCK_KEY}).scalar():
+            return 0, None
+        rows = (
+            db.query(models.OutboxEvent)
+            .order_by(models.OutboxEvent.id)
+            .limit(OUTBOX_BATCH_SIZE)
+            .all()
+        )
+        published, error = [], None
+        for row in rows:
+            try:
+                publisher.publish(row.event_type, row.payload, row.trace_context)
+            except Exception as e:
+                row.attempts += 1
+                row.last_error = str(e)[:500]
+                error = e
+                break
+            published.append(row.id)
+        if published:
+            db.query(models.OutboxEvent).filter(models.OutboxEvent.id.in_(published)).delete(synchronize_session=False)
+        db.commit()
+        OUTBOX_EVENTS.labels("published").inc(len(published))
+        if error is not None:
+            OUTBOX_EVENTS.labels("failed").inc()
+        return len(published), error
+    finally:
+        db.close()
+
+
+def run_outbox_relay() -> None:
+    """Relay thread: publish on every wake-up or poll tick, backing off while the broker is down."""
+    publisher = messaging.Publisher()
+    failures = 0
+    while True:
+        _wake.clear()
+        try:
+            published, error = relay_batch(publisher)
+        except Exception as e:
+            published, error = 0, e
+        if error is not None:
+            failures += 1
+            print(f"Outbox relay failed (attempt {failures}): {error}")
+            time.sleep(min(OUTBOX_MAX_BACKOFF_SECONDS, OUTBOX_POLL_INTERVAL_SECONDS * 2 ** failures))
+            continue
+        failures = 0
+        if published >= OUTBOX_BATCH_SIZE:
+            continue  # Backlog: keep draining
+        _wake.wait(OUTBOX_POLL_INTERVAL_SECONDS)
+        publisher.keepalive()
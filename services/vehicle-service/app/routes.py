@@ -1,76 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Header
-from sqlalchemy.orm import Session, joinedload
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status, Header
+from sqlalchemy import and_, or_, update
+from sqlalchemy.orm import Session, joinedload, selectinload
 from sqlalchemy.exc import IntegrityError
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Literal, Optional, Union
+from datetime import datetime, timezone
 
-from . import models, schemas, database, messaging
-from .deps import get_current_user, get_owner_id
+from . import alerts, geo, models, schemas, database, outbox, telemetry, timeseries
+from .events import emit_vehicle_event, serialize_issue, serialize_updates, serialize_vehicle
+from .deps import get_current_user, get_owner_id, require_service_token
 
 router = APIRouter()
 
 
-def _iso(value):
-    if value is None:
-        return None
-    return value.isoformat() if hasattr(value, "isoformat") else value
-
-
-def _serialize_vehicle(vehicle: models.Vehicle) -> Dict[str, Any]:
-    return {
-        "vehicle_id": vehicle.id,
-        "owner_id": vehicle.owner_id,
-        "vin": vehicle.vin,
-        "make": vehicle.make,
-        "model": vehicle.model,
-        "year": vehicle.year,
-        "license_plate": vehicle.license_plate,
-        "status": vehicle.status,
-        "fuel_type": vehicle.fuel_type,
-        "fuel_level": vehicle.fuel_level,
-        "fuel_capacity": vehicle.fuel_capacity,
-        "battery_level": vehicle.battery_level,
-        "odometer": vehicle.odometer,
-        "latitude": vehicle.latitude,
-        "longitude": vehicle.longitude,
-        "city": vehicle.city,
-        "current_driver_id": vehicle.current_driver_id,
-        "last_service_date": _iso(vehicle.last_service_date),
-        "created_at": _iso(vehicle.created_at),
-        "updated_at": _iso(vehicle.updated_at),
-    }
-
-
-def _serialize_issue(issue: models.VehicleIssue) -> Dict[str, Any]:
-    return {
-        "id": issue.id,
-        "vehicle_id": issue.vehicle_id,
-        "reporter_id": issue.reporter_id,
-        "severity": issue.severity,
-        "title": issue.title,
-        "description": issue.description,
-        "status": issue.status,
-        "created_at": _iso(issue.created_at),
-        "updated_at": _iso(issue.updated_at),
-        "resolved_at": _iso(issue.resolved_at),
-    }
-
-
-def _serialize_updates(updates: Dict[str, Any]) -> Dict[str, Any]:
-    serialized: Dict[str, Any] = {}
-    for key, value in updates.items():
-        serialized[key] = _iso(value) if hasattr(value, "isoformat") else value
-    return serialized
-
-
-def _emit_vehicle_event(event_name: str, vehicle: models.Vehicle, extra: Optional[Dict[str, Any]] = None) -> None:
-    payload = _serialize_vehicle(vehicle)
-    payload["event_type"] = event_name
-    payload["vehicle_label"] = f"{vehicle.make} {vehicle.model}"
-    if extra:
-        payload.update(extra)
-    messaging.publish_message(event_name, payload)
-
-
 @router.post("/vehicles/", response_model=schemas.Vehicle)
 async def create_vehicle(
     vehicle: schemas.VehicleCreate, 
@@ -89,8 +30,7 @@ async def create_vehicle(
     db.add(db_vehicle)
     
     try:
-        db.commit()
-        db.refresh(db_vehicle)
+        db.flush()
     except IntegrityError as e:
         db.rollback()
         error_msg = str(e.orig) if e.orig else str(e)
@@ -107,33 +47,190 @@ async def create_vehicle(
         else:
             raise HTTPException(status_code=400, detail="Vehicle data violates database constraints")
 
-    _emit_vehicle_event("vehicle_created", db_vehicle)
+    emit_vehicle_event(db, "vehicle_created", db_vehicle)
+    db.commit()
+    db.refresh(db_vehicle)
 
     return db_vehicle
 
-@router.get("/vehicles/", response_model=List[schemas.Vehicle])
+@router.get("/vehicles/", response_model=Union[List[schemas.Vehicle], List[schemas.VehicleSummary]])
 async def read_vehicles(
     skip: int = 0, 
     limit: int = 100, 
+    after_id: Optional[int] = None,
+    fields: Optional[str] = Query(None, pattern="^(full|summary)$"),
     db: Session = Depends(database.get_db),
     current_user: dict = Depends(get_current_user)
 ):
+    """
+    List the caller's fleet ordered by id.
+
+    - fields=summary: vehicle columns plus open/high-severity issue counts, no issue bodies
+    - after_id: keyset pagination; pass the last id of the previous page (skip is ignored)
+    """
     # Get owner_id based on user role (admin's own ID or employee's manager ID)
     owner_id = get_owner_id(current_user)
     
-    vehicles = (
+    query = (
         db.query(models.Vehicle)
         .filter(models.Vehicle.owner_id == owner_id)  # Filter by owner!
-        .options(joinedload(models.Vehicle.issues))
-        .offset(skip)
-        .limit(limit)
+        .order_by(models.Vehicle.id)
+    )
+    if after_id is not None:
+        query = query.filter(models.Vehicle.id > after_id)
+    else:
+        query = query.offset(skip)
+    page = query.limit(limit)
+
+    if fields == "summary":
+        # Issue counts are maintained columns, so the summary never touches vehicle_issues
+        return [schemas.VehicleSummary.model_validate(vehicle) for vehicle in page.all()]
+    # selectinload fetches issues in one extra query instead of duplicating vehicle rows per issue
+    return page.options(selectinload(models.Vehicle.issues)).all()
+
+def _vehicles_by_ids(db: Session, ids: List[int], fields: str, owner_id: Optional[str] = None):
+    query = (
+        db.query(models.Vehicle)
+        .filter(models.Vehicle.id.in_(set(ids)))
+        .order_by(models.Vehicle.id)
+    )
+    if owner_id is not None:
+        query = query.filter(models.Vehicle.owner_id == owner_id)
+    if fields == "summary":
+        return [schemas.VehicleSummary.model_validate(vehicle) for vehicle in query.all()]
+    return query.options(selectinload(models.Vehicle.issues)).all()
+
+
+@router.post("/vehicles/batch", response_model=Union[List[schemas.Vehicle], List[schemas.VehicleSummary]])
+async def read_vehicles_batch(
+    payload: schemas.VehicleBatchRequest,
+    db: Session = Depends(database.get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Fetch many vehicles in one owner-scoped query. Ids the caller cannot see are
+    silently left out, so the result may be shorter than the request.
+    """
+    owner_id = get_owner_id(current_user)
+    return _vehicles_by_ids(db, payload.ids, payload.fields, owner_id)
+
+
+@router.post(
+    "/internal/vehicles/batch",
+    response_model=Union[List[schemas.Vehicle], List[schemas.VehicleSummary]],
+    dependencies=[Depends(require_service_token)],
+)
+async def read_vehicles_batch_internal(
+    payload: schemas.InternalVehicleBatchRequest,
+    db: Session = Depends(database.get_db),
+):
+    """Service-to-service variant: X-Service-Token instead of a user token, no user-management call."""
+    return _vehicles_by_ids(db, payload.ids, payload.fields, payload.owner_id)
+
+
+@router.post("/vehicles/telemetry", response_model=schemas.TelemetryResult)
+async def ingest_telemetry(
+    batch: schemas.TelemetryBatch,
+    db: Session = Depends(database.get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Batched position/fuel/odometer samples for the caller's fleet. Samples are appended
+    to vehicle_telemetry; each vehicle's latest-state columns move to its newest sample.
+    """
+    owner_id = get_owner_id(current_user)
+    return telemetry.ingest(db, batch.samples, owner_id)
+
+
+@router.post(
+    "/internal/vehicles/telemetry",
+    response_model=schemas.TelemetryResult,
+    dependencies=[Depends(require_service_token)],
+)
+async def ingest_telemetry_internal(
+    batch: schemas.TelemetryBatch,
+    db: Session = Depends(database.get_db),
+):
+    """Telemetry from trusted services (e.g. a device gateway), across all fleets."""
+    return telemetry.ingest(db, batch.samples, None)
+
+
+def _vehicles_in_cells(db: Session, owner_id: str, box: geo.BBox):
+    """Candidates from the (owner_id, geohash) index; callers apply the exact shape test."""
+    # Prefix match as a range: under the "C" collation "~" sorts after every geohash character
+    cells = [
+        and_(models.Vehicle.geohash >= prefix, models.Vehicle.geohash < prefix + "~")
+        for prefix in geo.cover(box)
+    ]
+    return (
+        db.query(models.Vehicle)
+        .filter(models.Vehicle.owner_id == owner_id)
+        .filter(or_(*cells))
         .all()
     )
-    return vehicles
+
+
+@router.get("/vehicles/nearby", response_model=List[schemas.NearbyVehicle])
+async def read_vehicles_nearby(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    radius_km: float = Query(5.0, gt=0, le=500),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(database.get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """Vehicles within radius_km of a point, nearest first, as summaries with distance_km."""
+    owner_id = get_owner_id(current_user)
+    found = []
+    for vehicle in _vehicles_in_cells(db, owner_id, geo.radius_bbox(lat, lon, radius_km)):
+        distance = geo.haversine_km(lat, lon, vehicle.latitude, vehicle.longitude)
+        if distance <= radius_km:
+            found.append((distance, vehicle))
+    found.sort(key=lambda item: item[0])
+    return [
+        schemas.NearbyVehicle(
+            **schemas.VehicleSummary.model_validate(vehicle).model_dump(), distance_km=round(distance, 3)
+        )
+        for distance, vehicle in found[:limit]
+    ]
+
+
+@router.get("/vehicles/in-bounds", response_model=List[schemas.VehicleSummary])
+async def read_vehicles_in_bounds(
+    min_lat: float = Query(..., ge=-90, le=90),
+    min_lon: float = Query(..., ge=-180, le=180),
+    max_lat: float = Query(..., ge=-90, le=90),
+    max_lon: float = Query(..., ge=-180, le=180),
+    limit: int = Query(500, ge=1, le=5000),
+    db: Session = Depends(database.get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """Vehicles inside a map viewport; min_lon > max_lon means the box crosses the antimeridian."""
+    if min_lat > max_lat:
+        raise HTTPException(status_code=422, detail="min_lat must not exceed max_lat")
+    owner_id = get_owner_id(current_user)
+    box = (min_lat, min_lon, max_lat, max_lon)
+    inside = [
+        vehicle for vehicle in _vehicles_in_cells(db, owner_id, box)
+        if geo.in_bbox(vehicle.latitude, vehicle.longitude, box)
+    ]
+    inside.sort(key=lambda vehicle: vehicle.id)
+    return [schemas.VehicleSummary.model_validate(vehicle) for vehicle in inside[:limit]]
+
+
+@router.get("/vehicles/alerts", response_model=List[schemas.VehicleAlert])
+async def read_vehicle_alerts(
+    db: Session = Depends(database.get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """Service due/overdue and open high/critical issue alerts, from the precomputed columns."""
+    owner_id = get_owner_id(current_user)
+    return alerts.list_alerts(db, owner_id)
 
 @router.get("/vehicles/{vehicle_id}", response_model=schemas.Vehicle)
 async def read_vehicle(
     vehicle_id: int, 
+    response: Response,
     db: Session = Depends(database.get_db),
     current_user: dict = Depends(get_current_user)
 ):
@@ -148,63 +245,112 @@ async def read_vehicle(
     )
     if vehicle is None:
         raise HTTPException(status_code=404, detail="Vehicle not found")
+    response.headers["ETag"] = _etag(vehicle.version)
     return vehicle
 
+
+def _etag(version: int) -> str:
+    return f'"{version}"'
+
+
+def _if_match_version(if_match: Optional[str]) -> Optional[int]:
+    """Version named by an If-Match header; None for no header or "*"."""
+    if if_match is None or if_match.strip() == "*":
+        return None
+    tag = if_match.strip()
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    try:
+        return int(tag.strip('"'))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="If-Match must be a vehicle version ETag")
+
+
 @router.put("/vehicles/{vehicle_id}", response_model=schemas.Vehicle)
 async def update_vehicle(
     vehicle_id: int, 
     vehicle_update: schemas.VehicleUpdate, 
+    response: Response,
+    if_match: Optional[str] = Header(None),
     db: Session = Depends(database.get_db),
     current_user: dict = Depends(get_current_user)
 ):
+    """
+    Partial update of the fields sent. With If-Match: "<version>" the update only applies
+    if the vehicle is still at that version (412 otherwise). The write is a single
+    UPDATE ... RETURNING, so columns not sent (e.g. telemetry) are never overwritten.
+    latitude and longitude are only accepted together (422 otherwise) so the geohash
+    is written in that same UPDATE.
+    """
     # Only admins can update vehicles
     if current_user.get("role") != "admin":
         raise HTTPException(status_code=403, detail="Only admins can update vehicles")
     
     owner_id = get_owner_id(current_user)
+    expected_version = _if_match_version(if_match)
     
-    db_vehicle = (
-        db.query(models.Vehicle)
-        .filter(models.Vehicle.id == vehicle_id)
-        .filter(models.Vehicle.owner_id == owner_id)  # Security: only own vehicles
-        .first()
+    update_data = vehicle_update.dict(exclude_unset=True)
+    vehicles = models.Vehicle.__table__
+    values: Dict[str, Any] = dict(
+        update_data,
+        version=vehicles.c.version + 1,
+        updated_at=datetime.now(timezone.utc),
+    )
+
+    service_alert_level = None
+    if "last_service_date" in update_data:
+        # Alert right away and record the level so the sweeper does not repeat it
+        values["next_service_due"] = models.next_service_due_for(update_data["last_service_date"])
+        service_alert_level = alerts.service_alert_level(values["next_service_due"], datetime.now(timezone.utc))
+        values["service_alert_level"] = service_alert_level
+    if "latitude" in update_data:
+        values["geohash"] = geo.encode_optional(update_data["latitude"], update_data["longitude"])
+
+    statement = (
+        update(vehicles)
+        .where(vehicles.c.id == vehicle_id)
+        .where(vehicles.c.owner_id == owner_id)  # Security: only own vehicles
     )
+    if expected_version is not None:
+        statement = statement.where(vehicles.c.version == expected_version)
+    db_vehicle = db.execute(statement.values(**values).returning(*vehicles.c)).first()
+
     if db_vehicle is None:
-        raise HTTPException(status_code=404, detail="Vehicle not found")
-    
-    update_data = vehicle_update.dict(exclude_unset=True)
-    for key, value in update_data.items():
-        setattr(db_vehicle, key, value)
-    
-    db.commit()
-    db.refresh(db_vehicle)
+        exists = (
+            db.query(models.Vehicle.version)
+            .filter(models.Vehicle.id == vehicle_id)
+            .filter(models.Vehicle.owner_id == owner_id)
+            .first()
+        )
+        if exists is None:
+            raise HTTPException(status_code=404, detail="Vehicle not found")
+        raise HTTPException(
+            status_code=412,
+            detail="Vehicle was modified by someone else; reload it and retry",
+            headers={"ETag": _etag(exists.version)},
+        )
+
+    issues = (
+        db.query(models.VehicleIssue)
+        .filter(models.VehicleIssue.vehicle_id == vehicle_id)
+        .all()
+    )
 
-    _emit_vehicle_event("vehicle_updated", db_vehicle, {"updates": _serialize_updates(update_data)})
-
-    # Check if service date update requires an alert
-    if "last_service_date" in update_data and db_vehicle.last_service_date:
-        from datetime import datetime, timedelta, timezone
-        now = datetime.now(timezone.utc)
-        service_date = db_vehicle.last_service_date
-        if service_date.tzinfo is None:
-            service_date = service_date.replace(tzinfo=timezone.utc)
-        one_year = service_date + timedelta(days=365)
-        days_remaining = (one_year - now).days
-        
-        if days_remaining < 0:
-            _emit_vehicle_event("vehicle_service_alert", db_vehicle, {
-                "severity": "critical",
-                "message": f"Serwis przeterminowany o {abs(days_remaining)} dni!",
-                "days_remaining": days_remaining,
-            })
-        elif days_remaining <= 30:
-            _emit_vehicle_event("vehicle_service_alert", db_vehicle, {
-                "severity": "high",
-                "message": f"Serwis za {days_remaining} dni",
-                "days_remaining": days_remaining,
-            })
+    emit_vehicle_event(db, "vehicle_updated", db_vehicle, {"updates": serialize_updates(update_data)})
+    if service_alert_level:
+        emit_vehicle_event(
+            db,
+            "vehicle_service_alert",
+            db_vehicle,
+            alerts.service_alert_payload(
+                service_alert_level,
+                alerts.days_until(db_vehicle.next_service_due, datetime.now(timezone.utc)),
+            ),
+        )
+    db.commit()
 
-    return db_vehicle
+    response.headers["ETag"] = _etag(db_vehicle.version)
+    return schemas.Vehicle.model_validate(db_vehicle).model_copy(update={"issues": issues})
 
 
 @router.delete("/vehicles/{vehicle_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -239,16 +385,51 @@ async def delete_vehicle(
         )
     
     # Store data for event before deletion
-    vehicle_data = _serialize_vehicle(db_vehicle)
+    vehicle_data = serialize_vehicle(db_vehicle)
     
     db.delete(db_vehicle)
+    outbox.enqueue(db, "vehicle_deleted", vehicle_data)
     db.commit()
     
-    messaging.publish_message("vehicle_deleted", vehicle_data)
-    
     return None
 
 
+@router.get("/vehicles/{vehicle_id}/telemetry", response_model=schemas.TelemetrySeries)
+async def read_vehicle_telemetry(
+    vehicle_id: int,
+    start: datetime,
+    end: Optional[datetime] = None,
+    resolution: Literal["auto", "raw", "1m", "1h"] = "auto",
+    metrics: Optional[str] = Query(None, description="Comma-separated, e.g. latitude,longitude,speed_kmh"),
+    max_points: int = Query(5000, ge=1, le=50000),
+    db: Session = Depends(database.get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Telemetry history as parallel arrays. resolution=auto serves short windows from raw
+    samples and longer ones from the 1-minute or 1-hour rollups.
+    """
+    owner_id = get_owner_id(current_user)
+    end = end or datetime.now(timezone.utc)
+    if start >= end:
+        raise HTTPException(status_code=422, detail="start must be before end")
+    wanted = None
+    if metrics:
+        wanted = [metric.strip() for metric in metrics.split(",") if metric.strip()]
+        unknown = sorted(set(wanted) - set(timeseries.ROLLUP_METRICS))
+        if unknown:
+            raise HTTPException(status_code=422, detail=f"Unknown metrics: {', '.join(unknown)}")
+
+    exists = (
+        db.query(models.Vehicle.id)
+        .filter(models.Vehicle.id == vehicle_id)
+        .filter(models.Vehicle.owner_id == owner_id)
+        .first()
+    )
+    if exists is None:
+        raise HTTPException(status_code=404, detail="Vehicle not found")
+    return timeseries.read_range(db, vehicle_id, start, end, resolution, wanted, max_points)
+
 @router.get("/vehicles/{vehicle_id}/issues", response_model=List[schemas.VehicleIssue])
 async def list_vehicle_issues(
     vehicle_id: int, 
@@ -300,24 +481,26 @@ async def create_vehicle_issue(
         description=payload.description,
     )
     db.add(issue)
+    alerts.adjust_issue_counters(db, vehicle.id, None, ("open", issue.severity))
     
     # Auto-set vehicle to maintenance if issue is high or critical severity
-    if issue.severity in ("high", "critical"):
+    if issue.severity in alerts.HIGH_SEVERITIES:
         vehicle.status = "maintenance"
     
-    db.commit()
-    db.refresh(issue)
+    db.flush()
     event_payload = {
         "severity": issue.severity,
         "message": issue.title,
-        "issue": _serialize_issue(issue),
+        "issue": serialize_issue(issue),
         "updates": {
             "status": "issue",
             "issue_id": issue.id,
             "severity": issue.severity,
         },
     }
-    _emit_vehicle_event("vehicle_issue_created", vehicle, event_payload)
+    emit_vehicle_event(db, "vehicle_issue_created", vehicle, event_payload)
+    db.commit()
+    db.refresh(issue)
     return issue
 
 
@@ -355,10 +538,8 @@ async def return_vehicle(
     db_vehicle.status = "available"
     db_vehicle.current_driver_id = None
     
+    emit_vehicle_event(db, "vehicle_returned", db_vehicle, {"returned_by": user_id})
     db.commit()
-    db.refresh(db_vehicle)
-    
-    _emit_vehicle_event("vehicle_returned", db_vehicle, {"returned_by": user_id})
     
     return {"status": "success", "message": "Vehicle returned successfully"}
 
@@ -394,34 +575,25 @@ async def update_vehicle_issue(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Issue not found")
 
     updates = payload.dict(exclude_unset=True)
+    before = (issue.status, issue.severity)
     for field, value in updates.items():
         setattr(issue, field, value)
+    open_critical_issues = alerts.adjust_issue_counters(db, vehicle.id, before, (issue.status, issue.severity))
     
-    # Auto-restore vehicle to available when issue is resolved
-    if issue.status == "resolved" and vehicle.status == "maintenance":
-        # Check if there are no other open high/critical issues
-        open_critical_issues = (
-            db.query(models.VehicleIssue)
-            .filter(
-                models.VehicleIssue.vehicle_id == vehicle_id,
-                models.VehicleIssue.id != issue_id,
-                models.VehicleIssue.status != "resolved",
-                models.VehicleIssue.severity.in_(["high", "critical"])
-            )
-            .count()
-        )
-        if open_critical_issues == 0:
-            vehicle.status = "available"
+    # Auto-restore vehicle to available when no open high/critical issues remain
+    if issue.status == "resolved" and vehicle.status == "maintenance" and open_critical_issues == 0:
+        vehicle.status = "available"
     
-    db.commit()
-    db.refresh(issue)
-    event_updates = _serialize_updates(updates)
+    db.flush()
+    event_updates = serialize_updates(updates)
     event_updates.update({"issue_id": issue.id, "status": issue.status})
     event_payload = {
         "severity": issue.severity,
         "message": issue.title,
-        "issue": _serialize_issue(issue),
+        "issue": serialize_issue(issue),
         "updates": event_updates,
     }
-    _emit_vehicle_event("vehicle_issue_updated", vehicle, event_payload)
+    emit_vehicle_event(db, "vehicle_issue_updated", vehicle, event_payload)
+    db.commit()
+    db.refresh(issue)
     return issue
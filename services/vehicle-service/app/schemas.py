@@ -1,7 +1,7 @@
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Literal, Optional
 
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, ConfigDict, Field, field_validator, model_validator
 
 
 class VehicleIssueBase(BaseModel):
@@ -35,8 +35,7 @@ class VehicleIssue(BaseModel):
     updated_at: datetime
     resolved_at: Optional[datetime]
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class VehicleBase(BaseModel):
     vin: str = Field(..., min_length=17, max_length=17, description="Vehicle Identification Number (exactly 17 characters)")
@@ -79,13 +78,109 @@ class VehicleUpdate(BaseModel):
     last_service_date: Optional[datetime] = None
     current_driver_id: Optional[str] = None
 
+    @model_validator(mode="after")
+    def validate_coordinates(self):
+        # The geohash is written with the coordinates, so it needs both of them
+        if ("latitude" in self.model_fields_set) != ("longitude" in self.model_fields_set):
+            raise ValueError("latitude and longitude must be sent together")
+        return self
+
 class Vehicle(VehicleBase):
     id: int
     owner_id: str  # Admin who owns this vehicle
+    next_service_due: Optional[datetime] = None
+    open_issue_count: int = 0
+    open_critical_issue_count: int = 0
+    version: int = 1  # Send back as If-Match to update only if nobody changed the vehicle meanwhile
     created_at: datetime
     updated_at: datetime
     issues: List[VehicleIssue] = Field(default_factory=list)
     city: Optional[str] = None
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
+
+
+class VehicleAlert(BaseModel):
+    type: str  # service_overdue, service_due_soon, issue
+    vehicle_id: int
+    vehicle_label: str
+    license_plate: Optional[str] = None
+    severity: str
+    message: str
+    days_remaining: Optional[int] = None
+    next_service_due: Optional[datetime] = None
+    issue_id: Optional[int] = None
+
+
+class VehicleSummary(BaseModel):
+    """Lightweight list projection: no issue bodies, just the maintained counters."""
+    id: int
+    owner_id: str
+    vin: str
+    make: str
+    model: str
+    year: int
+    license_plate: str
+    status: Optional[str] = None
+    fuel_type: Optional[str] = None
+    fuel_level: Optional[int] = None
+    battery_level: Optional[int] = None
+    odometer: Optional[int] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    city: Optional[str] = None
+    current_driver_id: Optional[str] = None
+    last_service_date: Optional[datetime] = None
+    next_service_due: Optional[datetime] = None
+    open_issue_count: int = 0
+    open_critical_issue_count: int = 0
+    version: int = 1
+    updated_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class VehicleBatchRequest(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=500)
+    fields: Literal["full", "summary"] = "full"
+
+
+class InternalVehicleBatchRequest(VehicleBatchRequest):
+    owner_id: Optional[str] = None  # Optional extra scoping; service callers are trusted
+
+
+class NearbyVehicle(VehicleSummary):
+    distance_km: float
+
+
+class TelemetrySample(BaseModel):
+    vehicle_id: int
+    recorded_at: Optional[datetime] = None  # Defaults to the time the batch is received
+    latitude: Optional[float] = Field(None, ge=-90, le=90)
+    longitude: Optional[float] = Field(None, ge=-180, le=180)
+    fuel_level: Optional[int] = Field(None, ge=0, le=100)
+    battery_level: Optional[int] = Field(None, ge=0, le=100)
+    odometer: Optional[int] = Field(None, ge=0)
+    speed_kmh: Optional[float] = Field(None, ge=0)
+
+
+class TelemetryBatch(BaseModel):
+    samples: List[TelemetrySample] = Field(..., min_length=1, max_length=5000)
+
+
+class TelemetryResult(BaseModel):
+    accepted: int
+    rejected: int  # Unknown vehicles or vehicles outside the caller's fleet
+    vehicles_updated: int
+    events_emitted: int
+
+
+class TelemetrySeries(BaseModel):
+    vehicle_id: int
+    resolution: str  # raw, 1m or 1h
+    start: datetime
+    end: datetime
+    complete_to: Optional[datetime] = None  # Rollup tiers: buckets after this are not rolled up yet
+    truncated: bool  # An explicit resolution had more than max_points points
+    t: List[int]  # Epoch seconds: sample time (raw) or bucket start
+    series: Dict[str, List[Optional[float]]]
@@ -0,0 +1,127 @@
+"""
+High-frequency telemetry ingestion.
+
+A batch of samples from many vehicles costs three statements: one ownership check,
+one multi-row INSERT into vehicle_telemetry and one UPDATE ... FROM (VALUES ...)
+that moves each vehicle's latest-state columns to its newest sample. No ORM
+objects are loaded, and vehicle_telemetry events are throttled to one per vehicle
+per TELEMETRY_EVENT_INTERVAL_SECONDS and queued in the outbox with the batch.
+"""
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import DateTime, Float, Integer, String, column, func, or_, update, values
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from . import models, outbox, schemas
+from .config import TELEMETRY_EVENT_INTERVAL_SECONDS
+from .events import vehicle_event
+from .geo import encode_optional
+from .metrics import TELEMETRY_SAMPLES
+
+# Last vehicle_telemetry event per vehicle id (monotonic seconds), oldest first; per replica by design.
+# Entries older than the interval no longer throttle anything and are pruned, so this holds at most
+# the vehicles that emitted during the last TELEMETRY_EVENT_INTERVAL_SECONDS.
+_last_emitted: "OrderedDict[int, float]" = OrderedDict()
+_last_emitted_lock = threading.Lock()
+
+
+def _due_for_event(vehicle_id: int, now: float) -> bool:
+    return now - _last_emitted.get(vehicle_id, float("-inf")) >= TELEMETRY_EVENT_INTERVAL_SECONDS
+
+
+def _record_emitted(vehicle_ids: Iterable[int], now: float) -> None:
+    """Start the throttle interval of vehicles whose events were committed to the outbox."""
+    with _last_emitted_lock:
+        for vehicle_id in vehicle_ids:
+            _last_emitted[vehicle_id] = now
+            _last_emitted.move_to_end(vehicle_id)
+        while _last_emitted and now - next(iter(_last_emitted.values())) >= TELEMETRY_EVENT_INTERVAL_SECONDS:
+            _last_emitted.popitem(last=False)
+
+
+def ingest(db: Session, samples: List[schemas.TelemetrySample], owner_id: Optional[str]) -> Dict[str, int]:
+    """Store samples for vehicles the caller may write (owner_id=None: any vehicle)."""
+    known_query = db.query(models.Vehicle.id).filter(models.Vehicle.id.in_({s.vehicle_id for s in samples}))
+    if owner_id is not None:
+        known_query = known_query.filter(models.Vehicle.owner_id == owner_id)
+    known = {vehicle_id for (vehicle_id,) in known_query}
+
+    received_at = datetime.now(timezone.utc)
+    rows = [
+        dict(sample.dict(), recorded_at=sample.recorded_at or received_at)
+        for sample in samples
+        if sample.vehicle_id in known
+    ]
+    TELEMETRY_SAMPLES.labels("accepted").inc(len(rows))
+    TELEMETRY_SAMPLES.labels("rejected").inc(len(samples) - len(rows))
+    if not rows:
+        return {"accepted": 0, "rejected": len(samples), "vehicles_updated": 0, "events_emitted": 0}
+
+    # Retried batches hit the (vehicle_id, recorded_at) key and are skipped
+    db.execute(insert(models.VehicleTelemetry).on_conflict_do_nothing(), rows)
+
+    newest: Dict[int, dict] = {}
+    for row in rows:
+        current = newest.get(row["vehicle_id"])
+        if current is None or row["recorded_at"] > current["recorded_at"]:
+            newest[row["vehicle_id"]] = row
+    latest = values(
+        column("vehicle_id", Integer),
+        column("recorded_at", DateTime(timezone=True)),
+        column("latitude", Float),
+        column("longitude", Float),
+        column("fuel_level", Integer),
+        column("battery_level", Integer),
+        column("odometer", Integer),
+        column("geohash", String),
+        name="latest",
+    ).data([
+        (
+            r["vehicle_id"], r["recorded_at"], r["latitude"], r["longitude"],
+            r["fuel_level"], r["battery_level"], r["odometer"], encode_optional(r["latitude"], r["longitude"]),
+        )
+        for r in newest.values()
+    ])
+
+    vehicles = models.Vehicle.__table__
+    statement = (
+        update(vehicles)
+        .where(vehicles.c.id == latest.c.vehicle_id)
+        # Late or out-of-order batches still land in the history but never move the vehicle backwards
+        .where(or_(vehicles.c.last_telemetry_at.is_(None), vehicles.c.last_telemetry_at < latest.c.recorded_at))
+        .values(
+            latitude=func.coalesce(latest.c.latitude, vehicles.c.latitude),
+            longitude=func.coalesce(latest.c.longitude, vehicles.c.longitude),
+            geohash=func.coalesce(latest.c.geohash, vehicles.c.geohash),
+            fuel_level=func.coalesce(latest.c.fuel_level, vehicles.c.fuel_level),
+            battery_level=func.coalesce(latest.c.battery_level, vehicles.c.battery_level),
+            odometer=func.greatest(vehicles.c.odometer, latest.c.odometer),
+            last_telemetry_at=latest.c.recorded_at,
+            # A position ping is not an edit of the vehicle record
+            updated_at=vehicles.c.updated_at,
+        )
+        .returning(*vehicles.c)
+    )
+    updated = db.execute(statement).all()
+
+    now = time.monotonic()
+    due = [vehicle for vehicle in updated if _due_for_event(vehicle.id, now)]
+    events = [
+        ("vehicle_telemetry", vehicle_event("vehicle_telemetry", vehicle, {"recorded_at": vehicle.last_telemetry_at.isoformat()}))
+        for vehicle in due
+    ]
+    outbox.enqueue_many(db, events)
+    db.commit()
+    # Only once the events are committed: a rolled-back batch must not silence the next one
+    _record_emitted((vehicle.id for vehicle in due), now)
+    return {
+        "accepted": len(rows),
+        "rejected": len(samples) - len(rows),
+        "vehicles_updated": len(updated),
+        "events_emitted": len(events),
+    }
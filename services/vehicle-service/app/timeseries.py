@@ -0,0 +1,347 @@
+"""
+Telemetry history: time-partitioned raw samples, 1-minute and 1-hour rollups,
+and range reads that answer from the coarsest tier fine enough for the window.
+
+vehicle_telemetry is range-partitioned by day and vehicle_telemetry_1m by month,
+so retention is a DROP TABLE rather than a DELETE. A maintenance loop (one
+replica at a time, via an advisory lock) creates partitions ahead of time,
+rolls complete buckets up and drops partitions past their retention. Rollups
+re-read the last TELEMETRY_LATE_SECONDS before their watermark, so samples
+delivered a little late still land in their bucket.
+
+Range reads return one array per metric plus a shared array of epoch seconds
+instead of a list of point objects.
+"""
+import asyncio
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from . import models
+from .config import (
+    TELEMETRY_1M_RETENTION_DAYS,
+    TELEMETRY_LATE_SECONDS,
+    TELEMETRY_PARTITIONS_AHEAD_DAYS,
+    TELEMETRY_RAW_RETENTION_DAYS,
+)
+from .database import engine
+
+RESOLUTIONS = ("raw", "1m", "1h")
+METRICS = ("latitude", "longitude", "fuel_level", "battery_level", "odometer", "speed_kmh")
+ROLLUP_METRICS = METRICS + ("speed_kmh_max", "samples")
+# Windows up to these spans are served from the finer tiers by resolution=auto
+RAW_MAX_SPAN = timedelta(hours=6)
+MINUTE_MAX_SPAN = timedelta(days=7)
+DECIMALS = {"latitude": 5, "longitude": 5, "fuel_level": 1, "battery_level": 1, "speed_kmh": 1, "speed_kmh_max": 1}
+# pg_try_advisory_lock key shared by all vehicle-service replicas
+MAINTENANCE_LOCK_KEY = 0x7E1E_0001
+
+ROLLUP_1M = text("""
+    INSERT INTO vehicle_telemetry_1m AS r (
+        vehicle_id, bucket, samples, latitude, longitude,
+        fuel_level, battery_level, odometer, speed_kmh, speed_kmh_max
+    )
+    SELECT
+        vehicle_id,
+        date_trunc('minute', recorded_at, 'UTC'),
+        count(*),
+        (array_agg(latitude ORDER BY recorded_at DESC) FILTER (WHERE latitude IS NOT NULL AND longitude IS NOT NULL))[1],
+        (array_agg(longitude ORDER BY recorded_at DESC) FILTER (WHERE latitude IS NOT NULL AND longitude IS NOT NULL))[1],
+        avg(fuel_level),
+        avg(battery_level),
+        max(odometer),
+        avg(speed_kmh),
+        max(speed_kmh)
+    FROM vehicle_telemetry
+    WHERE recorded_at >= :start AND recorded_at < :end
+    GROUP BY 1, 2
+    ON CONFLICT (vehicle_id, bucket) DO UPDATE SET
+        samples = EXCLUDED.samples,
+        latitude = EXCLUDED.latitude,
+        longitude = EXCLUDED.longitude,
+        fuel_level = EXCLUDED.fuel_level,
+        battery_level = EXCLUDED.battery_level,
+        odometer = EXCLUDED.odometer,
+        speed_kmh = EXCLUDED.speed_kmh,
+        speed_kmh_max = EXCLUDED.speed_kmh_max
+""")
+
+# Averages are weighted by the number of raw samples behind each minute
+ROLLUP_1H = text("""
+    INSERT INTO vehicle_telemetry_1h AS r (
+        vehicle_id, bucket, samples, latitude, longitude,
+        fuel_level, battery_level, odometer, speed_kmh, speed_kmh_max
+    )
+    SELECT
+        vehicle_id,
+        date_trunc('hour', bucket, 'UTC'),
+        sum(samples),
+        (array_agg(latitude ORDER BY bucket DESC) FILTER (WHERE latitude IS NOT NULL))[1],
+        (array_agg(longitude ORDER BY bucket DESC) FILTER (WHERE latitude IS NOT NULL))[1],
+        sum(fuel_level * samples) / nullif(sum(samples) FILTER (WHERE fuel_level IS NOT NULL), 0),
+        sum(battery_level * samples) / nullif(sum(samples) FILTER (WHERE battery_level IS NOT NULL), 0),
+        max(odometer),
+        sum(speed_kmh * samples) / nullif(sum(samples) FILTER (WHERE speed_kmh IS NOT NULL), 0),
+        max(speed_kmh_max)
+    FROM vehicle_telemetry_1m
+    WHERE bucket >= :start AND bucket < :end
+    GROUP BY 1, 2
+    ON CONFLICT (vehicle_id, bucket) DO UPDATE SET
+        samples = EXCLUDED.samples,
+        latitude = EXCLUDED.latitude,
+        longitude = EXCLUDED.longitude,
+        fuel_level = EXCLUDED.fuel_level,
+        battery_level = EXCLUDED.battery_level,
+        odometer = EXCLUDED.odometer,
+        speed_kmh = EXCLUDED.speed_kmh,
+        speed_kmh_max = EXCLUDED.speed_kmh_max
+""")
+
+
+def _utc(value: datetime) -> datetime:
+    return value.astimezone(timezone.utc) if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def _floor(value: datetime, step: timedelta) -> datetime:
+    epoch = datetime(1970, 1, 1, tzinfo=timezone.utc)
+    return epoch + (value - epoch) // step * step
+
+
+def _midnight(day: date) -> datetime:
+    return datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+
+
+def _next_month(day: date) -> date:
+    return date(day.year + day.month // 12, day.month % 12 + 1, 1)
+
+
+# --- Partitions -------------------------------------------------------------
+
+def _create_partition(conn: Connection, parent: str, key: str, name: str, lower: datetime, upper: datetime) -> bool:
+    """
+    Add one range partition. Rows that already fell into the parent's default
+    partition for that range are moved over first, or ATTACH would refuse.
+    """
+    if conn.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar() is not None:
+        return False
+    conn.execute(text(f"CREATE TABLE {name} (LIKE {parent} INCLUDING DEFAULTS)"))
+    conn.execute(
+        text(
+            f"WITH moved AS (DELETE FROM {parent}_default WHERE {key} >= :lower AND {key} < :upper RETURNING *) "
+            f"INSERT INTO {name} SELECT * FROM moved"
+        ),
+        {"lower": lower, "upper": upper},
+    )
+    conn.execute(text(
+        f"ALTER TABLE {parent} ATTACH PARTITION {name} "
+        f"FOR VALUES FROM ('{lower.isoformat()}') TO ('{upper.isoformat()}')"
+    ))
+    return True
+
+
+def ensure_partitions(conn: Connection, now: datetime) -> int:
+    """Daily raw partitions and monthly 1m partitions through TELEMETRY_PARTITIONS_AHEAD_DAYS."""
+    created = 0
+    today = now.date()
+    last_day = today + timedelta(days=TELEMETRY_PARTITIONS_AHEAD_DAYS)
+    day = today
+    while day <= last_day:
+        created += _create_partition(
+            conn, "vehicle_telemetry", "recorded_at",
+            f"vehicle_telemetry_p{day:%Y%m%d}", _midnight(day), _midnight(day + timedelta(days=1)),
+        )
+        day += timedelta(days=1)
+    month = today.replace(day=1)
+    while month <= last_day:
+        created += _create_partition(
+            conn, "vehicle_telemetry_1m", "bucket",
+            f"vehicle_telemetry_1m_p{month:%Y%m}", _midnight(month), _midnight(_next_month(month)),
+        )
+        month = _next_month(month)
+    return created
+
+
+def _partitions(conn: Connection, parent: str) -> List[str]:
+    return list(conn.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = CAST(:parent AS regclass)"
+        ),
+        {"parent": parent},
+    ).scalars())
+
+
+def drop_expired(conn: Connection, now: datetime) -> int:
+    """Drop partitions wholly older than their tier's retention. The 1h tier is kept."""
+    dropped = 0
+    tiers = (
+        ("vehicle_telemetry", "recorded_at", "%Y%m%d", TELEMETRY_RAW_RETENTION_DAYS, lambda d: d + timedelta(days=1)),
+        ("vehicle_telemetry_1m", "bucket", "%Y%m", TELEMETRY_1M_RETENTION_DAYS, _next_month),
+    )
+    for parent, key, suffix_format, retention_days, next_period in tiers:
+        cutoff = now - timedelta(days=retention_days)
+        prefix = f"{parent}_p"
+        for name in _partitions(conn, parent):
+            if not name.startswith(prefix):
+                continue
+            try:
+                start = datetime.strptime(name[len(prefix):], suffix_format).date()
+            except ValueError:
+                continue
+            if _midnight(next_period(start)) <= cutoff:
+                conn.execute(text(f"DROP TABLE {name}"))
+                dropped += 1
+        conn.execute(text(f"DELETE FROM {parent}_default WHERE {key} < :cutoff"), {"cutoff": cutoff})
+    return dropped
+
+
+# --- Rollups ----------------------------------------------------------------
+
+def _watermark(conn: Union[Connection, Session], tier: str) -> Optional[datetime]:
+    return conn.execute(
+        text("SELECT rolled_up_to FROM telemetry_rollups WHERE tier = :tier"), {"tier": tier}
+    ).scalar()
+
+
+def _set_watermark(conn: Connection, tier: str, value: datetime) -> None:
+    conn.execute(
+        text(
+            "INSERT INTO telemetry_rollups (tier, rolled_up_to) VALUES (:tier, :value) "
+            "ON CONFLICT (tier) DO UPDATE SET rolled_up_to = EXCLUDED.rolled_up_to"
+        ),
+        {"tier": tier, "value": value},
+    )
+
+
+def roll_up(conn: Connection, now: datetime) -> None:
+    """Recompute complete 1m buckets from raw samples, then complete 1h buckets from 1m."""
+    late = timedelta(seconds=TELEMETRY_LATE_SECONDS)
+
+    minute_end = _floor(now, timedelta(minutes=1))
+    watermark = _watermark(conn, "1m") or minute_end - timedelta(days=TELEMETRY_RAW_RETENTION_DAYS)
+    minute_start = _floor(_utc(watermark) - late, timedelta(minutes=1))
+    if minute_start < minute_end:
+        conn.execute(ROLLUP_1M, {"start": minute_start, "end": minute_end})
+        _set_watermark(conn, "1m", minute_end)
+
+    # An hour is complete once every one of its minutes is
+    hour_end = _floor(minute_end, timedelta(hours=1))
+    watermark = _watermark(conn, "1h") or hour_end - timedelta(days=TELEMETRY_1M_RETENTION_DAYS)
+    hour_start = _floor(_utc(watermark) - late, timedelta(hours=1))
+    if hour_start < hour_end:
+        conn.execute(ROLLUP_1H, {"start": hour_start, "end": hour_end})
+        _set_watermark(conn, "1h", hour_end)
+
+
+def run_maintenance(now: Optional[datetime] = None) -> bool:
+    """One maintenance pass; False when another replica holds the lock."""
+    now = now or datetime.now(timezone.utc)
+    with engine.connect() as conn:
+        locked = conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": MAINTENANCE_LOCK_KEY}).scalar()
+        conn.commit()
+        if not locked:
+            return False
+        try:
+            for step in (ensure_partitions, roll_up, drop_expired):
+                step(conn, now)
+                conn.commit()
+        finally:
+            conn.rollback()
+            conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MAINTENANCE_LOCK_KEY})
+            conn.commit()
+    return True
+
+
+async def run_telemetry_maintenance(interval_seconds: float) -> None:
+    while True:
+        try:
+            await asyncio.to_thread(run_maintenance)
+        except Exception as e:
+            print(f"Telemetry maintenance failed: {e}")
+        await asyncio.sleep(interval_seconds)
+
+
+# --- Range reads ------------------------------------------------------------
+
+def pick_resolution(start: datetime, end: datetime, now: datetime) -> str:
+    span = end - start
+    if span <= RAW_MAX_SPAN and start >= now - timedelta(days=TELEMETRY_RAW_RETENTION_DAYS):
+        return "raw"
+    if span <= MINUTE_MAX_SPAN and start >= now - timedelta(days=TELEMETRY_1M_RETENTION_DAYS):
+        return "1m"
+    return "1h"
+
+
+def _fetch(
+    db: Session, vehicle_id: int, resolution: str, start: datetime, end: datetime,
+    metrics: Sequence[str], limit: int,
+) -> List[Tuple[Any, ...]]:
+    if resolution == "raw":
+        model, time_column = models.VehicleTelemetry, models.VehicleTelemetry.recorded_at
+    else:
+        model = models.VehicleTelemetryMinute if resolution == "1m" else models.VehicleTelemetryHour
+        time_column = model.bucket
+    return (
+        db.query(time_column, *(getattr(model, metric) for metric in metrics))
+        .filter(model.vehicle_id == vehicle_id)
+        .filter(time_column >= start, time_column < end)
+        .order_by(time_column)
+        .limit(limit)
+        .all()
+    )
+
+
+def _round(metric: str, value: Any) -> Any:
+    if value is None:
+        return None
+    digits = DECIMALS.get(metric)
+    return round(float(value), digits) if digits is not None else int(value)
+
+
+def read_range(
+    db: Session,
+    vehicle_id: int,
+    start: datetime,
+    end: datetime,
+    resolution: str = "auto",
+    metrics: Optional[Sequence[str]] = None,
+    max_points: int = 5000,
+    now: Optional[datetime] = None,
+) -> Dict[str, Any]:
+    """
+    Telemetry of one vehicle in [start, end) as parallel arrays. With resolution=auto
+    the tier follows the window length, stepping to a coarser tier if the finer one
+    would exceed max_points; an explicit resolution is cut at max_points instead.
+    """
+    now = now or datetime.now(timezone.utc)
+    start, end = _utc(start), _utc(end)
+    tiers = [resolution] if resolution != "auto" else list(RESOLUTIONS[RESOLUTIONS.index(pick_resolution(start, end, now)):])
+
+    for tier in tiers:
+        wanted = [m for m in (metrics or METRICS) if tier != "raw" or m in METRICS]
+        rows = _fetch(db, vehicle_id, tier, start, end, wanted, max_points + 1)
+        if len(rows) <= max_points or tier == tiers[-1]:
+            break
+
+    truncated = len(rows) > max_points
+    rows = rows[:max_points]
+    series: Dict[str, List[Any]] = {metric: [] for metric in wanted}
+    timestamps = []
+    for row in rows:
+        timestamps.append(int(_utc(row[0]).timestamp()))
+        for metric, value in zip(wanted, row[1:]):
+            series[metric].append(_round(metric, value))
+    return {
+        "vehicle_id": vehicle_id,
+        "resolution": tier,
+        "start": start,
+        "end": end,
+        # Rolled-up tiers only cover complete buckets up to this instant
+        "complete_to": None if tier == "raw" else _watermark(db, tier),
+        "truncated": truncated,
+        "t": timestamps,
+        "series": series,
+    }
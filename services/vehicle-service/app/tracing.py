@@ -0,0 +1,17 @@
+"""
+OpenTelemetry tracing for Vehicle Service.
+Continues the W3C traceparent sent by the gateway and forwards it on every downstream call,
+including into the vehicle events published to RabbitMQ.
+The helpers are fleetify_tracing's (a copy of services/shared); this module
+supplies the service's configuration.
+"""
+from fastapi import FastAPI
+
+from . import fleetify_tracing
+from .config import OTEL_EXPORTER_OTLP_ENDPOINT, OTEL_SERVICE_NAME, OTEL_TRACES_FILE
+from .fleetify_tracing import client_span, consumer_span, producer_span, trace_headers, tracer
+
+
+def trace_app(app: FastAPI) -> None:
+    """Start a server span per request, parented to the incoming traceparent header."""
+    fleetify_tracing.trace_app(app, OTEL_SERVICE_NAME, OTEL_EXPORTER_OTLP_ENDPOINT, OTEL_TRACES_FILE)
@@ -1,16 +1,60 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm.exc import StaleDataError
 from app.routes import router
+from app.database import SessionLocal
+from app.models import Vehicle
+from app.access_tokens import start_revocation_listener
+from app.alerts import run_service_sweeper
+from app.config import SERVICE_SWEEP_INTERVAL_SECONDS, TELEMETRY_MAINTENANCE_INTERVAL_SECONDS
+from app.timeseries import run_telemetry_maintenance
 import asyncio
+import threading
 from app.messaging import consume_messages
+from app.outbox import run_outbox_relay
+from app.metrics import instrument_app
+from app.profiling import profile_app
+from app.tracing import trace_app
 
 app = FastAPI(title="Vehicle Service")
+instrument_app(app)
+trace_app(app)
+profile_app(app)
 
 app.include_router(router)
 
+@app.exception_handler(StaleDataError)
+async def stale_vehicle_handler(request: Request, exc: StaleDataError):
+    # An ORM write lost the race against a concurrent edit (Vehicle.version changed):
+    # answer like a failed If-Match, with the version to reload
+    headers = {}
+    vehicle_id = request.path_params.get("vehicle_id")
+    if vehicle_id is not None:
+        db = SessionLocal()
+        try:
+            version = db.query(Vehicle.version).filter(Vehicle.id == int(vehicle_id)).scalar()
+        finally:
+            db.close()
+        if version is not None:
+            headers["ETag"] = f'"{version}"'
+    return JSONResponse(
+        status_code=412,
+        content={"detail": "Vehicle was modified by someone else; reload it and retry"},
+        headers=headers,
+    )
+
 @app.on_event("startup")
 async def startup_event():
     # Start RabbitMQ consumer in background
     asyncio.create_task(consume_messages())
+    # Publish committed outbox events (pika's blocking connection wants its own thread)
+    threading.Thread(target=run_outbox_relay, daemon=True).start()
+    # Flag vehicles that become due for service without anyone touching them
+    asyncio.create_task(run_service_sweeper(SERVICE_SWEEP_INTERVAL_SECONDS))
+    # Telemetry partitions, rollups and retention
+    asyncio.create_task(run_telemetry_maintenance(TELEMETRY_MAINTENANCE_INTERVAL_SECONDS))
+    # Revoked access tokens, so callers can be identified without asking user-management
+    start_revocation_listener()
 
 @app.get("/health")
 def health_check():
@@ -0,0 +1,49 @@
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
+from app import models, routes
+
+OWNER = "admin-1"  # The admin the route tests call as
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+
+    @event.listens_for(engine, "connect")
+    def _c_collation(connection, _record):
+        # vehicles.geohash is declared with PostgreSQL's "C" collation: plain byte order
+        connection.create_collation("C", lambda a, b: (a > b) - (a < b))
+
+    models.Vehicle.__table__.create(engine)
+    models.VehicleIssue.__table__.create(engine)
+    with Session(engine) as session:
+        yield session
+
+
+@pytest.fixture
+def events(monkeypatch):
+    """Events routes would add to the (PostgreSQL) outbox."""
+    emitted = []
+    monkeypatch.setattr(routes, "emit_vehicle_event", lambda db, name, vehicle, extra=None: emitted.append((name, extra)))
+    return emitted
+
+
+@pytest.fixture
+def add_vehicle(db):
+    def add(number, owner_id=OWNER, **fields):
+        vehicle = models.Vehicle(
+            owner_id=owner_id,
+            vin=f"WVWZZZ1JZXW{number:06d}",
+            make="Skoda",
+            model="Octavia",
+            year=2021,
+            license_plate=f"WA {number:05d}",
+            **fields,
+        )
+        db.add(vehicle)
+        db.commit()
+        return vehicle
+
+    return add
@@ -0,0 +1,61 @@
+import random
+
+import pytest
+
+from app import geo
+
+
+def test_encode_matches_known_geohashes():
+    assert geo.encode(57.64911, 10.40744, 11) == "u4pruydqqvj"
+    assert geo.encode(42.605, -5.603, 5) == "ezs42"
+    assert len(geo.encode(0.0, 0.0)) == geo.STORED_PRECISION
+
+
+def test_encode_optional_needs_both_coordinates():
+    assert geo.encode_optional(52.2297, None) is None
+    assert geo.encode_optional(None, 21.0122) is None
+    assert geo.encode_optional(52.2297, 21.0122) == geo.encode(52.2297, 21.0122)
+
+
+def in_prefix_range(geohash, prefixes):
+    # The same range routes._vehicles_in_cells asks the index for
+    return any(prefix <= geohash < prefix + "~" for prefix in prefixes)
+
+
+@pytest.mark.parametrize(
+    "box",
+    [
+        (52.1, 20.8, 52.4, 21.3),  # Warsaw
+        (-0.5, -0.5, 0.5, 0.5),  # around the equator and the prime meridian
+        (10.0, 179.5, 11.0, -179.5),  # across the antimeridian
+        (49.0, 14.0, 55.0, 24.2),  # a whole country
+    ],
+)
+def test_cover_prefix_ranges_contain_every_point_in_the_box(box):
+    prefixes = geo.cover(box)
+    assert 0 < len(prefixes) <= geo.MAX_COVER_CELLS
+    rng = random.Random(0)
+    min_lat, min_lon, max_lat, max_lon = box
+    width = (max_lon - min_lon) % 360.0
+    corners = [(min_lat, min_lon), (min_lat, max_lon), (max_lat, min_lon), (max_lat, max_lon)]
+    points = corners + [
+        (rng.uniform(min_lat, max_lat), (min_lon + rng.uniform(0, width) + 180.0) % 360.0 - 180.0)
+        for _ in range(500)
+    ]
+    for lat, lon in points:
+        assert geo.in_bbox(lat, lon, box)
+        assert in_prefix_range(geo.encode(lat, lon), prefixes), (lat, lon)
+
+
+def test_cover_uses_finer_cells_for_smaller_boxes():
+    city = geo.cover((52.1, 20.8, 52.4, 21.3))
+    street = geo.cover((52.2290, 21.0110, 52.2300, 21.0130))
+    assert len(street[0]) > len(city[0])
+
+
+def test_radius_bbox_wraps_the_antimeridian_and_contains_the_circle():
+    box = geo.radius_bbox(0.0, 179.9, 50.0)
+    assert box[1] > box[3]
+    assert geo.in_bbox(0.0, -179.9, box)
+    assert not geo.in_bbox(0.0, 0.0, box)
+    assert geo.haversine_km(0.0, 179.9, 0.0, -179.9) == pytest.approx(22.24, abs=0.01)
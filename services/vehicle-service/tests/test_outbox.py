@@ -0,0 +1,66 @@
+import pytest
+from opentelemetry import trace
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from sqlalchemy.orm import Session
+
+from app import messaging, outbox
+from app.tracing import tracer
+
+spans = InMemorySpanExporter()
+
+
+@pytest.fixture(scope="module", autouse=True)
+def tracer_provider():
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(spans))
+    trace.set_tracer_provider(provider)
+
+
+@pytest.fixture(autouse=True)
+def clear_spans():
+    spans.clear()
+
+
+class Channel:
+    def __init__(self):
+        self.published = []
+
+    def basic_publish(self, exchange, routing_key, body, properties):
+        self.published.append(properties.headers)
+
+
+def test_enqueued_event_carries_the_request_trace():
+    db = Session()
+    with tracer.start_as_current_span("PUT /vehicles/{vehicle_id}") as request_span:
+        outbox.enqueue(db, "vehicle_updated", {"vehicle_id": 7})
+    [row] = db.new
+
+    trace_id = format(request_span.get_span_context().trace_id, "032x")
+    assert row.trace_context["traceparent"].split("-")[1] == trace_id
+
+
+def test_event_queued_outside_a_trace_has_no_context():
+    db = Session()
+    outbox.enqueue(db, "vehicle_service_alert", {"vehicle_id": 7})
+    [row] = db.new
+
+    assert row.trace_context is None
+
+
+def test_relayed_publish_continues_the_queued_trace():
+    with tracer.start_as_current_span("PUT /vehicles/{vehicle_id}") as request_span:
+        db = Session()
+        outbox.enqueue(db, "vehicle_updated", {"vehicle_id": 7})
+    [row] = db.new
+    channel = Channel()
+
+    # The relay thread has no current span of its own
+    messaging._publish(channel, row.event_type, row.payload, row.trace_context)
+
+    [publish] = [span for span in spans.get_finished_spans() if span.kind == trace.SpanKind.PRODUCER]
+    assert publish.context.trace_id == request_span.get_span_context().trace_id
+    assert publish.parent.span_id == request_span.get_span_context().span_id
+    [headers] = channel.published
+    assert headers["traceparent"].split("-")[2] == format(publish.context.span_id, "016x")
@@ -0,0 +1,129 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException, Response
+
+from app import geo, routes, schemas
+
+ADMIN = {"id": "admin-1", "role": "admin"}
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def put(db, vehicle_id, if_match=None, **fields):
+    response = Response()
+    body = run(routes.update_vehicle(vehicle_id, schemas.VehicleUpdate(**fields), response, if_match, db, ADMIN))
+    return body, response
+
+
+def test_update_returns_the_updated_vehicle(db, events, add_vehicle):
+    vehicle = add_vehicle(1, latitude=50.06, longitude=19.94)
+    db.add(routes.models.VehicleIssue(vehicle_id=vehicle.id, title="Brakes", description="Squeaking"))
+    db.commit()
+
+    body, response = put(db, vehicle.id, if_match='"1"', fuel_level=40, latitude=52.2297, longitude=21.0122)
+
+    assert isinstance(body, schemas.Vehicle)
+    assert body.id == vehicle.id
+    assert body.fuel_level == 40
+    assert (body.latitude, body.longitude) == (52.2297, 21.0122)
+    assert body.version == 2
+    assert [issue.title for issue in body.issues] == ["Brakes"]
+    assert response.headers["ETag"] == '"2"'
+    assert db.get(routes.models.Vehicle, vehicle.id).geohash == geo.encode(52.2297, 21.0122)
+    assert [name for name, _extra in events] == ["vehicle_updated"]
+
+
+def test_update_with_stale_if_match_is_rejected_with_current_etag(db, events, add_vehicle):
+    vehicle = add_vehicle(1)
+    put(db, vehicle.id, fuel_level=40)
+
+    with pytest.raises(HTTPException) as error:
+        put(db, vehicle.id, if_match='"1"', fuel_level=10)
+
+    assert error.value.status_code == 412
+    assert error.value.headers == {"ETag": '"2"'}
+    assert db.get(routes.models.Vehicle, vehicle.id).fuel_level == 40
+
+
+def test_update_of_another_fleet_is_not_found(db, events, add_vehicle):
+    vehicle = add_vehicle(1, owner_id="admin-2")
+
+    with pytest.raises(HTTPException) as error:
+        put(db, vehicle.id, fuel_level=40)
+
+    assert error.value.status_code == 404
+
+
+def list_vehicles(db, **params):
+    params = {"skip": 0, "limit": 100, "after_id": None, "fields": None, **params}
+    return run(routes.read_vehicles(db=db, current_user=ADMIN, **params))
+
+
+def test_summary_listing_pages_by_id(db, add_vehicle):
+    vehicles = [add_vehicle(number, open_issue_count=number % 2) for number in range(1, 6)]
+    add_vehicle(99, owner_id="admin-2")
+
+    first = list_vehicles(db, fields="summary", limit=2)
+    rest = list_vehicles(db, fields="summary", limit=2000, after_id=first[-1].id)
+
+    assert all(isinstance(item, schemas.VehicleSummary) for item in first + rest)
+    assert [item.id for item in first + rest] == [vehicle.id for vehicle in vehicles]
+    assert [item.open_issue_count for item in first + rest] == [1, 0, 1, 0, 1]
+    assert first[0].license_plate == "WA 00001"
+
+
+def test_full_listing_includes_issues(db, add_vehicle):
+    vehicle = add_vehicle(1)
+    db.add(routes.models.VehicleIssue(vehicle_id=vehicle.id, title="Brakes", description="Squeaking"))
+    db.commit()
+
+    [listed] = list_vehicles(db)
+
+    assert [issue.title for issue in schemas.Vehicle.model_validate(listed).issues] == ["Brakes"]
+
+
+def test_batch_summary_is_scoped_to_the_fleet(db, add_vehicle):
+    mine = [add_vehicle(number) for number in (1, 2)]
+    theirs = add_vehicle(3, owner_id="admin-2")
+    ids = [mine[1].id, theirs.id, mine[0].id, mine[0].id]
+
+    found = run(routes.read_vehicles_batch(schemas.VehicleBatchRequest(ids=ids, fields="summary"), db, ADMIN))
+
+    assert all(isinstance(item, schemas.VehicleSummary) for item in found)
+    assert [item.id for item in found] == [mine[0].id, mine[1].id]
+
+
+def test_internal_batch_summary_spans_fleets(db, add_vehicle):
+    vehicles = [add_vehicle(1), add_vehicle(2, owner_id="admin-2")]
+    payload = schemas.InternalVehicleBatchRequest(ids=[v.id for v in vehicles], fields="summary")
+
+    found = run(routes.read_vehicles_batch_internal(payload, db))
+
+    assert [(item.id, item.owner_id) for item in found] == [(v.id, v.owner_id) for v in vehicles]
+
+
+def test_nearby_returns_vehicles_in_radius_nearest_first(db, add_vehicle):
+    far = add_vehicle(1, latitude=52.2400, longitude=21.0122)  # ~1.1 km north
+    near = add_vehicle(2, latitude=52.2300, longitude=21.0130)
+    add_vehicle(3, latitude=50.0647, longitude=19.9450)  # Kraków
+    add_vehicle(4, latitude=52.2297, longitude=21.0122, owner_id="admin-2")
+    add_vehicle(5)  # no position
+
+    found = run(routes.read_vehicles_nearby(52.2297, 21.0122, 5.0, 100, db, ADMIN))
+
+    assert [item.id for item in found] == [near.id, far.id]
+    assert all(isinstance(item, schemas.NearbyVehicle) for item in found)
+    assert found[0].distance_km < 0.1 < found[1].distance_km < 1.5
+
+
+def test_in_bounds_returns_vehicles_inside_the_viewport(db, add_vehicle):
+    inside = [add_vehicle(1, latitude=52.23, longitude=21.01), add_vehicle(2, latitude=52.10, longitude=20.90)]
+    add_vehicle(3, latitude=52.50, longitude=21.01)
+
+    found = run(routes.read_vehicles_in_bounds(52.0, 20.8, 52.4, 21.3, 500, db, ADMIN))
+
+    assert all(isinstance(item, schemas.VehicleSummary) for item in found)
+    assert [item.id for item in found] == [vehicle.id for vehicle in inside]
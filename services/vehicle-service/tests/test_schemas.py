@@ -0,0 +1,23 @@
+import pytest
+from pydantic import ValidationError
+
+from app.schemas import VehicleUpdate
+
+
+def test_vehicle_update_takes_both_coordinates_or_neither():
+    assert VehicleUpdate(status="available").model_fields_set == {"status"}
+    assert VehicleUpdate(latitude=52.2, longitude=21.0).model_dump(exclude_unset=True) == {
+        "latitude": 52.2,
+        "longitude": 21.0,
+    }
+    # Clearing the position clears the geohash too
+    assert VehicleUpdate(latitude=None, longitude=None).model_dump(exclude_unset=True) == {
+        "latitude": None,
+        "longitude": None,
+    }
+
+
+@pytest.mark.parametrize("fields", [{"latitude": 52.2}, {"longitude": 21.0}, {"latitude": None}])
+def test_vehicle_update_rejects_a_single_coordinate(fields):
+    with pytest.raises(ValidationError, match="latitude and longitude must be sent together"):
+        VehicleUpdate(**fields)
@@ -0,0 +1,35 @@
+from collections import OrderedDict
+
+import pytest
+
+from app import telemetry
+
+
+@pytest.fixture(autouse=True)
+def last_emitted(monkeypatch):
+    monkeypatch.setattr(telemetry, "TELEMETRY_EVENT_INTERVAL_SECONDS", 10)
+    monkeypatch.setattr(telemetry, "_last_emitted", OrderedDict())
+    return telemetry._last_emitted
+
+
+def test_event_throttle_starts_only_once_recorded():
+    assert telemetry._due_for_event(1, 100.0)
+    # A batch that never committed leaves the vehicle due
+    assert telemetry._due_for_event(1, 100.0)
+
+    telemetry._record_emitted([1], 100.0)
+
+    assert not telemetry._due_for_event(1, 109.0)
+    assert telemetry._due_for_event(1, 110.0)
+
+
+def test_record_emitted_prunes_expired_vehicles(last_emitted):
+    telemetry._record_emitted([1, 2], 100.0)
+    telemetry._record_emitted([3], 105.0)
+    telemetry._record_emitted([2], 108.0)
+
+    telemetry._record_emitted([4], 112.0)
+
+    assert list(last_emitted.items()) == [(3, 105.0), (2, 108.0), (4, 112.0)]
+    telemetry._record_emitted([], 200.0)
+    assert last_emitted == {}